@@ -0,0 +1,893 @@
+"""
+This module contains the AsyncApp listeners for responding to new Slack posts.
+
+They mirror `app.bolt_listeners` but await the `AsyncWebClient`, LiteLLM and file downloads,
+so that concurrent conversations share one event loop instead of one thread each.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Callable
+from functools import partial
+
+from litellm.exceptions import ContextWindowExceededError, Timeout
+from slack_bolt.context.ack.async_ack import AsyncAck
+from slack_bolt.context.async_context import AsyncBoltContext
+from slack_bolt.request.async_request import AsyncBoltRequest
+from slack_sdk.web import WebClient
+from slack_sdk.web.async_client import AsyncSlackResponse, AsyncWebClient
+
+from app import bolt_listeners
+from app.async_litellm_service import reply_to_slack_with_litellm
+from app.bolt_listeners import (
+    CONTEXT_WINDOW_EXCEEDED_ERROR_MESSAGE,
+    DM_HISTORY_PAGE_SIZE,
+    LOADING_TEXT,
+    MAX_DM_REPLIES,
+    MAX_PDF_SLOTS,
+    MAX_THREAD_REPLIES,
+    THREAD_HISTORY_PAGE_SIZE,
+    TIMEOUT_ERROR_MESSAGE,
+    convert_reply_text,
+    log_reply_stats,
+)
+from app.bolt_logic import (
+    build_queue_full_reply,
+    determine_thread_ts_to_reply,
+    extract_user_id_from_context,
+    has_read_files_scope,
+    is_post_from_bot,
+    is_post_in_dm,
+    is_post_mentioned,
+    is_slack_locale_enabled,
+)
+from app.context_logic import (
+    fit_messages_to_token_budget,
+    merge_consecutive_assistant_messages,
+)
+from app.engaged_thread_service import (
+    get_indexed_parent_post_mentioned,
+    may_respond_to_post,
+    record_engaged_thread_event,
+    store_parent_post_mentioned,
+)
+from app.env import (
+    IMAGE_INPUT_ENABLED,
+    LLM_TIMEOUT_SECONDS,
+    PDF_INPUT_ENABLED,
+    PROMPT_CACHING_ENABLED,
+    PROMPT_CACHING_TTL,
+    SLACK_FORMATTING_ENABLED,
+    SYSTEM_PROMPT_TEMPLATE,
+)
+from app.history_logic import (
+    TokenBudget,
+    TokenCounter,
+    get_reply_text,
+    select_newest_replies_within_budget,
+    trim_replies_to_token_budget,
+)
+from app.litellm_service import count_text_tokens, get_history_token_budget
+from app.message_logic import (
+    build_assistant_message,
+    build_slack_user_prefixed_text,
+    build_system_message,
+    build_user_message,
+    filter_replies_after_last_marker,
+    maybe_set_cache_points,
+)
+from app.post_burst_service import (
+    async_wait_for_post_burst,
+    discard_post_burst,
+    get_burst_loading_reply,
+    record_post_burst,
+    store_burst_loading_reply,
+)
+from app.post_queue_logic import build_post_schedule
+from app.post_queue_service import (
+    async_post_executor,
+    is_duplicate_event,
+    priority_class_weights,
+)
+from app.slack_image_service import async_build_image_url_items_from_slack_files
+from app.slack_pdf_service import async_build_pdf_file_items_from_slack_files
+from app.stage_timing_logic import StageTimer
+from app.thread_history_logic import convert_thread_reply_to_dict, has_thread_reply
+from app.thread_history_service import (
+    get_cached_thread_replies,
+    merge_thread_replies,
+    record_thread_message_event,
+    store_thread_replies,
+)
+from app.translation_service import async_translate
+from app.user_profile_service import async_get_user_profile
+
+
+async def enqueue_new_post(
+    ack: AsyncAck,
+    body: dict,
+    request: AsyncBoltRequest,
+    context: AsyncBoltContext,
+    payload: dict,
+    client: AsyncWebClient,
+) -> None:
+    """
+    Acknowledges a new Slack post and queues it to be handled by a post worker.
+
+    Retried deliveries of the same event are skipped, and posts that are certainly ignored are
+    not queued, so they never take a slot or a worker. Posts in the same thread are handled in
+    order. A post is dropped if the queue stays full, and since Slack has already received
+    the acknowledgment and will not retry it, the user is asked in a reply to post it again.
+    Posts that may join a burst are recorded on arrival, so earlier posts of the burst know
+    they were superseded.
+
+    Args:
+        ack (AsyncAck): The acknowledgment function provided by Slack Bolt.
+        body (dict): The request body of the event.
+        request (AsyncBoltRequest): The incoming request, whose headers carry Slack's retry number.
+        context (AsyncBoltContext): The Bolt context object.
+        payload (dict): The payload of the incoming Slack post.
+        client (AsyncWebClient): The Slack AsyncWebClient instance.
+
+    Returns:
+        None
+    """
+    await ack()
+    if is_duplicate_event(body, request.headers):
+        return
+    if context.channel_id is not None:
+        # Every message keeps the thread caches current, even if it is not responded to
+        record_thread_message_event(context.channel_id, payload)
+        record_engaged_thread_event(context.channel_id, payload, context.bot_user_id)
+    if not may_respond_to_post(context.channel_id, payload, context.bot_user_id):
+        return
+    schedule = build_post_schedule(
+        channel_id=context.channel_id,
+        user_id=extract_user_id_from_context(context),
+        payload=payload,
+        bot_user_id=context.bot_user_id,
+        class_weights=priority_class_weights,
+    )
+    burst_key = record_post_burst(context.channel_id, payload, context.bot_user_id)
+    if not await async_post_executor.submit(
+        schedule, respond_to_new_post, context, payload, client, burst_key=burst_key
+    ):
+        # Slack has received the ack and will not retry, so tell the user the post was dropped
+        if burst_key is not None:
+            discard_post_burst(burst_key, payload["ts"])
+        logging.warning(
+            f"Dropped a post because the post queue is full ({async_post_executor.stats()})"
+        )
+        if context.channel_id is not None:
+            await client.chat_postMessage(
+                **build_queue_full_reply(context.channel_id, payload)
+            )
+
+
+async def respond_to_new_post(
+    context: AsyncBoltContext,
+    payload: dict,
+    client: AsyncWebClient,
+    burst_key: tuple | None = None,
+) -> None:
+    """
+    Responds to a new Slack post.
+
+    This function filters irrelevant posts, posts a loading reply while building the
+    conversation history, and sends a response using a language model. The time of each stage
+    is logged at debug level.
+
+    A post in a burst shares the loading reply of the burst and waits for the burst to end.
+    Only the latest post of the burst is replied to, with a history that includes the others.
+
+    Args:
+        context (AsyncBoltContext): The Bolt context object.
+        payload (dict): The payload of the incoming Slack post.
+        client (AsyncWebClient): The Slack AsyncWebClient instance.
+        burst_key (Optional[tuple]): The key of the burst the post joined, if any.
+
+    Returns:
+        None
+    """
+    if context.channel_id is None:
+        raise ValueError("context.channel_id cannot be None")
+    user_id = extract_user_id_from_context(context)
+    if user_id is None:
+        raise ValueError("User ID could not be determined from context")
+
+    if is_post_from_bot(payload):
+        return
+
+    timer = StageTimer()
+    wip_reply = None
+    reply_thread_ts = None
+    try:
+        if not (
+            is_post_mentioned(context.bot_user_id, payload)
+            or is_post_in_dm(payload)
+            or await has_parent_post_mentioned(context, payload, client)
+        ):
+            return
+        build_history = partial(
+            build_messages,
+            client=client,
+            context=context,
+            payload=payload,
+            channel_id=context.channel_id,
+            user_id=user_id,
+        )
+        # The history does not depend on the loading reply, so fetch it meanwhile, unless later
+        # posts of a burst must be included in it
+        messages_task = (
+            asyncio.create_task(timer.call_async("history", build_history()))
+            if burst_key is None
+            else None
+        )
+        try:
+            with timer.measure("locale"):
+                locale = await resolve_locale(context, client)
+            with timer.measure("translate"):
+                loading_text = await async_translate(locale, LOADING_TEXT)
+            with timer.measure("loading_reply"):
+                reply_thread_ts, wip_reply = await post_loading_reply(
+                    client=client,
+                    channel_id=context.channel_id,
+                    payload=payload,
+                    loading_text=loading_text,
+                    burst_key=burst_key,
+                )
+            if messages_task is not None:
+                messages = await messages_task
+            else:
+                with timer.measure("burst"):
+                    is_latest = await async_wait_for_post_burst(
+                        burst_key, payload["ts"]
+                    )
+                if not is_latest:
+                    logging.debug(
+                        "Skipped a post superseded by a newer post in its burst"
+                    )
+                    return
+                messages = await timer.call_async(
+                    "history", build_history(exclude_ts=wip_reply["ts"])
+                )
+        finally:
+            if messages_task is not None:
+                messages_task.cancel()
+        with timer.measure("reply"):
+            await reply_to_slack_with_litellm(
+                client=client,
+                channel=context.channel_id,
+                user_id=user_id,
+                team_id=context.team_id,
+                thread_ts=reply_thread_ts,
+                messages=messages,
+                loading_text=loading_text,
+                wip_reply=wip_reply,
+                timeout_seconds=LLM_TIMEOUT_SECONDS,
+            )
+        logging.debug("Handled a post in stages: %s", timer.format_summary())
+        log_reply_stats()
+    except Timeout, TimeoutError:
+        await handle_timeout_error(
+            client=client,
+            channel_id=context.channel_id,
+            locale=await resolve_locale(context, client),
+            thread_ts=reply_thread_ts,
+        )
+    except ContextWindowExceededError as e:
+        await handle_context_window_exceeded_error(
+            client=client,
+            channel_id=context.channel_id,
+            e=e,
+            thread_ts=reply_thread_ts,
+        )
+    except Exception as e:
+        await handle_exception(
+            client=client,
+            channel_id=context.channel_id,
+            e=e,
+            thread_ts=reply_thread_ts,
+        )
+
+
+async def resolve_locale(
+    context: AsyncBoltContext, client: AsyncWebClient
+) -> str | None:
+    """
+    Looks up the locale of the user who made the post, if replies use Slack locales.
+
+    Args:
+        context (AsyncBoltContext): The Bolt context object.
+        client (AsyncWebClient): The Slack AsyncWebClient instance.
+
+    Returns:
+        Optional[str]: The locale, such as "ja-JP", or None if unknown or disabled.
+    """
+    if not is_slack_locale_enabled(context):
+        return None
+    user_id = extract_user_id_from_context(context)
+    if user_id is None:
+        return None
+    try:
+        return (await async_get_user_profile(client, user_id)).locale
+    except Exception as e:
+        logging.debug(f"Failed to get the locale of {user_id}: {e}")
+        return None
+
+
+async def has_parent_post_mentioned(
+    context: AsyncBoltContext,
+    payload: dict,
+    client: AsyncWebClient,
+) -> bool:
+    """
+    Checks whether the parent post of the thread mentions the bot.
+
+    Threads whose parent post was seen in an event or looked up before are answered from the
+    engaged-thread index without calling Slack.
+
+    Args:
+        context (AsyncBoltContext): The Bolt context object.
+        payload (dict): The payload of the incoming Slack post.
+        client (AsyncWebClient): The Slack AsyncWebClient instance.
+
+    Returns:
+        bool: True if the parent post mentions the bot, False otherwise.
+    """
+    channel_id, thread_ts = context.channel_id, payload.get("thread_ts")
+    if channel_id is None or thread_ts is None:
+        return False
+    mentioned = get_indexed_parent_post_mentioned(channel_id, thread_ts)
+    if mentioned is not None:
+        return mentioned
+    parent_post = await find_parent_post(
+        client=client,
+        channel_id=channel_id,
+        thread_ts=thread_ts,
+    )
+    mentioned = is_post_mentioned(context.bot_user_id, parent_post)
+    if parent_post is not None and parent_post.get("ts") == thread_ts:
+        store_parent_post_mentioned(channel_id, thread_ts, mentioned)
+    return mentioned
+
+
+async def find_parent_post(
+    client: AsyncWebClient, channel_id: str | None, thread_ts: str | None
+) -> dict | None:
+    """
+    Finds the parent post of a thread in Slack.
+
+    Args:
+        client (AsyncWebClient): The Slack AsyncWebClient instance.
+        channel_id (Optional[str]): The ID of the channel containing the thread.
+        thread_ts (Optional[str]): The timestamp of the thread.
+
+    Returns:
+        Optional[dict]: The parent post if found, None otherwise.
+    """
+    if channel_id is None or thread_ts is None:
+        return None
+    response = await client.conversations_history(
+        channel=channel_id,
+        latest=thread_ts,
+        limit=1,
+        inclusive=True,
+    )
+    posts: list[dict] = response.get("messages", [])
+    return posts[0] if posts else None
+
+
+async def post_loading_reply(
+    *,
+    client: AsyncWebClient,
+    channel_id: str,
+    payload: dict,
+    loading_text: str,
+    burst_key: tuple | None = None,
+) -> tuple[str | None, AsyncSlackResponse]:
+    """
+    Posts a loading reply to a Slack post in a channel or thread.
+
+    Args:
+        client (AsyncWebClient): The Slack AsyncWebClient instance.
+        channel_id (str): The ID of the channel to reply to.
+        payload (dict): The payload of the incoming Slack post.
+        loading_text (str): The loading text to display.
+        burst_key (Optional[tuple]): The key of the burst the post joined, whose loading reply
+            is reused if already posted.
+
+    Returns:
+        tuple[Optional[str], AsyncSlackResponse]: Thread timestamp and Slack API response.
+    """
+    thread_ts = determine_thread_ts_to_reply(payload)
+    if (
+        burst_key is not None
+        and (wip_reply := get_burst_loading_reply(burst_key)) is not None
+    ):
+        return thread_ts, wip_reply
+    wip_reply = await client.chat_postMessage(
+        channel=channel_id,
+        thread_ts=thread_ts,
+        text=loading_text,
+    )
+    if burst_key is not None:
+        store_burst_loading_reply(burst_key, wip_reply)
+    return thread_ts, wip_reply
+
+
+async def build_messages(
+    *,
+    client: AsyncWebClient,
+    context: AsyncBoltContext,
+    payload: dict,
+    channel_id: str,
+    user_id: str,
+    exclude_ts: str | None = None,
+) -> list[dict]:
+    """
+    Builds the conversation history for the Slack post.
+
+    Args:
+        client (AsyncWebClient): The Slack AsyncWebClient instance.
+        context (AsyncBoltContext): The Bolt context object.
+        payload (dict): The payload of the incoming Slack post.
+        channel_id (str): The ID of the channel where the post was made.
+        user_id (str): The ID of the user who made the post.
+        exclude_ts (Optional[str]): The timestamp of a reply to leave out, such as the loading
+            reply of a burst posted before its later posts.
+
+    Returns:
+        list[dict]: A list of messages representing the conversation history.
+    """
+    system_message = build_system_message(
+        system_prompt_template=SYSTEM_PROMPT_TEMPLATE,
+        bot_user_id=context.bot_user_id,
+        slack_formatting_enabled=SLACK_FORMATTING_ENABLED,
+        prompt_caching_enabled=PROMPT_CACHING_ENABLED,
+        prompt_caching_ttl=PROMPT_CACHING_TTL,
+    )
+    # Texts counted while selecting the history are not tokenized again when fitting
+    count_tokens = TokenCounter(count_text_tokens)
+    replies = await get_replies(
+        client=client,
+        payload=payload,
+        channel_id=channel_id,
+        user_id=user_id,
+        bot_user_id=context.bot_user_id,
+        count_tokens=count_tokens,
+    )
+    if exclude_ts is not None:
+        replies = [reply for reply in replies if reply.get("ts") != exclude_ts]
+    filtered_replies = filter_replies_after_last_marker(
+        replies=replies,
+        bot_user_id=context.bot_user_id,
+        marker_text=CONTEXT_WINDOW_EXCEEDED_ERROR_MESSAGE,
+    )
+    history = await convert_replies_to_messages(filtered_replies, context)
+    history = merge_consecutive_assistant_messages(
+        history,
+        speaker_prefix=build_slack_user_prefixed_text(
+            {"user": context.bot_user_id}, ""
+        ),
+    )
+    messages = fit_messages_to_token_budget(
+        messages=[system_message] + history,
+        count_text_tokens=count_tokens,
+        max_tokens=get_history_token_budget(),
+    )
+    maybe_set_cache_points(
+        messages=messages,
+        prompt_caching_enabled=PROMPT_CACHING_ENABLED,
+        prompt_caching_ttl=PROMPT_CACHING_TTL,
+    )
+    return messages
+
+
+async def get_replies(
+    *,
+    client: AsyncWebClient,
+    payload: dict,
+    channel_id: str,
+    user_id: str,
+    bot_user_id: str | None = None,
+    count_tokens: Callable[[str], int] = count_text_tokens,
+) -> list[dict]:
+    """
+    Retrieves replies to be used as conversation history based on the context of the incoming Slack
+    post.
+
+    Args:
+        client (AsyncWebClient): The Slack AsyncWebClient instance.
+        payload (dict): The payload of the incoming Slack post.
+        channel_id (str): The ID of the channel where the post was made.
+        user_id (str): The ID of the user who made the post.
+        bot_user_id (Optional[str]): The bot's user ID.
+        count_tokens (Callable[[str], int]): The function counting the tokens of a text.
+
+    Returns:
+        list[dict]: A list of replies based on the post context.
+    """
+    # The converted texts are counted, since those are what the model receives
+    convert_text = partial(
+        convert_reply_text, bot_user_id=bot_user_id, channel_id=channel_id
+    )
+    thread_ts = payload.get("thread_ts")
+    # In a DM with the bot (not part of a thread)
+    if payload.get("channel_type") == "im" and thread_ts is None:
+        return await get_dm_replies(
+            client, channel_id, count_tokens=count_tokens, convert_text=convert_text
+        )
+    # In a thread
+    if thread_ts is not None:
+        return trim_replies_to_token_budget(
+            replies=await get_thread_replies(
+                client, channel_id, thread_ts, payload.get("ts")
+            ),
+            count_tokens=count_tokens,
+            max_tokens=get_history_token_budget(),
+            convert_text=convert_text,
+        )
+    # In a channel (not in a thread), with a mention to the bot
+    return [
+        {
+            "text": payload["text"],
+            "user": user_id,
+            "bot_id": payload.get("bot_id"),
+            "files": payload.get("files"),
+        }
+    ]
+
+
+async def get_thread_replies(
+    client: AsyncWebClient,
+    channel_id: str,
+    thread_ts: str,
+    current_ts: str | None = None,
+) -> list[dict]:
+    """
+    Retrieves all replies to a Slack thread, reusing the cached thread history.
+
+    The cache is kept up to date by message events. If the current post is missing from it,
+    only the replies after the newest cached one are fetched.
+
+    Args:
+        client (AsyncWebClient): The Slack AsyncWebClient instance.
+        channel_id (str): The ID of the channel containing the thread.
+        thread_ts (str): The timestamp of the parent post.
+        current_ts (Optional[str]): The timestamp of the post being replied to.
+
+    Returns:
+        list[dict]: A list of replies in the thread.
+    """
+    cached_replies = get_cached_thread_replies(channel_id, thread_ts)
+    if cached_replies is None:
+        messages = await fetch_thread_messages(client, channel_id, thread_ts)
+        store_thread_replies(channel_id, thread_ts, messages)
+        return messages
+    if current_ts is not None and not has_thread_reply(cached_replies, current_ts):
+        messages = await fetch_thread_messages(
+            client, channel_id, thread_ts, oldest=cached_replies[-1].ts
+        )
+        merged_replies = merge_thread_replies(channel_id, thread_ts, messages)
+        if merged_replies is None:
+            return await get_thread_replies(client, channel_id, thread_ts)
+        cached_replies = merged_replies
+    return [convert_thread_reply_to_dict(reply) for reply in cached_replies]
+
+
+async def fetch_thread_messages(
+    client: AsyncWebClient,
+    channel_id: str,
+    thread_ts: str,
+    oldest: str | None = None,
+) -> list[dict]:
+    """
+    Fetches the messages of a Slack thread, page by page up to the reply limit.
+
+    Args:
+        client (AsyncWebClient): The Slack AsyncWebClient instance.
+        channel_id (str): The ID of the channel containing the thread.
+        thread_ts (str): The timestamp of the parent post.
+        oldest (Optional[str]): Only fetch messages after this timestamp, if given.
+
+    Returns:
+        list[dict]: The messages of the thread, oldest first.
+    """
+    messages: list[dict] = []
+    cursor = None
+    while len(messages) < MAX_THREAD_REPLIES:
+        response = await client.conversations_replies(
+            channel=channel_id,
+            ts=thread_ts,
+            oldest=oldest,
+            limit=THREAD_HISTORY_PAGE_SIZE,
+            cursor=cursor,
+        )
+        messages += response.get("messages", [])
+        cursor = (response.get("response_metadata") or {}).get("next_cursor")
+        if not cursor:
+            break
+    return messages
+
+
+async def get_dm_replies(
+    client: AsyncWebClient,
+    channel_id: str,
+    *,
+    count_tokens: Callable[[str], int] = count_text_tokens,
+    convert_text: Callable[[dict], str] = get_reply_text,
+) -> list[dict]:
+    """
+    Retrieves recent replies in a direct message (DM) conversation.
+    Pages newest-first through up to 100 messages from the last 24 hours and stops once
+    the history token budget is filled.
+
+    Args:
+        client (AsyncWebClient): The Slack AsyncWebClient instance.
+        channel_id (str): The ID of the DM channel.
+        count_tokens (Callable[[str], int]): The function counting the tokens of a text.
+        convert_text (Callable[[dict], str]): The function building the text of a reply that
+            is sent to the model.
+
+    Returns:
+        list[dict]: A list of replies in the DM conversation.
+    """
+    cutoff_time = time.time() - 86400  # 24 hours ago
+    budget = TokenBudget(max_tokens=get_history_token_budget())
+    replies: list[dict] = []
+    cursor = None
+    while len(replies) < MAX_DM_REPLIES:
+        response = await client.conversations_history(
+            channel=channel_id,
+            oldest=str(cutoff_time),
+            limit=min(DM_HISTORY_PAGE_SIZE, MAX_DM_REPLIES - len(replies)),
+            inclusive=True,
+            cursor=cursor,
+        )
+        replies += select_newest_replies_within_budget(
+            replies_newest_first=response.get("messages", []),
+            count_tokens=count_tokens,
+            budget=budget,
+            convert_text=convert_text,
+        )
+        cursor = (response.get("response_metadata") or {}).get("next_cursor")
+        if budget.is_filled or not cursor:
+            break
+
+    return list(reversed(replies))
+
+
+async def convert_replies_to_messages(
+    replies: list[dict],
+    context: AsyncBoltContext,
+) -> list[dict]:
+    """
+    Converts Slack replies to a list of messages for the language model.
+
+    Args:
+        replies (list[dict]): The list of replies to convert.
+        context (AsyncBoltContext): The Bolt context object.
+
+    Returns:
+        list[dict]: A list of messages representing the conversation history.
+    """
+
+    # Ignore trailing bot replies (including a loading reply)
+    while replies and replies[-1].get("user") == context.bot_user_id:
+        replies.pop()
+
+    messages: list[dict] = []
+    used_pdf_slots = 0
+
+    # Process replies in reverse order to prioritize recent PDFs and avoid unnecessary downloads
+    for reply in reversed(replies):
+        text = convert_reply_text(reply, context.bot_user_id, context.channel_id)
+
+        if reply["user"] == context.bot_user_id:
+            messages.append(build_assistant_message(text))
+            continue
+
+        content = [{"type": "text", "text": text}]
+        if (
+            reply.get("bot_id") is None
+            and IMAGE_INPUT_ENABLED
+            and has_read_files_scope(context.authorize_result)
+        ):
+            if context.bot_token is None:
+                raise ValueError("context.bot_token cannot be None")
+            content += await async_build_image_url_items_from_slack_files(
+                bot_token=context.bot_token,
+                files=reply.get("files"),
+            )
+
+        # Only process PDFs if we haven't reached the limit
+        if (
+            used_pdf_slots < MAX_PDF_SLOTS
+            and reply.get("bot_id") is None
+            and PDF_INPUT_ENABLED
+            and has_read_files_scope(context.authorize_result)
+        ):
+            if context.bot_token is None:
+                raise ValueError("context.bot_token cannot be None")
+            pdf_file_items = await async_build_pdf_file_items_from_slack_files(
+                bot_token=context.bot_token,
+                files=reply.get("files"),
+                pdf_slots=MAX_PDF_SLOTS,
+                used_pdf_slots=used_pdf_slots,
+            )
+
+            # Count and add PDFs
+            # Note: Prepend PDFs to avoid Bedrock Converse API error
+            # (cache control cannot immediately follow document type)
+            used_pdf_slots += len(pdf_file_items)
+            content = pdf_file_items + content
+
+        messages.append(build_user_message(content))
+
+    # Reverse the messages to restore chronological order
+    messages.reverse()
+    return messages
+
+
+async def handle_timeout_error(
+    *,
+    client: AsyncWebClient,
+    channel_id: str,
+    locale: str | None,
+    thread_ts: str | None = None,
+):
+    """
+    Handles timeout errors by posting an error message as a separate reply.
+
+    Args:
+        client (AsyncWebClient): The Slack AsyncWebClient instance.
+        channel_id (str): The ID of the channel where the post was made.
+        locale (Optional[str]): The locale for translation.
+        thread_ts (Optional[str]): The thread timestamp to reply to.
+
+    Returns:
+        None
+    """
+    text = await async_translate(locale, TIMEOUT_ERROR_MESSAGE)
+    await client.chat_postMessage(
+        channel=channel_id,
+        thread_ts=thread_ts,
+        text=text,
+    )
+
+
+async def handle_context_window_exceeded_error(
+    *,
+    client: AsyncWebClient,
+    channel_id: str,
+    e: ContextWindowExceededError,
+    thread_ts: str | None = None,
+):
+    """
+    Handles context window exceeded errors by posting an error message as a separate reply.
+
+    Args:
+        client (AsyncWebClient): The Slack AsyncWebClient instance.
+        channel_id (str): The ID of the channel where the post was made.
+        e (ContextWindowExceededError): The exception that occurred.
+        thread_ts (Optional[str]): The thread timestamp to reply to.
+
+    Returns:
+        None
+    """
+    text = CONTEXT_WINDOW_EXCEEDED_ERROR_MESSAGE + "\n\n" + f"Error: {e}"
+    await client.chat_postMessage(
+        channel=channel_id,
+        thread_ts=thread_ts,
+        text=text,
+    )
+
+
+async def handle_exception(
+    *,
+    client: AsyncWebClient,
+    channel_id: str,
+    e: Exception,
+    thread_ts: str | None = None,
+):
+    """
+    Handles exceptions by posting an error message as a separate reply.
+
+    Args:
+        client (AsyncWebClient): The Slack AsyncWebClient instance.
+        channel_id (str): The ID of the channel where the post was made.
+        e (Exception): The exception that occurred.
+        thread_ts (Optional[str]): The thread timestamp to reply to.
+
+    Returns:
+        None
+    """
+    text = f":warning: Failed to reply: {e}"
+    client.logger.exception(text)
+    await client.chat_postMessage(
+        channel=channel_id,
+        thread_ts=thread_ts,
+        text=text,
+    )
+
+
+def build_sync_client(client: AsyncWebClient) -> WebClient:
+    """
+    Builds a WebClient sharing the credentials of an AsyncWebClient.
+
+    The Home tab and MCP OAuth flows are rare and built on blocking helpers, so the AsyncApp
+    runs them in worker threads with a WebClient instead of duplicating them.
+
+    Args:
+        client (AsyncWebClient): The Slack AsyncWebClient instance.
+
+    Returns:
+        WebClient: A WebClient for the same token and API base URL.
+    """
+    return WebClient(token=client.token, base_url=client.base_url)
+
+
+async def handle_app_home_opened(client: AsyncWebClient, event: dict) -> None:
+    """
+    Handle app_home_opened event in a worker thread.
+
+    Args:
+        client (AsyncWebClient): Slack AsyncWebClient instance.
+        event (dict): The app_home_opened event payload.
+
+    Returns:
+        None
+    """
+    await asyncio.to_thread(
+        bolt_listeners.handle_app_home_opened, build_sync_client(client), event
+    )
+
+
+async def handle_enable_mcp_oauth_action(body: dict, client: AsyncWebClient) -> None:
+    """
+    Handle enable MCP OAuth action from Slack button in a worker thread.
+
+    Args:
+        body (dict): Slack event body.
+        client (AsyncWebClient): Slack AsyncWebClient instance.
+
+    Returns:
+        None
+    """
+    await asyncio.to_thread(
+        bolt_listeners.handle_enable_mcp_oauth_action, body, build_sync_client(client)
+    )
+
+
+async def handle_disable_mcp_oauth_action(body: dict, client: AsyncWebClient) -> None:
+    """
+    Handle disable authentication action from home tab in a worker thread.
+
+    Args:
+        body (dict): Action payload from Slack.
+        client (AsyncWebClient): Slack AsyncWebClient instance.
+
+    Returns:
+        None
+    """
+    await asyncio.to_thread(
+        bolt_listeners.handle_disable_mcp_oauth_action, body, build_sync_client(client)
+    )
+
+
+async def handle_cancel_mcp_oauth_action(body: dict, client: AsyncWebClient) -> None:
+    """
+    Handle cancel OAuth polling action from home tab in a worker thread.
+
+    Args:
+        body (dict): Action payload from Slack.
+        client (AsyncWebClient): Slack AsyncWebClient instance.
+
+    Returns:
+        None
+    """
+    await asyncio.to_thread(
+        bolt_listeners.handle_cancel_mcp_oauth_action, body, build_sync_client(client)
+    )
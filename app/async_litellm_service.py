@@ -0,0 +1,390 @@
+"""
+This module provides asyncio counterparts of the LiteLLM service functions.
+
+They share the logic of `app.litellm_service` but await `litellm.acompletion` and the
+`AsyncWebClient`, so many streaming replies can run on a single event loop.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator
+from typing import cast
+
+import litellm
+from litellm.litellm_core_utils.streaming_handler import CustomStreamWrapper
+from litellm.types.utils import Message, ModelResponse, ModelResponseStream, Usage
+from slack_sdk.web import SlackResponse
+from slack_sdk.web.async_client import AsyncSlackResponse, AsyncWebClient
+
+from app.async_reply_sink_service import SlackReplySink
+from app.env import (
+    LLM_CHUNK_GAP_TIMEOUT_SECONDS,
+    LLM_FIRST_TOKEN_TIMEOUT_SECONDS,
+    LLM_MAX_STEPS,
+    LLM_MAX_TOKENS,
+    LLM_MAX_TOTAL_TOKENS,
+    LLM_TEMPERATURE,
+    SLACK_UPDATE_MAX_INTERVAL_SECONDS,
+    SLACK_UPDATE_MIN_INTERVAL_SECONDS,
+    SLACK_UPDATE_TEXT_BUFFER_SIZE,
+)
+from app.flush_logic import FlushScheduler
+from app.litellm_logic import (
+    StreamAccumulator,
+    StreamStallDetector,
+    build_agent_step,
+    extract_total_tokens,
+    find_agent_stop_reason,
+    format_agent_step,
+)
+from app.litellm_service import build_litellm_completion_kwargs
+from app.message_logic import build_assistant_message
+from app.reply_sink_logic import AsyncReplySink
+from app.reply_split_logic import ReplySplitter
+from app.tools_service import async_process_tool_calls, get_all_tools
+
+
+async def reply_to_slack_with_litellm(
+    *,
+    client: AsyncWebClient,
+    channel: str,
+    user_id: str,
+    team_id: str | None,
+    thread_ts: str | None,
+    messages: list[dict],
+    loading_text: str,
+    wip_reply: dict | SlackResponse | AsyncSlackResponse,
+    timeout_seconds: int,
+) -> None:
+    """
+    Sends a reply to Slack using LiteLLM, running tool calls until the model answers.
+
+    Args:
+        client (AsyncWebClient): The Slack AsyncWebClient instance.
+        channel (str): The Slack channel ID.
+        user_id (str): The user ID of the person who initiated the conversation.
+        team_id (Optional[str]): The team ID of the workspace the conversation belongs to.
+        thread_ts (Optional[str]): The timestamp of the thread to reply to.
+        messages (list[dict]): The list of messages to include in the reply.
+        loading_text (str): The text to display while waiting for a response.
+        wip_reply (Union[dict, SlackResponse, AsyncSlackResponse]): The message object for
+            the in-progress reply.
+        timeout_seconds (int): The timeout duration in seconds for the whole reply.
+
+    Returns:
+        None
+    """
+    sink = SlackReplySink(
+        client=client,
+        channel=channel,
+        thread_ts=thread_ts,
+        user_id=user_id,
+        team_id=team_id,
+        wip_reply=wip_reply,
+        loading_text=loading_text,
+    )
+    await reply_with_litellm(
+        sink=sink,
+        channel=channel,
+        user_id=user_id,
+        messages=messages,
+        timeout_seconds=timeout_seconds,
+    )
+
+
+async def reply_with_litellm(
+    *,
+    sink: AsyncReplySink,
+    channel: str,
+    user_id: str,
+    messages: list[dict],
+    timeout_seconds: int,
+) -> None:
+    """
+    Streams a LiteLLM reply to a reply sink, running tool calls until the model answers.
+
+    Each step streams one model response and runs the tool calls it requested. The loop stops
+    with an error when the step or token budget is exhausted before a final answer.
+
+    Args:
+        sink (AsyncReplySink): The sink that receives the reply.
+        channel (str): The Slack channel ID.
+        user_id (str): The user ID of the person who initiated the conversation.
+        messages (list[dict]): The list of messages to include in the reply.
+        timeout_seconds (int): The timeout duration in seconds for the whole reply.
+
+    Returns:
+        None
+    """
+    start_time = time.time()
+    tools = get_all_tools(channel=channel, user_id=user_id)
+    total_tokens = 0
+    step = 0
+    while True:
+        step += 1
+        step_start = time.monotonic()
+        stream = await start_litellm_stream(
+            temperature=LLM_TEMPERATURE,
+            messages=messages,
+            user=user_id,
+            tools=tools,
+        )
+        response_message, usage = await stream_litellm_reply(
+            sink=sink,
+            messages=messages,
+            stream=stream,
+            timeout_seconds=timeout_seconds,
+            start_time=start_time,
+        )
+        llm_seconds = time.monotonic() - step_start
+        step_tokens = extract_total_tokens(usage)
+        total_tokens += step_tokens
+        tool_calls = response_message.tool_calls or []
+        stop_reason = find_agent_stop_reason(
+            step=step,
+            max_steps=LLM_MAX_STEPS,
+            total_tokens=total_tokens,
+            max_total_tokens=LLM_MAX_TOTAL_TOKENS,
+        )
+        tool_seconds = 0.0
+        if tool_calls and stop_reason is None:
+            await sink.show_loading()
+            tool_start = time.monotonic()
+            await async_process_tool_calls(
+                response_message=response_message,
+                assistant_message=messages[-1],
+                messages=messages,
+                user_id=user_id,
+            )
+            tool_seconds = time.monotonic() - tool_start
+        logging.info(
+            "Agent loop for %s: %s",
+            channel,
+            format_agent_step(
+                build_agent_step(
+                    step=step,
+                    llm_seconds=llm_seconds,
+                    tool_seconds=tool_seconds,
+                    total_tokens=step_tokens,
+                    tool_call_count=len(tool_calls),
+                )
+            ),
+        )
+        if not tool_calls:
+            return
+        if stop_reason is not None:
+            raise RuntimeError(stop_reason)
+
+
+async def call_litellm_completion(
+    *,
+    messages: list[dict],
+    user: str,
+    max_tokens: int = 1024,
+    temperature: float = 0,
+    stream: bool = False,
+    tools: list | None = None,
+) -> ModelResponse | CustomStreamWrapper:
+    """
+    Calls the LiteLLM completion API without blocking the event loop.
+
+    Args:
+        messages (list[dict]): The list of messages to send to the API.
+        user (str): The user ID of the person making the request.
+        max_tokens (int): The maximum number of tokens to generate.
+        temperature (float): The temperature for sampling.
+        stream (bool): Whether to stream the response.
+        tools (Optional[list]): The list of tools to use.
+
+    Returns:
+        Union[ModelResponse, CustomStreamWrapper]: The response from the API.
+    """
+    return await litellm.acompletion(
+        **build_litellm_completion_kwargs(
+            messages=messages,
+            user=user,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=stream,
+            tools=tools,
+        )
+    )
+
+
+async def start_litellm_stream(
+    *,
+    temperature: float,
+    messages: list[dict],
+    user: str,
+    tools: list | None = None,
+) -> CustomStreamWrapper:
+    """
+    Starts a LiteLLM stream for generating completions.
+
+    Args:
+        temperature (float): The temperature for sampling.
+        messages (list[dict]): The list of messages to send to the API.
+        user (str): The user ID of the person making the request.
+        tools (Optional[list]): The list of tools to use.
+
+    Returns:
+        CustomStreamWrapper: The stream wrapper for the response.
+    """
+    response = await call_litellm_completion(
+        messages=messages,
+        max_tokens=LLM_MAX_TOKENS,
+        temperature=temperature,
+        user=user,
+        stream=True,
+        tools=tools,
+    )
+    if not isinstance(response, CustomStreamWrapper):
+        raise TypeError("Expected CustomStreamWrapper when streaming is enabled")
+    return response
+
+
+async def stream_litellm_reply(
+    *,
+    sink: AsyncReplySink,
+    messages: list[dict],
+    stream: CustomStreamWrapper,
+    timeout_seconds: int,
+    start_time: float,
+) -> tuple[Message, Usage | None]:
+    """
+    Streams one LiteLLM response to a reply sink.
+
+    Responses exceeding the Slack message length limit continue in new messages, split at
+    paragraph, list or code fence boundaries.
+
+    Args:
+        sink (AsyncReplySink): The sink that receives the reply.
+        messages (list[dict]): The list of messages to include in the reply.
+        stream (CustomStreamWrapper): The stream wrapper for the response.
+        timeout_seconds (int): The timeout duration in seconds.
+        start_time (float): The start time of the request.
+
+    Returns:
+        tuple[Message, Optional[Usage]]: The response and its usage.
+    """
+    watchdog = StreamWatchdog(
+        stream=stream,
+        detector=StreamStallDetector(
+            start_time=asyncio.get_running_loop().time(),
+            first_chunk_timeout=LLM_FIRST_TOKEN_TIMEOUT_SECONDS,
+            chunk_gap_timeout=LLM_CHUNK_GAP_TIMEOUT_SECONDS,
+            total_timeout=timeout_seconds - (time.time() - start_time),
+        ),
+    )
+    accumulator = StreamAccumulator()
+    splitter = ReplySplitter()
+    while True:
+        assistant_message = build_assistant_message()
+        is_split = await handle_litellm_stream(
+            stream=watchdog,
+            accumulator=accumulator,
+            splitter=splitter,
+            assistant_message=assistant_message,
+            sink=sink,
+        )
+        messages.append(assistant_message)
+        if not is_split:
+            return accumulator.build_message(), accumulator.usage
+        await sink.start_next_message()
+
+
+class StreamWatchdog:
+    """
+    Hands over the chunks of a LiteLLM stream until it stalls, then closes the stream.
+
+    The detector runs on the event loop clock, so waiting for a chunk is bounded by an
+    `asyncio.timeout` instead of a separate thread.
+    """
+
+    def __init__(
+        self,
+        *,
+        stream: CustomStreamWrapper,
+        detector: StreamStallDetector,
+    ):
+        """Initialize the watchdog for a stream whose detector uses the event loop clock."""
+        self.stream = stream
+        self.detector = detector
+
+    async def __aiter__(self) -> AsyncIterator[ModelResponseStream]:
+        """Yield chunks as they arrive, raising TimeoutError once the stream stalls."""
+        loop = asyncio.get_running_loop()
+        iterator = aiter(self.stream)
+        while True:
+            deadline = self.detector.next_deadline()
+            try:
+                async with asyncio.timeout_at(deadline):
+                    chunk = await anext(iterator)
+            except StopAsyncIteration:
+                return
+            except TimeoutError:
+                stall_reason = self.detector.find_stall(deadline)
+                logging.warning("Closing a stalled LiteLLM stream: %s", stall_reason)
+                await self.stream.aclose()
+                raise TimeoutError(stall_reason) from None
+            self.detector.record_chunk(loop.time())
+            yield chunk
+
+
+async def handle_litellm_stream(
+    *,
+    stream: StreamWatchdog,
+    accumulator: StreamAccumulator,
+    splitter: ReplySplitter,
+    assistant_message: dict,
+    sink: AsyncReplySink,
+) -> bool:
+    """
+    Handles the streaming response from LiteLLM and sends it to the reply sink.
+
+    Streaming stops as soon as the message exceeds the length limit, so that the rest
+    of the response continues in a new message. Otherwise the stream is read until it ends or
+    the usage arrives after the finish reason.
+
+    Args:
+        stream (StreamWatchdog): The watched stream of the response.
+        accumulator (StreamAccumulator): The accumulator for the whole response.
+        splitter (ReplySplitter): The splitter holding the text of the current message.
+        assistant_message (dict): The assistant message to update.
+        sink (AsyncReplySink): The sink that receives the reply.
+
+    Returns:
+        bool: True if the message was split and the response continues, False otherwise.
+    """
+    is_split = False
+    flush_scheduler = FlushScheduler(
+        start_time=time.monotonic(),
+        buffer_size=SLACK_UPDATE_TEXT_BUFFER_SIZE,
+        min_interval=SLACK_UPDATE_MIN_INTERVAL_SECONDS,
+        max_interval=SLACK_UPDATE_MAX_INTERVAL_SECONDS,
+    )
+    try:
+        async for chunk in stream:
+            delta_content = accumulator.add_chunk(cast("ModelResponse", chunk))
+            if delta_content is not None:
+                sink.add_delta(delta_content)
+                splitter.add_text(delta_content)
+                if splitter.is_over_limit():
+                    is_split = True
+                    break
+                flush_scheduler.add_text(delta_content)
+                now = time.monotonic()
+                if flush_scheduler.should_flush(now) and sink.try_acquire_update():
+                    sink.submit(splitter.text)
+                    flush_scheduler.mark_flushed(now)
+            if accumulator.is_complete:
+                break
+    finally:
+        await sink.close_message()
+
+    assistant_message["content"] = splitter.split() if is_split else splitter.text
+    # Final update to remove the loading character after stream ends
+    await sink.finish(assistant_message["content"])
+
+    return is_split
@@ -4,18 +4,33 @@ This module contains the logic for responding to new Slack posts.
 
 import logging
 import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
 from litellm.exceptions import ContextWindowExceededError, Timeout
-from slack_bolt import BoltContext
+from slack_bolt import Ack, BoltContext, BoltRequest
 from slack_sdk.web import SlackResponse, WebClient
 
 from app.bolt_logic import (
+    build_queue_full_reply,
     determine_thread_ts_to_reply,
     extract_user_id_from_context,
     has_read_files_scope,
     is_post_from_bot,
     is_post_in_dm,
     is_post_mentioned,
+    is_slack_locale_enabled,
+)
+from app.context_logic import (
+    fit_messages_to_token_budget,
+    merge_consecutive_assistant_messages,
+)
+from app.engaged_thread_service import (
+    get_indexed_parent_post_mentioned,
+    may_respond_to_post,
+    record_engaged_thread_event,
+    store_parent_post_mentioned,
 )
 from app.env import (
     IMAGE_INPUT_ENABLED,
@@ -23,22 +38,29 @@ from app.env import (
     PDF_INPUT_ENABLED,
     PROMPT_CACHING_ENABLED,
     PROMPT_CACHING_TTL,
-    REDACT_CREDIT_CARD_PATTERN,
-    REDACT_EMAIL_PATTERN,
-    REDACT_PHONE_PATTERN,
-    REDACT_SSN_PATTERN,
-    REDACT_USER_DEFINED_PATTERN,
     REDACTION_ENABLED,
     SLACK_FORMATTING_ENABLED,
     SYSTEM_PROMPT_TEMPLATE,
 )
+from app.file_cache_service import get_file_cache_stats
+from app.history_logic import (
+    TokenBudget,
+    TokenCounter,
+    get_reply_text,
+    select_newest_replies_within_budget,
+    trim_replies_to_token_budget,
+)
 from app.home_tab_logic import (
     extract_cancel_server_index,
     extract_disable_server_index,
     extract_enable_server_index,
 )
 from app.home_tab_service import update_home_tab
-from app.litellm_service import reply_to_slack_with_litellm
+from app.litellm_service import (
+    count_text_tokens,
+    get_history_token_budget,
+    reply_to_slack_with_litellm,
+)
 from app.mcp.oauth_control_service import (
     cancel_user_oauth_polling,
     disable_user_oauth_session,
@@ -51,15 +73,40 @@ from app.message_logic import (
     build_system_message,
     build_user_message,
     filter_replies_after_last_marker,
-    maybe_redact_string,
     maybe_set_cache_points,
     maybe_slack_to_markdown,
     remove_bot_mention,
     unescape_slack_formatting,
 )
+from app.post_burst_service import (
+    discard_post_burst,
+    get_burst_loading_reply,
+    record_post_burst,
+    store_burst_loading_reply,
+    wait_for_post_burst,
+)
+from app.post_queue_logic import build_post_schedule
+from app.post_queue_service import (
+    is_duplicate_event,
+    post_executor,
+    priority_class_weights,
+)
+from app.redaction_service import REDACT_PATTERNS, get_redaction_stats, redact
+from app.reply_text_cache_logic import build_reply_text_cache_key
+from app.reply_text_cache_service import get_cached_reply_text, store_reply_text
+from app.slack_file_service import get_connection_stats
 from app.slack_image_service import build_image_url_items_from_slack_files
 from app.slack_pdf_service import build_pdf_file_items_from_slack_files
+from app.stage_timing_logic import StageTimer
+from app.thread_history_logic import convert_thread_reply_to_dict, has_thread_reply
+from app.thread_history_service import (
+    get_cached_thread_replies,
+    merge_thread_replies,
+    record_thread_message_event,
+    store_thread_replies,
+)
 from app.translation_service import translate
+from app.user_profile_service import get_user_profile
 
 LOADING_TEXT = ":hourglass_flowing_sand: Wait a second, please ..."
 TIMEOUT_ERROR_MESSAGE = (
@@ -73,31 +120,103 @@ CONTEXT_WINDOW_EXCEEDED_ERROR_MESSAGE = (
     "To continue, only your upcoming messages will be used and previous ones will be ignored."
 )
 
-REDACT_PATTERNS = [
-    (REDACT_EMAIL_PATTERN, "[EMAIL]"),
-    (REDACT_CREDIT_CARD_PATTERN, "[CREDIT CARD]"),
-    (REDACT_PHONE_PATTERN, "[PHONE]"),
-    (REDACT_SSN_PATTERN, "[SSN]"),
-    (REDACT_USER_DEFINED_PATTERN, "[REDACTED]"),
-]
+# Settings that change how reply texts are converted, part of the key of cached texts
+REPLY_TEXT_CONFIG_KEY = hash(
+    (tuple(REDACT_PATTERNS), REDACTION_ENABLED, SLACK_FORMATTING_ENABLED)
+)
 MAX_PDF_SLOTS = 5
+MAX_DM_REPLIES = 100
+MAX_THREAD_REPLIES = 1000
+# DM history is paged newest-first and stops once the token budget is filled
+DM_HISTORY_PAGE_SIZE = 50
+# Threads are read whole in as few calls as possible, at Slack's recommended page size
+THREAD_HISTORY_PAGE_SIZE = 200
+
+request_pipeline_executor = ThreadPoolExecutor(thread_name_prefix="request-pipeline")
+
+
+def enqueue_new_post(
+    ack: Ack,
+    body: dict,
+    request: BoltRequest,
+    context: BoltContext,
+    payload: dict,
+    client: WebClient,
+) -> None:
+    """
+    Acknowledges a new Slack post and queues it to be handled by a post worker.
+
+    Retried deliveries of the same event are skipped, and posts that are certainly ignored are
+    not queued, so they never take a slot or a worker. Posts in the same thread are handled in
+    order. A post is dropped if the queue stays full, and since Slack has already received
+    the acknowledgment and will not retry it, the user is asked in a reply to post it again.
+    Posts that may join a burst are recorded on arrival, so earlier posts of the burst know
+    they were superseded.
+
+    Args:
+        ack (Ack): The acknowledgment function provided by Slack Bolt.
+        body (dict): The request body of the event.
+        request (BoltRequest): The incoming request, whose headers carry Slack's retry number.
+        context (BoltContext): The Bolt context object.
+        payload (dict): The payload of the incoming Slack post.
+        client (WebClient): The Slack WebClient instance.
+
+    Returns:
+        None
+    """
+    ack()
+    if is_duplicate_event(body, request.headers):
+        return
+    if context.channel_id is not None:
+        # Every message keeps the thread caches current, even if it is not responded to
+        record_thread_message_event(context.channel_id, payload)
+        record_engaged_thread_event(context.channel_id, payload, context.bot_user_id)
+    if not may_respond_to_post(context.channel_id, payload, context.bot_user_id):
+        return
+    schedule = build_post_schedule(
+        channel_id=context.channel_id,
+        user_id=extract_user_id_from_context(context),
+        payload=payload,
+        bot_user_id=context.bot_user_id,
+        class_weights=priority_class_weights,
+    )
+    burst_key = record_post_burst(context.channel_id, payload, context.bot_user_id)
+    if not post_executor.submit(
+        schedule, respond_to_new_post, context, payload, client, burst_key=burst_key
+    ):
+        # Slack has received the ack and will not retry, so tell the user the post was dropped
+        if burst_key is not None:
+            discard_post_burst(burst_key, payload["ts"])
+        logging.warning(
+            f"Dropped a post because the post queue is full ({post_executor.stats()})"
+        )
+        if context.channel_id is not None:
+            client.chat_postMessage(
+                **build_queue_full_reply(context.channel_id, payload)
+            )
 
 
 def respond_to_new_post(
     context: BoltContext,
     payload: dict,
     client: WebClient,
+    burst_key: tuple | None = None,
 ) -> None:
     """
     Responds to a new Slack post.
 
-    This function filters irrelevant posts, posts a loading reply,
-    builds the conversation history, and sends a response using a language model.
+    This function filters irrelevant posts, posts a loading reply while building the
+    conversation history, and sends a response using a language model. The time of each stage
+    is logged at debug level.
+
+    A post in a burst shares the loading reply of the burst and waits for the burst to end.
+    Only the latest post of the burst is replied to, with a history that includes the others.
 
     Args:
         context (BoltContext): The Bolt context object.
         payload (dict): The payload of the incoming Slack post.
         client (WebClient): The Slack WebClient instance.
+        burst_key (Optional[tuple]): The key of the burst the post joined, if any.
 
     Returns:
         None
@@ -111,6 +230,7 @@ def respond_to_new_post(
     if is_post_from_bot(payload):
         return
 
+    timer = StageTimer()
     wip_reply = None
     reply_thread_ts = None
     try:
@@ -120,35 +240,73 @@ def respond_to_new_post(
             or has_parent_post_mentioned(context, payload, client)
         ):
             return
-        loading_text = translate(context.get("locale"), LOADING_TEXT)
-        reply_thread_ts, wip_reply = post_loading_reply(
-            client=client,
-            channel_id=context.channel_id,
-            payload=payload,
-            loading_text=loading_text,
-        )
-        messages = build_messages(
-            client=client,
-            context=context,
-            payload=payload,
-            channel_id=context.channel_id,
-            user_id=user_id,
-        )
-        reply_to_slack_with_litellm(
-            client=client,
-            channel=context.channel_id,
-            user_id=user_id,
-            thread_ts=reply_thread_ts,
-            messages=messages,
-            loading_text=loading_text,
-            wip_reply=wip_reply,
-            timeout_seconds=LLM_TIMEOUT_SECONDS,
+
+        channel_id = context.channel_id
+
+        def build_history(exclude_ts: str | None = None) -> list[dict]:
+            with timer.measure("history"):
+                return build_messages(
+                    client=client,
+                    context=context,
+                    payload=payload,
+                    channel_id=channel_id,
+                    user_id=user_id,
+                    exclude_ts=exclude_ts,
+                )
+
+        # The history does not depend on the loading reply, so fetch it meanwhile, unless later
+        # posts of a burst must be included in it
+        messages_future = (
+            request_pipeline_executor.submit(build_history)
+            if burst_key is None
+            else None
         )
+        try:
+            with timer.measure("locale"):
+                locale = resolve_locale(context, client)
+            with timer.measure("translate"):
+                loading_text = translate(locale, LOADING_TEXT)
+            with timer.measure("loading_reply"):
+                reply_thread_ts, wip_reply = post_loading_reply(
+                    client=client,
+                    channel_id=context.channel_id,
+                    payload=payload,
+                    loading_text=loading_text,
+                    burst_key=burst_key,
+                )
+            if messages_future is not None:
+                messages = messages_future.result()
+            else:
+                with timer.measure("burst"):
+                    is_latest = wait_for_post_burst(burst_key, payload["ts"])
+                if not is_latest:
+                    logging.debug(
+                        "Skipped a post superseded by a newer post in its burst"
+                    )
+                    return
+                messages = build_history(exclude_ts=wip_reply["ts"])
+        finally:
+            if messages_future is not None:
+                messages_future.cancel()
+        with timer.measure("reply"):
+            reply_to_slack_with_litellm(
+                client=client,
+                channel=context.channel_id,
+                user_id=user_id,
+                team_id=context.team_id,
+                thread_ts=reply_thread_ts,
+                messages=messages,
+                loading_text=loading_text,
+                wip_reply=wip_reply,
+                timeout_seconds=LLM_TIMEOUT_SECONDS,
+            )
+        logging.debug("Handled a post in stages: %s", timer.format_summary())
+        log_reply_stats()
     except Timeout, TimeoutError:
         handle_timeout_error(
             client=client,
             channel_id=context.channel_id,
-            locale=context.get("locale"),
+            locale=resolve_locale(context, client),
             thread_ts=reply_thread_ts,
         )
     except ContextWindowExceededError as e:
@@ -167,13 +325,39 @@ def respond_to_new_post(
         )
 
 
+def resolve_locale(context: BoltContext, client: WebClient) -> str | None:
+    """
+    Looks up the locale of the user who made the post, if replies use Slack locales.
+
+    Args:
+        context (BoltContext): The Bolt context object.
+        client (WebClient): The Slack WebClient instance.
+
+    Returns:
+        Optional[str]: The locale, such as "ja-JP", or None if unknown or disabled.
+    """
+    if not is_slack_locale_enabled(context):
+        return None
+    user_id = extract_user_id_from_context(context)
+    if user_id is None:
+        return None
+    try:
+        return get_user_profile(client, user_id).locale
+    except Exception as e:
+        logging.debug(f"Failed to get the locale of {user_id}: {e}")
+        return None
+
+
 def has_parent_post_mentioned(
     context: BoltContext,
     payload: dict,
     client: WebClient,
 ) -> bool:
     """
-    Checks whether the Slack post should be ignored based on certain conditions.
+    Checks whether the parent post of the thread mentions the bot.
+
+    Threads whose parent post was seen in an event or looked up before are answered from the
+    engaged-thread index without calling Slack.
 
     Args:
         context (BoltContext): The Bolt context object.
@@ -181,14 +365,23 @@ def has_parent_post_mentioned(
         client (WebClient): The Slack WebClient instance.
 
     Returns:
-        bool: True if the post should be ignored, False otherwise.
+        bool: True if the parent post mentions the bot, False otherwise.
     """
+    channel_id, thread_ts = context.channel_id, payload.get("thread_ts")
+    if channel_id is None or thread_ts is None:
+        return False
+    mentioned = get_indexed_parent_post_mentioned(channel_id, thread_ts)
+    if mentioned is not None:
+        return mentioned
     parent_post = find_parent_post(
         client=client,
-        channel_id=context.channel_id,
-        thread_ts=payload.get("thread_ts"),
+        channel_id=channel_id,
+        thread_ts=thread_ts,
     )
-    return is_post_mentioned(context.bot_user_id, parent_post)
+    mentioned = is_post_mentioned(context.bot_user_id, parent_post)
+    if parent_post is not None and parent_post.get("ts") == thread_ts:
+        store_parent_post_mentioned(channel_id, thread_ts, mentioned)
+    return mentioned
 
 
 def find_parent_post(
@@ -222,6 +415,7 @@ def post_loading_reply(
     channel_id: str,
     payload: dict,
     loading_text: str,
+    burst_key: tuple | None = None,
 ) -> tuple[str | None, SlackResponse]:
     """
     Posts a loading reply to a Slack post in a channel or thread.
@@ -231,16 +425,25 @@ def post_loading_reply(
         channel_id (str): The ID of the channel to reply to.
         payload (dict): The payload of the incoming Slack post.
         loading_text (str): The loading text to display.
+        burst_key (Optional[tuple]): The key of the burst the post joined, whose loading reply
+            is reused if already posted.
 
     Returns:
         tuple[Optional[str], SlackResponse]: Thread timestamp and Slack API response.
     """
     thread_ts = determine_thread_ts_to_reply(payload)
+    if (
+        burst_key is not None
+        and (wip_reply := get_burst_loading_reply(burst_key)) is not None
+    ):
+        return thread_ts, wip_reply
     wip_reply = client.chat_postMessage(
         channel=channel_id,
         thread_ts=thread_ts,
         text=loading_text,
     )
+    if burst_key is not None:
+        store_burst_loading_reply(burst_key, wip_reply)
     return thread_ts, wip_reply
 
 
@@ -251,6 +454,7 @@ def build_messages(
     payload: dict,
     channel_id: str,
     user_id: str,
+    exclude_ts: str | None = None,
 ) -> list[dict]:
     """
     Builds the conversation history for the Slack post.
@@ -261,6 +465,8 @@ def build_messages(
         payload (dict): The payload of the incoming Slack post.
         channel_id (str): The ID of the channel where the post was made.
         user_id (str): The ID of the user who made the post.
+        exclude_ts (Optional[str]): The timestamp of a reply to leave out, such as the loading
+            reply of a burst posted before its later posts.
 
     Returns:
         list[dict]: A list of messages representing the conversation history.
@@ -272,18 +478,35 @@ def build_messages(
         prompt_caching_enabled=PROMPT_CACHING_ENABLED,
         prompt_caching_ttl=PROMPT_CACHING_TTL,
     )
+    # Texts counted while selecting the history are not tokenized again when fitting
+    count_tokens = TokenCounter(count_text_tokens)
     replies = get_replies(
         client=client,
         payload=payload,
         channel_id=channel_id,
         user_id=user_id,
+        bot_user_id=context.bot_user_id,
+        count_tokens=count_tokens,
     )
+    if exclude_ts is not None:
+        replies = [reply for reply in replies if reply.get("ts") != exclude_ts]
     filtered_replies = filter_replies_after_last_marker(
         replies=replies,
         bot_user_id=context.bot_user_id,
         marker_text=CONTEXT_WINDOW_EXCEEDED_ERROR_MESSAGE,
     )
-    messages = [system_message] + convert_replies_to_messages(filtered_replies, context)
+    history = convert_replies_to_messages(filtered_replies, context)
+    history = merge_consecutive_assistant_messages(
+        history,
+        speaker_prefix=build_slack_user_prefixed_text(
+            {"user": context.bot_user_id}, ""
+        ),
+    )
+    messages = fit_messages_to_token_budget(
+        messages=[system_message] + history,
+        count_text_tokens=count_tokens,
+        max_tokens=get_history_token_budget(),
+    )
     maybe_set_cache_points(
         messages=messages,
         prompt_caching_enabled=PROMPT_CACHING_ENABLED,
@@ -298,6 +521,8 @@ def get_replies(
     payload: dict,
     channel_id: str,
     user_id: str,
+    bot_user_id: str | None = None,
+    count_tokens: Callable[[str], int] = count_text_tokens,
 ) -> list[dict]:
     """
     Retrieves replies to be used as conversation history based on the context of the incoming Slack
@@ -308,17 +533,32 @@ def get_replies(
         payload (dict): The payload of the incoming Slack post.
         channel_id (str): The ID of the channel where the post was made.
         user_id (str): The ID of the user who made the post.
+        bot_user_id (Optional[str]): The bot's user ID.
+        count_tokens (Callable[[str], int]): The function counting the tokens of a text.
 
     Returns:
         list[dict]: A list of replies based on the post context.
     """
+    # The converted texts are counted, since those are what the model receives
+    convert_text = partial(
+        convert_reply_text, bot_user_id=bot_user_id, channel_id=channel_id
+    )
     thread_ts = payload.get("thread_ts")
     # In a DM with the bot (not part of a thread)
     if payload.get("channel_type") == "im" and thread_ts is None:
-        return get_dm_replies(client, channel_id)
+        return get_dm_replies(
+            client, channel_id, count_tokens=count_tokens, convert_text=convert_text
+        )
     # In a thread
     if thread_ts is not None:
-        return get_thread_replies(client, channel_id, thread_ts)
+        return trim_replies_to_token_budget(
+            replies=get_thread_replies(
+                client, channel_id, thread_ts, payload.get("ts")
+            ),
+            count_tokens=count_tokens,
+            max_tokens=get_history_token_budget(),
+            convert_text=convert_text,
+        )
     # In a channel (not in a thread), with a mention to the bot
     return [
         {
@@ -331,51 +571,122 @@ def get_replies(
 
 
 def get_thread_replies(
-    client: WebClient, channel_id: str, thread_ts: str
+    client: WebClient,
+    channel_id: str,
+    thread_ts: str,
+    current_ts: str | None = None,
 ) -> list[dict]:
     """
-    Retrieves all replies to a Slack thread.
+    Retrieves all replies to a Slack thread, reusing the cached thread history.
+
+    The cache is kept up to date by message events. If the current post is missing from it,
+    only the replies after the newest cached one are fetched.
 
     Args:
         client (WebClient): The Slack WebClient instance.
         channel_id (str): The ID of the channel containing the thread.
         thread_ts (str): The timestamp of the parent post.
+        current_ts (Optional[str]): The timestamp of the post being replied to.
 
     Returns:
         list[dict]: A list of replies in the thread.
     """
-    return client.conversations_replies(
-        channel=channel_id,
-        ts=thread_ts,
-        limit=1000,
-    ).get("messages", [])
+    cached_replies = get_cached_thread_replies(channel_id, thread_ts)
+    if cached_replies is None:
+        messages = fetch_thread_messages(client, channel_id, thread_ts)
+        store_thread_replies(channel_id, thread_ts, messages)
+        return messages
+    if current_ts is not None and not has_thread_reply(cached_replies, current_ts):
+        messages = fetch_thread_messages(
+            client, channel_id, thread_ts, oldest=cached_replies[-1].ts
+        )
+        merged_replies = merge_thread_replies(channel_id, thread_ts, messages)
+        if merged_replies is None:
+            return get_thread_replies(client, channel_id, thread_ts)
+        cached_replies = merged_replies
+    return [convert_thread_reply_to_dict(reply) for reply in cached_replies]
 
 
-def get_dm_replies(client: WebClient, channel_id: str) -> list[dict]:
+def fetch_thread_messages(
+    client: WebClient,
+    channel_id: str,
+    thread_ts: str,
+    oldest: str | None = None,
+) -> list[dict]:
+    """
+    Fetches the messages of a Slack thread, page by page up to the reply limit.
+
+    Args:
+        client (WebClient): The Slack WebClient instance.
+        channel_id (str): The ID of the channel containing the thread.
+        thread_ts (str): The timestamp of the parent post.
+        oldest (Optional[str]): Only fetch messages after this timestamp, if given.
+
+    Returns:
+        list[dict]: The messages of the thread, oldest first.
+    """
+    messages: list[dict] = []
+    cursor = None
+    while len(messages) < MAX_THREAD_REPLIES:
+        response = client.conversations_replies(
+            channel=channel_id,
+            ts=thread_ts,
+            oldest=oldest,
+            limit=THREAD_HISTORY_PAGE_SIZE,
+            cursor=cursor,
+        )
+        messages += response.get("messages", [])
+        cursor = (response.get("response_metadata") or {}).get("next_cursor")
+        if not cursor:
+            break
+    return messages
+
+
+def get_dm_replies(
+    client: WebClient,
+    channel_id: str,
+    *,
+    count_tokens: Callable[[str], int] = count_text_tokens,
+    convert_text: Callable[[dict], str] = get_reply_text,
+) -> list[dict]:
     """
     Retrieves recent replies in a direct message (DM) conversation.
-    Returns up to 100 messages from the last 24 hours.
+    Pages newest-first through up to 100 messages from the last 24 hours and stops once
+    the history token budget is filled.
 
     Args:
         client (WebClient): The Slack WebClient instance.
         channel_id (str): The ID of the DM channel.
+        count_tokens (Callable[[str], int]): The function counting the tokens of a text.
+        convert_text (Callable[[dict], str]): The function building the text of a reply that
+            is sent to the model.
 
     Returns:
         list[dict]: A list of replies in the DM conversation.
     """
     cutoff_time = time.time() - 86400  # 24 hours ago
-    replies: list[dict] = client.conversations_history(
-        channel=channel_id,
-        limit=100,
-        inclusive=True,
-    ).get("messages", [])
-
-    # Filter messages to only include those from the last 24 hours
-    recent_replies = [
-        message for message in replies if float(message.get("ts", "0")) >= cutoff_time
-    ]
+    budget = TokenBudget(max_tokens=get_history_token_budget())
+    replies: list[dict] = []
+    cursor = None
+    while len(replies) < MAX_DM_REPLIES:
+        response = client.conversations_history(
+            channel=channel_id,
+            oldest=str(cutoff_time),
+            limit=min(DM_HISTORY_PAGE_SIZE, MAX_DM_REPLIES - len(replies)),
+            inclusive=True,
+            cursor=cursor,
+        )
+        replies += select_newest_replies_within_budget(
+            replies_newest_first=response.get("messages", []),
+            count_tokens=count_tokens,
+            budget=budget,
+            convert_text=convert_text,
+        )
+        cursor = (response.get("response_metadata") or {}).get("next_cursor")
+        if budget.is_filled or not cursor:
+            break
 
-    return list(reversed(recent_replies))
+    return list(reversed(replies))
 
 
 def convert_replies_to_messages(
@@ -402,15 +713,7 @@ def convert_replies_to_messages(
 
     # Process replies in reverse order to prioritize recent PDFs and avoid unnecessary downloads
     for reply in reversed(replies):
-        text = remove_bot_mention(reply.get("text", ""), context.bot_user_id)
-        text = maybe_redact_string(
-            input_string=text,
-            patterns=REDACT_PATTERNS,
-            redaction_enabled=REDACTION_ENABLED,
-        )
-        text = unescape_slack_formatting(text)
-        text = maybe_slack_to_markdown(text, SLACK_FORMATTING_ENABLED)
-        text = build_slack_user_prefixed_text(reply, text)
+        text = convert_reply_text(reply, context.bot_user_id, context.channel_id)
 
         if reply["user"] == context.bot_user_id:
             messages.append(build_assistant_message(text))
@@ -458,6 +761,62 @@ def convert_replies_to_messages(
     return messages
 
 
+def convert_reply_text(
+    reply: dict, bot_user_id: str | None, channel_id: str | None = None
+) -> str:
+    """
+    Converts the text of a Slack reply into the message text for the language model.
+
+    Converted texts are cached by channel, timestamp and edit time, so replies seen on an
+    earlier turn are not converted again.
+
+    Args:
+        reply (dict): The Slack reply.
+        bot_user_id (Optional[str]): The bot's user ID.
+        channel_id (Optional[str]): The ID of the channel containing the reply.
+
+    Returns:
+        str: The converted text, prefixed with the author's user ID.
+    """
+    key = build_reply_text_cache_key(
+        channel_id=channel_id,
+        reply=reply,
+        bot_user_id=bot_user_id,
+        config_key=REPLY_TEXT_CONFIG_KEY,
+    )
+    if key is not None and (cached_text := get_cached_reply_text(key)) is not None:
+        return cached_text
+    text = remove_bot_mention(reply.get("text", ""), bot_user_id)
+    redaction = redact(text)
+    text = unescape_slack_formatting(redaction.text)
+    text = maybe_slack_to_markdown(text, SLACK_FORMATTING_ENABLED)
+    text = build_slack_user_prefixed_text(reply, text)
+    # A timed-out redaction replaces the whole text, so convert it again on the next turn
+    if key is not None and not redaction.timed_out:
+        store_reply_text(key, text)
+    return text
+
+
+def log_reply_stats() -> None:
+    """
+    Log the totals of the Slack file cache, redaction and file download connections after a
+    reply, at debug level.
+
+    Returns:
+        None
+    """
+    if not logging.getLogger().isEnabledFor(logging.DEBUG):
+        return
+    file_cache_stats = get_file_cache_stats()
+    logging.debug(
+        f"Slack file cache hit rate: {file_cache_stats.hit_rate:.1%} ({file_cache_stats})"
+    )
+    if REDACTION_ENABLED:
+        logging.debug(f"Redaction totals: {get_redaction_stats()}")
+    if connection_stats := get_connection_stats():
+        logging.debug(f"Slack file download connections by host: {connection_stats}")
+
+
 def handle_timeout_error(
     *,
     client: WebClient,
@@ -2,24 +2,193 @@
 This module contains logic for handling Slack events and interactions.
 """
 
+import json
+from collections.abc import Callable
+from urllib.parse import parse_qs
+
 from slack_bolt import BoltContext
 from slack_bolt.authorization.authorize_result import AuthorizeResult
+from slack_bolt.context.async_context import AsyncBoltContext
 from slack_bolt.request.payload_utils import is_event
+from slack_sdk.http_retry.builtin_async_handlers import (
+    AsyncRateLimitErrorRetryHandler,
+)
 from slack_sdk.http_retry.builtin_handlers import RateLimitErrorRetryHandler
+from slack_sdk.http_retry.request import HttpRequest
+from slack_sdk.http_retry.response import HttpResponse
+from slack_sdk.http_retry.state import RetryState
+
+# Context key set by the middleware when replies use the locale of the user's Slack profile
+SLACK_LOCALE_ENABLED_KEY = "slack_locale_enabled"
+QUEUE_FULL_ERROR_MESSAGE = (
+    ":warning: Sorry, too many posts are waiting for a reply right now, so this one was not "
+    "answered. Please post it again in a minute. :bow:"
+)
+
+
+class NotifyingRateLimitErrorRetryHandler(RateLimitErrorRetryHandler):
+    """RateLimitErrorRetryHandler that reports each rate limited channel before retrying."""
+
+    def __init__(
+        self,
+        max_retry_count: int,
+        on_rate_limited: Callable[[str | None, float], None],
+    ):
+        """Initialize the handler with a callback receiving the channel and retry-after."""
+        super().__init__(max_retry_count=max_retry_count)
+        self.on_rate_limited = on_rate_limited
+
+    def prepare_for_next_attempt(
+        self,
+        *,
+        state: RetryState,
+        request: HttpRequest,
+        response: HttpResponse | None = None,
+        error: Exception | None = None,
+    ) -> None:
+        """Report the rate limit, then wait as RateLimitErrorRetryHandler does."""
+        if response is not None:
+            self.on_rate_limited(
+                extract_channel_from_request(request),
+                extract_retry_after(response.headers),
+            )
+        super().prepare_for_next_attempt(
+            state=state, request=request, response=response, error=error
+        )
+
+
+class NotifyingAsyncRateLimitErrorRetryHandler(AsyncRateLimitErrorRetryHandler):
+    """AsyncRateLimitErrorRetryHandler that reports each rate limited channel before retrying."""
+
+    def __init__(
+        self,
+        max_retry_count: int,
+        on_rate_limited: Callable[[str | None, float], None],
+    ):
+        """Initialize the handler with a callback receiving the channel and retry-after."""
+        super().__init__(max_retry_count=max_retry_count)
+        self.on_rate_limited = on_rate_limited
+
+    async def prepare_for_next_attempt_async(
+        self,
+        *,
+        state: RetryState,
+        request: HttpRequest,
+        response: HttpResponse | None = None,
+        error: Exception | None = None,
+    ) -> None:
+        """Report the rate limit, then wait as AsyncRateLimitErrorRetryHandler does."""
+        if response is not None:
+            self.on_rate_limited(
+                extract_channel_from_request(request),
+                extract_retry_after(response.headers),
+            )
+        await super().prepare_for_next_attempt_async(
+            state=state, request=request, response=response, error=error
+        )
+
+
+def append_rate_limit_retry_handler(
+    retry_handlers: list,
+    max_retry_count: int,
+    on_rate_limited: Callable[[str | None, float], None] | None = None,
+) -> None:
+    """
+    Append a RateLimitErrorRetryHandler to the list of retry handlers.
 
+    Args:
+        retry_handlers (list): The list of existing retry handlers.
+        max_retry_count (int): The maximum number of retries for rate limit errors.
+        on_rate_limited (Optional[Callable[[Optional[str], float], None]]): Called with the
+            channel ID and retry-after seconds whenever a request is rate limited.
 
-def append_rate_limit_retry_handler(retry_handlers: list, max_retry_count: int) -> None:
+    Returns:
+        None
     """
-    Append a RateLimitErrorRetryHandler to the list of retry handlers.
+    if on_rate_limited is None:
+        retry_handlers.append(
+            RateLimitErrorRetryHandler(max_retry_count=max_retry_count)
+        )
+        return
+    retry_handlers.append(
+        NotifyingRateLimitErrorRetryHandler(
+            max_retry_count=max_retry_count,
+            on_rate_limited=on_rate_limited,
+        )
+    )
+
+
+def append_async_rate_limit_retry_handler(
+    retry_handlers: list,
+    max_retry_count: int,
+    on_rate_limited: Callable[[str | None, float], None] | None = None,
+) -> None:
+    """
+    Append an AsyncRateLimitErrorRetryHandler to the list of AsyncWebClient retry handlers.
 
     Args:
         retry_handlers (list): The list of existing retry handlers.
         max_retry_count (int): The maximum number of retries for rate limit errors.
+        on_rate_limited (Optional[Callable[[Optional[str], float], None]]): Called with the
+            channel ID and retry-after seconds whenever a request is rate limited.
 
     Returns:
         None
     """
-    retry_handlers.append(RateLimitErrorRetryHandler(max_retry_count=max_retry_count))
+    if on_rate_limited is None:
+        retry_handlers.append(
+            AsyncRateLimitErrorRetryHandler(max_retry_count=max_retry_count)
+        )
+        return
+    retry_handlers.append(
+        NotifyingAsyncRateLimitErrorRetryHandler(
+            max_retry_count=max_retry_count,
+            on_rate_limited=on_rate_limited,
+        )
+    )
+
+
+def extract_channel_from_request(request: HttpRequest) -> str | None:
+    """
+    Extract the channel ID from a Slack API request.
+
+    Args:
+        request (HttpRequest): The Slack API request.
+
+    Returns:
+        Optional[str]: The channel ID if present, None otherwise.
+    """
+    if request.body_params and isinstance(request.body_params.get("channel"), str):
+        return request.body_params["channel"]
+    if not request.data:
+        return None
+    data = request.data.decode("utf-8", errors="ignore")
+    try:
+        params = json.loads(data)
+    except ValueError:
+        params = {k: v[0] for k, v in parse_qs(data).items()}
+    channel = params.get("channel") if isinstance(params, dict) else None
+    return channel if isinstance(channel, str) else None
+
+
+def extract_retry_after(headers: dict) -> float:
+    """
+    Extract the retry-after seconds from response headers.
+
+    Args:
+        headers (dict): The response headers.
+
+    Returns:
+        float: The retry-after seconds, or 1.0 if unavailable.
+    """
+    for key, value in headers.items():
+        if key.lower() != "retry-after" or not value:
+            continue
+        try:
+            return float(value[0] if isinstance(value, list) else value)
+        except ValueError:
+            break
+    return 1.0
 
 
 def should_skip_event(body: dict, payload: dict) -> bool:
@@ -40,12 +209,12 @@ def should_skip_event(body: dict, payload: dict) -> bool:
     )
 
 
-def extract_user_id_from_context(context: BoltContext) -> str | None:
+def extract_user_id_from_context(context: BoltContext | AsyncBoltContext) -> str | None:
     """
     Extract the user ID from a Bolt context object.
 
     Args:
-        context (BoltContext): The Bolt context object.
+        context (Union[BoltContext, AsyncBoltContext]): The Bolt context object.
 
     Returns:
         Optional[str]: The user ID if available, None otherwise.
@@ -92,6 +261,19 @@ def is_post_mentioned(bot_user_id: str | None, post: dict | None) -> bool:
     return post is not None and f"<@{bot_user_id}>" in post.get("text", "")
 
 
+def is_slack_locale_enabled(context: BoltContext | AsyncBoltContext) -> bool:
+    """
+    Check if replies use the locale of the user's Slack profile.
+
+    Args:
+        context (Union[BoltContext, AsyncBoltContext]): The Bolt context object.
+
+    Returns:
+        bool: True if the locale should be looked up, False otherwise.
+    """
+    return context.get(SLACK_LOCALE_ENABLED_KEY) is True
+
+
 def determine_thread_ts_to_reply(payload: dict) -> str | None:
     """
     Determine the thread timestamp (thread_ts) to reply to.
@@ -108,6 +290,27 @@ def determine_thread_ts_to_reply(payload: dict) -> str | None:
     return thread_ts
 
 
+def build_queue_full_reply(channel_id: str, payload: dict) -> dict:
+    """
+    Build the reply telling the user that their post was dropped because the queue is full.
+
+    Slack has already received the acknowledgment of the post and will not retry it, so the
+    user is asked to post again.
+
+    Args:
+        channel_id (str): The ID of the channel where the post was made.
+        payload (dict): The Slack post payload.
+
+    Returns:
+        dict: The keyword arguments for `chat_postMessage`.
+    """
+    return {
+        "channel": channel_id,
+        "thread_ts": determine_thread_ts_to_reply(payload),
+        "text": QUEUE_FULL_ERROR_MESSAGE,
+    }
+
+
 def has_read_files_scope(authorize_result: AuthorizeResult | None) -> bool:
     """
     Check if the bot has the "files:read" scope.
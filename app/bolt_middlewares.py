@@ -3,12 +3,29 @@ This module contains middleware functions for the Slack Bolt app.
 """
 
 import logging
-from collections.abc import Callable
+from collections.abc import Awaitable, Callable
 
 from slack_bolt import BoltContext, BoltResponse
-from slack_sdk.web import WebClient
+from slack_bolt.context.async_context import AsyncBoltContext
 
-from app.bolt_logic import extract_user_id_from_context, should_skip_event
+from app.bolt_logic import SLACK_LOCALE_ENABLED_KEY, should_skip_event
+from app.engaged_thread_service import record_engaged_thread_event
+from app.thread_history_service import record_thread_message_event
+
+
+def record_skipped_message_event(payload: dict) -> None:
+    """
+    Apply an edit or deletion to the in-memory thread caches before the event is skipped.
+
+    Args:
+        payload (dict): The payload of the message event.
+
+    Returns:
+        None
+    """
+    if channel_id := payload.get("channel"):
+        record_thread_message_event(channel_id, payload)
+        record_engaged_thread_event(channel_id, payload, None)
 
 
 def before_authorize(
@@ -31,6 +48,7 @@ def before_authorize(
         Optional[BoltResponse]: A BoltResponse object if the event is skipped, None otherwise.
     """
     if should_skip_event(body, payload):
+        record_skipped_message_event(payload)
         logging.debug(
             "Skipped the following middleware and listeners "
             f"for this message event (subtype: {payload.get('subtype')})"
@@ -40,26 +58,63 @@ def before_authorize(
     return None
 
 
-def set_locale(
-    context: BoltContext,
-    client: WebClient,
-    next_: Callable[[], None],
-) -> None:
+def enable_slack_locale(context: BoltContext, next_: Callable[[], None]) -> None:
     """
-    Set the locale for the user based on their Slack profile.
+    Mark that replies use the locale of the user's Slack profile.
+
+    The locale is looked up only when a reply or translation needs it, so events the app
+    ignores cost no users.info call.
 
     Args:
         context (BoltContext): The Bolt context object.
-        client (WebClient): The Slack WebClient instance.
         next_ (Callable[[], None]): The next middleware function to call.
 
     Returns:
         None
     """
-    if user_id := extract_user_id_from_context(context):
-        user_info = client.users_info(user=user_id, include_locale=True)
-        user: dict = user_info.get("user", {})
-        context["locale"] = user.get("locale")
-    else:
-        context["locale"] = None
+    context[SLACK_LOCALE_ENABLED_KEY] = True
     next_()
+
+
+async def async_before_authorize(
+    body: dict,
+    payload: dict,
+    next_: Callable[[], Awaitable[None]],
+) -> BoltResponse | None:
+    """
+    Skip message changed/deleted events to reduce unnecessary workload in the AsyncApp.
+
+    Args:
+        body (dict): The request body.
+        payload (dict): The request payload.
+        next_ (Callable[[], Awaitable[None]]): The next middleware function to call.
+
+    Returns:
+        Optional[BoltResponse]: A BoltResponse object if the event is skipped, None otherwise.
+    """
+    if should_skip_event(body, payload):
+        record_skipped_message_event(payload)
+        logging.debug(
+            "Skipped the following middleware and listeners "
+            f"for this message event (subtype: {payload.get('subtype')})"
+        )
+        return BoltResponse(status=200, body="")
+    await next_()
+    return None
+
+
+async def async_enable_slack_locale(
+    context: AsyncBoltContext, next_: Callable[[], Awaitable[None]]
+) -> None:
+    """
+    Mark that replies use the locale of the user's Slack profile in the AsyncApp.
+
+    Args:
+        context (AsyncBoltContext): The Bolt context object.
+        next_ (Callable[[], Awaitable[None]]): The next middleware function to call.
+
+    Returns:
+        None
+    """
+    context[SLACK_LOCALE_ENABLED_KEY] = True
+    await next_()
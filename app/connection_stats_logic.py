@@ -0,0 +1,98 @@
+"""
+This module contains logic for counting how often pooled HTTP connections are reused, from the
+events of the `trace` request extension of httpx.
+"""
+
+from dataclasses import dataclass
+from typing import Any
+
+NEW_CONNECTION_EVENT = "connection.connect_tcp.started"
+TLS_HANDSHAKE_EVENT = "connection.start_tls.started"
+REQUEST_EVENTS = {
+    "http11.send_request_headers.started": "HTTP/1.1",
+    "http2.send_request_headers.started": "HTTP/2",
+}
+
+
+@dataclass
+class HostConnectionStats:
+    """Counts of the requests to one host and the connections opened for them."""
+
+    requests: int = 0
+    http2_requests: int = 0
+    connections: int = 0
+    tls_handshakes: int = 0
+
+    @property
+    def reused_requests(self) -> int:
+        """The number of requests sent on an already open connection."""
+        return max(self.requests - self.connections, 0)
+
+
+def find_trace_event_host(event_name: str, info: dict[str, Any]) -> str | None:
+    """
+    Find the host of a trace event that is counted.
+
+    Args:
+        event_name (str): The name of the event, such as "connection.connect_tcp.started".
+        info (dict[str, Any]): The information passed with the event.
+
+    Returns:
+        Optional[str]: The host, or None if the event is not counted.
+    """
+    if event_name == NEW_CONNECTION_EVENT:
+        return info.get("host")
+    if event_name == TLS_HANDSHAKE_EVENT:
+        return info.get("server_hostname")
+    if event_name in REQUEST_EVENTS and (request := info.get("request")) is not None:
+        host = request.url.host
+        return host.decode("ascii") if isinstance(host, bytes) else host
+    return None
+
+
+class ConnectionReuseStats:
+    """Counts requests and new connections per host, to show how well connections are reused."""
+
+    def __init__(self):
+        """Initialize empty statistics."""
+        self.hosts: dict[str, HostConnectionStats] = {}
+
+    def record(self, event_name: str, info: dict[str, Any]) -> None:
+        """
+        Count a trace event.
+
+        Args:
+            event_name (str): The name of the event.
+            info (dict[str, Any]): The information passed with the event.
+
+        Returns:
+            None
+        """
+        host = find_trace_event_host(event_name, info)
+        if host is None:
+            return
+        stats = self.hosts.setdefault(host, HostConnectionStats())
+        if event_name == NEW_CONNECTION_EVENT:
+            stats.connections += 1
+        elif event_name == TLS_HANDSHAKE_EVENT:
+            stats.tls_handshakes += 1
+        else:
+            stats.requests += 1
+            stats.http2_requests += REQUEST_EVENTS[event_name] == "HTTP/2"
+
+    def snapshot(self) -> dict[str, HostConnectionStats]:
+        """Return a copy of the counts of each host."""
+        return {
+            host: HostConnectionStats(**vars(stats))
+            for host, stats in self.hosts.items()
+        }
+
+    def total(self) -> HostConnectionStats:
+        """Return the counts summed over all hosts."""
+        total = HostConnectionStats()
+        for stats in self.hosts.values():
+            total.requests += stats.requests
+            total.http2_requests += stats.http2_requests
+            total.connections += stats.connections
+            total.tls_handshakes += stats.tls_handshakes
+        return total
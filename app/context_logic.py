@@ -0,0 +1,162 @@
+"""
+This module contains logic for fitting the messages sent to the language model into its context
+window before the request is made.
+"""
+
+from collections.abc import Callable
+
+from app.history_logic import MESSAGE_OVERHEAD_TOKENS
+
+# Estimated tokens of an attached image, which the tokenizer cannot count from its data URL
+IMAGE_ITEM_TOKENS = 1600
+# Estimated tokens of an attached PDF file
+FILE_ITEM_TOKENS = 3000
+ATTACHMENTS_OMITTED_TEXT = "(Attachments omitted to fit the context window)"
+
+
+def count_content_item_tokens(
+    item: dict, count_text_tokens: Callable[[str], int]
+) -> int:
+    """
+    Count or estimate the tokens of an item of a user message.
+
+    Args:
+        item (dict): The content item, such as a text, image URL or file item.
+        count_text_tokens (Callable[[str], int]): The function counting the tokens of a text.
+
+    Returns:
+        int: The number of tokens.
+    """
+    item_type = item.get("type")
+    if item_type == "text":
+        return count_text_tokens(item.get("text", ""))
+    if item_type == "image_url":
+        return IMAGE_ITEM_TOKENS
+    return FILE_ITEM_TOKENS
+
+
+def count_message_tokens(message: dict, count_text_tokens: Callable[[str], int]) -> int:
+    """
+    Count the tokens of a message, including the overhead of its role.
+
+    Args:
+        message (dict): The system, user or assistant message.
+        count_text_tokens (Callable[[str], int]): The function counting the tokens of a text.
+
+    Returns:
+        int: The number of tokens.
+    """
+    content = message.get("content") or ""
+    if isinstance(content, str):
+        return MESSAGE_OVERHEAD_TOKENS + count_text_tokens(content)
+    return MESSAGE_OVERHEAD_TOKENS + sum(
+        count_content_item_tokens(item, count_text_tokens) for item in content
+    )
+
+
+def has_attachments(message: dict) -> bool:
+    """
+    Check if a message has items other than text.
+
+    Args:
+        message (dict): The message to check.
+
+    Returns:
+        bool: True if the message has image or file items, False otherwise.
+    """
+    content = message.get("content")
+    return isinstance(content, list) and any(
+        item.get("type") != "text" for item in content
+    )
+
+
+def remove_attachments(message: dict) -> dict:
+    """
+    Build a copy of a message without its image and file items.
+
+    Args:
+        message (dict): The user message with attachments.
+
+    Returns:
+        dict: The message keeping its text items and a note that attachments were omitted.
+    """
+    content = [item for item in message["content"] if item.get("type") == "text"]
+    content.append({"type": "text", "text": ATTACHMENTS_OMITTED_TEXT})
+    return {**message, "content": content}
+
+
+def merge_consecutive_assistant_messages(
+    messages: list[dict], *, speaker_prefix: str
+) -> list[dict]:
+    """
+    Merge consecutive assistant messages, such as a reply split across several Slack messages.
+
+    Args:
+        messages (list[dict]): The messages in chronological order.
+        speaker_prefix (str): The prefix of the bot's texts, which is kept only once.
+
+    Returns:
+        list[dict]: The messages with each run of assistant messages joined into one.
+    """
+    merged: list[dict] = []
+    for message in messages:
+        previous = merged[-1] if merged else None
+        if (
+            previous is not None
+            and previous["role"] == "assistant"
+            and message["role"] == "assistant"
+            and isinstance(previous["content"], str)
+            and isinstance(message["content"], str)
+        ):
+            text = message["content"].removeprefix(speaker_prefix)
+            merged[-1] = {**previous, "content": f"{previous['content']}\n{text}"}
+        else:
+            merged.append(message)
+    return merged
+
+
+def fit_messages_to_token_budget(
+    *,
+    messages: list[dict],
+    count_text_tokens: Callable[[str], int],
+    max_tokens: int,
+) -> list[dict]:
+    """
+    Drop attachments and then the oldest turns until the messages fit in the token budget.
+
+    The system message and the last message are always kept, and a trimmed history starts with
+    a user message.
+
+    Args:
+        messages (list[dict]): The messages in chronological order, starting with the system
+            message.
+        count_text_tokens (Callable[[str], int]): The function counting the tokens of a text.
+        max_tokens (int): The token budget, or 0 for no limit.
+
+    Returns:
+        list[dict]: The messages that fit in the budget, in chronological order.
+    """
+    if max_tokens <= 0 or len(messages) <= 2:
+        return messages
+    system_message, history = messages[0], list(messages[1:])
+    counts = [count_message_tokens(m, count_text_tokens) for m in history]
+    total = count_message_tokens(system_message, count_text_tokens) + sum(counts)
+
+    # Attachments are the largest items, so the oldest ones go first
+    for index in range(len(history) - 1):
+        if total <= max_tokens:
+            return [system_message] + history
+        if has_attachments(history[index]):
+            history[index] = remove_attachments(history[index])
+            new_count = count_message_tokens(history[index], count_text_tokens)
+            total += new_count - counts[index]
+            counts[index] = new_count
+
+    start = 0
+    while total > max_tokens and start < len(history) - 1:
+        total -= counts[start]
+        start += 1
+    # Replies of the bot are meaningless without the post they answer
+    while 0 < start < len(history) - 1 and history[start]["role"] != "user":
+        start += 1
+    return [system_message] + history[start:]
@@ -0,0 +1,125 @@
+"""
+This module contains logic for remembering which threads the bot takes part in, so replies in
+other threads are ignored without looking up their parent posts.
+"""
+
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+
+from app.bolt_logic import is_post_mentioned
+
+
+def find_edited_post_ts(payload: dict) -> str | None:
+    """
+    Find the timestamp of the post changed or deleted by a message event.
+
+    Args:
+        payload (dict): The payload of the message event.
+
+    Returns:
+        Optional[str]: The timestamp of the edited or deleted post, or None for other events.
+    """
+    subtype = payload.get("subtype")
+    if subtype == "message_changed":
+        return (payload.get("message") or {}).get("ts")
+    if subtype == "message_deleted":
+        return payload.get("deleted_ts")
+    return None
+
+
+def is_top_level_post(payload: dict) -> bool:
+    """
+    Check if a message event posts a new message that is not a reply in a thread.
+
+    Args:
+        payload (dict): The payload of the message event.
+
+    Returns:
+        bool: True if the post may become the parent post of a thread, False otherwise.
+    """
+    return (
+        "ts" in payload
+        and payload.get("subtype") not in ("message_changed", "message_deleted")
+        and payload.get("thread_ts", payload["ts"]) == payload["ts"]
+    )
+
+
+class EngagedThreadIndex:
+    """
+    LRU index of whether the parent post of a thread mentions the bot, with expiring entries.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_threads: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize an empty index of up to `max_threads` threads kept for `ttl_seconds`."""
+        self.max_threads = max_threads
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._threads: OrderedDict[tuple[str, str], tuple[bool, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        """Return the number of indexed threads, including expired ones not yet evicted."""
+        return len(self._threads)
+
+    def get(self, channel: str, thread_ts: str) -> bool | None:
+        """
+        Look up whether the parent post of a thread mentions the bot.
+
+        Args:
+            channel (str): The ID of the channel containing the thread.
+            thread_ts (str): The timestamp of the parent post.
+
+        Returns:
+            Optional[bool]: True or False if known, None if the thread is not indexed or expired.
+        """
+        entry = self._threads.get((channel, thread_ts))
+        if entry is None:
+            return None
+        is_engaged, expires_at = entry
+        if expires_at <= self.clock():
+            del self._threads[(channel, thread_ts)]
+            return None
+        self._threads.move_to_end((channel, thread_ts))
+        return is_engaged
+
+    def put(self, channel: str, thread_ts: str, is_engaged: bool) -> None:
+        """Index a thread, evicting the least recently used threads."""
+        if self.max_threads <= 0:
+            return
+        self._threads[(channel, thread_ts)] = (
+            is_engaged,
+            self.clock() + self.ttl_seconds,
+        )
+        self._threads.move_to_end((channel, thread_ts))
+        while len(self._threads) > self.max_threads:
+            self._threads.popitem(last=False)
+
+    def discard(self, channel: str, thread_ts: str) -> None:
+        """Remove a thread from the index, so its parent post is looked up again."""
+        self._threads.pop((channel, thread_ts), None)
+
+    def apply_event(self, channel: str, payload: dict, bot_user_id: str | None) -> bool:
+        """
+        Index the thread started by a new top-level post, or forget an edited or deleted one.
+
+        Args:
+            channel (str): The ID of the channel the event belongs to.
+            payload (dict): The payload of the message event.
+            bot_user_id (Optional[str]): The bot's user ID.
+
+        Returns:
+            bool: True if the index was changed, False otherwise.
+        """
+        if edited_ts := find_edited_post_ts(payload):
+            self.discard(channel, edited_ts)
+            return True
+        if not is_top_level_post(payload):
+            return False
+        self.put(channel, payload["ts"], is_post_mentioned(bot_user_id, payload))
+        return True
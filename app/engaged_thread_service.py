@@ -0,0 +1,93 @@
+"""
+Service functions for the engaged-thread index shared by all incoming posts.
+"""
+
+import threading
+
+from app.bolt_logic import is_post_from_bot, is_post_in_dm, is_post_mentioned
+from app.engaged_thread_logic import EngagedThreadIndex
+from app.env import ENGAGED_THREAD_INDEX_SIZE, ENGAGED_THREAD_TTL_SECONDS
+
+engaged_thread_index = EngagedThreadIndex(
+    max_threads=ENGAGED_THREAD_INDEX_SIZE,
+    ttl_seconds=ENGAGED_THREAD_TTL_SECONDS,
+)
+_engaged_thread_index_lock = threading.Lock()
+
+
+def record_engaged_thread_event(
+    channel_id: str, payload: dict, bot_user_id: str | None
+) -> None:
+    """
+    Index the thread started by a message event, if the event is a top-level post.
+
+    Args:
+        channel_id (str): The ID of the channel the event belongs to.
+        payload (dict): The payload of the message event.
+        bot_user_id (Optional[str]): The bot's user ID.
+
+    Returns:
+        None
+    """
+    with _engaged_thread_index_lock:
+        engaged_thread_index.apply_event(channel_id, payload, bot_user_id)
+
+
+def get_indexed_parent_post_mentioned(channel_id: str, thread_ts: str) -> bool | None:
+    """
+    Get whether the parent post of a thread mentions the bot, if the thread is indexed.
+
+    Args:
+        channel_id (str): The ID of the channel containing the thread.
+        thread_ts (str): The timestamp of the parent post.
+
+    Returns:
+        Optional[bool]: True or False if known, None if the parent post must be looked up.
+    """
+    with _engaged_thread_index_lock:
+        return engaged_thread_index.get(channel_id, thread_ts)
+
+
+def store_parent_post_mentioned(
+    channel_id: str, thread_ts: str, mentioned: bool
+) -> None:
+    """
+    Index a thread after looking up its parent post.
+
+    Args:
+        channel_id (str): The ID of the channel containing the thread.
+        thread_ts (str): The timestamp of the parent post.
+        mentioned (bool): Whether the parent post mentions the bot.
+
+    Returns:
+        None
+    """
+    with _engaged_thread_index_lock:
+        engaged_thread_index.put(channel_id, thread_ts, mentioned)
+
+
+def may_respond_to_post(
+    channel_id: str | None, payload: dict, bot_user_id: str | None
+) -> bool:
+    """
+    Check without calling Slack whether a post may be responded to, before it is queued.
+
+    Replies in threads whose parent post is not indexed yet may still be responded to, once a
+    worker looks up the parent post.
+
+    Args:
+        channel_id (Optional[str]): The ID of the channel containing the post.
+        payload (dict): The payload of the message event.
+        bot_user_id (Optional[str]): The bot's user ID.
+
+    Returns:
+        bool: False if the post is certainly ignored, True otherwise.
+    """
+    if is_post_from_bot(payload):
+        return False
+    if is_post_in_dm(payload) or is_post_mentioned(bot_user_id, payload):
+        return True
+    thread_ts = payload.get("thread_ts")
+    if channel_id is None or thread_ts is None:
+        return False
+    return get_indexed_parent_post_mentioned(channel_id, thread_ts) is not False
@@ -85,8 +85,17 @@ SYSTEM_PROMPT_TEMPLATE = get_env(
 )
 LLM_MODEL = get_env("LLM_MODEL", "gpt-5.2")
 LLM_TIMEOUT_SECONDS = get_env("LLM_TIMEOUT_SECONDS", 30)
+LLM_FIRST_TOKEN_TIMEOUT_SECONDS = get_env(
+    "LLM_FIRST_TOKEN_TIMEOUT_SECONDS", float(LLM_TIMEOUT_SECONDS)
+)
+LLM_CHUNK_GAP_TIMEOUT_SECONDS = get_env(
+    "LLM_CHUNK_GAP_TIMEOUT_SECONDS", float(LLM_TIMEOUT_SECONDS)
+)
 LLM_TEMPERATURE = get_env("LLM_TEMPERATURE", 1.0)
 LLM_MAX_TOKENS = get_env("LLM_MAX_TOKENS", 2048)
+LLM_MAX_STEPS = get_env("LLM_MAX_STEPS", 20)
+LLM_MAX_TOTAL_TOKENS = get_env("LLM_MAX_TOTAL_TOKENS", 0)
+LLM_HISTORY_MAX_TOKENS = get_env("LLM_HISTORY_MAX_TOKENS", 0)
 
 # LiteLLM
 LITELLM_CALLBACK_MODULE_NAME = get_env("LITELLM_CALLBACK_MODULE_NAME")
@@ -94,10 +103,54 @@ LITELLM_DROP_PARAMS = get_env("LITELLM_DROP_PARAMS")
 
 # Slack
 SLACK_APP_LOG_LEVEL = get_env("SLACK_APP_LOG_LEVEL", "DEBUG")
+SLACK_ASYNC_MODE_ENABLED = get_env("SLACK_ASYNC_MODE_ENABLED", "false") == "true"
+POST_WORKER_MAX_CONCURRENCY = get_env("POST_WORKER_MAX_CONCURRENCY", 16)
+POST_QUEUE_MAX_SIZE = get_env("POST_QUEUE_MAX_SIZE", 200)
+POST_QUEUE_TIMEOUT_SECONDS = get_env("POST_QUEUE_TIMEOUT_SECONDS", 1.0)
+POST_QUEUE_STATS_LOG_INTERVAL_SECONDS = get_env(
+    "POST_QUEUE_STATS_LOG_INTERVAL_SECONDS", 300.0
+)
+POST_PRIORITY_CLASS_WEIGHTS = get_env(
+    "POST_PRIORITY_CLASS_WEIGHTS", "dm:4,mention:2,thread:2,attachments:1"
+)
+POST_BURST_WINDOW_SECONDS = get_env("POST_BURST_WINDOW_SECONDS", 0.0)
+EVENT_DEDUPE_TTL_SECONDS = get_env("EVENT_DEDUPE_TTL_SECONDS", 600.0)
+SLACK_STREAMING_API_ENABLED = get_env("SLACK_STREAMING_API_ENABLED", "false") == "true"
 SLACK_UPDATE_TEXT_BUFFER_SIZE = get_env("SLACK_UPDATE_TEXT_BUFFER_SIZE", 20)
+SLACK_UPDATE_MIN_INTERVAL_SECONDS = get_env("SLACK_UPDATE_MIN_INTERVAL_SECONDS", 0.5)
+SLACK_UPDATE_MAX_INTERVAL_SECONDS = get_env("SLACK_UPDATE_MAX_INTERVAL_SECONDS", 2.0)
+SLACK_UPDATE_CHANNEL_RATE = get_env("SLACK_UPDATE_CHANNEL_RATE", 1.0)
+SLACK_UPDATE_CHANNEL_BURST = get_env("SLACK_UPDATE_CHANNEL_BURST", 3.0)
 SLACK_LOADING_CHARACTER = get_env("SLACK_LOADING_CHARACTER", " ... :writing_hand:")
 USE_SLACK_LOCALE = get_env("USE_SLACK_LOCALE", "true") == "true"
+USER_PROFILE_CACHE_SIZE = get_env("USER_PROFILE_CACHE_SIZE", 10000)
+USER_PROFILE_TTL_SECONDS = get_env("USER_PROFILE_TTL_SECONDS", 3600.0)
+USER_PROFILE_WARM_UP_ENABLED = (
+    get_env("USER_PROFILE_WARM_UP_ENABLED", "false") == "true"
+)
 SLACK_FORMATTING_ENABLED = get_env("SLACK_FORMATTING_ENABLED", "false") == "true"
+SLACK_REPLY_FORMAT = get_env("SLACK_REPLY_FORMAT", "text").strip().lower()
+# The formats of app.slack_blocks_logic.REPLY_FORMATS; a typo would silently skip the mrkdwn
+# conversion without rendering blocks
+if SLACK_REPLY_FORMAT not in ("text", "markdown", "rich_text"):
+    warnings.warn(
+        f"Unknown SLACK_REPLY_FORMAT {SLACK_REPLY_FORMAT!r}, using 'text' instead",
+        stacklevel=1,
+    )
+    SLACK_REPLY_FORMAT = "text"
+THREAD_HISTORY_CACHE_SIZE = get_env("THREAD_HISTORY_CACHE_SIZE", 200)
+ENGAGED_THREAD_INDEX_SIZE = get_env("ENGAGED_THREAD_INDEX_SIZE", 10000)
+ENGAGED_THREAD_TTL_SECONDS = get_env("ENGAGED_THREAD_TTL_SECONDS", 86400.0)
+REPLY_TEXT_CACHE_SIZE = get_env("REPLY_TEXT_CACHE_SIZE", 10000)
+SLACK_FILE_HTTP2_ENABLED = get_env("SLACK_FILE_HTTP2_ENABLED", "false") == "true"
+SLACK_FILE_MAX_CONNECTIONS = get_env("SLACK_FILE_MAX_CONNECTIONS", 20)
+SLACK_FILE_MAX_KEEPALIVE_CONNECTIONS = get_env(
+    "SLACK_FILE_MAX_KEEPALIVE_CONNECTIONS", 10
+)
+SLACK_FILE_KEEPALIVE_SECONDS = get_env("SLACK_FILE_KEEPALIVE_SECONDS", 30.0)
+SLACK_FILE_CACHE_MAX_BYTES = get_env("SLACK_FILE_CACHE_MAX_BYTES", 104857600)
+SLACK_FILE_CACHE_DIR = get_env("SLACK_FILE_CACHE_DIR")
+SLACK_FILE_CACHE_DIR_MAX_BYTES = get_env("SLACK_FILE_CACHE_DIR_MAX_BYTES", 1073741824)
 
 # Input
 IMAGE_INPUT_ENABLED = get_env("IMAGE_INPUT_ENABLED", "false") == "true"
@@ -123,3 +176,8 @@ REDACT_CREDIT_CARD_PATTERN = get_env(
 )
 REDACT_SSN_PATTERN = get_env("REDACT_SSN_PATTERN", r"\b\d{3}[- ]?\d{2}[- ]?\d{4}\b")
 REDACT_USER_DEFINED_PATTERN = get_env("REDACT_USER_DEFINED_PATTERN", r"(?!)")
+REDACTION_TIMEOUT_SECONDS = get_env("REDACTION_TIMEOUT_SECONDS", 0.5)
+REDACT_TOOL_ARGUMENTS_ENABLED = (
+    get_env("REDACT_TOOL_ARGUMENTS_ENABLED", "false") == "true"
+)
+REDACT_TOOL_RESULTS_ENABLED = get_env("REDACT_TOOL_RESULTS_ENABLED", "false") == "true"
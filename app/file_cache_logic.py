@@ -0,0 +1,255 @@
+"""
+This module contains logic for caching downloaded Slack files, so images and PDFs in a thread
+are downloaded and encoded once instead of on every turn.
+
+Files are content-addressed: Slack file IDs map to the hash of their validated content, so the
+same content posted as several files is stored and encoded once. The memory tier holds the
+encoded data URLs, and the optional disk tier holds the validated bytes, which survive
+restarts. Both tiers evict their least recently used contents to stay within a total size.
+"""
+
+import hashlib
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from uuid import uuid4
+
+# How many Slack file IDs the memory tier remembers, much more than its contents, since the
+# index entries are small
+MAX_FILE_IDS = 100000
+# Slack file IDs are used as file names in the disk tier
+FILE_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+@dataclass
+class FileCacheStats:
+    """Counts of the file cache lookups, for logging and monitoring."""
+
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    encodes: int = 0
+    evictions: int = 0
+    memory_bytes: int = 0
+    disk_bytes: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """The share of lookups found in either tier, or 0 if there were none."""
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return hits / lookups if lookups else 0.0
+
+
+def hash_content(data: bytes) -> str:
+    """Return the hex SHA-256 digest of file content."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class MemoryFileCache:
+    """LRU cache of encoded data URLs by content hash, with an index of Slack file IDs."""
+
+    def __init__(self, *, max_bytes: int, max_file_ids: int = MAX_FILE_IDS):
+        """Initialize an empty cache holding up to `max_bytes` of data URLs."""
+        self.max_bytes = max_bytes
+        self.max_file_ids = max_file_ids
+        self.nbytes = 0
+        self._content_hashes: OrderedDict[str, str] = OrderedDict()
+        self._data_urls: OrderedDict[str, str] = OrderedDict()
+
+    def __len__(self) -> int:
+        """Return the number of cached data URLs."""
+        return len(self._data_urls)
+
+    def find_content_hash(self, file_id: str) -> str | None:
+        """Return the content hash of a Slack file, if the file was cached."""
+        return self._content_hashes.get(file_id)
+
+    def get(self, content_hash: str) -> str | None:
+        """Return the data URL of the content, marking it as recently used."""
+        data_url = self._data_urls.get(content_hash)
+        if data_url is not None:
+            self._data_urls.move_to_end(content_hash)
+        return data_url
+
+    def link(self, file_id: str, content_hash: str) -> None:
+        """Remember the content hash of a Slack file, forgetting the oldest file IDs."""
+        self._content_hashes[file_id] = content_hash
+        self._content_hashes.move_to_end(file_id)
+        while len(self._content_hashes) > self.max_file_ids:
+            self._content_hashes.popitem(last=False)
+
+    def put(self, content_hash: str, data_url: str) -> int:
+        """
+        Cache the data URL of the content, evicting the least recently used data URLs.
+
+        Args:
+            content_hash (str): The hash of the content.
+            data_url (str): The encoded content.
+
+        Returns:
+            int: The number of evicted data URLs.
+        """
+        if len(data_url) > self.max_bytes:
+            return 0
+        if (previous := self._data_urls.pop(content_hash, None)) is not None:
+            self.nbytes -= len(previous)
+        self._data_urls[content_hash] = data_url
+        self.nbytes += len(data_url)
+        evictions = 0
+        while self.nbytes > self.max_bytes:
+            _, evicted = self._data_urls.popitem(last=False)
+            self.nbytes -= len(evicted)
+            evictions += 1
+        return evictions
+
+
+class DiskFileCache:
+    """
+    LRU cache of validated file contents in a directory, bounded by their total size.
+
+    Contents are stored as "content/<hash>", and each Slack file ID as "files/<file ID>",
+    holding the hash and MIME type of its content. The index is read once at startup.
+
+    Reading and writing contents is separate from updating the index, so a shared cache can
+    do its slow disk I/O outside its lock: `read` and `write` only touch content files, and
+    `find`, `mark_used`, `add` and `forget` update the index. `add` and `forget` also write
+    and delete the small files of the index, so an indexed content is never missing while
+    they are called under the lock.
+    """
+
+    def __init__(self, *, directory: Path, max_bytes: int):
+        """Initialize a cache in `directory`, loading the files cached by earlier runs."""
+        self.max_bytes = max_bytes
+        self.content_dir = directory / "content"
+        self.files_dir = directory / "files"
+        self.content_dir.mkdir(parents=True, exist_ok=True)
+        self.files_dir.mkdir(parents=True, exist_ok=True)
+        self.nbytes = 0
+        self._sizes: OrderedDict[str, int] = OrderedDict()
+        self._index: dict[str, tuple[str, str]] = {}
+        self._file_ids: dict[str, set[str]] = {}
+        contents = []
+        for path in self.content_dir.iterdir():
+            # Contents still being written when an earlier run stopped are incomplete
+            if path.name.endswith(".tmp"):
+                path.unlink(missing_ok=True)
+                continue
+            stat = path.stat()
+            contents.append((stat.st_mtime, path.name, stat.st_size))
+        contents.sort()
+        for _, content_hash, size in contents:
+            self._sizes[content_hash] = size
+            self.nbytes += size
+        for path in self.files_dir.iterdir():
+            content_hash, _, mime_type = path.read_text().partition("\n")
+            if content_hash in self._sizes:
+                self._add_index(path.name, content_hash, mime_type)
+            else:
+                path.unlink(missing_ok=True)
+
+    def __len__(self) -> int:
+        """Return the number of cached contents."""
+        return len(self._sizes)
+
+    def _add_index(self, file_id: str, content_hash: str, mime_type: str) -> None:
+        if (previous := self._index.get(file_id)) is not None:
+            self._file_ids.get(previous[0], set()).discard(file_id)
+        self._index[file_id] = (content_hash, mime_type)
+        self._file_ids.setdefault(content_hash, set()).add(file_id)
+
+    def find(self, file_id: str) -> tuple[str, str] | None:
+        """Return the content hash and MIME type of a Slack file, if the file is cached."""
+        return self._index.get(file_id)
+
+    def read(self, content_hash: str) -> bytes | None:
+        """
+        Read and verify cached content, without changing the index.
+
+        Args:
+            content_hash (str): The hash of the content.
+
+        Returns:
+            Optional[bytes]: The content, or None if it is missing or corrupted.
+        """
+        path = self.content_dir / content_hash
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        if hash_content(data) != content_hash:
+            return None
+        path.touch()
+        return data
+
+    def mark_used(self, content_hash: str) -> None:
+        """Mark the content as recently used in the index."""
+        if content_hash in self._sizes:
+            self._sizes.move_to_end(content_hash)
+
+    def write(
+        self, *, file_id: str, content_hash: str, mime_type: str, data: bytes
+    ) -> bool:
+        """
+        Write the content of a Slack file to the directory, without changing the index.
+
+        Args:
+            file_id (str): The Slack file ID.
+            content_hash (str): The hash of the content.
+            mime_type (str): The MIME type of the content.
+            data (bytes): The validated content.
+
+        Returns:
+            bool: Whether the content was written and can be added to the index with `add`.
+        """
+        if not FILE_ID_PATTERN.fullmatch(file_id) or len(data) > self.max_bytes:
+            return False
+        path = self.content_dir / content_hash
+        if not path.exists():
+            # Each writer has its own temporary file, so concurrent writes of the same
+            # content do not interleave
+            temporary_path = self.content_dir / f"{content_hash}.{uuid4().hex}.tmp"
+            temporary_path.write_bytes(data)
+            temporary_path.replace(path)
+        return True
+
+    def add(
+        self, *, file_id: str, content_hash: str, mime_type: str, size: int
+    ) -> int | None:
+        """
+        Add a written Slack file to the index, evicting the least recently used contents.
+
+        Args:
+            file_id (str): The Slack file ID.
+            content_hash (str): The hash of the content.
+            mime_type (str): The MIME type of the content.
+            size (int): The size of the content in bytes.
+
+        Returns:
+            Optional[int]: The number of evicted contents, or None if the content was deleted
+                after it was written, so the file is not cached.
+        """
+        if content_hash not in self._sizes:
+            # `write` skips content that is already there, and an eviction since then may
+            # have deleted it
+            if not (self.content_dir / content_hash).exists():
+                return None
+            self._sizes[content_hash] = size
+            self.nbytes += size
+        self._sizes.move_to_end(content_hash)
+        (self.files_dir / file_id).write_text(f"{content_hash}\n{mime_type}")
+        self._add_index(file_id, content_hash, mime_type)
+        evictions = 0
+        while self.nbytes > self.max_bytes:
+            self.forget(next(iter(self._sizes)))
+            evictions += 1
+        return evictions
+
+    def forget(self, content_hash: str) -> None:
+        """Remove the content and the Slack files holding it from the index and the directory."""
+        self.nbytes -= self._sizes.pop(content_hash, 0)
+        (self.content_dir / content_hash).unlink(missing_ok=True)
+        for file_id in self._file_ids.pop(content_hash, set()):
+            self._index.pop(file_id, None)
+            (self.files_dir / file_id).unlink(missing_ok=True)
@@ -0,0 +1,170 @@
+"""
+Service functions for the cache of downloaded Slack files shared by all incoming posts.
+"""
+
+import asyncio
+import logging
+import threading
+from dataclasses import replace
+from pathlib import Path
+
+from app.env import (
+    SLACK_FILE_CACHE_DIR,
+    SLACK_FILE_CACHE_DIR_MAX_BYTES,
+    SLACK_FILE_CACHE_MAX_BYTES,
+)
+from app.file_cache_logic import (
+    DiskFileCache,
+    FileCacheStats,
+    MemoryFileCache,
+    hash_content,
+)
+from app.message_logic import build_data_url
+
+memory_file_cache = MemoryFileCache(max_bytes=SLACK_FILE_CACHE_MAX_BYTES)
+disk_file_cache: DiskFileCache | None = None
+if SLACK_FILE_CACHE_DIR:
+    disk_file_cache = DiskFileCache(
+        directory=Path(SLACK_FILE_CACHE_DIR), max_bytes=SLACK_FILE_CACHE_DIR_MAX_BYTES
+    )
+file_cache_stats = FileCacheStats()
+_file_cache_lock = threading.Lock()
+
+
+def get_cached_slack_file_data_url(file_id: str | None) -> str | None:
+    """
+    Get the encoded content of a Slack file downloaded before.
+
+    A file found only on disk is encoded and kept in memory for the next lookup. The disk is
+    read and the content is encoded outside the lock, which only guards the indexes and
+    their small files.
+
+    Args:
+        file_id (Optional[str]): The Slack file ID.
+
+    Returns:
+        Optional[str]: The content as a data URL, or None if the file must be downloaded.
+    """
+    if file_id is None:
+        return None
+    with _file_cache_lock:
+        content_hash = memory_file_cache.find_content_hash(file_id)
+        if content_hash is not None and (
+            data_url := memory_file_cache.get(content_hash)
+        ):
+            file_cache_stats.memory_hits += 1
+            return data_url
+        disk_cache = disk_file_cache
+        entry = disk_cache.find(file_id) if disk_cache is not None else None
+        if disk_cache is None or entry is None:
+            file_cache_stats.misses += 1
+            return None
+    content_hash, mime_type = entry
+    try:
+        data = disk_cache.read(content_hash)
+    except OSError:
+        logging.exception(f"Failed to read a cached Slack file: {file_id}")
+        with _file_cache_lock:
+            file_cache_stats.misses += 1
+        return None
+    if data is None:
+        with _file_cache_lock:
+            file_cache_stats.misses += 1
+            try:
+                disk_cache.forget(content_hash)
+            except OSError:
+                logging.exception(f"Failed to delete a cached Slack file: {file_id}")
+        return None
+    data_url = build_data_url(mime_type, data)
+    with _file_cache_lock:
+        disk_cache.mark_used(content_hash)
+        file_cache_stats.disk_hits += 1
+        file_cache_stats.encodes += 1
+        memory_file_cache.link(file_id, content_hash)
+        file_cache_stats.evictions += memory_file_cache.put(content_hash, data_url)
+    return data_url
+
+
+async def async_get_cached_slack_file_data_url(file_id: str | None) -> str | None:
+    """
+    Get the encoded content of a Slack file downloaded before, reading the disk in a thread.
+
+    Args:
+        file_id (Optional[str]): The Slack file ID.
+
+    Returns:
+        Optional[str]: The content as a data URL, or None if the file must be downloaded.
+    """
+    if disk_file_cache is None:
+        return get_cached_slack_file_data_url(file_id)
+    return await asyncio.to_thread(get_cached_slack_file_data_url, file_id)
+
+
+def cache_slack_file(*, file_id: str | None, mime_type: str, data: bytes) -> str:
+    """
+    Encode the validated content of a downloaded Slack file, and cache it.
+
+    Content already cached for another file is not encoded again. The content is hashed,
+    encoded and written to disk outside the lock, which only guards the indexes and their
+    small files.
+
+    Args:
+        file_id (Optional[str]): The Slack file ID, or None if the file cannot be cached.
+        mime_type (str): The MIME type of the content.
+        data (bytes): The validated content.
+
+    Returns:
+        str: The content as a data URL.
+    """
+    content_hash = hash_content(data)
+    with _file_cache_lock:
+        data_url = memory_file_cache.get(content_hash)
+    if data_url is None:
+        data_url = build_data_url(mime_type, data)
+        with _file_cache_lock:
+            file_cache_stats.encodes += 1
+            file_cache_stats.evictions += memory_file_cache.put(content_hash, data_url)
+    if file_id is None:
+        return data_url
+    with _file_cache_lock:
+        memory_file_cache.link(file_id, content_hash)
+    if disk_file_cache is None:
+        return data_url
+    try:
+        written = disk_file_cache.write(
+            file_id=file_id, content_hash=content_hash, mime_type=mime_type, data=data
+        )
+    except OSError:
+        logging.exception(f"Failed to cache a Slack file on disk: {file_id}")
+        return data_url
+    if not written:
+        return data_url
+    with _file_cache_lock:
+        try:
+            evictions = disk_file_cache.add(
+                file_id=file_id,
+                content_hash=content_hash,
+                mime_type=mime_type,
+                size=len(data),
+            )
+        except OSError:
+            logging.exception(f"Failed to cache a Slack file on disk: {file_id}")
+            return data_url
+        if evictions is not None:
+            file_cache_stats.evictions += evictions
+    return data_url
+
+
+def get_file_cache_stats() -> FileCacheStats:
+    """
+    Get the lookup counts and sizes of the Slack file cache.
+
+    Returns:
+        FileCacheStats: A snapshot of the counts.
+    """
+    with _file_cache_lock:
+        return replace(
+            file_cache_stats,
+            memory_bytes=memory_file_cache.nbytes,
+            disk_bytes=disk_file_cache.nbytes if disk_file_cache is not None else 0,
+        )
@@ -0,0 +1,226 @@
+"""
+This module contains logic for deciding when to flush streamed replies to Slack.
+"""
+
+import re
+from collections import OrderedDict
+
+TEXT_BOUNDARY_PATTERN = re.compile(r"(?:[.!?。！？]\s*|\n)$")
+PENDING_TAIL_LENGTH = 16
+
+
+def is_at_text_boundary(text: str) -> bool:
+    """
+    Check if the text ends at a sentence or paragraph boundary.
+
+    Args:
+        text (str): The text to check.
+
+    Returns:
+        bool: True if the text ends with sentence punctuation or a newline, False otherwise.
+    """
+    return TEXT_BOUNDARY_PATTERN.search(text) is not None
+
+
+def calculate_flush_interval(
+    *,
+    chars_per_second: float,
+    buffer_size: int,
+    min_interval: float,
+    max_interval: float,
+) -> float:
+    """
+    Calculate the time to wait between flushes based on the current text rate.
+
+    The interval is the time it takes to receive `buffer_size` characters, clamped to the
+    configured range, so fast streams are batched and slow streams still show progress.
+
+    Args:
+        chars_per_second (float): The observed text rate in characters per second.
+        buffer_size (int): The number of characters to batch per update.
+        min_interval (float): The minimum interval in seconds.
+        max_interval (float): The maximum interval in seconds.
+
+    Returns:
+        float: The flush interval in seconds.
+    """
+    if chars_per_second <= 0:
+        return max_interval
+    return min(max(buffer_size / chars_per_second, min_interval), max_interval)
+
+
+class FlushScheduler:
+    """Decides when a streamed reply should be flushed to Slack."""
+
+    def __init__(
+        self,
+        *,
+        start_time: float,
+        buffer_size: int,
+        min_interval: float,
+        max_interval: float,
+    ):
+        """Initialize the scheduler for a reply that started at `start_time`."""
+        self.buffer_size = buffer_size
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.start_time = start_time
+        self.last_flush_time: float | None = None
+        self.received_chars = 0
+        self.has_pending_text = False
+        self.pending_tail = ""
+
+    def add_text(self, text: str) -> None:
+        """Record text received since the last flush."""
+        self.received_chars += len(text)
+        self.has_pending_text = self.has_pending_text or bool(text.strip())
+        self.pending_tail = (self.pending_tail + text)[-PENDING_TAIL_LENGTH:]
+
+    def chars_per_second(self, now: float) -> float:
+        """Return the average text rate since the reply started."""
+        elapsed = now - self.start_time
+        return self.received_chars / elapsed if elapsed > 0 else 0.0
+
+    def should_flush(self, now: float) -> bool:
+        """
+        Check if the pending text should be flushed now.
+
+        The first visible text is flushed immediately. After that, pending text is flushed
+        early at sentence or paragraph boundaries once the minimum interval has passed, and
+        otherwise when the rate-based interval has passed.
+
+        Args:
+            now (float): The current time in seconds.
+
+        Returns:
+            bool: True if the pending text should be flushed, False otherwise.
+        """
+        if not self.has_pending_text:
+            return False
+        if self.last_flush_time is None:
+            return True
+        elapsed = now - self.last_flush_time
+        if elapsed < self.min_interval:
+            return False
+        if is_at_text_boundary(self.pending_tail):
+            return True
+        return elapsed >= calculate_flush_interval(
+            chars_per_second=self.chars_per_second(now),
+            buffer_size=self.buffer_size,
+            min_interval=self.min_interval,
+            max_interval=self.max_interval,
+        )
+
+    def mark_flushed(self, now: float) -> None:
+        """Record that the pending text has been flushed."""
+        self.last_flush_time = now
+        self.has_pending_text = False
+        self.pending_tail = ""
+
+
+def build_token_bucket(capacity: float, now: float) -> dict:
+    """
+    Build a full token bucket.
+
+    Args:
+        capacity (float): The maximum number of tokens.
+        now (float): The current time in seconds.
+
+    Returns:
+        dict: The token bucket state.
+    """
+    return {
+        "tokens": capacity,
+        "updated_at": now,
+        "blocked_until": 0.0,
+        "rate_factor": 1.0,
+    }
+
+
+def get_token_bucket(
+    buckets: OrderedDict[str, dict],
+    key: str,
+    *,
+    capacity: float,
+    now: float,
+    max_buckets: int,
+) -> dict:
+    """
+    Get the token bucket of a key, building a full one and evicting the least recently used
+    buckets if needed.
+
+    Args:
+        buckets (OrderedDict[str, dict]): The token buckets in least recently used order.
+        key (str): The key of the bucket, such as a Slack channel ID.
+        capacity (float): The maximum number of tokens.
+        now (float): The current time in seconds.
+        max_buckets (int): The maximum number of buckets to keep.
+
+    Returns:
+        dict: The token bucket state.
+    """
+    bucket = buckets.get(key)
+    if bucket is None:
+        bucket = buckets[key] = build_token_bucket(capacity, now)
+        while len(buckets) > max_buckets:
+            buckets.popitem(last=False)
+    else:
+        buckets.move_to_end(key)
+    return bucket
+
+
+def try_consume_token(
+    *,
+    bucket: dict,
+    now: float,
+    rate: float,
+    capacity: float,
+) -> bool:
+    """
+    Refill the bucket and consume one token if available.
+
+    The refill rate is scaled by the bucket's rate factor, which is reduced by rate limit
+    backoffs and recovers a little on every successful consumption.
+
+    Args:
+        bucket (dict): The token bucket state.
+        now (float): The current time in seconds.
+        rate (float): The base refill rate in tokens per second.
+        capacity (float): The maximum number of tokens.
+
+    Returns:
+        bool: True if a token was consumed, False otherwise.
+    """
+    elapsed = max(now - bucket["updated_at"], 0.0)
+    bucket["tokens"] = min(
+        bucket["tokens"] + elapsed * rate * bucket["rate_factor"], capacity
+    )
+    bucket["updated_at"] = max(now, bucket["updated_at"])
+    if now < bucket["blocked_until"] or bucket["tokens"] < 1:
+        return False
+    bucket["tokens"] -= 1
+    bucket["rate_factor"] = min(bucket["rate_factor"] + 0.1, 1.0)
+    return True
+
+
+def apply_rate_limit_backoff(
+    *,
+    bucket: dict,
+    now: float,
+    retry_after: float,
+) -> None:
+    """
+    Back off the bucket after a rate limit error.
+
+    Args:
+        bucket (dict): The token bucket state.
+        now (float): The current time in seconds.
+        retry_after (float): The number of seconds Slack asked to wait.
+
+    Returns:
+        None
+    """
+    bucket["tokens"] = 0.0
+    bucket["updated_at"] = max(now + retry_after, bucket["updated_at"])
+    bucket["blocked_until"] = max(now + retry_after, bucket["blocked_until"])
+    bucket["rate_factor"] = max(bucket["rate_factor"] / 2, 0.1)
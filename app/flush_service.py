@@ -0,0 +1,74 @@
+"""
+Service functions for rate limiting streamed reply updates per Slack channel.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from app.env import SLACK_UPDATE_CHANNEL_BURST, SLACK_UPDATE_CHANNEL_RATE
+from app.flush_logic import (
+    apply_rate_limit_backoff,
+    get_token_bucket,
+    try_consume_token,
+)
+
+# Buckets of channels without updates for a while are full again, so evicting them is harmless
+MAX_CHANNEL_UPDATE_BUCKETS = 10000
+
+channel_update_buckets: OrderedDict[str, dict] = OrderedDict()
+_channel_update_buckets_lock = threading.Lock()
+
+
+def try_acquire_channel_update(channel: str) -> bool:
+    """
+    Try to take an update slot from the channel's token bucket.
+
+    Args:
+        channel (str): The Slack channel ID.
+
+    Returns:
+        bool: True if the reply may be updated now, False if it should wait.
+    """
+    now = time.monotonic()
+    with _channel_update_buckets_lock:
+        bucket = get_token_bucket(
+            channel_update_buckets,
+            channel,
+            capacity=SLACK_UPDATE_CHANNEL_BURST,
+            now=now,
+            max_buckets=MAX_CHANNEL_UPDATE_BUCKETS,
+        )
+        return try_consume_token(
+            bucket=bucket,
+            now=now,
+            rate=SLACK_UPDATE_CHANNEL_RATE,
+            capacity=SLACK_UPDATE_CHANNEL_BURST,
+        )
+
+
+def record_channel_rate_limited(channel: str | None, retry_after: float) -> None:
+    """
+    Back off reply updates in a channel after Slack returned a rate limit error.
+
+    Args:
+        channel (Optional[str]): The Slack channel ID, if known.
+        retry_after (float): The number of seconds Slack asked to wait.
+
+    Returns:
+        None
+    """
+    if channel is None:
+        return
+    now = time.monotonic()
+    with _channel_update_buckets_lock:
+        bucket = get_token_bucket(
+            channel_update_buckets,
+            channel,
+            capacity=SLACK_UPDATE_CHANNEL_BURST,
+            now=now,
+            max_buckets=MAX_CHANNEL_UPDATE_BUCKETS,
+        )
+        apply_rate_limit_backoff(bucket=bucket, now=now, retry_after=retry_after)
+    logging.info("Backing off reply updates in %s for %.1fs", channel, retry_after)
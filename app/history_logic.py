@@ -0,0 +1,153 @@
+"""
+This module contains logic for limiting the conversation history to a token budget.
+"""
+
+from collections.abc import Callable, Iterable
+
+# Share of the model's input window the history may fill, leaving room for the system
+# prompt, tool definitions and differences between tokenizers
+HISTORY_INPUT_WINDOW_RATIO = 0.75
+# Tokens added per message for its role and separators
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def calculate_history_token_budget(
+    *, configured_tokens: int, max_input_tokens: int | None
+) -> int:
+    """
+    Calculate how many tokens the conversation history may use.
+
+    Args:
+        configured_tokens (int): The configured budget, or 0 to derive it from the model.
+        max_input_tokens (Optional[int]): The model's input window, if known.
+
+    Returns:
+        int: The token budget, or 0 for no limit.
+    """
+    if configured_tokens > 0:
+        return configured_tokens
+    if max_input_tokens is None or max_input_tokens <= 0:
+        return 0
+    return int(max_input_tokens * HISTORY_INPUT_WINDOW_RATIO)
+
+
+class TokenBudget:
+    """Counts the tokens of messages added newest-first until the budget is filled."""
+
+    def __init__(self, *, max_tokens: int):
+        """Initialize an empty budget of `max_tokens` tokens, or no limit if 0."""
+        self.max_tokens = max_tokens
+        self.used_tokens = 0
+        self.message_count = 0
+        self.is_filled = False
+
+    def try_add(self, tokens: int) -> bool:
+        """
+        Add a message if it fits in the budget.
+
+        The newest message is always added, so a reply never lacks the post it answers.
+
+        Args:
+            tokens (int): The number of tokens of the message.
+
+        Returns:
+            bool: True if the message was added, False once the budget is filled.
+        """
+        if self.is_filled:
+            return False
+        tokens += MESSAGE_OVERHEAD_TOKENS
+        if (
+            self.max_tokens > 0
+            and self.message_count > 0
+            and self.used_tokens + tokens > self.max_tokens
+        ):
+            self.is_filled = True
+            return False
+        self.used_tokens += tokens
+        self.message_count += 1
+        return True
+
+
+class TokenCounter:
+    """
+    Counts the tokens of texts, remembering the count of each text.
+
+    One counter is shared by the steps of a turn, so a message counted while the history is
+    selected is not tokenized again when the messages are fitted to the model's budget.
+    """
+
+    def __init__(self, count_tokens: Callable[[str], int]):
+        """Initialize a counter using `count_tokens` for the texts it has not seen yet."""
+        self.count_tokens = count_tokens
+        self._counts: dict[str, int] = {}
+
+    def __call__(self, text: str) -> int:
+        """Return the number of tokens of a text."""
+        if (count := self._counts.get(text)) is None:
+            count = self._counts[text] = self.count_tokens(text)
+        return count
+
+
+def get_reply_text(reply: dict) -> str:
+    """Return the text of a Slack reply as is."""
+    return reply.get("text", "")
+
+
+def select_newest_replies_within_budget(
+    *,
+    replies_newest_first: Iterable[dict],
+    count_tokens: Callable[[str], int],
+    budget: TokenBudget,
+    convert_text: Callable[[dict], str] = get_reply_text,
+) -> list[dict]:
+    """
+    Take replies newest-first until the token budget is filled.
+
+    Args:
+        replies_newest_first (Iterable[dict]): The replies, newest first.
+        count_tokens (Callable[[str], int]): The function counting the tokens of a text.
+        budget (TokenBudget): The budget shared with earlier pages, updated in place.
+        convert_text (Callable[[dict], str]): The function building the text of a reply that
+            is sent to the model, which is the text counted.
+
+    Returns:
+        list[dict]: The replies that fit in the budget, newest first.
+    """
+    selected: list[dict] = []
+    for reply in replies_newest_first:
+        if not budget.try_add(count_tokens(convert_text(reply))):
+            break
+        selected.append(reply)
+    return selected
+
+
+def trim_replies_to_token_budget(
+    *,
+    replies: list[dict],
+    count_tokens: Callable[[str], int],
+    max_tokens: int,
+    convert_text: Callable[[dict], str] = get_reply_text,
+) -> list[dict]:
+    """
+    Keep the newest replies that fit in the token budget.
+
+    Args:
+        replies (list[dict]): The replies in chronological order.
+        count_tokens (Callable[[str], int]): The function counting the tokens of a text.
+        max_tokens (int): The token budget, or 0 for no limit.
+        convert_text (Callable[[dict], str]): The function building the text of a reply that
+            is sent to the model, which is the text counted.
+
+    Returns:
+        list[dict]: The newest replies that fit in the budget, in chronological order.
+    """
+    if max_tokens <= 0:
+        return replies
+    selected = select_newest_replies_within_budget(
+        replies_newest_first=reversed(replies),
+        count_tokens=count_tokens,
+        budget=TokenBudget(max_tokens=max_tokens),
+        convert_text=convert_text,
+    )
+    selected.reverse()
+    return selected
@@ -16,11 +16,12 @@ from app.mcp.oauth_tools_service import (
     get_user_oauth_mcp_tools,
     get_user_oauth_sessions,
 )
+from app.user_profile_service import get_user_profile
 
 
 def get_user_timezone(client: WebClient, user_id: str) -> str:
     """
-    Get user's timezone from Slack API.
+    Get user's timezone from the cached Slack profile.
 
     Args:
         client (WebClient): Slack WebClient instance.
@@ -30,11 +31,9 @@ def get_user_timezone(client: WebClient, user_id: str) -> str:
         str: User's timezone string (defaults to UTC if unavailable).
     """
     try:
-        user_info = client.users_info(user=user_id)
-        if user_info.get("ok"):
-            user_data = user_info.get("user")
-            if user_data and hasattr(user_data, "get"):
-                return user_data.get("tz", "UTC")
+        tz = get_user_profile(client, user_id).tz
+        if tz:
+            return tz
     except Exception:
         logging.debug("Failed to get user timezone")
     return "UTC"
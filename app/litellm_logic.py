@@ -2,7 +2,9 @@
 This module contains logic related to LiteLLM.
 """
 
-from litellm.types.utils import ModelResponse
+from typing import Any
+
+from litellm.types.utils import Message, ModelResponse, Usage
 
 
 def extract_delta_content(chunk: ModelResponse) -> str | None:
@@ -32,3 +34,299 @@ def is_final_chunk(chunk: ModelResponse) -> bool:
         bool: True if the chunk is the final chunk, False otherwise.
     """
     return chunk.choices[0].get("finish_reason") is not None
+
+
+def get_field(obj: object, name: str) -> Any:
+    """
+    Get a field from a dict or an object attribute.
+
+    Args:
+        obj (object): The dict or object to read from.
+        name (str): The name of the field.
+
+    Returns:
+        Any: The value of the field, or None if not found.
+    """
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+class StreamAccumulator:
+    """
+    Accumulates a streamed model response as chunks arrive.
+
+    Text, tool calls, finish reason and usage are merged incrementally, so no chunk objects are
+    kept and the final message does not need to be rebuilt from all chunks at the end.
+    """
+
+    def __init__(self):
+        """Initialize an empty accumulator."""
+        self.finish_reason: str | None = None
+        self.usage: Usage | None = None
+        self.tool_calls: dict[int, dict] = {}
+        self._content = ""
+        self._pending_content: list[str] = []
+
+    @property
+    def is_complete(self) -> bool:
+        """
+        Return whether the finish reason and usage have both arrived.
+
+        Usage requested with `stream_options` comes in a chunk after the finish reason, so the
+        stream is read until then even if the final chunk carries text.
+        """
+        return self.finish_reason is not None and self.usage is not None
+
+    @property
+    def content(self) -> str:
+        """Return the text received so far."""
+        if self._pending_content:
+            self._content += "".join(self._pending_content)
+            self._pending_content.clear()
+        return self._content
+
+    def add_chunk(self, chunk: ModelResponse) -> str | None:
+        """
+        Merge a chunk into the accumulated response.
+
+        Args:
+            chunk (ModelResponse): The chunk of model response.
+
+        Returns:
+            Optional[str]: The delta content of the chunk, or None if not found.
+        """
+        if usage := get_field(chunk, "usage"):
+            self.usage = usage
+        if not chunk.choices:
+            return None
+        choice = chunk.choices[0]
+        if finish_reason := get_field(choice, "finish_reason"):
+            self.finish_reason = finish_reason
+        delta = get_field(choice, "delta")
+        if delta is None:
+            return None
+        for tool_call in get_field(delta, "tool_calls") or []:
+            self.add_tool_call_delta(tool_call)
+        delta_content = extract_delta_content(chunk)
+        if delta_content:
+            self._pending_content.append(delta_content)
+        return delta_content
+
+    def add_tool_call_delta(self, tool_call: object) -> None:
+        """
+        Merge a streamed tool call fragment into the tool call with the same index.
+
+        Args:
+            tool_call (object): The tool call delta from a chunk.
+
+        Returns:
+            None
+        """
+        function = get_field(tool_call, "function")
+        if function is None:
+            return
+        index = get_field(tool_call, "index") or 0
+        merged = self.tool_calls.setdefault(
+            index,
+            {
+                "id": None,
+                "type": None,
+                "name": None,
+                "arguments": [],
+                "provider_specific_fields": {},
+            },
+        )
+        for key in ("id", "type"):
+            if value := get_field(tool_call, key):
+                merged[key] = value
+        if name := get_field(function, "name"):
+            merged["name"] = name
+        if arguments := get_field(function, "arguments"):
+            merged["arguments"].append(arguments)
+        provider_specific_fields = get_field(
+            tool_call, "provider_specific_fields"
+        ) or get_field(function, "provider_specific_fields")
+        if isinstance(provider_specific_fields, dict):
+            merged["provider_specific_fields"].update(provider_specific_fields)
+
+    def build_message(self) -> Message:
+        """
+        Build the assistant message from the accumulated response.
+
+        Returns:
+            Message: The assistant message including any complete tool calls.
+        """
+        tool_calls = []
+        for index in sorted(self.tool_calls):
+            merged = self.tool_calls[index]
+            if not (merged["id"] and merged["name"]):
+                continue
+            tool_call = {
+                "id": merged["id"],
+                "type": merged["type"] or "function",
+                "function": {
+                    "name": merged["name"],
+                    "arguments": "".join(merged["arguments"]) or "{}",
+                },
+            }
+            if merged["provider_specific_fields"]:
+                tool_call["provider_specific_fields"] = merged[
+                    "provider_specific_fields"
+                ]
+            tool_calls.append(tool_call)
+        return Message(
+            content=self.content or None,
+            role="assistant",
+            tool_calls=tool_calls or None,
+        )
+
+
+def extract_total_tokens(usage: object) -> int:
+    """
+    Extract the total number of tokens from a usage object.
+
+    Args:
+        usage (object): The usage reported by the model, as a dict or object.
+
+    Returns:
+        int: The total tokens, or 0 if the usage was not reported.
+    """
+    if usage is None:
+        return 0
+    total_tokens = get_field(usage, "total_tokens")
+    if total_tokens is not None:
+        return int(total_tokens)
+    return int(get_field(usage, "prompt_tokens") or 0) + int(
+        get_field(usage, "completion_tokens") or 0
+    )
+
+
+def build_agent_step(
+    *,
+    step: int,
+    llm_seconds: float,
+    tool_seconds: float,
+    total_tokens: int,
+    tool_call_count: int,
+) -> dict:
+    """
+    Build a record of one step in the agent loop.
+
+    Args:
+        step (int): The 1-based step number.
+        llm_seconds (float): The time spent streaming the model response.
+        tool_seconds (float): The time spent running tool calls.
+        total_tokens (int): The tokens used by the model call.
+        tool_call_count (int): The number of tool calls requested by the model.
+
+    Returns:
+        dict: The agent step record.
+    """
+    return {
+        "step": step,
+        "llm_seconds": llm_seconds,
+        "tool_seconds": tool_seconds,
+        "total_tokens": total_tokens,
+        "tool_call_count": tool_call_count,
+    }
+
+
+def format_agent_step(agent_step: dict) -> str:
+    """
+    Format an agent step record for logging.
+
+    Args:
+        agent_step (dict): The agent step record.
+
+    Returns:
+        str: A one-line summary of the step.
+    """
+    return (
+        f"step={agent_step['step']} llm={agent_step['llm_seconds']:.2f}s "
+        f"tools={agent_step['tool_seconds']:.2f}s "
+        f"tokens={agent_step['total_tokens']} "
+        f"tool_calls={agent_step['tool_call_count']}"
+    )
+
+
+def find_agent_stop_reason(
+    *,
+    step: int,
+    max_steps: int,
+    total_tokens: int,
+    max_total_tokens: int,
+) -> str | None:
+    """
+    Find why the agent loop must stop before running another step.
+
+    Args:
+        step (int): The 1-based number of the step that just finished.
+        max_steps (int): The maximum number of steps.
+        total_tokens (int): The tokens used so far.
+        max_total_tokens (int): The token budget, or 0 for no limit.
+
+    Returns:
+        Optional[str]: The reason to stop, or None if another step may run.
+    """
+    if max_total_tokens > 0 and total_tokens >= max_total_tokens:
+        return (
+            f"Stopped after using {total_tokens} tokens "
+            f"(budget: {max_total_tokens}) without a final answer"
+        )
+    if step >= max_steps:
+        return f"Stopped at the step limit ({max_steps}) without a final answer"
+    return None
+
+
+class StreamStallDetector:
+    """Tracks a model response stream against its first-token, chunk-gap and total limits."""
+
+    def __init__(
+        self,
+        *,
+        start_time: float,
+        first_chunk_timeout: float,
+        chunk_gap_timeout: float,
+        total_timeout: float,
+    ):
+        """Initialize the detector for a stream that started at `start_time`."""
+        self.start_time = start_time
+        self.first_chunk_timeout = first_chunk_timeout
+        self.chunk_gap_timeout = chunk_gap_timeout
+        self.total_timeout = total_timeout
+        self.last_chunk_time: float | None = None
+
+    def record_chunk(self, now: float) -> None:
+        """Record that a chunk arrived."""
+        self.last_chunk_time = now
+
+    def next_deadline(self) -> float:
+        """Return the time at which the stream is considered stalled if no chunk arrives."""
+        if self.last_chunk_time is None:
+            chunk_deadline = self.start_time + self.first_chunk_timeout
+        else:
+            chunk_deadline = self.last_chunk_time + self.chunk_gap_timeout
+        return min(chunk_deadline, self.start_time + self.total_timeout)
+
+    def find_stall(self, now: float) -> str | None:
+        """
+        Find which limit the stream has exceeded.
+
+        Args:
+            now (float): The current time in seconds.
+
+        Returns:
+            Optional[str]: A description of the exceeded limit, or None if the stream is healthy.
+        """
+        if now - self.start_time >= self.total_timeout:
+            return f"The response did not complete within {self.total_timeout:g}s"
+        if self.last_chunk_time is None:
+            if now - self.start_time >= self.first_chunk_timeout:
+                return (
+                    f"The response did not start within {self.first_chunk_timeout:g}s"
+                )
+            return None
+        if now - self.last_chunk_time >= self.chunk_gap_timeout:
+            return f"The response stalled for {self.chunk_gap_timeout:g}s"
+        return None
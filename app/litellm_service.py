@@ -4,32 +4,48 @@ This module provides functions to interact with the LiteLLM API.
 
 import logging
 import os
+import queue
 import threading
 import time
+from collections.abc import Iterator
+from functools import cache
 from importlib import import_module
 from typing import cast
 
 import litellm
 from litellm.litellm_core_utils.streaming_handler import CustomStreamWrapper
-from litellm.types.utils import Choices, Message, ModelResponse
+from litellm.types.utils import Message, ModelResponse, ModelResponseStream, Usage
 from slack_sdk.web import SlackResponse, WebClient
 
 from app.env import (
     LITELLM_CALLBACK_MODULE_NAME,
     LITELLM_DROP_PARAMS,
+    LLM_CHUNK_GAP_TIMEOUT_SECONDS,
+    LLM_FIRST_TOKEN_TIMEOUT_SECONDS,
+    LLM_HISTORY_MAX_TOKENS,
+    LLM_MAX_STEPS,
     LLM_MAX_TOKENS,
+    LLM_MAX_TOTAL_TOKENS,
     LLM_MODEL,
     LLM_TEMPERATURE,
-    SLACK_FORMATTING_ENABLED,
-    SLACK_LOADING_CHARACTER,
+    SLACK_UPDATE_MAX_INTERVAL_SECONDS,
+    SLACK_UPDATE_MIN_INTERVAL_SECONDS,
     SLACK_UPDATE_TEXT_BUFFER_SIZE,
 )
-from app.litellm_logic import extract_delta_content, is_final_chunk
-from app.message_logic import (
-    build_assistant_message,
-    convert_markdown_to_mrkdwn,
-    format_assistant_reply_for_slack,
+from app.flush_logic import FlushScheduler
+from app.history_logic import calculate_history_token_budget
+from app.litellm_logic import (
+    StreamAccumulator,
+    StreamStallDetector,
+    build_agent_step,
+    extract_total_tokens,
+    find_agent_stop_reason,
+    format_agent_step,
 )
+from app.message_logic import build_assistant_message
+from app.reply_sink_logic import ReplySink
+from app.reply_sink_service import SlackReplySink
+from app.reply_split_logic import ReplySplitter
 from app.tools_service import get_all_tools, process_tool_calls
 
 litellm.drop_params = True
@@ -44,6 +60,7 @@ def reply_to_slack_with_litellm(
     client: WebClient,
     channel: str,
     user_id: str,
+    team_id: str | None,
     thread_ts: str | None,
     messages: list[dict],
     loading_text: str,
@@ -51,40 +68,124 @@ def reply_to_slack_with_litellm(
     timeout_seconds: int,
 ) -> None:
     """
-    Sends a reply to Slack using LiteLLM.
+    Sends a reply to Slack using LiteLLM, running tool calls until the model answers.
 
     Args:
         client (WebClient): The Slack WebClient instance.
         channel (str): The Slack channel ID.
         user_id (str): The user ID of the person who initiated the conversation.
+        team_id (Optional[str]): The team ID of the workspace the conversation belongs to.
         thread_ts (Optional[str]): The timestamp of the thread to reply to.
         messages (list[dict]): The list of messages to include in the reply.
         loading_text (str): The text to display while waiting for a response.
         wip_reply (Union[dict, SlackResponse]): The message object for the in-progress reply.
-        timeout_seconds (int): The timeout duration in seconds.
+        timeout_seconds (int): The timeout duration in seconds for the whole reply.
 
     Returns:
         None
     """
-    stream = start_litellm_stream(
-        temperature=LLM_TEMPERATURE,
-        messages=messages,
-        user=user_id,
-        channel=channel,
-    )
-    stream_litellm_reply_to_slack(
+    sink = SlackReplySink(
         client=client,
+        channel=channel,
+        thread_ts=thread_ts,
+        user_id=user_id,
+        team_id=team_id,
         wip_reply=wip_reply,
+        loading_text=loading_text,
+    )
+    reply_with_litellm(
+        sink=sink,
         channel=channel,
         user_id=user_id,
         messages=messages,
-        stream=stream,
-        thread_ts=thread_ts,
-        loading_text=loading_text,
         timeout_seconds=timeout_seconds,
     )
 
 
+def reply_with_litellm(
+    *,
+    sink: ReplySink,
+    channel: str,
+    user_id: str,
+    messages: list[dict],
+    timeout_seconds: int,
+) -> None:
+    """
+    Streams a LiteLLM reply to a reply sink, running tool calls until the model answers.
+
+    Each step streams one model response and runs the tool calls it requested. The loop stops
+    with an error when the step or token budget is exhausted before a final answer.
+
+    Args:
+        sink (ReplySink): The sink that receives the reply.
+        channel (str): The Slack channel ID.
+        user_id (str): The user ID of the person who initiated the conversation.
+        messages (list[dict]): The list of messages to include in the reply.
+        timeout_seconds (int): The timeout duration in seconds for the whole reply.
+
+    Returns:
+        None
+    """
+    start_time = time.time()
+    tools = get_all_tools(channel=channel, user_id=user_id)
+    total_tokens = 0
+    step = 0
+    while True:
+        step += 1
+        step_start = time.monotonic()
+        stream = start_litellm_stream(
+            temperature=LLM_TEMPERATURE,
+            messages=messages,
+            user=user_id,
+            tools=tools,
+        )
+        response_message, usage = stream_litellm_reply(
+            sink=sink,
+            messages=messages,
+            stream=stream,
+            timeout_seconds=timeout_seconds,
+            start_time=start_time,
+        )
+        llm_seconds = time.monotonic() - step_start
+        step_tokens = extract_total_tokens(usage)
+        total_tokens += step_tokens
+        tool_calls = response_message.tool_calls or []
+        stop_reason = find_agent_stop_reason(
+            step=step,
+            max_steps=LLM_MAX_STEPS,
+            total_tokens=total_tokens,
+            max_total_tokens=LLM_MAX_TOTAL_TOKENS,
+        )
+        tool_seconds = 0.0
+        if tool_calls and stop_reason is None:
+            sink.show_loading()
+            tool_start = time.monotonic()
+            process_tool_calls(
+                response_message=response_message,
+                assistant_message=messages[-1],
+                messages=messages,
+                user_id=user_id,
+            )
+            tool_seconds = time.monotonic() - tool_start
+        logging.info(
+            "Agent loop for %s: %s",
+            channel,
+            format_agent_step(
+                build_agent_step(
+                    step=step,
+                    llm_seconds=llm_seconds,
+                    tool_seconds=tool_seconds,
+                    total_tokens=step_tokens,
+                    tool_call_count=len(tool_calls),
+                )
+            ),
+        )
+        if not tool_calls:
+            return
+        if stop_reason is not None:
+            raise RuntimeError(stop_reason)
+
+
 def call_litellm_completion(
     *,
     messages: list[dict],
@@ -108,6 +209,41 @@ def call_litellm_completion(
     Returns:
         Union[ModelResponse, CustomStreamWrapper]: The response from the API.
     """
+    return litellm.completion(
+        **build_litellm_completion_kwargs(
+            messages=messages,
+            user=user,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=stream,
+            tools=tools,
+        )
+    )
+
+
+def build_litellm_completion_kwargs(
+    *,
+    messages: list[dict],
+    user: str,
+    max_tokens: int,
+    temperature: float,
+    stream: bool,
+    tools: list | None,
+) -> dict:
+    """
+    Builds the keyword arguments shared by the sync and async LiteLLM completion calls.
+
+    Args:
+        messages (list[dict]): The list of messages to send to the API.
+        user (str): The user ID of the person making the request.
+        max_tokens (int): The maximum number of tokens to generate.
+        temperature (float): The temperature for sampling.
+        stream (bool): Whether to stream the response.
+        tools (Optional[list]): The list of tools to use.
+
+    Returns:
+        dict: The keyword arguments for the completion call.
+    """
     kwargs = {
         "model": LLM_MODEL,
         "messages": messages,
@@ -122,16 +258,50 @@ def call_litellm_completion(
         "aws_region_name": os.environ.get("AWS_REGION_NAME"),
     }
 
+    if stream:
+        kwargs["stream_options"] = {"include_usage": True}
+
     if tools is not None:
         kwargs["tools"] = tools
 
-    additional_kwargs: dict[str, list[str]] = {}
     if LITELLM_DROP_PARAMS is not None:
-        additional_kwargs["additional_drop_params"] = [
+        kwargs["additional_drop_params"] = [
             param.strip() for param in LITELLM_DROP_PARAMS.split(",")
         ]
 
-    return litellm.completion(**kwargs, **additional_kwargs)
+    return kwargs
+
+
+def count_text_tokens(text: str) -> int:
+    """
+    Counts the tokens of a text with the tokenizer of the configured model.
+
+    Args:
+        text (str): The text to count.
+
+    Returns:
+        int: The number of tokens.
+    """
+    return litellm.token_counter(model=LLM_MODEL, text=text)
+
+
+@cache
+def get_history_token_budget() -> int:
+    """
+    Gets the token budget for the conversation history of the configured model.
+
+    Returns:
+        int: The token budget, or 0 for no limit.
+    """
+    try:
+        max_input_tokens = litellm.get_model_info(LLM_MODEL).get("max_input_tokens")
+    except Exception as e:
+        logging.debug("Failed to get the model info of %s: %s", LLM_MODEL, e)
+        max_input_tokens = None
+    return calculate_history_token_budget(
+        configured_tokens=LLM_HISTORY_MAX_TOKENS,
+        max_input_tokens=max_input_tokens,
+    )
 
 
 def start_litellm_stream(
@@ -139,7 +309,7 @@ def start_litellm_stream(
     temperature: float,
     messages: list[dict],
     user: str,
-    channel: str | None = None,
+    tools: list | None = None,
 ) -> CustomStreamWrapper:
     """
     Starts a LiteLLM stream for generating completions.
@@ -148,7 +318,7 @@ def start_litellm_stream(
         temperature (float): The temperature for sampling.
         messages (list[dict]): The list of messages to send to the API.
         user (str): The user ID of the person making the request.
-        channel (Optional[str]): Slack channel ID for context-aware tool selection.
+        tools (Optional[list]): The list of tools to use.
 
     Returns:
         CustomStreamWrapper: The stream wrapper for the response.
@@ -159,255 +329,198 @@ def start_litellm_stream(
         temperature=temperature,
         user=user,
         stream=True,
-        tools=get_all_tools(channel=channel, user_id=user),
+        tools=tools,
     )
     if not isinstance(response, CustomStreamWrapper):
         raise TypeError("Expected CustomStreamWrapper when streaming is enabled")
     return response
 
 
-def stream_litellm_reply_to_slack(
+def stream_litellm_reply(
     *,
-    client: WebClient,
-    wip_reply: dict | SlackResponse,
-    channel: str,
-    user_id: str,
+    sink: ReplySink,
     messages: list[dict],
     stream: CustomStreamWrapper,
-    thread_ts: str | None,
-    loading_text: str,
     timeout_seconds: int,
-):
+    start_time: float,
+) -> tuple[Message, Usage | None]:
     """
-    Streams the LiteLLM response and updates the Slack message.
+    Streams one LiteLLM response to a reply sink.
+
+    Responses exceeding the Slack message length limit continue in new messages, split at
+    paragraph, list or code fence boundaries.
 
     Args:
-        client (WebClient): The Slack WebClient instance.
-        wip_reply (Union[dict, SlackResponse]): The message object for the in-progress reply.
-        channel (str): The Slack channel ID.
-        user_id (str): The user ID of the person who initiated the conversation.
+        sink (ReplySink): The sink that receives the reply.
         messages (list[dict]): The list of messages to include in the reply.
         stream (CustomStreamWrapper): The stream wrapper for the response.
-        thread_ts (Optional[str]): The timestamp of the thread to reply to.
-        loading_text (str): The text to display while waiting for a response.
         timeout_seconds (int): The timeout duration in seconds.
+        start_time (float): The start time of the request.
 
     Returns:
-        None
+        tuple[Message, Optional[Usage]]: The response and its usage.
     """
-    start_time = time.time()
+    watchdog = StreamWatchdog(
+        stream=stream,
+        detector=StreamStallDetector(
+            start_time=time.monotonic(),
+            first_chunk_timeout=LLM_FIRST_TOKEN_TIMEOUT_SECONDS,
+            chunk_gap_timeout=LLM_CHUNK_GAP_TIMEOUT_SECONDS,
+            total_timeout=timeout_seconds - (time.time() - start_time),
+        ),
+    )
+    accumulator = StreamAccumulator()
+    splitter = ReplySplitter()
     while True:
         assistant_message = build_assistant_message()
-        response_message, is_response_too_long = handle_litellm_stream(
-            stream=stream,
+        is_split = handle_litellm_stream(
+            stream=watchdog,
+            accumulator=accumulator,
+            splitter=splitter,
             assistant_message=assistant_message,
-            wip_reply=wip_reply,
-            client=client,
-            channel=channel,
-            timeout_seconds=int(timeout_seconds - (time.time() - start_time)),
-            start_time=start_time,
+            sink=sink,
         )
         messages.append(assistant_message)
-        if not is_response_too_long:
-            break
-        wip_reply = client.chat_postMessage(
-            channel=channel,
-            thread_ts=thread_ts,
-            text=SLACK_LOADING_CHARACTER,
-        )
+        if not is_split:
+            return accumulator.build_message(), accumulator.usage
+        sink.start_next_message()
 
-    if response_message is None or response_message.tool_calls is None:
-        return
 
-    # If the message has already been updated, post a new one
-    if (wip_message := wip_reply["message"]) and wip_message["text"] != loading_text:
-        wip_reply = client.chat_postMessage(
-            channel=channel,
-            thread_ts=thread_ts,
-            text=loading_text,
-        )
-
-    process_tool_calls(
-        response_message=response_message,
-        assistant_message=assistant_message,
-        messages=messages,
-        user_id=user_id,
-    )
-    reply_to_slack_with_litellm(
-        client=client,
-        wip_reply=wip_reply,
-        channel=channel,
-        user_id=user_id,
-        messages=messages,
-        thread_ts=thread_ts,
-        loading_text=loading_text,
-        timeout_seconds=int(timeout_seconds - (time.time() - start_time)),
-    )
-
-
-def handle_litellm_stream(
-    *,
-    stream: CustomStreamWrapper,
-    assistant_message: dict,
-    wip_reply: dict | SlackResponse,
-    client: WebClient,
-    channel: str,
-    timeout_seconds: int,
-    start_time: float,
-) -> tuple[Message | None, bool]:
+class StreamWatchdog:
     """
-    Handles the streaming response from LiteLLM and updates the Slack message.
+    Reads a LiteLLM stream in a background thread and hands its chunks over until it stalls.
 
-    Args:
-        stream (CustomStreamWrapper): The stream wrapper for the response.
-        assistant_message (dict): The assistant message to update.
-        wip_reply (Union[dict, SlackResponse]): The message object for the in-progress reply.
-        client (WebClient): The Slack WebClient instance.
-        channel (str): The Slack channel ID.
-        timeout_seconds (int): The timeout duration in seconds.
-        start_time (float): The start time of the request.
-
-    Returns:
-        tuple[Optional[Message], bool]: The response and whether it exceeded the length limit.
+    Closing a stalled HTTP stream does not reliably interrupt a read in progress, so the reply
+    thread waits on a queue instead of the socket and gives up at the detector's deadline.
     """
-    response_chunks: list = []
-    is_response_too_long = False
-    threads: list[threading.Thread] = []
-    buffered_text = ""
-    try:
-        for chunk in stream:
-            if (time.time() - start_time) > timeout_seconds:
-                raise TimeoutError()
-            response_chunks.append(chunk)
-            delta_content = extract_delta_content(cast("ModelResponse", chunk))
-            if delta_content is None:
-                continue
-            buffered_text += delta_content
-            assistant_message["content"] += delta_content
-            final_chunk = is_final_chunk(cast("ModelResponse", chunk))
-            if len(buffered_text) >= SLACK_UPDATE_TEXT_BUFFER_SIZE:
-                spawn_update_reply_text(
-                    client=client,
-                    channel=channel,
-                    wip_reply=wip_reply,
-                    assistant_content=assistant_message["content"],
-                    threads=threads,
-                )
-                buffered_text = ""
-                if (
-                    not final_chunk
-                    and (wip_message := wip_reply["message"])
-                    and len(wip_message["text"].encode("utf-8")) > 3500
-                ):
-                    is_response_too_long = True
-                    break
-            if final_chunk:
-                break
-    finally:
-        for t in threads:
-            try:
-                t.join()
-            except Exception:
-                logging.debug("Failed to join thread")
 
-    # Final update to remove the loading character after stream ends
-    if len(assistant_message["content"]) > 0:
-        update_reply_text(
-            client=client,
-            channel=channel,
-            wip_reply=wip_reply,
-            assistant_content=assistant_message["content"],
-            with_loading_character=False,
+    def __init__(
+        self,
+        *,
+        stream: CustomStreamWrapper,
+        detector: StreamStallDetector,
+    ):
+        """Initialize the watchdog and start reading the stream in a background thread."""
+        self.stream = stream
+        self.detector = detector
+        self._items: queue.Queue[tuple[str, object]] = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run,
+            daemon=True,
+            name="stream-watchdog",
         )
+        self._thread.start()
 
-    return extract_message_from_chunks(response_chunks), is_response_too_long
-
-
-def spawn_update_reply_text(
-    *,
-    client: WebClient,
-    channel: str,
-    wip_reply: dict | SlackResponse,
-    assistant_content: str,
-    threads: list[threading.Thread],
-) -> None:
+    def __iter__(self) -> Iterator[ModelResponseStream]:
+        """Yield chunks as they arrive, raising TimeoutError once the stream stalls."""
+        while True:
+            timeout = self.detector.next_deadline() - time.monotonic()
+            try:
+                kind, item = self._items.get(timeout=max(timeout, 0))
+            except queue.Empty:
+                stall_reason = self.detector.find_stall(time.monotonic())
+                if stall_reason is None:
+                    continue
+                logging.warning("Closing a stalled LiteLLM stream: %s", stall_reason)
+                close_litellm_stream(self.stream)
+                raise TimeoutError(stall_reason) from None
+            if kind == "end":
+                return
+            if kind == "error":
+                raise cast("Exception", item)
+            self.detector.record_chunk(time.monotonic())
+            yield cast("ModelResponseStream", item)
+
+    def _run(self) -> None:
+        """Read the stream until it ends or fails."""
+        try:
+            for chunk in self.stream:
+                self._items.put(("chunk", chunk))
+        except Exception as e:
+            self._items.put(("error", e))
+        else:
+            self._items.put(("end", None))
+
+
+def close_litellm_stream(stream: CustomStreamWrapper) -> None:
     """
-    Spawns a thread to update the Slack message with the assistant's reply.
+    Closes the HTTP response underlying a LiteLLM stream.
 
     Args:
-        client (WebClient): The Slack WebClient instance.
-        channel (str): The Slack channel ID.
-        wip_reply (Union[dict, SlackResponse]): The message object for the in-progress reply.
-        assistant_content (str): The content of the assistant's reply.
-        threads (list[threading.Thread]): The list of threads to manage.
+        stream (CustomStreamWrapper): The stream wrapper for the response.
 
     Returns:
         None
     """
-    thread = threading.Thread(
-        target=update_reply_text,
-        kwargs={
-            "client": client,
-            "channel": channel,
-            "wip_reply": wip_reply,
-            "assistant_content": assistant_content,
-        },
-    )
-    thread.daemon = True
-    thread.start()
-    threads.append(thread)
+    completion_stream = stream.completion_stream
+    for target in (
+        completion_stream,
+        getattr(completion_stream, "response", None),
+        getattr(completion_stream, "streaming_response", None),
+    ):
+        close = getattr(target, "close", None)
+        if close is None:
+            continue
+        try:
+            close()
+            return
+        except Exception as e:
+            logging.debug("Failed to close the LiteLLM stream: %s", e)
 
 
-def update_reply_text(
+def handle_litellm_stream(
     *,
-    client: WebClient,
-    channel: str,
-    wip_reply: dict | SlackResponse,
-    assistant_content: str,
-    with_loading_character: bool = True,
-) -> None:
+    stream: StreamWatchdog,
+    accumulator: StreamAccumulator,
+    splitter: ReplySplitter,
+    assistant_message: dict,
+    sink: ReplySink,
+) -> bool:
     """
-    Updates the Slack message with the assistant's reply.
+    Handles the streaming response from LiteLLM and sends it to the reply sink.
+
+    Streaming stops as soon as the message exceeds the length limit, so that the rest
+    of the response continues in a new message. Otherwise the stream is read until it ends or
+    the usage arrives after the finish reason.
 
     Args:
-        client (WebClient): The Slack WebClient instance.
-        channel (str): The Slack channel ID.
-        wip_reply (Union[dict, SlackResponse]): The message object for the in-progress reply.
-        assistant_content (str): The content of the assistant's reply.
-        with_loading_character (bool): Whether to append a loading character.
+        stream (StreamWatchdog): The watched stream of the response.
+        accumulator (StreamAccumulator): The accumulator for the whole response.
+        splitter (ReplySplitter): The splitter holding the text of the current message.
+        assistant_message (dict): The assistant message to update.
+        sink (ReplySink): The sink that receives the reply.
 
     Returns:
-        None
-    """
-    wip_message = wip_reply["message"]
-    if not wip_message:
-        return
-    assistant_reply_text = format_assistant_reply_for_slack(assistant_content)
-    if SLACK_FORMATTING_ENABLED:
-        assistant_reply_text = convert_markdown_to_mrkdwn(assistant_reply_text)
-    wip_message["text"] = assistant_reply_text
-    text = assistant_reply_text
-    if with_loading_character:
-        text += SLACK_LOADING_CHARACTER
-    client.chat_update(channel=channel, ts=wip_message["ts"], text=text)
-
-
-def extract_message_from_chunks(chunks: list) -> Message | None:
+        bool: True if the message was split and the response continues, False otherwise.
     """
-    Extracts the message from the chunks of the model response.
+    is_split = False
+    flush_scheduler = FlushScheduler(
+        start_time=time.monotonic(),
+        buffer_size=SLACK_UPDATE_TEXT_BUFFER_SIZE,
+        min_interval=SLACK_UPDATE_MIN_INTERVAL_SECONDS,
+        max_interval=SLACK_UPDATE_MAX_INTERVAL_SECONDS,
+    )
+    try:
+        for chunk in stream:
+            delta_content = accumulator.add_chunk(cast("ModelResponse", chunk))
+            if delta_content is not None:
+                sink.add_delta(delta_content)
+                splitter.add_text(delta_content)
+                if splitter.is_over_limit():
+                    is_split = True
+                    break
+                flush_scheduler.add_text(delta_content)
+                now = time.monotonic()
+                if flush_scheduler.should_flush(now) and sink.try_acquire_update():
+                    sink.submit(splitter.text)
+                    flush_scheduler.mark_flushed(now)
+            if accumulator.is_complete:
+                break
+    finally:
+        sink.close_message()
 
-    Args:
-        chunks (list): The list of chunks from the model response.
+    assistant_message["content"] = splitter.split() if is_split else splitter.text
+    # Final update to remove the loading character after stream ends
+    sink.finish(assistant_message["content"])
 
-    Returns:
-        Optional[Message]: The extracted message, or None if not found.
-    """
-    response = litellm.stream_chunk_builder(chunks)
-    if response is None:
-        raise RuntimeError(
-            "litellm.stream_chunk_builder returned None. "
-            "Check the stream data or API behavior."
-        )
-    if isinstance(response.choices[0], Choices):
-        return response.choices[0].message
-    return None
+    return is_split
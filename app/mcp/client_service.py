@@ -0,0 +1,56 @@
+"""
+Service functions for calling MCP tools natively on the asyncio event loop.
+"""
+
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+
+class MCPSessionInitializationError(Exception):
+    """Raised when an MCP session could not be established."""
+
+
+async def async_call_mcp_tool(
+    *,
+    server_url: str,
+    tool_name: str,
+    arguments: dict,
+    headers: dict[str, str] | None = None,
+) -> str:
+    """
+    Calls an MCP tool over streamable HTTP and returns its first text content.
+
+    Args:
+        server_url (str): The URL of the MCP server.
+        tool_name (str): The name of the tool to call.
+        arguments (dict): The arguments to pass to the tool.
+        headers (Optional[dict[str, str]]): Additional HTTP headers such as authorization.
+
+    Returns:
+        str: The text of the first content item, or an empty string if there is none.
+
+    Raises:
+        MCPSessionInitializationError: If the session could not be initialized.
+    """
+    initialized = False
+    try:
+        async with (
+            streamablehttp_client(server_url, headers=headers) as (
+                read_stream,
+                write_stream,
+                _,
+            ),
+            ClientSession(read_stream, write_stream) as session,
+        ):
+            await session.initialize()
+            initialized = True
+            result = await session.call_tool(tool_name, arguments)
+    except Exception as err:
+        if initialized:
+            raise
+        raise MCPSessionInitializationError(
+            f"Failed to initialize the MCP session with {server_url}"
+        ) from err
+    if not result.content:
+        return ""
+    return getattr(result.content[0], "text", "")
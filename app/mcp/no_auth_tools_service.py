@@ -11,6 +11,7 @@ from mcp.client.streamable_http import streamablehttp_client
 from strands.tools.mcp.mcp_client import MCPClient
 
 from app.env import LLM_MODEL
+from app.mcp.client_service import async_call_mcp_tool
 from app.mcp.config_service import get_no_auth_servers
 from app.mcp.tools_logic import transform_mcp_spec_to_classic_tool
 
@@ -105,3 +106,27 @@ def process_no_auth_mcp_tool_call(
         )
     content = result["content"][0]
     return content.get("text", "")
+
+
+async def async_process_no_auth_mcp_tool_call(
+    *,
+    server_url: str,
+    tool_name: str,
+    arguments: dict,
+) -> str:
+    """
+    Processes a no-auth MCP tool call natively on the event loop.
+
+    Args:
+        server_url (str): The URL of the MCP server.
+        tool_name (str): The name of the tool to call.
+        arguments (dict): The arguments to pass to the function.
+
+    Returns:
+        str: The response from the tool call.
+    """
+    return await async_call_mcp_tool(
+        server_url=server_url,
+        tool_name=tool_name,
+        arguments=arguments,
+    )
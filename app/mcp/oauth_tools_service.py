@@ -9,6 +9,7 @@ from strands.tools.mcp.mcp_client import MCPClient
 from strands.types.exceptions import MCPClientInitializationError
 
 from app.env import LLM_MODEL
+from app.mcp.client_service import MCPSessionInitializationError, async_call_mcp_tool
 from app.mcp.config_service import get_oauth_server, get_oauth_server_index
 from app.mcp.oauth_tools_logic import create_bearer_auth_headers, is_session_not_expired
 from app.mcp.tools_logic import transform_mcp_spec_to_classic_tool
@@ -271,3 +272,45 @@ def process_oauth_mcp_tool_call(
             f"Authentication error for {server_config['name']}. "
             "Please visit the Home tab to re-authorize."
         ) from err
+
+
+async def async_process_oauth_mcp_tool_call(
+    *,
+    tool_name: str,
+    arguments: dict,
+    user_id: str,
+    server_index: int,
+) -> str:
+    """
+    Processes an OAuth MCP tool call natively on the event loop.
+
+    Args:
+        tool_name (str): The name of the tool to call.
+        arguments (dict): The arguments to pass to the function.
+        user_id (str): The user ID for authentication.
+        server_index (int): The OAuth server index.
+
+    Returns:
+        str: The response from the tool call.
+    """
+    server_config = get_oauth_server(server_index)
+    session = get_user_oauth_session_for_server(user_id, server_config["name"])
+
+    additional_headers = server_config.get("additional_headers", {})
+    headers = create_bearer_auth_headers(session["token"], additional_headers)
+
+    try:
+        return await async_call_mcp_tool(
+            server_url=server_config["url"],
+            tool_name=tool_name,
+            arguments=arguments,
+            headers=headers,
+        )
+    except MCPSessionInitializationError as err:
+        # MCP session failed to initialize, likely due to authentication error
+        # Clear the invalid session and cached tools
+        clear_user_oauth_session(user_id, server_config["name"])
+        raise RuntimeError(
+            f"Authentication error for {server_config['name']}. "
+            "Please visit the Home tab to re-authorize."
+        ) from err
@@ -4,7 +4,14 @@ This module contains functions to handle message logic.
 
 import base64
 import re
-import unicodedata
+
+from app.slack_format_logic import (
+    has_stray_backtick,
+    markdown_to_mrkdwn,
+    mrkdwn_to_markdown,
+    strip_code_block_tags,
+    strip_reply_start,
+)
 
 
 def is_last_marker_reply(
@@ -140,6 +147,20 @@ def build_tool_message(*, tool_call_id: str, name: str, content: str) -> dict:
     }
 
 
+def build_data_url(mime_type: str, data: bytes) -> str:
+    """
+    Encode file content as a base64 data URL.
+
+    Args:
+        - mime_type (str): The MIME type of the content.
+        - data (bytes): The content in bytes.
+
+    Returns:
+        - str: The data URL.
+    """
+    return f"data:{mime_type};base64,{base64.b64encode(data).decode('utf-8')}"
+
+
 def build_image_url_item(mime_type: str, image_bytes: bytes) -> dict:
     """
     Build an image URL item for the bot.
@@ -151,11 +172,20 @@ def build_image_url_item(mime_type: str, image_bytes: bytes) -> dict:
     Returns:
         - dict: The image URL content as a dictionary with "type" and "image_url".
     """
-    encoded_image = base64.b64encode(image_bytes).decode("utf-8")
-    return {
-        "type": "image_url",
-        "image_url": {"url": f"data:{mime_type};base64,{encoded_image}"},
-    }
+    return build_image_url_item_from_data_url(build_data_url(mime_type, image_bytes))
+
+
+def build_image_url_item_from_data_url(data_url: str) -> dict:
+    """
+    Build an image URL item for the bot from an already encoded image.
+
+    Args:
+        - data_url (str): The image as a base64 data URL.
+
+    Returns:
+        - dict: The image URL content as a dictionary with "type" and "image_url".
+    """
+    return {"type": "image_url", "image_url": {"url": data_url}}
 
 
 def build_pdf_file_item(filename: str | None, pdf_bytes: bytes) -> dict:
@@ -169,13 +199,25 @@ def build_pdf_file_item(filename: str | None, pdf_bytes: bytes) -> dict:
     Returns:
         - dict: The PDF file content as a dictionary with "type" and "file".
     """
-    encoded_pdf = base64.b64encode(pdf_bytes).decode("utf-8")
+    return build_pdf_file_item_from_data_url(
+        filename, build_data_url("application/pdf", pdf_bytes)
+    )
+
+
+def build_pdf_file_item_from_data_url(filename: str | None, data_url: str) -> dict:
+    """
+    Build a PDF file item for the bot from an already encoded PDF.
+
+    Args:
+        - filename (Optional[str]): The name of the PDF file.
+        - data_url (str): The PDF as a base64 data URL.
+
+    Returns:
+        - dict: The PDF file content as a dictionary with "type" and "file".
+    """
     return {
         "type": "file",
-        "file": {
-            "filename": filename or "unnamed.pdf",
-            "file_data": f"data:application/pdf;base64,{encoded_pdf}",
-        },
+        "file": {"filename": filename or "unnamed.pdf", "file_data": data_url},
     }
 
 
@@ -193,31 +235,6 @@ def remove_bot_mention(text: str, bot_user_id: str | None) -> str:
     return re.sub(rf"<@{bot_user_id}>\s*", "", text) if bot_user_id else text
 
 
-def maybe_redact_string(
-    *,
-    input_string: str,
-    patterns: list[tuple[str, str]],
-    redaction_enabled: bool,
-) -> str:
-    """
-    Optionally redact sensitive information from a string (inspired by @quangnhut123)
-
-    Args:
-        - input_string (str): The string to potentially redact
-        - patterns (list[tuple]): A list of (regex pattern, replacement string)
-        - redaction_enabled (bool): Whether redaction should be applied
-
-    Returns:
-        - str: The redacted string (or original if disabled)
-    """
-    if not redaction_enabled:
-        return input_string
-    output_string = input_string
-    for pattern, replacement in patterns:
-        output_string = re.sub(pattern, replacement, output_string)
-    return output_string
-
-
 def unescape_slack_formatting(content: str) -> str:
     """
     Unescape Slack formatting characters.
@@ -249,22 +266,7 @@ def maybe_slack_to_markdown(content: str, slack_formatting_enabled: bool) -> str
     """
     if not slack_formatting_enabled:
         return content
-
-    # Split the input string into parts based on code blocks and inline code
-    parts = re.split(r"(?s)(```.+?```|`[^`\n]+?`)", content)
-
-    # Apply the bold, italic, and strikethrough formatting to text not within code
-    result = ""
-    for part in parts:
-        if not part.startswith("```") and not part.startswith("`"):
-            for o, n in [
-                (r"\*(?!\s)([^\*\n]+?)(?<!\s)\*", r"**\1**"),  # *bold* to **bold**
-                (r"_(?!\s)([^_\n]+?)(?<!\s)_", r"*\1*"),  # _italic_ to *italic*
-                (r"~(?!\s)([^~\n]+?)(?<!\s)~", r"~~\1~~"),  # ~strike~ to ~~strike~~
-            ]:
-                part = re.sub(o, n, part)
-        result += part
-    return result
+    return mrkdwn_to_markdown(content)
 
 
 def build_slack_user_prefixed_text(reply: dict, text: str) -> str:
@@ -316,51 +318,23 @@ def maybe_set_cache_points(
             break
 
 
-def format_assistant_reply_for_slack(content: str) -> str:
+def format_assistant_reply_for_slack(
+    content: str, is_continuation: bool = False
+) -> str:
     """
     Format the assistant reply for Slack display.
 
     Args:
         content (str): The input string containing the assistant reply.
+        is_continuation (bool): Whether the content continues an already formatted reply,
+            in which case rules for the start of the reply are skipped.
 
     Returns:
         str: The formatted string for Slack display.
     """
-    for o, n in [
-        # Remove leading newlines
-        ("^\n+", ""),
-        # Remove prepended Slack user ID
-        ("^<@U.*?>\\s?:\\s?", ""),
-        # Remove code block tags since Slack doesn't render them in a message
-        ("```\\s*[Rr]ust\n", "```\n"),
-        ("```\\s*[Rr]uby\n", "```\n"),
-        ("```\\s*[Ss]cala\n", "```\n"),
-        ("```\\s*[Kk]otlin\n", "```\n"),
-        ("```\\s*[Jj]ava\n", "```\n"),
-        ("```\\s*[Gg]o\n", "```\n"),
-        ("```\\s*[Ss]wift\n", "```\n"),
-        ("```\\s*[Oo]objective[Cc]\n", "```\n"),
-        ("```\\s*[Cc]\n", "```\n"),
-        ("```\\s*[Cc][+][+]\n", "```\n"),
-        ("```\\s*[Cc][Pp][Pp]\n", "```\n"),
-        ("```\\s*[Cc]sharp\n", "```\n"),
-        ("```\\s*[Mm][Aa][Tt][Ll][Aa][Bb]\n", "```\n"),
-        ("```\\s*[Jj][Ss][Oo][Nn]\n", "```\n"),
-        ("```\\s*[Ll]a[Tt]e[Xx]\n", "```\n"),
-        ("```\\s*[Ll][Uu][Aa]\n", "```\n"),
-        ("```\\s*[Cc][Mm][Aa][Kk][Ee]\n", "```\n"),
-        ("```\\s*bash\n", "```\n"),
-        ("```\\s*zsh\n", "```\n"),
-        ("```\\s*sh\n", "```\n"),
-        ("```\\s*[Ss][Qq][Ll]\n", "```\n"),
-        ("```\\s*[Pp][Hh][Pp]\n", "```\n"),
-        ("```\\s*[Pp][Ee][Rr][Ll]\n", "```\n"),
-        ("```\\s*[Jj]ava[Ss]cript\n", "```\n"),
-        ("```\\s*[Ty]ype[Ss]cript\n", "```\n"),
-        ("```\\s*[Pp]ython\n", "```\n"),
-    ]:
-        content = re.sub(o, n, content)
-    return content
+    if not is_continuation:
+        content = strip_reply_start(content)
+    return strip_code_block_tags(content)
 
 
 def convert_markdown_to_mrkdwn(content: str) -> str:
@@ -375,89 +349,136 @@ def convert_markdown_to_mrkdwn(content: str) -> str:
     Returns:
         str: The converted string in Slack mrkdwn format.
     """
-    # Split the input string into parts based on code blocks and inline code
-    parts = re.split(r"(?s)(```.+?```|`[^`\n]+?`)", content)
-
-    # Apply the bold, italic, and strikethrough formatting to text not within code
-    result = ""
-    for idx, part in enumerate(parts):
-        if part.startswith("```") or part.startswith("`"):
-            # Insert ASCII spaces around code spans/blocks when adjacent to
-            # East Asian wide/fullwidth characters to improve readability.
-            left_space = False
-            right_space = False
-            if result:
-                prev = result[-1]
-                if (not prev.isspace()) and unicodedata.east_asian_width(prev) in (
-                    "W",
-                    "F",
-                ):
-                    left_space = True
-            if idx + 1 < len(parts):
-                nxt_part = parts[idx + 1]
-                if nxt_part:
-                    nxt = nxt_part[0]
-                    if (not nxt.isspace()) and unicodedata.east_asian_width(nxt) in (
-                        "W",
-                        "F",
-                    ):
-                        right_space = True
-            if left_space:
-                result += " "
-            result += part
-            if right_space:
-                result += " "
-        else:
-            for o, n in [
-                (
-                    r"\*\*\*(?!\s)([^\*\n]+?)(?<!\s)\*\*\*",
-                    r"_*\1*_",
-                ),  # ***bold italic*** to *_bold italic_*
-                (
-                    r"(?<![\*_])\*(?!\s)([^\*\n]+?)(?<!\s)\*(?![\*_])",
-                    r"_\1_",
-                ),  # *italic* to _italic_
-                (r"\*\*(?!\s)([^\*\n]+?)(?<!\s)\*\*", r"*\1*"),  # **bold** to *bold*
-                (r"__(?!\s)([^_\n]+?)(?<!\s)__", r"*\1*"),  # __bold__ to *bold*
-                (r"~~(?!\s)([^~\n]+?)(?<!\s)~~", r"~\1~"),  # ~~strike~~ to ~strike~
-            ]:
-                part = re.sub(o, n, part)
-            # Insert ASCII spaces around Slack formatting when adjacent to
-            # East Asian wide/fullwidth characters (e.g., CJK, Hiragana,
-            # Katakana, Hangul, Bopomofo, and fullwidth punctuation).
-            # This improves mrkdwn rendering when tokens touch wide chars.
-
-            def _is_eaw_wide(ch: str) -> bool:
-                # East Asian Width: W (wide) and F (fullwidth)
-                return unicodedata.east_asian_width(ch) in ("W", "F")
-
-            def _add_space_around_matches(text: str, pattern: re.Pattern) -> str:
-                out = []
-                last = 0
-                for m in pattern.finditer(text):
-                    start, end = m.start(), m.end()
-                    out.append(text[last:start])
-                    if start > 0:
-                        prev = text[start - 1]
-                        if not prev.isspace() and _is_eaw_wide(prev):
-                            out.append(" ")
-                    out.append(m.group(0))
-                    if end < len(text):
-                        nxt = text[end]
-                        if not nxt.isspace() and _is_eaw_wide(nxt):
-                            out.append(" ")
-                    last = end
-                out.append(text[last:])
-                return "".join(out)
-
-            patterns = [
-                re.compile(r"_\*(?!\s)(.+?)(?<!\s)\*_"),  # *_bold italic_*
-                re.compile(r"\*(?!\s)([^\*\n]+?)(?<!\s)\*"),  # *bold*
-                re.compile(r"_(?!\s)([^_\n]+?)(?<!\s)_"),  # _italic_
-                re.compile(r"~(?!\s)([^~\n]+?)(?<!\s)~"),  # ~strike~
-            ]
-
-            for ptn in patterns:
-                part = _add_space_around_matches(part, ptn)
-            result += part
-    return result
+    return markdown_to_mrkdwn(content)
+
+
+def render_assistant_reply_for_slack(
+    *,
+    content: str,
+    slack_formatting_enabled: bool,
+    cache: dict[str, str] | None = None,
+) -> str:
+    """
+    Render the assistant reply for Slack, reusing the cached output of its stable prefix.
+
+    While a reply is streamed, only its open tail changes. The prefix up to the last paragraph
+    break that closes every code span is rendered once and cached, so each call only renders
+    the remaining tail. The result is identical to formatting the whole content with
+    `format_assistant_reply_for_slack` and `convert_markdown_to_mrkdwn`.
+
+    Args:
+        content (str): The accumulated assistant reply.
+        slack_formatting_enabled (bool): Whether to convert Markdown to Slack mrkdwn.
+        cache (Optional[dict[str, str]]): The render cache for this reply, updated in place.
+
+    Returns:
+        str: The formatted string for Slack display.
+    """
+    if cache is None:
+        cache = {}
+    if not content.startswith(cache.get("source", "")):
+        cache.clear()
+    source = cache.get("source", "")
+    rendered = cache.get("rendered", "")
+    tail = content[len(source) :]
+
+    cut = find_stable_prefix_end(tail)
+    if cut > 0:
+        stable_text = render_stable_prefix(
+            content=tail[:cut],
+            slack_formatting_enabled=slack_formatting_enabled,
+            is_continuation=bool(source),
+        )
+        if stable_text is not None:
+            source += tail[:cut]
+            rendered += stable_text
+            tail = tail[cut:]
+            cache["source"] = source
+            cache["rendered"] = rendered
+
+    tail_text = format_assistant_reply_for_slack(tail, is_continuation=bool(source))
+    if slack_formatting_enabled:
+        tail_text = convert_continued_markdown_to_mrkdwn(
+            tail_text, is_continuation=bool(source)
+        )
+    return rendered + tail_text
+
+
+def convert_continued_markdown_to_mrkdwn(content: str, is_continuation: bool) -> str:
+    """
+    Convert Markdown to Slack mrkdwn, optionally as the continuation of a rendered prefix.
+
+    A rendered prefix always ends with a newline outside code, so a newline is prepended to
+    make the first part of the continuation be handled exactly as in the whole content.
+
+    Args:
+        content (str): The input string in Markdown format.
+        is_continuation (bool): Whether the content follows an already rendered prefix.
+
+    Returns:
+        str: The converted string in Slack mrkdwn format.
+    """
+    if not is_continuation:
+        return convert_markdown_to_mrkdwn(content)
+    return convert_markdown_to_mrkdwn("\n" + content)[1:]
+
+
+def find_stable_prefix_end(content: str) -> int:
+    """
+    Find the end of the last paragraph in the content that closes every code block.
+
+    Args:
+        content (str): The content to search.
+
+    Returns:
+        int: The index right after the paragraph break, or 0 if there is none.
+    """
+    stable_end = 0
+    fence_count = 0
+    counted_end = 0
+    index = content.find("\n\n")
+    while index >= 0:
+        cut = index + 2
+        fence_count += content.count("```", counted_end, cut)
+        counted_end = cut
+        if cut < len(content) and not content[cut].isspace() and fence_count % 2 == 0:
+            stable_end = cut
+        index = content.find("\n\n", index + 1)
+    return stable_end
+
+
+def render_stable_prefix(
+    *,
+    content: str,
+    slack_formatting_enabled: bool,
+    is_continuation: bool,
+) -> str | None:
+    """
+    Render a reply prefix if rendering it separately cannot change the rest of the reply.
+
+    The prefix must contain more than leading newlines, end with a newline that is not part of
+    an opening code fence, and have no backtick outside complete code spans.
+
+    Args:
+        content (str): The prefix ending with a paragraph break.
+        slack_formatting_enabled (bool): Whether to convert Markdown to Slack mrkdwn.
+        is_continuation (bool): Whether the prefix continues an already rendered reply.
+
+    Returns:
+        Optional[str]: The rendered prefix, or None if it is not stable yet.
+    """
+    if not is_continuation and not content.lstrip("\n"):
+        return None
+    formatted = format_assistant_reply_for_slack(
+        content, is_continuation=is_continuation
+    )
+    if not formatted.endswith("\n") or formatted.rstrip().endswith("```"):
+        return None
+    if not slack_formatting_enabled:
+        return formatted
+    if is_continuation:
+        formatted = "\n" + formatted
+    if has_stray_backtick(formatted):
+        return None
+    converted = convert_markdown_to_mrkdwn(formatted)
+    return converted[1:] if is_continuation else converted
@@ -0,0 +1,152 @@
+"""
+This module contains logic for coalescing bursts of posts, so that several short posts sent in a
+row get a single reply, posted in a single loading message.
+"""
+
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.bolt_logic import is_post_in_dm
+from app.post_queue_logic import build_post_queue_key
+
+# How long a finished burst is remembered, so that posts still waiting in the queue can tell
+# whether a newer post superseded them
+BURST_RETENTION_SECONDS = 600.0
+
+
+@dataclass
+class PostBurst:
+    """Posts in one conversation, each sent within the burst window of the previous one."""
+
+    latest_ts: str
+    last_posted_at: float
+    loading_reply: Any = None
+    earlier_tss: list[str] = field(default_factory=list)
+
+
+def find_burst_key(channel_id: str | None, payload: dict) -> tuple | None:
+    """
+    Find the key of the burst a post may belong to.
+
+    Args:
+        channel_id (Optional[str]): The ID of the channel containing the post.
+        payload (dict): The payload of the message event.
+
+    Returns:
+        Optional[tuple]: The key of the post's conversation for replies in threads and posts in
+            DMs, or None for top-level posts in channels, which each start their own thread.
+    """
+    if payload.get("thread_ts") is None and not is_post_in_dm(payload):
+        return None
+    return build_post_queue_key(channel_id, payload)
+
+
+class BurstCoalescer:
+    """
+    Tracks the latest post of each burst, so that only it is replied to once the burst ends.
+    """
+
+    def __init__(
+        self,
+        *,
+        window_seconds: float,
+        max_bursts: int,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize a coalescer that ends a burst after `window_seconds` without posts."""
+        self.window_seconds = window_seconds
+        self.max_bursts = max_bursts
+        self.clock = clock
+        self._bursts: OrderedDict[Hashable, PostBurst] = OrderedDict()
+
+    def __len__(self) -> int:
+        """Return the number of remembered bursts."""
+        return len(self._bursts)
+
+    def add(self, key: Hashable, ts: str) -> None:
+        """
+        Record a post, extending the burst of its conversation or starting a new one.
+
+        Args:
+            key (Hashable): The key of the burst.
+            ts (str): The timestamp of the post.
+
+        Returns:
+            None
+        """
+        now = self.clock()
+        forget_before = now - self.window_seconds - BURST_RETENTION_SECONDS
+        # Bursts are ordered by their last post, so the oldest come first
+        while self._bursts:
+            oldest_key, oldest = next(iter(self._bursts.items()))
+            if oldest.last_posted_at > forget_before:
+                break
+            del self._bursts[oldest_key]
+        burst = self._bursts.get(key)
+        if burst is None or burst.last_posted_at + self.window_seconds <= now:
+            self._bursts[key] = PostBurst(latest_ts=ts, last_posted_at=now)
+        else:
+            burst.earlier_tss.append(burst.latest_ts)
+            burst.latest_ts = ts
+            burst.last_posted_at = now
+        self._bursts.move_to_end(key)
+        while len(self._bursts) > self.max_bursts:
+            self._bursts.popitem(last=False)
+
+    def discard(self, key: Hashable, ts: str) -> None:
+        """
+        Forget a post that was dropped before it was handled, so the post before it in the
+        burst is replied to instead.
+
+        Args:
+            key (Hashable): The key of the burst.
+            ts (str): The timestamp of the dropped post.
+
+        Returns:
+            None
+        """
+        burst = self._bursts.get(key)
+        if burst is None:
+            return
+        if burst.latest_ts != ts:
+            if ts in burst.earlier_tss:
+                burst.earlier_tss.remove(ts)
+        elif burst.earlier_tss:
+            burst.latest_ts = burst.earlier_tss.pop()
+        else:
+            del self._bursts[key]
+
+    def seconds_until_quiet(self, key: Hashable) -> float:
+        """Return how long until the burst ends if no more posts arrive, or 0 if it has ended."""
+        burst = self._bursts.get(key)
+        if burst is None:
+            return 0.0
+        return max(0.0, burst.last_posted_at + self.window_seconds - self.clock())
+
+    def is_latest(self, key: Hashable, ts: str) -> bool:
+        """
+        Check if a post is the latest one of its burst.
+
+        Args:
+            key (Hashable): The key of the burst.
+            ts (str): The timestamp of the post.
+
+        Returns:
+            bool: True if the post is the latest or its burst is forgotten, False if a newer
+                post will be replied to instead.
+        """
+        burst = self._bursts.get(key)
+        return burst is None or burst.latest_ts == ts
+
+    def get_loading_reply(self, key: Hashable) -> Any:
+        """Return the loading reply posted for the burst, or None if there is none yet."""
+        burst = self._bursts.get(key)
+        return burst.loading_reply if burst is not None else None
+
+    def set_loading_reply(self, key: Hashable, loading_reply: Any) -> None:
+        """Remember the loading reply posted for the burst, so later posts update it."""
+        if (burst := self._bursts.get(key)) is not None:
+            burst.loading_reply = loading_reply
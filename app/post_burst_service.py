@@ -0,0 +1,142 @@
+"""
+Service functions for coalescing bursts of posts shared by all incoming posts.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Any
+
+from app.bolt_logic import is_post_from_bot, is_post_in_dm, is_post_mentioned
+from app.engaged_thread_service import get_indexed_parent_post_mentioned
+from app.env import POST_BURST_WINDOW_SECONDS
+from app.post_burst_logic import BurstCoalescer, find_burst_key
+
+MAX_POST_BURSTS = 10000
+
+burst_coalescer = BurstCoalescer(
+    window_seconds=POST_BURST_WINDOW_SECONDS, max_bursts=MAX_POST_BURSTS
+)
+_burst_coalescer_lock = threading.Lock()
+
+
+def record_post_burst(
+    channel_id: str | None, payload: dict, bot_user_id: str | None
+) -> tuple | None:
+    """
+    Record a new post in the burst of its conversation, if the post may join a burst.
+
+    Only posts known to be replied to without looking up their parent post join a burst, so a
+    post that turns out to be ignored never supersedes one that is replied to.
+
+    Args:
+        channel_id (Optional[str]): The ID of the channel containing the post.
+        payload (dict): The payload of the message event.
+        bot_user_id (Optional[str]): The bot's user ID.
+
+    Returns:
+        Optional[tuple]: The key of the burst, or None if coalescing is disabled or the post
+            is handled on its own.
+    """
+    if POST_BURST_WINDOW_SECONDS <= 0 or channel_id is None or "ts" not in payload:
+        return None
+    key = find_burst_key(channel_id, payload)
+    if key is None or is_post_from_bot(payload):
+        return None
+    if not (
+        is_post_in_dm(payload)
+        or is_post_mentioned(bot_user_id, payload)
+        or get_indexed_parent_post_mentioned(channel_id, payload["thread_ts"])
+    ):
+        return None
+    with _burst_coalescer_lock:
+        burst_coalescer.add(key, payload["ts"])
+    return key
+
+
+def discard_post_burst(key: tuple, ts: str) -> None:
+    """
+    Forget a post recorded in a burst that was then dropped, so the burst is still replied to.
+
+    Args:
+        key (tuple): The key of the burst.
+        ts (str): The timestamp of the dropped post.
+
+    Returns:
+        None
+    """
+    with _burst_coalescer_lock:
+        burst_coalescer.discard(key, ts)
+
+
+def wait_for_post_burst(key: tuple | None, ts: str) -> bool:
+    """
+    Wait until no new post has arrived in the burst for the burst window.
+
+    Args:
+        key (Optional[tuple]): The key of the burst, or None if the post is not part of one.
+        ts (str): The timestamp of the post being handled.
+
+    Returns:
+        bool: True if the post is the latest of the burst and should be replied to, False if a
+            newer post will be replied to instead.
+    """
+    if key is None:
+        return True
+    while True:
+        with _burst_coalescer_lock:
+            delay = burst_coalescer.seconds_until_quiet(key)
+            if delay <= 0:
+                return burst_coalescer.is_latest(key, ts)
+        time.sleep(delay)
+
+
+async def async_wait_for_post_burst(key: tuple | None, ts: str) -> bool:
+    """
+    Wait until no new post has arrived in the burst for the burst window, without blocking.
+
+    Args:
+        key (Optional[tuple]): The key of the burst, or None if the post is not part of one.
+        ts (str): The timestamp of the post being handled.
+
+    Returns:
+        bool: True if the post is the latest of the burst and should be replied to, False if a
+            newer post will be replied to instead.
+    """
+    if key is None:
+        return True
+    while True:
+        with _burst_coalescer_lock:
+            delay = burst_coalescer.seconds_until_quiet(key)
+            if delay <= 0:
+                return burst_coalescer.is_latest(key, ts)
+        await asyncio.sleep(delay)
+
+
+def get_burst_loading_reply(key: tuple) -> Any:
+    """
+    Get the loading reply already posted for a burst.
+
+    Args:
+        key (tuple): The key of the burst.
+
+    Returns:
+        Any: The Slack API response of the loading reply, or None if there is none yet.
+    """
+    with _burst_coalescer_lock:
+        return burst_coalescer.get_loading_reply(key)
+
+
+def store_burst_loading_reply(key: tuple, loading_reply: Any) -> None:
+    """
+    Remember the loading reply posted for a burst, so the reply to the burst updates it.
+
+    Args:
+        key (tuple): The key of the burst.
+        loading_reply (Any): The Slack API response of the loading reply.
+
+    Returns:
+        None
+    """
+    with _burst_coalescer_lock:
+        burst_coalescer.set_loading_reply(key, loading_reply)
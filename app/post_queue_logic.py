@@ -0,0 +1,380 @@
+"""
+This module contains logic for queueing incoming Slack posts, so they run with bounded
+concurrency, in order within each thread, fairly across users and channels, and at most once
+per event.
+"""
+
+import math
+import time
+from collections import OrderedDict, deque
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.bolt_logic import is_post_in_dm, is_post_mentioned
+
+DEFAULT_PRIORITY_CLASS = "thread"
+DEFAULT_PRIORITY_CLASS_WEIGHTS = "dm:4,mention:2,thread:2,attachments:1"
+MAX_LATENCY_SAMPLES = 1000
+
+
+@dataclass(frozen=True)
+class PostSchedule:
+    """How a post is scheduled: its conversation, who it is charged to, and its priority."""
+
+    key: Hashable
+    flows: tuple[Hashable, ...] = ()
+    priority_class: str = DEFAULT_PRIORITY_CLASS
+    weight: float = 1.0
+
+
+@dataclass
+class QueuedTask:
+    """A post waiting to be handled."""
+
+    schedule: PostSchedule
+    run: Callable[[], Any]
+    enqueued_at: float = 0.0
+    start_tag: float = 0.0
+    finish_tag: float = 0.0
+
+    @property
+    def key(self) -> Hashable:
+        """Return the key of the conversation the post belongs to."""
+        return self.schedule.key
+
+
+@dataclass(frozen=True)
+class LatencySummary:
+    """Queue wait times of one priority class."""
+
+    count: int
+    mean_seconds: float
+    p95_seconds: float
+    max_seconds: float
+
+
+class LatencyStats:
+    """Collects the queue wait times of one priority class."""
+
+    def __init__(self, *, max_samples: int = MAX_LATENCY_SAMPLES):
+        """Initialize empty statistics keeping the latest `max_samples` waits."""
+        self.count = 0
+        self.max_seconds = 0.0
+        self.samples: deque[float] = deque(maxlen=max_samples)
+
+    def add(self, seconds: float) -> None:
+        """Record the wait of a post."""
+        self.count += 1
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.samples.append(seconds)
+
+    def summarize(self) -> LatencySummary:
+        """Return the count and maximum of all waits, and the mean and p95 of recent ones."""
+        recent = sorted(self.samples)
+        return LatencySummary(
+            count=self.count,
+            mean_seconds=sum(recent) / len(recent) if recent else 0.0,
+            p95_seconds=recent[math.ceil(len(recent) * 0.95) - 1] if recent else 0.0,
+            max_seconds=self.max_seconds,
+        )
+
+
+@dataclass
+class QueueStats:
+    """The state of a post queue, for logging and monitoring."""
+
+    queued: int = 0
+    running: int = 0
+    rejected: int = 0
+    last_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+    latencies: dict[str, LatencySummary] = field(default_factory=dict)
+
+
+def parse_priority_class_weights(text: str) -> dict[str, float]:
+    """
+    Parse the weights of priority classes.
+
+    Args:
+        text (str): Comma-separated "class:weight" pairs, such as "dm:4,thread:1".
+
+    Returns:
+        dict[str, float]: The positive weight of each class. Invalid pairs are ignored.
+    """
+    weights: dict[str, float] = {}
+    for pair in text.split(","):
+        name, _, value = pair.partition(":")
+        try:
+            weight = float(value)
+        except ValueError:
+            continue
+        if name.strip() and weight > 0:
+            weights[name.strip()] = weight
+    return weights
+
+
+def classify_post(payload: dict, bot_user_id: str | None) -> str:
+    """
+    Find the priority class of a post.
+
+    Args:
+        payload (dict): The payload of the message event.
+        bot_user_id (Optional[str]): The bot's user ID.
+
+    Returns:
+        str: "attachments" for posts with files, which take longest to handle, otherwise "dm",
+            "mention" or "thread".
+    """
+    if payload.get("files"):
+        return "attachments"
+    if is_post_in_dm(payload):
+        return "dm"
+    if is_post_mentioned(bot_user_id, payload):
+        return "mention"
+    return DEFAULT_PRIORITY_CLASS
+
+
+def build_post_queue_key(channel_id: str | None, payload: dict) -> tuple:
+    """
+    Build the key of the conversation a post belongs to.
+
+    A top-level post and the replies in its thread share a key, so they are handled in order.
+    Top-level posts in a DM also share a key, since they are replied to as one conversation.
+
+    Args:
+        channel_id (Optional[str]): The ID of the channel containing the post.
+        payload (dict): The payload of the message event.
+
+    Returns:
+        tuple: The channel ID and the timestamp of the thread's parent post, which is None for
+            top-level posts in a DM.
+    """
+    if payload.get("thread_ts") is None and is_post_in_dm(payload):
+        return channel_id, None
+    return channel_id, payload.get("thread_ts") or payload.get("ts")
+
+
+def build_post_schedule(
+    *,
+    channel_id: str | None,
+    user_id: str | None,
+    payload: dict,
+    bot_user_id: str | None,
+    class_weights: dict[str, float],
+) -> PostSchedule:
+    """
+    Build how a post is scheduled.
+
+    The post is charged to both its user and its channel, so neither a busy user nor a busy
+    channel can take every worker.
+
+    Args:
+        channel_id (Optional[str]): The ID of the channel containing the post.
+        user_id (Optional[str]): The ID of the user who made the post.
+        payload (dict): The payload of the message event.
+        bot_user_id (Optional[str]): The bot's user ID.
+        class_weights (dict[str, float]): The weight of each priority class.
+
+    Returns:
+        PostSchedule: The conversation key, the user and channel flows, and the priority.
+    """
+    priority_class = classify_post(payload, bot_user_id)
+    return PostSchedule(
+        key=build_post_queue_key(channel_id, payload),
+        flows=(("user", user_id), ("channel", channel_id)),
+        priority_class=priority_class,
+        weight=class_weights.get(priority_class, 1.0),
+    )
+
+
+def find_event_dedupe_key(body: dict) -> str | None:
+    """
+    Find the key identifying an event across retried deliveries.
+
+    Args:
+        body (dict): The request body of the event.
+
+    Returns:
+        Optional[str]: The event ID, or the channel and timestamp of the message if the ID is
+            missing, or None if the event cannot be identified.
+    """
+    if event_id := body.get("event_id"):
+        return event_id
+    event = body.get("event") or {}
+    if event.get("channel") and event.get("ts"):
+        return f"{event['channel']}:{event['ts']}"
+    return None
+
+
+def find_retry_num(headers: dict | None) -> int:
+    """
+    Find how many times Slack has retried the delivery of an event over HTTP.
+
+    Args:
+        headers (Optional[dict]): The request headers, whose values are lists of strings.
+
+    Returns:
+        int: The retry number, or 0 for the first delivery.
+    """
+    values = (headers or {}).get("x-slack-retry-num") or ["0"]
+    try:
+        return int(values[0])
+    except ValueError:
+        return 0
+
+
+class RecentKeys:
+    """Remembers keys seen recently, up to a maximum number and age."""
+
+    def __init__(
+        self,
+        *,
+        max_keys: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize an empty set of up to `max_keys` keys kept for `ttl_seconds`."""
+        self.max_keys = max_keys
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._expires_at: OrderedDict[Hashable, float] = OrderedDict()
+
+    def __len__(self) -> int:
+        """Return the number of remembered keys."""
+        return len(self._expires_at)
+
+    def add(self, key: Hashable) -> bool:
+        """
+        Remember a key.
+
+        Args:
+            key (Hashable): The key to remember.
+
+        Returns:
+            bool: True if the key is new, False if it was seen within the TTL.
+        """
+        now = self.clock()
+        while self._expires_at:
+            oldest_key, expires_at = next(iter(self._expires_at.items()))
+            if expires_at > now:
+                break
+            del self._expires_at[oldest_key]
+        if key in self._expires_at:
+            return False
+        if self.max_keys <= 0:
+            return True
+        self._expires_at[key] = now + self.ttl_seconds
+        while len(self._expires_at) > self.max_keys:
+            self._expires_at.popitem(last=False)
+        return True
+
+
+class KeyedTaskQueue:
+    """
+    Queue of tasks with the same key run one at a time, choosing between keys by start-time
+    fair queueing across the flows the tasks are charged to.
+
+    Each task gets a virtual start tag when queued: the later of the current virtual time and
+    the finish tags of its flows. Its finish tag is the start tag plus 1 / weight, and becomes
+    the finish tag of its flows. The ready task with the smallest finish tag runs first, so
+    flows share the workers in proportion to the weights of their tasks, a burst from one flow
+    only delays that flow, and among new flows a heavier class runs before a lighter one.
+    """
+
+    def __init__(self, *, max_size: int):
+        """Initialize an empty queue holding up to `max_size` waiting tasks."""
+        self.max_size = max_size
+        self._pending: dict[Hashable, deque[QueuedTask]] = {}
+        self._ready: list[Hashable] = []
+        self._running: set[Hashable] = set()
+        self._size = 0
+        self._virtual_time = 0.0
+        self._flow_finish_tags: dict[Hashable, float] = {}
+
+    def __len__(self) -> int:
+        """Return the number of tasks waiting to run."""
+        return self._size
+
+    @property
+    def running_count(self) -> int:
+        """Return the number of keys whose task is running."""
+        return len(self._running)
+
+    @property
+    def is_full(self) -> bool:
+        """Return True if no more tasks can be queued."""
+        return self._size >= self.max_size
+
+    def push(self, task: QueuedTask) -> bool:
+        """
+        Queue a task behind the other tasks with the same key.
+
+        Args:
+            task (QueuedTask): The task to queue.
+
+        Returns:
+            bool: True if the task was queued, False if the queue is full.
+        """
+        if self.is_full:
+            return False
+        if self._size == 0:
+            # Nothing is waiting, so earlier posts no longer hold back any flow
+            self._virtual_time = max(
+                [self._virtual_time, *self._flow_finish_tags.values()]
+            )
+            self._flow_finish_tags.clear()
+        flows = task.schedule.flows
+        task.start_tag = max(
+            [self._virtual_time]
+            + [self._flow_finish_tags.get(flow, 0.0) for flow in flows]
+        )
+        task.finish_tag = task.start_tag + 1 / task.schedule.weight
+        for flow in flows:
+            self._flow_finish_tags[flow] = task.finish_tag
+        pending = self._pending.setdefault(task.key, deque())
+        pending.append(task)
+        self._size += 1
+        if len(pending) == 1 and task.key not in self._running:
+            self._ready.append(task.key)
+        return True
+
+    def pop_ready(self) -> QueuedTask | None:
+        """
+        Take the ready task with the smallest finish tag, and mark its key as running.
+
+        Returns:
+            Optional[QueuedTask]: The task, or None if every queued task waits for its key.
+        """
+        if not self._ready:
+            return None
+        # min() keeps the earliest ready key among equal tags, so ties run in arrival order
+        key = min(self._ready, key=lambda k: self._pending[k][0].finish_tag)
+        self._ready.remove(key)
+        task = self._pending[key].popleft()
+        self._size -= 1
+        self._running.add(key)
+        self._virtual_time = max(self._virtual_time, task.start_tag)
+        # Flows that finished before the virtual time start from it anyway
+        self._flow_finish_tags = {
+            flow: tag
+            for flow, tag in self._flow_finish_tags.items()
+            if tag > self._virtual_time
+        }
+        return task
+
+    def complete(self, key: Hashable) -> None:
+        """
+        Mark the task of a key as finished, so the next task with the key can run.
+
+        Args:
+            key (Hashable): The key of the finished task.
+
+        Returns:
+            None
+        """
+        self._running.discard(key)
+        if self._pending.get(key):
+            self._ready.append(key)
+        else:
+            self._pending.pop(key, None)
@@ -0,0 +1,344 @@
+"""
+Service functions for the queues that handle incoming Slack posts with bounded concurrency.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from app.env import (
+    EVENT_DEDUPE_TTL_SECONDS,
+    POST_PRIORITY_CLASS_WEIGHTS,
+    POST_QUEUE_MAX_SIZE,
+    POST_QUEUE_STATS_LOG_INTERVAL_SECONDS,
+    POST_QUEUE_TIMEOUT_SECONDS,
+    POST_WORKER_MAX_CONCURRENCY,
+)
+from app.post_queue_logic import (
+    KeyedTaskQueue,
+    LatencyStats,
+    PostSchedule,
+    QueuedTask,
+    QueueStats,
+    RecentKeys,
+    find_event_dedupe_key,
+    find_retry_num,
+    parse_priority_class_weights,
+)
+
+MAX_RECENT_EVENTS = 10000
+
+recent_events = RecentKeys(
+    max_keys=MAX_RECENT_EVENTS, ttl_seconds=EVENT_DEDUPE_TTL_SECONDS
+)
+_recent_events_lock = threading.Lock()
+
+priority_class_weights = parse_priority_class_weights(POST_PRIORITY_CLASS_WEIGHTS)
+
+
+def is_duplicate_event(body: dict, headers: dict | None = None) -> bool:
+    """
+    Check if an event was already received, such as a delivery retried by Slack.
+
+    Args:
+        body (dict): The request body of the event.
+        headers (Optional[dict]): The request headers.
+
+    Returns:
+        bool: True if the event should be skipped, False otherwise.
+    """
+    key = find_event_dedupe_key(body)
+    if key is None:
+        return False
+    with _recent_events_lock:
+        is_new = recent_events.add(key)
+    if not is_new:
+        logging.info(
+            f"Skipped a duplicate event (key: {key}, retry: {find_retry_num(headers)})"
+        )
+    return not is_new
+
+
+def snapshot_queue_stats(
+    queue: KeyedTaskQueue, stats: QueueStats, latencies: dict[str, LatencyStats]
+) -> QueueStats:
+    """
+    Copy the statistics of an executor.
+
+    Args:
+        queue (KeyedTaskQueue): The queue of the executor.
+        stats (QueueStats): The counters of the executor.
+        latencies (dict[str, LatencyStats]): The wait times of each priority class.
+
+    Returns:
+        QueueStats: The snapshot.
+    """
+    return QueueStats(
+        queued=len(queue),
+        running=queue.running_count,
+        rejected=stats.rejected,
+        last_wait_seconds=stats.last_wait_seconds,
+        max_wait_seconds=stats.max_wait_seconds,
+        latencies={name: latency.summarize() for name, latency in latencies.items()},
+    )
+
+
+def record_wait(
+    task: QueuedTask,
+    queue: KeyedTaskQueue,
+    stats: QueueStats,
+    latencies: dict[str, LatencyStats],
+) -> None:
+    """
+    Record how long a post waited before a worker started it.
+
+    Args:
+        task (QueuedTask): The started post.
+        queue (KeyedTaskQueue): The queue of the executor.
+        stats (QueueStats): The counters of the executor, updated in place.
+        latencies (dict[str, LatencyStats]): The wait times of each priority class.
+
+    Returns:
+        None
+    """
+    wait_seconds = time.monotonic() - task.enqueued_at
+    stats.last_wait_seconds = wait_seconds
+    stats.max_wait_seconds = max(stats.max_wait_seconds, wait_seconds)
+    priority_class = task.schedule.priority_class
+    latencies.setdefault(priority_class, LatencyStats()).add(wait_seconds)
+    logging.debug(
+        f"Started a {priority_class} post after waiting {wait_seconds:.3f}s "
+        f"({len(queue)} queued, {queue.running_count} running)"
+    )
+
+
+def is_stats_log_due(last_logged_at: float, now: float) -> bool:
+    """
+    Check if the statistics of an executor are due to be logged.
+
+    Args:
+        last_logged_at (float): The monotonic time the statistics were last logged.
+        now (float): The current monotonic time.
+
+    Returns:
+        bool: True if the log interval has passed, False otherwise or if logging is disabled.
+    """
+    return (
+        POST_QUEUE_STATS_LOG_INTERVAL_SECONDS > 0
+        and now - last_logged_at >= POST_QUEUE_STATS_LOG_INTERVAL_SECONDS
+    )
+
+
+class PostExecutor:
+    """
+    Runs posts on a fixed number of worker threads, one post at a time per conversation.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_workers: int,
+        max_queue_size: int,
+        submit_timeout_seconds: float,
+    ):
+        """Initialize an executor whose worker threads start with the first post."""
+        self.max_workers = max_workers
+        self.submit_timeout_seconds = submit_timeout_seconds
+        self._queue = KeyedTaskQueue(max_size=max_queue_size)
+        self._stats = QueueStats()
+        self._latencies: dict[str, LatencyStats] = {}
+        self._condition = threading.Condition()
+        self._workers: list[threading.Thread] = []
+        self._stats_logged_at = time.monotonic()
+
+    def stats(self) -> QueueStats:
+        """Return a snapshot of the queue depth, running posts and wait times."""
+        with self._condition:
+            return snapshot_queue_stats(self._queue, self._stats, self._latencies)
+
+    def submit(
+        self,
+        schedule: PostSchedule,
+        fn: Callable[..., Any],
+        /,
+        *args: Any,
+        **kwargs: Any,
+    ) -> bool:
+        """
+        Queue a post, waiting up to the submit timeout while the queue is full.
+
+        Args:
+            schedule (PostSchedule): The conversation, flows and priority class of the post.
+            fn (Callable[..., Any]): The function handling the post.
+            *args (Any): The positional arguments of the function.
+            **kwargs (Any): The keyword arguments of the function.
+
+        Returns:
+            bool: True if the post was queued, False if it was rejected.
+        """
+        task = QueuedTask(
+            schedule=schedule,
+            run=lambda: fn(*args, **kwargs),
+            enqueued_at=time.monotonic(),
+        )
+        with self._condition:
+            self._start_workers()
+            if not self._condition.wait_for(
+                lambda: not self._queue.is_full, timeout=self.submit_timeout_seconds
+            ):
+                self._stats.rejected += 1
+                return False
+            self._queue.push(task)
+            self._condition.notify_all()
+            return True
+
+    def _start_workers(self) -> None:
+        """Start the worker threads that are not running yet."""
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(
+                target=self._run,
+                daemon=True,
+                name=f"post-worker-{len(self._workers)}",
+            )
+            self._workers.append(worker)
+            worker.start()
+
+    def _run(self) -> None:
+        """Handle queued posts until the process exits."""
+        while True:
+            with self._condition:
+                task = self._condition.wait_for(self._queue.pop_ready)
+                if task is None:
+                    continue
+                record_wait(task, self._queue, self._stats, self._latencies)
+                self._condition.notify_all()
+            try:
+                task.run()
+            except Exception:
+                logging.exception("Failed to handle a post")
+            finally:
+                with self._condition:
+                    self._queue.complete(task.key)
+                    self._condition.notify_all()
+                    stats = self._take_stats_to_log()
+                if stats is not None:
+                    logging.info(f"Post queue stats: {stats}")
+
+    def _take_stats_to_log(self) -> QueueStats | None:
+        """Return a snapshot of the statistics if they are due to be logged."""
+        now = time.monotonic()
+        if not is_stats_log_due(self._stats_logged_at, now):
+            return None
+        self._stats_logged_at = now
+        return snapshot_queue_stats(self._queue, self._stats, self._latencies)
+
+
+class AsyncPostExecutor:
+    """
+    Runs posts on a fixed number of worker tasks, one post at a time per conversation.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_workers: int,
+        max_queue_size: int,
+        submit_timeout_seconds: float,
+    ):
+        """Initialize an executor whose worker tasks start with the first post."""
+        self.max_workers = max_workers
+        self.submit_timeout_seconds = submit_timeout_seconds
+        self._queue = KeyedTaskQueue(max_size=max_queue_size)
+        self._stats = QueueStats()
+        self._latencies: dict[str, LatencyStats] = {}
+        self._condition: asyncio.Condition | None = None
+        self._workers: list[asyncio.Task] = []
+        self._stats_logged_at = time.monotonic()
+
+    def stats(self) -> QueueStats:
+        """Return a snapshot of the queue depth, running posts and wait times."""
+        return snapshot_queue_stats(self._queue, self._stats, self._latencies)
+
+    async def submit(
+        self,
+        schedule: PostSchedule,
+        fn: Callable[..., Awaitable[Any]],
+        /,
+        *args: Any,
+        **kwargs: Any,
+    ) -> bool:
+        """
+        Queue a post, waiting up to the submit timeout while the queue is full.
+
+        Args:
+            schedule (PostSchedule): The conversation, flows and priority class of the post.
+            fn (Callable[..., Awaitable[Any]]): The coroutine function handling the post.
+            *args (Any): The positional arguments of the function.
+            **kwargs (Any): The keyword arguments of the function.
+
+        Returns:
+            bool: True if the post was queued, False if it was rejected.
+        """
+        # Created on first use, so that it belongs to the running event loop
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        condition = self._condition
+        while len(self._workers) < self.max_workers:
+            self._workers.append(
+                asyncio.create_task(
+                    self._run(condition), name=f"post-worker-{len(self._workers)}"
+                )
+            )
+        task = QueuedTask(
+            schedule=schedule,
+            run=lambda: fn(*args, **kwargs),
+            enqueued_at=time.monotonic(),
+        )
+        async with condition:
+            try:
+                await asyncio.wait_for(
+                    condition.wait_for(lambda: not self._queue.is_full),
+                    timeout=self.submit_timeout_seconds,
+                )
+            except TimeoutError:
+                self._stats.rejected += 1
+                return False
+            self._queue.push(task)
+            condition.notify_all()
+            return True
+
+    async def _run(self, condition: asyncio.Condition) -> None:
+        """Handle queued posts until the event loop stops."""
+        while True:
+            async with condition:
+                task = await condition.wait_for(self._queue.pop_ready)
+            if task is None:
+                continue
+            record_wait(task, self._queue, self._stats, self._latencies)
+            try:
+                await task.run()
+            except Exception:
+                logging.exception("Failed to handle a post")
+            finally:
+                self._queue.complete(task.key)
+                async with condition:
+                    condition.notify_all()
+                now = time.monotonic()
+                if is_stats_log_due(self._stats_logged_at, now):
+                    self._stats_logged_at = now
+                    logging.info(f"Post queue stats: {self.stats()}")
+
+
+post_executor = PostExecutor(
+    max_workers=POST_WORKER_MAX_CONCURRENCY,
+    max_queue_size=POST_QUEUE_MAX_SIZE,
+    submit_timeout_seconds=POST_QUEUE_TIMEOUT_SECONDS,
+)
+async_post_executor = AsyncPostExecutor(
+    max_workers=POST_WORKER_MAX_CONCURRENCY,
+    max_queue_size=POST_QUEUE_MAX_SIZE,
+    submit_timeout_seconds=POST_QUEUE_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,120 @@
+"""
+Service functions for redacting sensitive information from texts sent to the model and tools.
+"""
+
+import logging
+import threading
+from dataclasses import replace
+from typing import Any
+
+from app.env import (
+    REDACT_CREDIT_CARD_PATTERN,
+    REDACT_EMAIL_PATTERN,
+    REDACT_PHONE_PATTERN,
+    REDACT_SSN_PATTERN,
+    REDACT_TOOL_ARGUMENTS_ENABLED,
+    REDACT_TOOL_RESULTS_ENABLED,
+    REDACT_USER_DEFINED_PATTERN,
+    REDACTION_ENABLED,
+    REDACTION_TIMEOUT_SECONDS,
+)
+from app.redaction_logic import (
+    RedactionEngine,
+    RedactionResult,
+    RedactionStats,
+    redact_json_strings,
+)
+
+REDACT_PATTERNS = [
+    (REDACT_EMAIL_PATTERN, "[EMAIL]"),
+    (REDACT_CREDIT_CARD_PATTERN, "[CREDIT CARD]"),
+    (REDACT_PHONE_PATTERN, "[PHONE]"),
+    (REDACT_SSN_PATTERN, "[SSN]"),
+    (REDACT_USER_DEFINED_PATTERN, "[REDACTED]"),
+]
+
+redaction_engine = RedactionEngine(
+    REDACT_PATTERNS, timeout_seconds=REDACTION_TIMEOUT_SECONDS
+)
+redaction_stats = RedactionStats()
+_redaction_stats_lock = threading.Lock()
+
+
+def redact(text: str) -> RedactionResult:
+    """
+    Redact sensitive information from a text, if redaction is enabled.
+
+    Args:
+        text (str): The text to redact.
+
+    Returns:
+        RedactionResult: The redacted text with its matches, or the text as is if redaction is
+            disabled.
+    """
+    if not REDACTION_ENABLED or not text:
+        return RedactionResult(text=text)
+    result = redaction_engine.redact(text)
+    with _redaction_stats_lock:
+        redaction_stats.add(result)
+        if result.timed_out:
+            logging.warning(
+                f"Redacted a whole text of {len(text)} characters, since redaction took over "
+                f"{REDACTION_TIMEOUT_SECONDS} seconds ({redaction_stats})"
+            )
+    if result.matches:
+        logging.debug(f"Redacted {result.matches} in {result.seconds * 1000:.2f} ms")
+    return result
+
+
+def redact_text(text: str) -> str:
+    """
+    Redact sensitive information from a text, if redaction is enabled.
+
+    Args:
+        text (str): The text to redact.
+
+    Returns:
+        str: The redacted text, or the text as is if redaction is disabled.
+    """
+    return redact(text).text
+
+
+def get_redaction_stats() -> RedactionStats:
+    """
+    Get the totals of the texts redacted so far.
+
+    Returns:
+        RedactionStats: A snapshot of the totals.
+    """
+    with _redaction_stats_lock:
+        return replace(redaction_stats, matches=dict(redaction_stats.matches))
+
+
+def maybe_redact_tool_arguments(arguments: Any) -> Any:
+    """
+    Redact the strings in the arguments of a tool call before the tool is called, if enabled.
+
+    Args:
+        arguments (Any): The decoded JSON arguments.
+
+    Returns:
+        Any: The redacted arguments, or the arguments as is if disabled.
+    """
+    if not REDACT_TOOL_ARGUMENTS_ENABLED:
+        return arguments
+    return redact_json_strings(arguments, redact_text)
+
+
+def maybe_redact_tool_result(result: Any) -> Any:
+    """
+    Redact the result of a tool call before it is sent to the model, if enabled.
+
+    Args:
+        result (Any): The result of the tool call.
+
+    Returns:
+        Any: The redacted result if it is a string, or the result as is.
+    """
+    if not REDACT_TOOL_RESULTS_ENABLED or not isinstance(result, str):
+        return result
+    return redact_text(result)
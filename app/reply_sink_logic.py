@@ -0,0 +1,198 @@
+"""
+This module defines where streamed replies are sent, with implementations that need no Slack
+workspace for profiling and load testing the streaming path.
+"""
+
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Protocol
+
+
+class ReplySink(Protocol):
+    """Receives a streamed reply as a sequence of messages."""
+
+    def try_acquire_update(self) -> bool:
+        """Return True if the current message may be updated now."""
+        ...
+
+    def add_delta(self, delta: str) -> None:
+        """Receive text as soon as it is streamed."""
+        ...
+
+    def submit(self, assistant_content: str) -> None:
+        """Update the current message with its content so far."""
+        ...
+
+    def close_message(self) -> None:
+        """Stop updating the current message, even if the stream failed."""
+        ...
+
+    def finish(self, assistant_content: str) -> None:
+        """Set the final content of the current message."""
+        ...
+
+    def start_next_message(self) -> None:
+        """Continue the reply in a new message after the current one is full."""
+        ...
+
+    def show_loading(self) -> None:
+        """Show a loading message while tools run."""
+        ...
+
+
+class AsyncReplySink(Protocol):
+    """Receives a streamed reply as a sequence of messages on the asyncio event loop."""
+
+    def try_acquire_update(self) -> bool:
+        """Return True if the current message may be updated now."""
+        ...
+
+    def add_delta(self, delta: str) -> None:
+        """Receive text as soon as it is streamed."""
+        ...
+
+    def submit(self, assistant_content: str) -> None:
+        """Update the current message with its content so far."""
+        ...
+
+    async def close_message(self) -> None:
+        """Stop updating the current message, even if the stream failed."""
+        ...
+
+    async def finish(self, assistant_content: str) -> None:
+        """Set the final content of the current message."""
+        ...
+
+    async def start_next_message(self) -> None:
+        """Continue the reply in a new message after the current one is full."""
+        ...
+
+    async def show_loading(self) -> None:
+        """Show a loading message while tools run."""
+        ...
+
+
+class NoopReplyUpdates:
+    """Discards the streamed updates of a reply, for the sync and async no-op sinks."""
+
+    def try_acquire_update(self) -> bool:
+        """Always allow updates."""
+        return True
+
+    def add_delta(self, delta: str) -> None:
+        """Discard the delta."""
+
+    def submit(self, assistant_content: str) -> None:
+        """Discard the update."""
+
+
+class NoopReplySink(NoopReplyUpdates):
+    """Discards the reply, so only the model side of the streaming path is measured."""
+
+    def close_message(self) -> None:
+        """Do nothing."""
+
+    def finish(self, assistant_content: str) -> None:
+        """Discard the final content."""
+
+    def start_next_message(self) -> None:
+        """Do nothing."""
+
+    def show_loading(self) -> None:
+        """Do nothing."""
+
+
+@dataclass(frozen=True)
+class ReplySinkEvent:
+    """An event received by a recording reply sink."""
+
+    time: float
+    kind: str
+    text: str = ""
+
+
+class RecordingReplyUpdates:
+    """Records the streamed updates of a reply, for the sync and async recording sinks."""
+
+    def __init__(self, *, clock: Callable[[], float] = time.monotonic):
+        """Initialize an empty recording that reads timestamps from `clock`."""
+        self.clock = clock
+        self.events: list[ReplySinkEvent] = []
+
+    def record(self, kind: str, text: str = "") -> None:
+        """Append an event with the current time."""
+        self.events.append(ReplySinkEvent(time=self.clock(), kind=kind, text=text))
+
+    @property
+    def messages(self) -> list[str]:
+        """Return the final content of each finished message."""
+        return [event.text for event in self.events if event.kind == "finish"]
+
+    def try_acquire_update(self) -> bool:
+        """Always allow updates."""
+        return True
+
+    def add_delta(self, delta: str) -> None:
+        """Record the delta."""
+        self.record("delta", delta)
+
+    def submit(self, assistant_content: str) -> None:
+        """Record the update."""
+        self.record("flush", assistant_content)
+
+
+class RecordingReplySink(RecordingReplyUpdates):
+    """Records every delta and update with a timestamp instead of sending it anywhere."""
+
+    def close_message(self) -> None:
+        """Record that the message stopped receiving updates."""
+        self.record("close")
+
+    def finish(self, assistant_content: str) -> None:
+        """Record the final content."""
+        self.record("finish", assistant_content)
+
+    def start_next_message(self) -> None:
+        """Record the start of a continuation message."""
+        self.record("next_message")
+
+    def show_loading(self) -> None:
+        """Record the loading message."""
+        self.record("loading")
+
+
+class AsyncNoopReplySink(NoopReplyUpdates):
+    """Discards the reply on the asyncio event loop."""
+
+    async def close_message(self) -> None:
+        """Do nothing."""
+
+    async def finish(self, assistant_content: str) -> None:
+        """Discard the final content."""
+
+    async def start_next_message(self) -> None:
+        """Do nothing."""
+
+    async def show_loading(self) -> None:
+        """Do nothing."""
+
+
+class AsyncRecordingReplySink(RecordingReplyUpdates):
+    """Records every delta and update on the asyncio event loop."""
+
+    async def close_message(self) -> None:
+        """Record that the message stopped receiving updates."""
+        self.record("close")
+
+    async def finish(self, assistant_content: str) -> None:
+        """Record the final content."""
+        self.record("finish", assistant_content)
+
+    async def start_next_message(self) -> None:
+        """Record the start of a continuation message."""
+        self.record("next_message")
+
+    async def show_loading(self) -> None:
+        """Record the loading message."""
+        self.record("loading")
@@ -0,0 +1,333 @@
+"""
+Service classes for sending streamed replies to Slack.
+"""
+
+import logging
+import threading
+
+from slack_sdk.web import SlackResponse, WebClient
+
+from app.env import (
+    SLACK_FORMATTING_ENABLED,
+    SLACK_LOADING_CHARACTER,
+    SLACK_REPLY_FORMAT,
+)
+from app.flush_service import try_acquire_channel_update
+from app.message_logic import render_assistant_reply_for_slack
+from app.slack_blocks_logic import (
+    REPLY_FORMAT_TEXT,
+    append_loading_character,
+    render_reply_blocks,
+)
+from app.slack_format_logic import strip_streamed_reply_start
+from app.slack_stream_service import SlackReplyStream, is_slack_streaming_available
+
+
+class SlackReplySink:
+    """
+    Sends a streamed reply to Slack, continuing it in new replies when a message is full.
+
+    Updates of the current message go through a background ReplyUpdateWorker, and thread
+    replies use the Slack streaming methods when they are enabled and available.
+    """
+
+    def __init__(
+        self,
+        *,
+        client: WebClient,
+        channel: str,
+        thread_ts: str | None,
+        user_id: str,
+        team_id: str | None,
+        wip_reply: dict | SlackResponse,
+        loading_text: str,
+    ):
+        """Initialize the sink for a reply whose loading message is `wip_reply`."""
+        self.client = client
+        self.channel = channel
+        self.thread_ts = thread_ts
+        self.user_id = user_id
+        self.team_id = team_id
+        self.wip_reply = wip_reply
+        self.loading_text = loading_text
+        self._reply_stream: SlackReplyStream | None = None
+        self._update_worker: ReplyUpdateWorker | None = None
+
+    def try_acquire_update(self) -> bool:
+        """Take an update slot from the channel's token bucket."""
+        return try_acquire_channel_update(self.channel)
+
+    def add_delta(self, delta: str) -> None:
+        """Ignore the delta; Slack only receives whole updates."""
+
+    def submit(self, assistant_content: str) -> None:
+        """Schedule an update of the current message."""
+        if self._update_worker is None:
+            self._update_worker = ReplyUpdateWorker(
+                client=self.client,
+                channel=self.channel,
+                wip_reply=self.wip_reply,
+                reply_stream=self._get_reply_stream(),
+            )
+        self._update_worker.submit(assistant_content)
+
+    def close_message(self) -> None:
+        """Wait for the in-flight update of the current message and drop pending ones."""
+        if self._update_worker is not None:
+            self._update_worker.close()
+
+    def finish(self, assistant_content: str) -> None:
+        """Update the current message with its final content, removing the loading character."""
+        render_cache = None
+        if self._update_worker is not None:
+            render_cache = self._update_worker.render_cache
+        if len(assistant_content) > 0:
+            send_reply_update(
+                client=self.client,
+                channel=self.channel,
+                wip_reply=self.wip_reply,
+                reply_stream=self._get_reply_stream(),
+                assistant_content=assistant_content,
+                with_loading_character=False,
+                render_cache=render_cache,
+            )
+        self._reply_stream = None
+        self._update_worker = None
+
+    def start_next_message(self) -> None:
+        """Post a new reply to continue in."""
+        self.wip_reply = self.client.chat_postMessage(
+            channel=self.channel,
+            thread_ts=self.thread_ts,
+            text=SLACK_LOADING_CHARACTER,
+        )
+
+    def show_loading(self) -> None:
+        """Post a new loading reply if the current one already shows assistant text."""
+        self.wip_reply = repost_loading_reply_if_updated(
+            client=self.client,
+            channel=self.channel,
+            thread_ts=self.thread_ts,
+            wip_reply=self.wip_reply,
+            loading_text=self.loading_text,
+        )
+
+    def _get_reply_stream(self) -> SlackReplyStream | None:
+        """Return the Slack message stream of the current message, if streaming."""
+        if (
+            self._reply_stream is None
+            and self.thread_ts is not None
+            and is_slack_streaming_available()
+        ):
+            self._reply_stream = SlackReplyStream(
+                client=self.client,
+                channel=self.channel,
+                thread_ts=self.thread_ts,
+                user_id=self.user_id,
+                team_id=self.team_id,
+                wip_reply=self.wip_reply,
+            )
+        return self._reply_stream
+
+
+def repost_loading_reply_if_updated(
+    *,
+    client: WebClient,
+    channel: str,
+    thread_ts: str | None,
+    wip_reply: dict | SlackResponse,
+    loading_text: str,
+) -> dict | SlackResponse:
+    """
+    Posts a new loading reply if the in-progress reply already shows assistant text.
+
+    Args:
+        client (WebClient): The Slack WebClient instance.
+        channel (str): The Slack channel ID.
+        thread_ts (Optional[str]): The timestamp of the thread to reply to.
+        wip_reply (Union[dict, SlackResponse]): The message object for the in-progress reply.
+        loading_text (str): The text to display while waiting for a response.
+
+    Returns:
+        Union[dict, SlackResponse]: The in-progress reply to use for the next step.
+    """
+    if (wip_message := wip_reply["message"]) and wip_message["text"] != loading_text:
+        return client.chat_postMessage(
+            channel=channel,
+            thread_ts=thread_ts,
+            text=loading_text,
+        )
+    return wip_reply
+
+
+class ReplyUpdateWorker:
+    """
+    Background worker that coalesces Slack message updates for one in-flight reply.
+
+    Only the latest submitted content is kept, so at most one chat.update call is in flight and
+    stale intermediate snapshots are dropped instead of being sent.
+    """
+
+    def __init__(
+        self,
+        *,
+        client: WebClient,
+        channel: str,
+        wip_reply: dict | SlackResponse,
+        reply_stream: SlackReplyStream | None = None,
+    ):
+        """Initialize the worker and start its background thread."""
+        self.client = client
+        self.channel = channel
+        self.wip_reply = wip_reply
+        self.reply_stream = reply_stream
+        self.sent_count = 0
+        self.coalesced_count = 0
+        self.render_cache: dict = {}
+        self._pending_content: str | None = None
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(
+            target=self._run,
+            daemon=True,
+            name="reply-update-worker",
+        )
+        self._thread.start()
+
+    def submit(self, assistant_content: str) -> None:
+        """Schedule an update with the latest assistant content, replacing any pending one."""
+        with self._condition:
+            if self._pending_content is not None:
+                self.coalesced_count += 1
+            self._pending_content = assistant_content
+            self._condition.notify()
+
+    def close(self) -> None:
+        """Wait for the in-flight update to finish and drop any pending one."""
+        with self._condition:
+            if self._pending_content is not None:
+                self.coalesced_count += 1
+                self._pending_content = None
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+        logging.debug(
+            "Reply updates for %s: sent=%d, coalesced=%d",
+            self.channel,
+            self.sent_count,
+            self.coalesced_count,
+        )
+
+    def _run(self) -> None:
+        """Send the latest pending content until the worker is closed."""
+        while True:
+            with self._condition:
+                while self._pending_content is None and not self._closed:
+                    self._condition.wait()
+                if self._pending_content is None:
+                    return
+                assistant_content = self._pending_content
+                self._pending_content = None
+            try:
+                send_reply_update(
+                    client=self.client,
+                    channel=self.channel,
+                    wip_reply=self.wip_reply,
+                    reply_stream=self.reply_stream,
+                    assistant_content=assistant_content,
+                    render_cache=self.render_cache,
+                )
+                self.sent_count += 1
+            except Exception:
+                logging.exception("Failed to update the reply text")
+
+
+def send_reply_update(
+    *,
+    client: WebClient,
+    channel: str,
+    wip_reply: dict | SlackResponse,
+    reply_stream: SlackReplyStream | None,
+    assistant_content: str,
+    with_loading_character: bool = True,
+    render_cache: dict | None = None,
+) -> None:
+    """
+    Sends the assistant's reply to its Slack message stream, or updates the message instead.
+
+    Args:
+        client (WebClient): The Slack WebClient instance.
+        channel (str): The Slack channel ID.
+        wip_reply (Union[dict, SlackResponse]): The message object for the in-progress reply.
+        reply_stream (Optional[SlackReplyStream]): The Slack message stream, if streaming.
+        assistant_content (str): The content of the assistant's reply.
+        with_loading_character (bool): Whether the reply is still in progress.
+        render_cache (Optional[dict]): The render cache for this reply.
+
+    Returns:
+        None
+    """
+    if reply_stream is not None:
+        is_final = not with_loading_character
+        stream_content = strip_streamed_reply_start(
+            assistant_content, is_final=is_final
+        )
+        if stream_content is None or reply_stream.send(
+            stream_content, is_final=is_final
+        ):
+            return
+    update_reply_text(
+        client=client,
+        channel=channel,
+        wip_reply=wip_reply,
+        assistant_content=assistant_content,
+        with_loading_character=with_loading_character,
+        render_cache=render_cache,
+    )
+
+
+def update_reply_text(
+    *,
+    client: WebClient,
+    channel: str,
+    wip_reply: dict | SlackResponse,
+    assistant_content: str,
+    with_loading_character: bool = True,
+    render_cache: dict | None = None,
+) -> None:
+    """
+    Updates the Slack message with the assistant's reply.
+
+    Args:
+        client (WebClient): The Slack WebClient instance.
+        channel (str): The Slack channel ID.
+        wip_reply (Union[dict, SlackResponse]): The message object for the in-progress reply.
+        assistant_content (str): The content of the assistant's reply.
+        with_loading_character (bool): Whether to append a loading character.
+        render_cache (Optional[dict]): The render cache for this reply.
+
+    Returns:
+        None
+    """
+    wip_message = wip_reply["message"]
+    if not wip_message:
+        return
+    # Block formats render the Markdown themselves, so it is not converted to mrkdwn
+    assistant_reply_text = render_assistant_reply_for_slack(
+        content=assistant_content,
+        slack_formatting_enabled=SLACK_FORMATTING_ENABLED
+        and SLACK_REPLY_FORMAT == REPLY_FORMAT_TEXT,
+        cache=render_cache,
+    )
+    blocks = render_reply_blocks(
+        content=assistant_reply_text,
+        reply_format=SLACK_REPLY_FORMAT,
+        cache=render_cache,
+    )
+    wip_message["text"] = assistant_reply_text
+    text = assistant_reply_text
+    if with_loading_character:
+        text += SLACK_LOADING_CHARACTER
+        if blocks:
+            blocks = append_loading_character(blocks, SLACK_LOADING_CHARACTER)
+    client.chat_update(channel=channel, ts=wip_message["ts"], text=text, blocks=blocks)
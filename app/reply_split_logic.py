@@ -0,0 +1,174 @@
+"""
+This module contains logic for splitting long streamed replies into several Slack messages.
+"""
+
+import re
+from dataclasses import dataclass
+
+MAX_REPLY_BYTES = 3500
+LIST_ITEM_PATTERN = re.compile(r"[ \t]*(?:[-*+]|\d+[.)])[ \t]")
+
+
+@dataclass(frozen=True)
+class LineStart:
+    """A position where a line starts, with the code fence state at that position."""
+
+    char_offset: int
+    byte_offset: int
+    fence_opener: str | None
+    is_block_boundary: bool
+
+
+def toggles_code_fence(line: str) -> bool:
+    """
+    Check if a line opens or closes a code fence.
+
+    Args:
+        line (str): The line without its trailing newline.
+
+    Returns:
+        bool: True if the line starts with an unbalanced ``` marker, False otherwise.
+    """
+    stripped = line.strip()
+    return stripped.startswith("```") and stripped.count("```") % 2 == 1
+
+
+class ReplySplitter:
+    """
+    Tracks the text of the current Slack message and splits it at block boundaries.
+
+    The UTF-8 length and the line starts are updated as text arrives, so checking the limit
+    does not re-encode the message and finding a split point does not re-scan it.
+    """
+
+    def __init__(self, *, max_bytes: int = MAX_REPLY_BYTES):
+        """Initialize an empty message that may hold up to `max_bytes` bytes."""
+        self.max_bytes = max_bytes
+        self._reset()
+
+    def _reset(self) -> None:
+        """Forget the current message."""
+        self.byte_length = 0
+        self.line_starts: list[LineStart] = []
+        self._text = ""
+        self._pending_text: list[str] = []
+        self._char_length = 0
+        self._partial_line = ""
+        self._fence_opener: str | None = None
+
+    @property
+    def text(self) -> str:
+        """Return the text of the current message."""
+        if self._pending_text:
+            self._text += "".join(self._pending_text)
+            self._pending_text.clear()
+        return self._text
+
+    def add_text(self, text: str) -> None:
+        """Append streamed text to the current message."""
+        if not text:
+            return
+        self._pending_text.append(text)
+        *completed, partial = text.split("\n")
+        for segment in completed:
+            self._char_length += len(segment) + 1
+            self.byte_length += len(segment.encode("utf-8")) + 1
+            self._complete_line(self._partial_line + segment)
+            self._partial_line = ""
+        self._char_length += len(partial)
+        self.byte_length += len(partial.encode("utf-8"))
+        self._partial_line += partial
+
+    def _complete_line(self, line: str) -> None:
+        """Update the fence state with a completed line and record the next line start."""
+        closes_fence = False
+        if toggles_code_fence(line):
+            if self._fence_opener is None:
+                self._fence_opener = line.strip()
+            else:
+                self._fence_opener = None
+                closes_fence = True
+        self.line_starts.append(
+            LineStart(
+                char_offset=self._char_length,
+                byte_offset=self.byte_length,
+                fence_opener=self._fence_opener,
+                is_block_boundary=self._fence_opener is None
+                and (closes_fence or not line.strip()),
+            )
+        )
+
+    def is_over_limit(self) -> bool:
+        """Return True if the current message exceeds the byte limit."""
+        return self.byte_length > self.max_bytes
+
+    def split(self) -> str:
+        """
+        Split off the head of the current message, keeping the rest as the next message.
+
+        If the split point is inside a code fence, the fence is closed at the end of the head
+        and reopened at the start of the next message.
+
+        Returns:
+            str: The text to finalize in the current Slack message.
+        """
+        text = self.text
+        split_point = self.find_split_point(text)
+        if split_point is None:
+            head = text.encode("utf-8")[: self.max_bytes].decode("utf-8", "ignore")
+            fence_opener = next(
+                (
+                    line_start.fence_opener
+                    for line_start in reversed(self.line_starts)
+                    if line_start.char_offset <= len(head)
+                ),
+                None,
+            )
+            if fence_opener is not None:
+                head += "\n"
+        else:
+            head = text[: split_point.char_offset]
+            fence_opener = split_point.fence_opener
+        tail = text[len(head) :]
+        if fence_opener is not None:
+            head += "```"
+            tail = f"{fence_opener}\n{tail}"
+        self._reset()
+        self.add_text(tail)
+        return head
+
+    def find_split_point(self, text: str) -> LineStart | None:
+        """
+        Find the best line start to split the current message at.
+
+        Block boundaries outside code fences are preferred, then list items, then any line
+        start. Only line starts in the second half of the limit are considered for the
+        preferred kinds, so messages are not cut much shorter than necessary.
+
+        Args:
+            text (str): The text of the current message.
+
+        Returns:
+            Optional[LineStart]: The split point, or None if no line starts within the limit.
+        """
+        candidates = [
+            line_start
+            for line_start in self.line_starts
+            if 0 < line_start.byte_offset <= self.max_bytes
+        ]
+        if not candidates:
+            return None
+        preferred = [
+            line_start
+            for line_start in candidates
+            if line_start.byte_offset >= self.max_bytes // 2
+        ]
+        for line_start in reversed(preferred):
+            if line_start.is_block_boundary:
+                return line_start
+        for line_start in reversed(preferred):
+            if line_start.fence_opener is None and LIST_ITEM_PATTERN.match(
+                text, line_start.char_offset
+            ):
+                return line_start
+        return candidates[-1]
@@ -0,0 +1,65 @@
+"""
+This module contains logic for caching the converted text of Slack replies, so only new or
+edited replies are converted again on each turn of a conversation.
+"""
+
+from collections import OrderedDict
+
+ReplyTextCacheKey = tuple[str, str, str | None, int, str | None, int]
+
+
+def build_reply_text_cache_key(
+    *,
+    channel_id: str | None,
+    reply: dict,
+    bot_user_id: str | None,
+    config_key: int,
+) -> ReplyTextCacheKey | None:
+    """
+    Build the cache key of a reply's converted text.
+
+    Args:
+        channel_id (Optional[str]): The ID of the channel containing the reply.
+        reply (dict): The Slack reply.
+        bot_user_id (Optional[str]): The bot's user ID, whose mention is removed from the text.
+        config_key (int): The hash of the settings that change the conversion.
+
+    Returns:
+        Optional[ReplyTextCacheKey]: The key, or None if the reply cannot be identified.
+    """
+    ts = reply.get("ts")
+    if channel_id is None or ts is None:
+        return None
+    edited_ts = (reply.get("edited") or {}).get("ts")
+    # Updates made with chat.update do not always set "edited", so the text is part of the key
+    text_hash = hash(reply.get("text", ""))
+    return channel_id, ts, edited_ts, text_hash, bot_user_id, config_key
+
+
+class ReplyTextCache:
+    """LRU cache of converted reply texts."""
+
+    def __init__(self, *, max_entries: int):
+        """Initialize an empty cache holding up to `max_entries` texts."""
+        self.max_entries = max_entries
+        self._texts: OrderedDict[ReplyTextCacheKey, str] = OrderedDict()
+
+    def __len__(self) -> int:
+        """Return the number of cached texts."""
+        return len(self._texts)
+
+    def get(self, key: ReplyTextCacheKey) -> str | None:
+        """Return the cached text, marking it as recently used."""
+        text = self._texts.get(key)
+        if text is not None:
+            self._texts.move_to_end(key)
+        return text
+
+    def put(self, key: ReplyTextCacheKey, text: str) -> None:
+        """Cache a text, evicting the least recently used texts."""
+        if self.max_entries <= 0:
+            return
+        self._texts[key] = text
+        self._texts.move_to_end(key)
+        while len(self._texts) > self.max_entries:
+            self._texts.popitem(last=False)
@@ -0,0 +1,40 @@
+"""
+Service functions for the converted reply text cache shared by all incoming posts.
+"""
+
+import threading
+
+from app.env import REPLY_TEXT_CACHE_SIZE
+from app.reply_text_cache_logic import ReplyTextCache, ReplyTextCacheKey
+
+reply_text_cache = ReplyTextCache(max_entries=REPLY_TEXT_CACHE_SIZE)
+_reply_text_cache_lock = threading.Lock()
+
+
+def get_cached_reply_text(key: ReplyTextCacheKey) -> str | None:
+    """
+    Get the converted text of a reply.
+
+    Args:
+        key (ReplyTextCacheKey): The key built from the reply and the conversion settings.
+
+    Returns:
+        Optional[str]: The converted text, or None if not cached.
+    """
+    with _reply_text_cache_lock:
+        return reply_text_cache.get(key)
+
+
+def store_reply_text(key: ReplyTextCacheKey, text: str) -> None:
+    """
+    Cache the converted text of a reply.
+
+    Args:
+        key (ReplyTextCacheKey): The key built from the reply and the conversion settings.
+        text (str): The converted text.
+
+    Returns:
+        None
+    """
+    with _reply_text_cache_lock:
+        reply_text_cache.put(key, text)
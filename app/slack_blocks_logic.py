@@ -0,0 +1,468 @@
+"""
+This module contains logic for rendering assistant replies as Slack Block Kit blocks, either as
+a `markdown` block rendered by Slack or as a `rich_text` block built from the reply's Markdown.
+
+Unlike the mrkdwn conversion, the reply's Markdown is parsed into structured elements, so nested
+emphasis, lists, code blocks and tables keep their structure. While a reply is streamed, the
+elements of its stable prefix are built once and cached, so each update only parses the tail.
+"""
+
+import re
+
+from app.slack_format_logic import is_wide_char
+
+REPLY_FORMAT_TEXT = "text"
+REPLY_FORMAT_MARKDOWN = "markdown"
+REPLY_FORMAT_RICH_TEXT = "rich_text"
+REPLY_FORMATS = (REPLY_FORMAT_TEXT, REPLY_FORMAT_MARKDOWN, REPLY_FORMAT_RICH_TEXT)
+# Slack rejects deeper list indents
+MAX_LIST_INDENT = 8
+
+FENCE_PATTERN = re.compile(r"^\s*```")
+HEADING_PATTERN = re.compile(r"^\s{0,3}#{1,6}\s+(.*?)(?:\s+#+)?\s*$")
+LIST_ITEM_PATTERN = re.compile(r"^( *)(?:([-*+])|(\d{1,9})[.)])\s+(.*)$")
+QUOTE_PATTERN = re.compile(r"^\s{0,3}> ?(.*)$")
+TABLE_ROW_PATTERN = re.compile(r"^\s*\|.*\|\s*$")
+TABLE_DELIMITER_PATTERN = re.compile(r"^\s*\|?\s*:?-+:?\s*(?:\|\s*:?-+:?\s*)*\|?\s*$")
+# Alternatives are tried in order at each position, so code and links win over emphasis
+INLINE_PATTERN = re.compile(
+    r"```(?P<code_block>[^\n]+?)```"
+    r"|`(?P<code>[^`\n]+)`"
+    r"|\[(?P<link_text>[^\]\n]+)\]\((?P<link_url>[^)\s]+)\)"
+    r"|<(?P<angle_url>https?://[^>|\s]+)(?:\|(?P<angle_url_text>[^>\n]+))?>"
+    r"|<@(?P<user_id>[UW][A-Z0-9]+)>"
+    r"|<#(?P<channel_id>C[A-Z0-9]+)(?:\|[^>\n]*)?>"
+    r"|(?P<url>https?://[^\s<>()\[\]]*[^\s<>()\[\].,;:!?'\"])"
+    r"|(?<![\w:]):(?P<emoji>[a-z0-9_+'-]*[a-z][a-z0-9_+'-]*):(?![\w:])"
+    r"|\*\*\*(?=\S)(?P<bold_italic>.+?)(?<=\S)\*\*\*"
+    r"|\*\*(?=\S)(?P<bold>.+?)(?<=\S)\*\*"
+    r"|(?<!\w)__(?=\S)(?P<underscore_bold>.+?)(?<=\S)__(?!\w)"
+    r"|~~(?=\S)(?P<strike>.+?)(?<=\S)~~"
+    r"|(?<!\*)\*(?=[^\s*])(?P<italic>[^*\n]+?)(?<=\S)\*(?!\*)"
+    r"|(?<!\w)_(?=[^\s_])(?P<underscore_italic>[^_\n]+?)(?<=\S)_(?!\w)"
+)
+# Emphasis groups and the styles they add to their content
+EMPHASIS_STYLES = {
+    "bold_italic": {"bold": True, "italic": True},
+    "bold": {"bold": True},
+    "underscore_bold": {"bold": True},
+    "strike": {"strike": True},
+    "italic": {"italic": True},
+    "underscore_italic": {"italic": True},
+}
+
+
+def build_text_element(text: str, style: dict | None = None) -> dict:
+    """Build a rich text `text` element, with a style if any."""
+    element: dict = {"type": "text", "text": text}
+    if style:
+        element["style"] = dict(style)
+    return element
+
+
+def render_inline_match(match: re.Match, style: dict) -> list[dict]:
+    """
+    Build the rich text elements of an inline Markdown match.
+
+    Args:
+        match (re.Match): The match of `INLINE_PATTERN`.
+        style (dict): The style of the text surrounding the match.
+
+    Returns:
+        list[dict]: The elements for the match.
+    """
+    if (code := match["code_block"] or match["code"]) is not None:
+        return [build_text_element(code, {**style, "code": True})]
+    if match["link_text"] is not None:
+        link = {"type": "link", "url": match["link_url"], "text": match["link_text"]}
+        if style:
+            link["style"] = dict(style)
+        return [link]
+    if (url := match["angle_url"] or match["url"]) is not None:
+        link = {"type": "link", "url": url}
+        if match["angle_url_text"]:
+            link["text"] = match["angle_url_text"]
+        if style:
+            link["style"] = dict(style)
+        return [link]
+    if match["user_id"] is not None:
+        return [{"type": "user", "user_id": match["user_id"]}]
+    if match["channel_id"] is not None:
+        return [{"type": "channel", "channel_id": match["channel_id"]}]
+    if match["emoji"] is not None:
+        return [{"type": "emoji", "name": match["emoji"]}]
+    # Each emphasis group is the only group of its alternative
+    group = match.lastgroup
+    if group is None:
+        raise ValueError("match.lastgroup cannot be None")
+    return parse_inline_markdown(
+        match.group(group), {**style, **EMPHASIS_STYLES[group]}
+    )
+
+
+def parse_inline_markdown(text: str, style: dict | None = None) -> list[dict]:
+    """
+    Parse inline Markdown into rich text elements, nesting emphasis into combined styles.
+
+    Args:
+        text (str): The Markdown text of a paragraph, list item or quote.
+        style (Optional[dict]): The style applied to all of the text.
+
+    Returns:
+        list[dict]: The rich text elements of the text.
+    """
+    style = style or {}
+    elements: list[dict] = []
+    position = 0
+    for match in INLINE_PATTERN.finditer(text):
+        if match.start() > position:
+            elements.append(build_text_element(text[position : match.start()], style))
+        elements.extend(render_inline_match(match, style))
+        position = match.end()
+    if position < len(text):
+        elements.append(build_text_element(text[position:], style))
+    return elements
+
+
+def build_plain_text(text: str) -> str:
+    """Remove inline Markdown from text, keeping the text of links, mentions and emoji."""
+    parts = []
+    for element in parse_inline_markdown(text):
+        if element["type"] == "text":
+            parts.append(element["text"])
+        elif element["type"] == "link":
+            parts.append(element.get("text", element["url"]))
+        elif element["type"] == "emoji":
+            parts.append(f":{element['name']}:")
+        elif element["type"] == "user":
+            parts.append(f"<@{element['user_id']}>")
+        else:
+            parts.append(f"<#{element['channel_id']}>")
+    return "".join(parts)
+
+
+def get_display_width(text: str) -> int:
+    """Return the number of monospace columns the text takes up."""
+    return sum(2 if is_wide_char(char) else 1 for char in text)
+
+
+def render_table(rows: list[str]) -> str:
+    """
+    Render Markdown table rows as monospace text with aligned columns, since rich text has no
+    table element.
+
+    Args:
+        rows (list[str]): The table rows, with the delimiter row second.
+
+    Returns:
+        str: The table as aligned text.
+    """
+    cells = [
+        [build_plain_text(cell.strip()) for cell in row.strip().strip("|").split("|")]
+        for index, row in enumerate(rows)
+        if index != 1
+    ]
+    column_count = max(len(row) for row in cells)
+    for row in cells:
+        row.extend([""] * (column_count - len(row)))
+    widths = [
+        max(get_display_width(row[column]) for row in cells)
+        for column in range(column_count)
+    ]
+
+    def render_row(row: list[str]) -> str:
+        return " | ".join(
+            cell + " " * (width - get_display_width(cell))
+            for cell, width in zip(row, widths, strict=True)
+        ).rstrip()
+
+    lines = [render_row(cells[0]), "-+-".join("-" * width for width in widths)]
+    lines.extend(render_row(row) for row in cells[1:])
+    return "\n".join(lines)
+
+
+def is_block_start(lines: list[str], index: int) -> bool:
+    """Check if the line starts a block other than a paragraph."""
+    line = lines[index]
+    return bool(
+        FENCE_PATTERN.match(line)
+        or HEADING_PATTERN.match(line)
+        or LIST_ITEM_PATTERN.match(line)
+        or QUOTE_PATTERN.match(line)
+        or is_table_start(lines, index)
+    )
+
+
+def is_table_start(lines: list[str], index: int) -> bool:
+    """Check if the line is a table header followed by a delimiter row."""
+    return (
+        index + 1 < len(lines)
+        and TABLE_ROW_PATTERN.match(lines[index]) is not None
+        and TABLE_DELIMITER_PATTERN.match(lines[index + 1]) is not None
+    )
+
+
+def build_section(elements: list[dict], lines: list[str], end: int) -> dict:
+    """Build a section, ending with a newline if a blank line follows it."""
+    if end < len(lines) and not lines[end].strip():
+        elements.append(build_text_element("\n"))
+    return {"type": "rich_text_section", "elements": elements}
+
+
+def build_lists(items: list[tuple[int, str, int, str]]) -> list[dict]:
+    """
+    Build rich text lists from list items, starting a new list at each change of indent or
+    style, as Slack requires.
+
+    Args:
+        items (list[tuple[int, str, int, str]]): The indent, style, number and text of each
+            item.
+
+    Returns:
+        list[dict]: The `rich_text_list` elements.
+    """
+    lists: list[dict] = []
+    for indent, style, number, text in items:
+        last: dict | None = lists[-1] if lists else None
+        if last is None or last["indent"] != indent or last["style"] != style:
+            last = {"type": "rich_text_list", "style": style, "indent": indent}
+            if style == "ordered" and number > 1:
+                last["offset"] = number - 1
+            last["elements"] = []
+            lists.append(last)
+        section_elements = parse_inline_markdown(text) or [build_text_element(" ")]
+        last["elements"].append(
+            {"type": "rich_text_section", "elements": section_elements}
+        )
+    return lists
+
+
+def render_rich_text_elements(content: str) -> list[dict]:
+    """
+    Render Markdown as the elements of a `rich_text` block.
+
+    Paragraphs and headings become sections, lists become lists, fenced code and tables become
+    preformatted text, and quotes become quotes. Every block ends at a blank line, so content
+    split at a paragraph break renders as the elements of both parts. An unclosed code block is
+    rendered up to the end of the content, as it is while being streamed.
+
+    Args:
+        content (str): The Markdown content.
+
+    Returns:
+        list[dict]: The rich text elements.
+    """
+    elements: list[dict] = []
+    lines = content.split("\n")
+    index = 0
+    while index < len(lines):
+        line = lines[index]
+        if not line.strip():
+            index += 1
+        elif FENCE_PATTERN.match(line):
+            # The text after the opening fence is a language tag, which Slack doesn't render
+            end = index + 1
+            while end < len(lines) and not FENCE_PATTERN.match(lines[end]):
+                end += 1
+            code = "\n".join(lines[index + 1 : end])
+            if code:
+                elements.append(
+                    {
+                        "type": "rich_text_preformatted",
+                        "elements": [build_text_element(code)],
+                    }
+                )
+            index = end + 1
+        elif heading := HEADING_PATTERN.match(line):
+            section_elements = parse_inline_markdown(heading[1], {"bold": True})
+            index += 1
+            if section_elements:
+                elements.append(build_section(section_elements, lines, index))
+        elif is_table_start(lines, index):
+            end = index + 2
+            while end < len(lines) and TABLE_ROW_PATTERN.match(lines[end]):
+                end += 1
+            elements.append(
+                {
+                    "type": "rich_text_preformatted",
+                    "elements": [build_text_element(render_table(lines[index:end]))],
+                }
+            )
+            index = end
+        elif LIST_ITEM_PATTERN.match(line):
+            items: list[tuple[int, str, int, str]] = []
+            open_indents: list[int] = []
+            while index < len(lines) and lines[index].strip():
+                item = LIST_ITEM_PATTERN.match(lines[index])
+                if item is None:
+                    if is_block_start(lines, index):
+                        break
+                    # A continuation line belongs to the previous item
+                    indent, style, number, text = items[-1]
+                    items[-1] = (
+                        indent,
+                        style,
+                        number,
+                        f"{text}\n{lines[index].strip()}",
+                    )
+                    index += 1
+                    continue
+                spaces = len(item[1])
+                while open_indents and open_indents[-1] > spaces:
+                    open_indents.pop()
+                if not open_indents or open_indents[-1] < spaces:
+                    open_indents.append(spaces)
+                items.append(
+                    (
+                        min(len(open_indents) - 1, MAX_LIST_INDENT),
+                        "bullet" if item[2] else "ordered",
+                        int(item[3] or 1),
+                        item[4],
+                    )
+                )
+                index += 1
+            elements.extend(build_lists(items))
+        elif QUOTE_PATTERN.match(line):
+            quote_lines = []
+            while index < len(lines) and (quote := QUOTE_PATTERN.match(lines[index])):
+                quote_lines.append(quote[1])
+                index += 1
+            quote_elements = parse_inline_markdown("\n".join(quote_lines))
+            if quote_elements:
+                elements.append({"type": "rich_text_quote", "elements": quote_elements})
+        else:
+            paragraph_lines = [line]
+            index += 1
+            while (
+                index < len(lines)
+                and lines[index].strip()
+                and not is_block_start(lines, index)
+            ):
+                paragraph_lines.append(lines[index])
+                index += 1
+            section_elements = parse_inline_markdown("\n".join(paragraph_lines))
+            elements.append(build_section(section_elements, lines, index))
+    return elements
+
+
+def find_stable_elements_end(content: str) -> int:
+    """
+    Find the end of the last paragraph break in the content outside code blocks.
+
+    Code blocks are found as `render_rich_text_elements` finds them, opened and closed only by
+    fences at the start of a line, so "```" inside code or text does not move the break.
+
+    Args:
+        content (str): The content to search.
+
+    Returns:
+        int: The index of the line after the paragraph break, or 0 if there is none.
+    """
+    stable_end = 0
+    is_in_code = False
+    start = 0
+    while start < len(content):
+        end = content.find("\n", start)
+        if end < 0:
+            end = len(content)
+        line = content[start:end]
+        if (
+            not is_in_code
+            and line
+            and not line[0].isspace()
+            and content.startswith("\n\n", start - 2)
+        ):
+            stable_end = start
+        if FENCE_PATTERN.match(line):
+            is_in_code = not is_in_code
+        start = end + 1
+    return stable_end
+
+
+def render_rich_text_block(content: str, cache: dict | None = None) -> dict | None:
+    """
+    Render Markdown as a `rich_text` block, reusing the cached elements of its stable prefix.
+
+    The prefix up to the last paragraph break outside code blocks is rendered once and
+    cached, so each call while a reply is streamed only renders the remaining tail. Every block
+    ends at a paragraph break, so the result is identical to rendering the whole content with
+    `render_rich_text_elements`.
+
+    Args:
+        content (str): The formatted assistant reply.
+        cache (Optional[dict]): The render cache for this reply, updated in place.
+
+    Returns:
+        Optional[dict]: The block, or None if the content renders no elements.
+    """
+    if cache is None:
+        cache = {}
+    source = cache.get("blocks_source", "")
+    elements = cache.get("blocks_elements", [])
+    if not content.startswith(source):
+        source, elements = "", []
+    tail = content[len(source) :]
+
+    cut = find_stable_elements_end(tail)
+    if cut > 0:
+        source += tail[:cut]
+        elements = elements + render_rich_text_elements(tail[:cut])
+        tail = tail[cut:]
+    cache["blocks_source"] = source
+    cache["blocks_elements"] = elements
+
+    elements = elements + render_rich_text_elements(tail)
+    if not elements:
+        return None
+    return {"type": "rich_text", "elements": elements}
+
+
+def render_reply_blocks(
+    *, content: str, reply_format: str, cache: dict | None = None
+) -> list[dict] | None:
+    """
+    Render the formatted assistant reply as blocks in the given reply format.
+
+    Args:
+        content (str): The formatted assistant reply, in Markdown.
+        reply_format (str): One of `REPLY_FORMATS`.
+        cache (Optional[dict]): The render cache for this reply, updated in place.
+
+    Returns:
+        Optional[list[dict]]: The blocks, which are empty if the content renders nothing, or
+            None for the plain text format, which sends no blocks.
+    """
+    if reply_format == REPLY_FORMAT_MARKDOWN:
+        return [{"type": "markdown", "text": content}] if content.strip() else []
+    if reply_format == REPLY_FORMAT_RICH_TEXT:
+        block = render_rich_text_block(content, cache)
+        return [block] if block is not None else []
+    return None
+
+
+def append_loading_character(blocks: list[dict], loading_character: str) -> list[dict]:
+    """
+    Append the loading character to the end of the reply blocks, without changing them.
+
+    Args:
+        blocks (list[dict]): The blocks from `render_reply_blocks`.
+        loading_character (str): The text shown while the reply is being written.
+
+    Returns:
+        list[dict]: A copy of the blocks with the loading character at the end.
+    """
+    if not blocks:
+        return blocks
+    last = blocks[-1]
+    if last["type"] == "markdown":
+        return [*blocks[:-1], {**last, "text": last["text"] + loading_character}]
+    loading_elements = parse_inline_markdown(loading_character)
+    elements = list(last["elements"])
+    if elements and elements[-1]["type"] == "rich_text_section":
+        elements[-1] = {
+            **elements[-1],
+            "elements": elements[-1]["elements"] + loading_elements,
+        }
+    else:
+        elements.append({"type": "rich_text_section", "elements": loading_elements})
+    return [*blocks[:-1], {**last, "elements": elements}]
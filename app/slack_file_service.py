@@ -1,10 +1,139 @@
 """
 This module provides a function to download files from Slack.
+
+Downloads share long-lived HTTP clients, so connections to Slack's file servers are kept alive
+and reused across files instead of being opened with a new TLS handshake for each one.
 """
 
+import asyncio
+import logging
+import threading
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from importlib.util import find_spec
+from typing import Any
+
 import httpx
 from slack_sdk.errors import SlackApiError
 
+from app.connection_stats_logic import ConnectionReuseStats, HostConnectionStats
+from app.env import (
+    SLACK_FILE_HTTP2_ENABLED,
+    SLACK_FILE_KEEPALIVE_SECONDS,
+    SLACK_FILE_MAX_CONNECTIONS,
+    SLACK_FILE_MAX_KEEPALIVE_CONNECTIONS,
+)
+
+SLACK_FILE_TIMEOUT_SECONDS = 10
+
+http_client: httpx.Client | None = None
+async_http_client: httpx.AsyncClient | None = None
+_async_http_client_loop: asyncio.AbstractEventLoop | None = None
+_http_client_lock = threading.Lock()
+connection_stats = ConnectionReuseStats()
+_connection_stats_lock = threading.Lock()
+
+
+def build_http_client_options() -> dict[str, Any]:
+    """
+    Build the options shared by the sync and async HTTP clients.
+
+    HTTP/2 needs the optional `h2` package, so it is only enabled if that is installed.
+
+    Returns:
+        dict[str, Any]: The keyword arguments for `httpx.Client` and `httpx.AsyncClient`.
+    """
+    http2 = SLACK_FILE_HTTP2_ENABLED
+    if http2 and find_spec("h2") is None:
+        logging.warning(
+            "HTTP/2 is disabled for Slack file downloads, since the h2 package is not "
+            "installed. Install httpx[http2] to enable it."
+        )
+        http2 = False
+    return {
+        # Downloads use the bot token of each workspace, so no cookies are kept between them
+        "cookies": CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+        "http2": http2,
+        "limits": httpx.Limits(
+            max_connections=SLACK_FILE_MAX_CONNECTIONS,
+            max_keepalive_connections=SLACK_FILE_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=SLACK_FILE_KEEPALIVE_SECONDS,
+        ),
+        "timeout": SLACK_FILE_TIMEOUT_SECONDS,
+        "follow_redirects": True,
+    }
+
+
+def get_http_client() -> httpx.Client:
+    """
+    Get the HTTP client shared by all Slack file downloads, creating it on first use.
+
+    Returns:
+        httpx.Client: The shared client.
+    """
+    global http_client
+    with _http_client_lock:
+        if http_client is None:
+            http_client = httpx.Client(**build_http_client_options())
+        return http_client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    Get the async HTTP client shared by all Slack file downloads on the running event loop.
+
+    A client's connections belong to the event loop that opened them, so a new client is
+    created if the loop has changed, and the old one is closed on its own loop.
+
+    Returns:
+        httpx.AsyncClient: The shared client.
+    """
+    global async_http_client, _async_http_client_loop
+    loop = asyncio.get_running_loop()
+    with _http_client_lock:
+        if async_http_client is not None and _async_http_client_loop is loop:
+            return async_http_client
+        old_client, old_loop = async_http_client, _async_http_client_loop
+        async_http_client = httpx.AsyncClient(**build_http_client_options())
+        _async_http_client_loop = loop
+        client = async_http_client
+    if old_client is not None and old_loop is not None and not old_loop.is_closed():
+        asyncio.run_coroutine_threadsafe(old_client.aclose(), old_loop)
+    return client
+
+
+def record_connection_event(event_name: str, info: dict[str, Any]) -> None:
+    """Count a trace event of a download in the connection reuse statistics."""
+    with _connection_stats_lock:
+        connection_stats.record(event_name, info)
+
+
+async def async_record_connection_event(event_name: str, info: dict[str, Any]) -> None:
+    """Count a trace event of an async download in the connection reuse statistics."""
+    record_connection_event(event_name, info)
+
+
+def get_connection_stats() -> dict[str, HostConnectionStats]:
+    """
+    Get how often the connections of Slack file downloads were reused.
+
+    Returns:
+        dict[str, HostConnectionStats]: A snapshot of the counts of each host.
+    """
+    with _connection_stats_lock:
+        return connection_stats.snapshot()
+
+
+def log_connection_stats() -> None:
+    """Log the connection reuse statistics summed over all hosts."""
+    if not logging.getLogger().isEnabledFor(logging.DEBUG):
+        return
+    with _connection_stats_lock:
+        total = connection_stats.total()
+    logging.debug(
+        f"Slack file downloads reused connections for {total.reused_requests} of "
+        f"{total.requests} requests ({total})"
+    )
+
 
 def get_slack_file_content(
     *,
@@ -23,12 +152,66 @@ def get_slack_file_content(
     Returns:
         - bytes: The content of the Slack file.
     """
-    response = httpx.get(
+    response = get_http_client().get(
+        url,
+        headers={"Authorization": f"Bearer {token}"},
+        extensions={"trace": record_connection_event},
+    )
+    log_connection_stats()
+    return extract_slack_file_content(
+        url=url,
+        response=response,
+        expected_content_types=expected_content_types,
+    )
+
+
+async def async_get_slack_file_content(
+    *,
+    url: str,
+    token: str,
+    expected_content_types: list[str],
+) -> bytes:
+    """
+    Get the content of a Slack file without blocking the event loop.
+
+    Args:
+        - url (str): The URL of the Slack file.
+        - token (str): The bot token for Slack API.
+        - expected_content_types (list[str]): A list of expected content types.
+
+    Returns:
+        - bytes: The content of the Slack file.
+    """
+    response = await get_async_http_client().get(
         url,
         headers={"Authorization": f"Bearer {token}"},
-        timeout=10,
-        follow_redirects=True,
+        extensions={"trace": async_record_connection_event},
     )
+    log_connection_stats()
+    return extract_slack_file_content(
+        url=url,
+        response=response,
+        expected_content_types=expected_content_types,
+    )
+
+
+def extract_slack_file_content(
+    *,
+    url: str,
+    response: httpx.Response,
+    expected_content_types: list[str],
+) -> bytes:
+    """
+    Validate a Slack file download response and return its content.
+
+    Args:
+        - url (str): The URL of the Slack file.
+        - response (httpx.Response): The download response.
+        - expected_content_types (list[str]): A list of expected content types.
+
+    Returns:
+        - bytes: The content of the Slack file.
+    """
     if response.status_code != 200:
         raise SlackApiError(
             f"Request to {url} failed with status code {response.status_code}", response
@@ -0,0 +1,340 @@
+"""
+This module contains the formatting engine that converts replies between Markdown and Slack
+mrkdwn.
+
+Every pattern is compiled once. The content is split into text and code spans in a single
+tokenizing scan, and each rule scans all text segments in one call, or none if its marker is
+missing. The rules of one direction still run in order, because they build on each other's
+output, as in "**a *b* c**".
+"""
+
+import re
+import unicodedata
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import cache
+
+# Leading newlines and a prepended Slack user ID are removed from the start of replies
+REPLY_START_PATTERN = re.compile(r"\A\n*(?:<@U.*?>\s?:\s?)?")
+# Streamed text that may still grow into a speaker prefix, such as "\n<@U12" or "<@U123>:"
+REPLY_START_PENDING_PATTERN = re.compile(
+    r"\A\n*(?:<(?:@(?:U[^>\n]*(?:>\s?(?::\s?)?)?)?)?)?\Z"
+)
+# Code block tags are removed, since Slack doesn't render them in a message
+CODE_BLOCK_LANGUAGE_PATTERNS = (
+    "[Rr]ust",
+    "[Rr]uby",
+    "[Ss]cala",
+    "[Kk]otlin",
+    "[Jj]ava",
+    "[Gg]o",
+    "[Ss]wift",
+    "[Oo]objective[Cc]",
+    "[Cc]",
+    "[Cc][+][+]",
+    "[Cc][Pp][Pp]",
+    "[Cc]sharp",
+    "[Mm][Aa][Tt][Ll][Aa][Bb]",
+    "[Jj][Ss][Oo][Nn]",
+    "[Ll]a[Tt]e[Xx]",
+    "[Ll][Uu][Aa]",
+    "[Cc][Mm][Aa][Kk][Ee]",
+    "bash",
+    "zsh",
+    "sh",
+    "[Ss][Qq][Ll]",
+    "[Pp][Hh][Pp]",
+    "[Pp][Ee][Rr][Ll]",
+    "[Jj]ava[Ss]cript",
+    "[Ty]ype[Ss]cript",
+    "[Pp]ython",
+)
+# One group per language, so the matched language is known from `Match.lastindex`
+CODE_BLOCK_LANGUAGE_TAG = (
+    r"\s*(?:" + "|".join(f"({p})" for p in CODE_BLOCK_LANGUAGE_PATTERNS) + r")\n"
+)
+CODE_BLOCK_TAG_PATTERN = re.compile("```" + CODE_BLOCK_LANGUAGE_TAG)
+CODE_BLOCK_NEXT_TAG_PATTERN = re.compile(CODE_BLOCK_LANGUAGE_TAG)
+CODE_SPAN_PATTERN = re.compile(r"```.+?```|`[^`\n]+?`", re.DOTALL)
+# Joins the text segments between code spans, so that each rule scans all of them in one call.
+# No rule matches across a newline, so the segments cannot affect each other.
+SEGMENT_SEPARATOR = "\n\ue000\n"
+
+
+@dataclass(frozen=True)
+class FormattingRule:
+    """A substitution applied to text outside code, if the text contains its marker."""
+
+    marker: str
+    pattern: re.Pattern
+    replacement: str | Callable[[re.Match], str]
+
+    def apply(self, text: str) -> str:
+        """Apply the substitution, skipping the scan when the marker is missing."""
+        if self.marker not in text:
+            return text
+        return self.pattern.sub(self.replacement, text)
+
+
+@cache
+def is_wide_char(char: str) -> bool:
+    """
+    Check if a character is East Asian wide or fullwidth, such as CJK, Hiragana, Katakana,
+    Hangul, Bopomofo and fullwidth punctuation.
+
+    Args:
+        char (str): The character to check.
+
+    Returns:
+        bool: True if the character is wide and not a space, False otherwise.
+    """
+    return not char.isspace() and unicodedata.east_asian_width(char) in ("W", "F")
+
+
+def space_wide_neighbors(match: re.Match) -> str:
+    """
+    Surround a match with ASCII spaces where it touches wide characters, since Slack doesn't
+    render mrkdwn markup next to them.
+
+    Args:
+        match (re.Match): The markup found in the text.
+
+    Returns:
+        str: The markup, with a space on each side that touches a wide character.
+    """
+    text, start, end = match.string, match.start(), match.end()
+    left = " " if start > 0 and is_wide_char(text[start - 1]) else ""
+    right = " " if end < len(text) and is_wide_char(text[end]) else ""
+    return left + match.group() + right
+
+
+MARKDOWN_TO_MRKDWN_RULES = (
+    # ***bold italic*** to _*bold italic*_
+    FormattingRule(
+        "***",
+        re.compile(r"\*\*\*(?!\s)([^\*\n]+?)(?<!\s)\*\*\*"),
+        r"_*\1*_",
+    ),
+    # *italic* to _italic_
+    FormattingRule(
+        "*",
+        re.compile(r"(?<![\*_])\*(?!\s)([^\*\n]+?)(?<!\s)\*(?![\*_])"),
+        r"_\1_",
+    ),
+    # **bold** to *bold*
+    FormattingRule("**", re.compile(r"\*\*(?!\s)([^\*\n]+?)(?<!\s)\*\*"), r"*\1*"),
+    # __bold__ to *bold*
+    FormattingRule("__", re.compile(r"__(?!\s)([^_\n]+?)(?<!\s)__"), r"*\1*"),
+    # ~~strike~~ to ~strike~
+    FormattingRule("~~", re.compile(r"~~(?!\s)([^~\n]+?)(?<!\s)~~"), r"~\1~"),
+)
+MRKDWN_SPACING_RULES = (
+    # _*bold italic*_
+    FormattingRule("_*", re.compile(r"_\*(?!\s)(.+?)(?<!\s)\*_"), space_wide_neighbors),
+    # *bold*
+    FormattingRule(
+        "*", re.compile(r"\*(?!\s)([^\*\n]+?)(?<!\s)\*"), space_wide_neighbors
+    ),
+    # _italic_
+    FormattingRule("_", re.compile(r"_(?!\s)([^_\n]+?)(?<!\s)_"), space_wide_neighbors),
+    # ~strike~
+    FormattingRule("~", re.compile(r"~(?!\s)([^~\n]+?)(?<!\s)~"), space_wide_neighbors),
+)
+MRKDWN_TO_MARKDOWN_RULES = (
+    # *bold* to **bold**
+    FormattingRule("*", re.compile(r"\*(?!\s)([^\*\n]+?)(?<!\s)\*"), r"**\1**"),
+    # _italic_ to *italic*
+    FormattingRule("_", re.compile(r"_(?!\s)([^_\n]+?)(?<!\s)_"), r"*\1*"),
+    # ~strike~ to ~~strike~~
+    FormattingRule("~", re.compile(r"~(?!\s)([^~\n]+?)(?<!\s)~"), r"~~\1~~"),
+)
+
+
+def split_code_spans(content: str) -> list[str]:
+    """
+    Split content into text segments and the code blocks and inline code between them.
+
+    Args:
+        content (str): The content to split.
+
+    Returns:
+        list[str]: Text and code segments alternately, starting and ending with text, which may
+            be empty. A text segment starting with a backtick is left as is, like code.
+    """
+    segments = []
+    position = 0
+    for match in CODE_SPAN_PATTERN.finditer(content):
+        segments.append(content[position : match.start()])
+        segments.append(match.group())
+        position = match.end()
+    segments.append(content[position:])
+    return segments
+
+
+def is_code_segment(segment: str) -> bool:
+    """Check if a segment from `split_code_spans` is left unconverted."""
+    return segment.startswith("`")
+
+
+def has_stray_backtick(content: str) -> bool:
+    """
+    Check if content has a backtick outside complete code spans.
+
+    Args:
+        content (str): The content to check.
+
+    Returns:
+        bool: True if a code span is still open, False otherwise.
+    """
+    return any("`" in segment for segment in split_code_spans(content)[::2])
+
+
+def apply_rules(text: str, rules: tuple[FormattingRule, ...]) -> str:
+    """Apply formatting rules in order to a text segment."""
+    for rule in rules:
+        text = rule.apply(text)
+    return text
+
+
+def strip_reply_start(content: str) -> str:
+    """Remove leading newlines and a "<@U...>: " speaker prefix from the start of a reply."""
+    return REPLY_START_PATTERN.sub("", content, count=1)
+
+
+def strip_streamed_reply_start(content: str, *, is_final: bool) -> str | None:
+    """
+    Remove the start of a reply that is being streamed, as `strip_reply_start` does.
+
+    Streamed text cannot be taken back, so nothing is returned while the start of the reply
+    may still become a speaker prefix.
+
+    Args:
+        content (str): The reply received so far.
+        is_final (bool): Whether the reply is complete.
+
+    Returns:
+        Optional[str]: The reply without its start, or None if it should not be sent yet.
+    """
+    if not is_final and REPLY_START_PENDING_PATTERN.match(content):
+        return None
+    return strip_reply_start(content)
+
+
+def strip_code_block_tags(content: str) -> str:
+    """
+    Remove language tags after opening code fences.
+
+    A fence followed by several lines of language names, such as "```rust\\ngo\\n", loses
+    each further name listed after the previous one in `CODE_BLOCK_LANGUAGE_PATTERNS`.
+
+    Args:
+        content (str): The content to clean.
+
+    Returns:
+        str: The content with "```" and a newline in place of each removed tag.
+    """
+    match = CODE_BLOCK_TAG_PATTERN.search(content)
+    if match is None:
+        return content
+    parts = []
+    position = 0
+    while match is not None:
+        end, language = match.end(), match.lastindex or 0
+        while (
+            next_match := CODE_BLOCK_NEXT_TAG_PATTERN.match(content, end)
+        ) is not None and (next_match.lastindex or 0) > language:
+            end, language = next_match.end(), next_match.lastindex or 0
+        parts.append(content[position : match.start()])
+        parts.append("```\n")
+        position = end
+        match = CODE_BLOCK_TAG_PATTERN.search(content, position)
+    parts.append(content[position:])
+    return "".join(parts)
+
+
+def convert_text_segments(
+    segments: list[str], convert: Callable[[str], str]
+) -> list[str]:
+    """
+    Convert the text segments from `split_code_spans` in a single call, leaving code as is.
+
+    Args:
+        segments (list[str]): The text and code segments.
+        convert (Callable[[str], str]): The conversion of text outside code.
+
+    Returns:
+        list[str]: The segments with each text segment converted.
+    """
+    indexes = [
+        index
+        for index in range(0, len(segments), 2)
+        if not is_code_segment(segments[index])
+    ]
+    texts = [segments[index] for index in indexes]
+    if len(texts) <= 1 or any(SEGMENT_SEPARATOR[1] in text for text in texts):
+        converted_texts = [convert(text) for text in texts]
+    else:
+        converted_texts = convert(SEGMENT_SEPARATOR.join(texts)).split(
+            SEGMENT_SEPARATOR
+        )
+    converted = list(segments)
+    for index, text in zip(indexes, converted_texts, strict=True):
+        converted[index] = text
+    return converted
+
+
+def convert_markdown_text(text: str) -> str:
+    """Convert Markdown emphasis in text outside code, and space it from wide characters."""
+    text = apply_rules(text, MARKDOWN_TO_MRKDWN_RULES)
+    # ASCII text has no wide characters to space
+    if text.isascii():
+        return text
+    return apply_rules(text, MRKDWN_SPACING_RULES)
+
+
+def markdown_to_mrkdwn(content: str) -> str:
+    """
+    Convert Markdown emphasis outside code to Slack mrkdwn, and space markup and code spans
+    that touch wide characters.
+
+    Args:
+        content (str): The input string in Markdown format.
+
+    Returns:
+        str: The converted string in Slack mrkdwn format.
+    """
+    segments = split_code_spans(content)
+    converted = convert_text_segments(segments, convert_markdown_text)
+    parts: list[str] = []
+    last_char = ""
+    for index, segment in enumerate(converted):
+        if is_code_segment(segments[index]):
+            if last_char and is_wide_char(last_char):
+                parts.append(" ")
+            parts.append(segment)
+            following = segments[index + 1] if index + 1 < len(segments) else ""
+            if following and is_wide_char(following[0]):
+                parts.append(" ")
+        else:
+            parts.append(segment)
+        if parts[-1]:
+            last_char = parts[-1][-1]
+    return "".join(parts)
+
+
+def mrkdwn_to_markdown(content: str) -> str:
+    """
+    Convert Slack mrkdwn emphasis outside code to Markdown.
+
+    Args:
+        content (str): The input string in Slack mrkdwn format.
+
+    Returns:
+        str: The converted string in Markdown format.
+    """
+    segments = split_code_spans(content)
+    return "".join(
+        convert_text_segments(
+            segments, lambda text: apply_rules(text, MRKDWN_TO_MARKDOWN_RULES)
+        )
+    )
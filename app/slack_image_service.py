@@ -2,13 +2,19 @@
 This module provides functionality to handle images from Slack files.
 """
 
+import asyncio
 import logging
 from io import BytesIO
 
 from PIL import Image
 
-from app.message_logic import build_image_url_item
-from app.slack_file_service import get_slack_file_content
+from app.file_cache_service import (
+    async_get_cached_slack_file_data_url,
+    cache_slack_file,
+    get_cached_slack_file_data_url,
+)
+from app.message_logic import build_image_url_item_from_data_url
+from app.slack_file_service import async_get_slack_file_content, get_slack_file_content
 
 SUPPORTED_IMAGE_FORMATS = ["jpeg", "png", "gif", "webp"]
 SUPPORTED_IMAGE_MIME_TYPES = [f"image/{fmt}" for fmt in SUPPORTED_IMAGE_FORMATS]
@@ -20,7 +26,7 @@ def build_image_url_items_from_slack_files(
     files: list[dict] | None,
 ) -> list[dict]:
     """
-    Build image URL items from Slack files.
+    Build image URL items from Slack files, downloading only the files not cached yet.
 
     Args:
         - bot_token (str): The bot token for Slack API.
@@ -30,10 +36,94 @@ def build_image_url_items_from_slack_files(
         - list[dict]: A list of dictionaries containing image content.
     """
     image_url_items: list[dict] = []
-    if not files:
-        return image_url_items
+    for file_url, mime_type, file_id in find_image_files(files):
+        if (data_url := get_cached_slack_file_data_url(file_id)) is not None:
+            image_url_items.append(build_image_url_item_from_data_url(data_url))
+            continue
+        image_bytes = get_slack_file_content(
+            url=file_url,
+            token=bot_token,
+            expected_content_types=SUPPORTED_IMAGE_MIME_TYPES,
+        )
+        image_url_item = build_validated_image_url_item(
+            file_url=file_url,
+            mime_type=mime_type,
+            file_id=file_id,
+            image_bytes=image_bytes,
+        )
+        if image_url_item is not None:
+            image_url_items.append(image_url_item)
+
+    return image_url_items
+
+
+async def async_build_image_url_items_from_slack_files(
+    *,
+    bot_token: str,
+    files: list[dict] | None,
+) -> list[dict]:
+    """
+    Build image URL items from Slack files, downloading the files not cached yet concurrently.
 
-    for file in files:
+    Args:
+        - bot_token (str): The bot token for Slack API.
+        - files (Optional[list[dict]]): The list of files from Slack.
+
+    Returns:
+        - list[dict]: A list of dictionaries containing image content.
+    """
+    image_files = find_image_files(files)
+    data_urls = [
+        await async_get_cached_slack_file_data_url(file_id)
+        for _, _, file_id in image_files
+    ]
+    contents = iter(
+        await asyncio.gather(
+            *(
+                async_get_slack_file_content(
+                    url=file_url,
+                    token=bot_token,
+                    expected_content_types=SUPPORTED_IMAGE_MIME_TYPES,
+                )
+                for (file_url, _, _), data_url in zip(
+                    image_files, data_urls, strict=True
+                )
+                if data_url is None
+            )
+        )
+    )
+    image_url_items: list[dict] = []
+    for (file_url, mime_type, file_id), data_url in zip(
+        image_files, data_urls, strict=True
+    ):
+        if data_url is not None:
+            image_url_items.append(build_image_url_item_from_data_url(data_url))
+            continue
+        image_url_item = build_validated_image_url_item(
+            file_url=file_url,
+            mime_type=mime_type,
+            file_id=file_id,
+            image_bytes=next(contents),
+        )
+        if image_url_item is not None:
+            image_url_items.append(image_url_item)
+
+    return image_url_items
+
+
+def find_image_files(files: list[dict] | None) -> list[tuple[str, str, str | None]]:
+    """
+    Find supported image files that can be downloaded.
+
+    Args:
+        - files (Optional[list[dict]]): The list of files from Slack.
+
+    Returns:
+        - list[tuple[str, str, Optional[str]]]: The private URL, MIME type and ID of each
+            image file.
+    """
+    image_files: list[tuple[str, str, str | None]] = []
+    for file in files or []:
         mime_type = file.get("mimetype")
         if mime_type not in SUPPORTED_IMAGE_MIME_TYPES:
             continue
@@ -41,26 +131,40 @@ def build_image_url_items_from_slack_files(
         if file_url is None:
             logging.warning("Skipped an image file due to missing 'url_private'")
             continue
+        image_files.append((file_url, mime_type, file.get("id")))
+    return image_files
 
-        image_bytes = get_slack_file_content(
-            url=file_url,
-            token=bot_token,
-            expected_content_types=SUPPORTED_IMAGE_MIME_TYPES,
-        )
-        try:
-            image = Image.open(BytesIO(image_bytes))
-        except Exception as e:
-            raise RuntimeError(f"Failed to open an image data: {e}") from e
-        if image.format is None:
-            logging.warning(f"Skipped image with unknown format (url: {file_url})")
-            continue
-        if image.format.lower() not in SUPPORTED_IMAGE_FORMATS:
-            logging.info(
-                f"Skipped unsupported image (url: {file_url}, format: {image.format})"
-            )
-            continue
 
-        image_url_item = build_image_url_item(mime_type, image_bytes)
-        image_url_items.append(image_url_item)
+def build_validated_image_url_item(
+    *,
+    file_url: str,
+    mime_type: str,
+    file_id: str | None = None,
+    image_bytes: bytes,
+) -> dict | None:
+    """
+    Build an image URL item if the downloaded data is a supported image, and cache the image.
 
-    return image_url_items
+    Args:
+        - file_url (str): The URL of the Slack file.
+        - mime_type (str): The MIME type of the Slack file.
+        - file_id (Optional[str]): The ID of the Slack file, used as the cache key.
+        - image_bytes (bytes): The downloaded image data.
+
+    Returns:
+        - Optional[dict]: The image URL item, or None if the image is not supported.
+    """
+    try:
+        image = Image.open(BytesIO(image_bytes))
+    except Exception as e:
+        raise RuntimeError(f"Failed to open an image data: {e}") from e
+    if image.format is None:
+        logging.warning(f"Skipped image with unknown format (url: {file_url})")
+        return None
+    if image.format.lower() not in SUPPORTED_IMAGE_FORMATS:
+        logging.info(
+            f"Skipped unsupported image (url: {file_url}, format: {image.format})"
+        )
+        return None
+    data_url = cache_slack_file(file_id=file_id, mime_type=mime_type, data=image_bytes)
+    return build_image_url_item_from_data_url(data_url)
@@ -2,10 +2,19 @@
 This module provides functionality to handle PDFs from Slack files.
 """
 
+import asyncio
 import logging
 
-from app.message_logic import build_pdf_file_item
-from app.slack_file_service import get_slack_file_content
+from app.file_cache_service import (
+    async_get_cached_slack_file_data_url,
+    cache_slack_file,
+    get_cached_slack_file_data_url,
+)
+from app.message_logic import build_pdf_file_item_from_data_url
+from app.slack_file_service import async_get_slack_file_content, get_slack_file_content
+
+PDF_MIME_TYPE = "application/pdf"
+PDF_CONTENT_TYPES = [PDF_MIME_TYPE, "binary/octet-stream"]
 
 
 def build_pdf_file_items_from_slack_files(
@@ -16,7 +25,7 @@ def build_pdf_file_items_from_slack_files(
     used_pdf_slots: int = 0,
 ) -> list[dict]:
     """
-    Build PDF file items from Slack files.
+    Build PDF file items from Slack files, downloading only the files not cached yet.
 
     Args:
         - bot_token (str): The bot token for Slack API.
@@ -28,29 +37,139 @@ def build_pdf_file_items_from_slack_files(
         - list[dict]: A list of dictionaries containing PDF file content.
     """
     pdf_file_items: list[dict] = []
-    if not files:
-        return pdf_file_items
-
-    for file in files:
+    for file_url, filename, file_id in find_pdf_files(files):
         if len(pdf_file_items) >= (pdf_slots - used_pdf_slots):
             break
-        if file.get("mimetype") != "application/pdf":
+        if (data_url := get_cached_slack_file_data_url(file_id)) is not None:
+            pdf_file_items.append(build_pdf_file_item_from_data_url(filename, data_url))
             continue
-        file_url = file.get("url_private")
-        if file_url is None:
-            logging.warning("Skipped a PDF file due to missing 'url_private'")
-            continue
-
         pdf_bytes = get_slack_file_content(
             url=file_url,
             token=bot_token,
-            expected_content_types=["application/pdf", "binary/octet-stream"],
+            expected_content_types=PDF_CONTENT_TYPES,
         )
-        if not pdf_bytes.startswith(b"%PDF-"):
-            logging.warning(f"Skipped invalid PDF (url: {file_url})")
-            continue
+        file_item = build_validated_pdf_file_item(
+            file_url=file_url,
+            filename=filename,
+            file_id=file_id,
+            pdf_bytes=pdf_bytes,
+        )
+        if file_item is not None:
+            pdf_file_items.append(file_item)
+
+    return pdf_file_items
+
+
+async def async_build_pdf_file_items_from_slack_files(
+    *,
+    bot_token: str,
+    files: list[dict] | None,
+    pdf_slots: int = 5,
+    used_pdf_slots: int = 0,
+) -> list[dict]:
+    """
+    Build PDF file items from Slack files, downloading the files not cached yet up to the free
+    slots concurrently.
 
-        file_item = build_pdf_file_item(file.get("name"), pdf_bytes)
-        pdf_file_items.append(file_item)
+    Args:
+        - bot_token (str): The bot token for Slack API.
+        - files (Optional[list[dict]]): The list of files from Slack.
+        - pdf_slots (int): The number of PDF slots available.
+        - used_pdf_slots (int): The number of PDF slots already used.
+
+    Returns:
+        - list[dict]: A list of dictionaries containing PDF file content.
+    """
+    pdf_file_items: list[dict] = []
+    pdf_files = find_pdf_files(files)
+    while pdf_files and len(pdf_file_items) < (pdf_slots - used_pdf_slots):
+        free_slots = pdf_slots - used_pdf_slots - len(pdf_file_items)
+        batch, pdf_files = pdf_files[:free_slots], pdf_files[free_slots:]
+        data_urls = [
+            await async_get_cached_slack_file_data_url(file_id)
+            for _, _, file_id in batch
+        ]
+        contents = iter(
+            await asyncio.gather(
+                *(
+                    async_get_slack_file_content(
+                        url=file_url,
+                        token=bot_token,
+                        expected_content_types=PDF_CONTENT_TYPES,
+                    )
+                    for (file_url, _, _), data_url in zip(batch, data_urls, strict=True)
+                    if data_url is None
+                )
+            )
+        )
+        for (file_url, filename, file_id), data_url in zip(
+            batch, data_urls, strict=True
+        ):
+            if data_url is not None:
+                pdf_file_items.append(
+                    build_pdf_file_item_from_data_url(filename, data_url)
+                )
+                continue
+            file_item = build_validated_pdf_file_item(
+                file_url=file_url,
+                filename=filename,
+                file_id=file_id,
+                pdf_bytes=next(contents),
+            )
+            if file_item is not None:
+                pdf_file_items.append(file_item)
 
     return pdf_file_items
+
+
+def find_pdf_files(
+    files: list[dict] | None,
+) -> list[tuple[str, str | None, str | None]]:
+    """
+    Find PDF files that can be downloaded.
+
+    Args:
+        - files (Optional[list[dict]]): The list of files from Slack.
+
+    Returns:
+        - list[tuple[str, Optional[str], Optional[str]]]: The private URL, name and ID of each
+            PDF file.
+    """
+    pdf_files: list[tuple[str, str | None, str | None]] = []
+    for file in files or []:
+        if file.get("mimetype") != PDF_MIME_TYPE:
+            continue
+        file_url = file.get("url_private")
+        if file_url is None:
+            logging.warning("Skipped a PDF file due to missing 'url_private'")
+            continue
+        pdf_files.append((file_url, file.get("name"), file.get("id")))
+    return pdf_files
+
+
+def build_validated_pdf_file_item(
+    *,
+    file_url: str,
+    filename: str | None,
+    file_id: str | None = None,
+    pdf_bytes: bytes,
+) -> dict | None:
+    """
+    Build a PDF file item if the downloaded data is a PDF, and cache the PDF.
+
+    Args:
+        - file_url (str): The URL of the Slack file.
+        - filename (Optional[str]): The name of the PDF file.
+        - file_id (Optional[str]): The ID of the Slack file, used as the cache key.
+        - pdf_bytes (bytes): The downloaded PDF data.
+
+    Returns:
+        - Optional[dict]: The PDF file item, or None if the data is not a PDF.
+    """
+    if not pdf_bytes.startswith(b"%PDF-"):
+        logging.warning(f"Skipped invalid PDF (url: {file_url})")
+        return None
+    data_url = cache_slack_file(
+        file_id=file_id, mime_type=PDF_MIME_TYPE, data=pdf_bytes
+    )
+    return build_pdf_file_item_from_data_url(filename, data_url)
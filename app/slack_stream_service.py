@@ -0,0 +1,251 @@
+"""
+Service classes for streaming replies with Slack's chat.startStream, chat.appendStream and
+chat.stopStream methods.
+"""
+
+import logging
+import threading
+
+from slack_sdk.errors import SlackApiError
+from slack_sdk.web import SlackResponse, WebClient
+from slack_sdk.web.async_client import AsyncSlackResponse, AsyncWebClient
+
+from app.env import SLACK_STREAMING_API_ENABLED
+
+# Errors meaning the methods cannot be used by this app or workspace at all
+SLACK_STREAMING_UNSUPPORTED_ERRORS = frozenset(
+    {
+        "unknown_method",
+        "not_allowed_token_type",
+        "missing_scope",
+        "feature_not_enabled",
+    }
+)
+
+slack_streaming_unsupported = threading.Event()
+
+
+def is_slack_streaming_available() -> bool:
+    """
+    Check if replies can be streamed with the Slack streaming methods.
+
+    Returns:
+        bool: True if streaming is enabled and has not turned out to be unsupported.
+    """
+    return SLACK_STREAMING_API_ENABLED and not slack_streaming_unsupported.is_set()
+
+
+class ReplyStreamState:
+    """Tracks which part of a reply has already been sent to a Slack message stream."""
+
+    def __init__(
+        self,
+        *,
+        channel: str,
+        thread_ts: str,
+        user_id: str | None,
+        team_id: str | None,
+        wip_reply: dict | SlackResponse | AsyncSlackResponse,
+    ):
+        """Initialize the state for a stream that has not started yet."""
+        self.channel = channel
+        self.thread_ts = thread_ts
+        self.user_id = user_id
+        self.team_id = team_id
+        self.wip_reply = wip_reply
+        self.ts: str | None = None
+        self.is_unavailable = False
+        self.is_stopped = False
+        self.sent_content = ""
+
+    @property
+    def started_ts(self) -> str:
+        """Return the timestamp of the stream message, which exists once the stream started."""
+        if self.ts is None:
+            raise ValueError("The reply stream has not started")
+        return self.ts
+
+    def find_delta(self, assistant_content: str) -> str | None:
+        """Return the text to append, or None if the content no longer extends the sent text."""
+        if not assistant_content.startswith(self.sent_content):
+            return None
+        return assistant_content[len(self.sent_content) :]
+
+    def handle_start_error(self, e: SlackApiError) -> None:
+        """Give up on streaming this reply, and on streaming at all if it is unsupported."""
+        error = e.response.get("error")
+        logging.warning(
+            "Falling back to chat.update for %s: chat.startStream failed: %s",
+            self.channel,
+            error,
+        )
+        self.is_unavailable = True
+        if error in SLACK_STREAMING_UNSUPPORTED_ERRORS:
+            slack_streaming_unsupported.set()
+
+    def mark_started(self, ts: str) -> str | None:
+        """Record the stream message and return the placeholder timestamp to delete."""
+        self.ts = ts
+        wip_message = self.wip_reply["message"]
+        if not wip_message:
+            return None
+        placeholder_ts = wip_message["ts"]
+        wip_message["ts"] = ts
+        wip_message["text"] = self.sent_content
+        return placeholder_ts
+
+
+class SlackReplyStream(ReplyStreamState):
+    """
+    Sends a reply as a Slack message stream, uploading only the text added since the last call.
+
+    The stream message replaces the loading reply when the first text arrives. If the
+    streaming methods are unavailable, `send` returns False so the caller can fall back to
+    chat.update.
+    """
+
+    def __init__(self, *, client: WebClient, **kwargs):
+        """Initialize a stream for the in-progress reply."""
+        super().__init__(**kwargs)
+        self.client = client
+
+    def send(self, assistant_content: str, *, is_final: bool = False) -> bool:
+        """
+        Send the new part of the reply, stopping the stream if the reply is complete.
+
+        Args:
+            assistant_content (str): The accumulated content of this Slack message.
+            is_final (bool): Whether this is the complete content of the message.
+
+        Returns:
+            bool: True if the reply was sent as a stream, False if the caller should fall back.
+        """
+        if self.is_unavailable or self.is_stopped:
+            return False
+        delta = self.find_delta(assistant_content)
+        if self.ts is None:
+            if not assistant_content or not self._start(assistant_content):
+                return False
+            delta = ""
+        elif delta is None:
+            # The final content was cut before text already streamed; replace it instead
+            self._stop(None)
+            return False
+        if is_final:
+            self._stop(delta)
+        elif delta:
+            self.client.chat_appendStream(
+                channel=self.channel,
+                ts=self.started_ts,
+                markdown_text=delta,
+            )
+        self.sent_content = assistant_content
+        return True
+
+    def _start(self, assistant_content: str) -> bool:
+        """Start the stream and delete the loading reply it replaces."""
+        try:
+            response = self.client.chat_startStream(
+                channel=self.channel,
+                thread_ts=self.thread_ts,
+                markdown_text=assistant_content,
+                recipient_user_id=self.user_id,
+                recipient_team_id=self.team_id,
+            )
+        except SlackApiError as e:
+            self.handle_start_error(e)
+            return False
+        self.sent_content = assistant_content
+        placeholder_ts = self.mark_started(response["ts"])
+        if placeholder_ts is not None:
+            try:
+                self.client.chat_delete(channel=self.channel, ts=placeholder_ts)
+            except SlackApiError as e:
+                logging.debug("Failed to delete the loading reply: %s", e)
+        return True
+
+    def _stop(self, delta: str | None) -> None:
+        """Stop the stream, appending the last delta if there is one."""
+        self.is_stopped = True
+        self.client.chat_stopStream(
+            channel=self.channel,
+            ts=self.started_ts,
+            markdown_text=delta or None,
+        )
+
+
+class AsyncSlackReplyStream(ReplyStreamState):
+    """
+    Sends a reply as a Slack message stream with the AsyncWebClient.
+
+    See `SlackReplyStream` for the behavior.
+    """
+
+    def __init__(self, *, client: AsyncWebClient, **kwargs):
+        """Initialize a stream for the in-progress reply."""
+        super().__init__(**kwargs)
+        self.client = client
+
+    async def send(self, assistant_content: str, *, is_final: bool = False) -> bool:
+        """
+        Send the new part of the reply, stopping the stream if the reply is complete.
+
+        Args:
+            assistant_content (str): The accumulated content of this Slack message.
+            is_final (bool): Whether this is the complete content of the message.
+
+        Returns:
+            bool: True if the reply was sent as a stream, False if the caller should fall back.
+        """
+        if self.is_unavailable or self.is_stopped:
+            return False
+        delta = self.find_delta(assistant_content)
+        if self.ts is None:
+            if not assistant_content or not await self._start(assistant_content):
+                return False
+            delta = ""
+        elif delta is None:
+            # The final content was cut before text already streamed; replace it instead
+            await self._stop(None)
+            return False
+        if is_final:
+            await self._stop(delta)
+        elif delta:
+            await self.client.chat_appendStream(
+                channel=self.channel,
+                ts=self.started_ts,
+                markdown_text=delta,
+            )
+        self.sent_content = assistant_content
+        return True
+
+    async def _start(self, assistant_content: str) -> bool:
+        """Start the stream and delete the loading reply it replaces."""
+        try:
+            response = await self.client.chat_startStream(
+                channel=self.channel,
+                thread_ts=self.thread_ts,
+                markdown_text=assistant_content,
+                recipient_user_id=self.user_id,
+                recipient_team_id=self.team_id,
+            )
+        except SlackApiError as e:
+            self.handle_start_error(e)
+            return False
+        self.sent_content = assistant_content
+        placeholder_ts = self.mark_started(response["ts"])
+        if placeholder_ts is not None:
+            try:
+                await self.client.chat_delete(channel=self.channel, ts=placeholder_ts)
+            except SlackApiError as e:
+                logging.debug("Failed to delete the loading reply: %s", e)
+        return True
+
+    async def _stop(self, delta: str | None) -> None:
+        """Stop the stream, appending the last delta if there is one."""
+        self.is_stopped = True
+        await self.client.chat_stopStream(
+            channel=self.channel,
+            ts=self.started_ts,
+            markdown_text=delta or None,
+        )
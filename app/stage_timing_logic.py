@@ -0,0 +1,76 @@
+"""
+This module contains logic for timing the stages of handling a Slack post, including stages that
+run concurrently.
+"""
+
+import time
+from collections.abc import Awaitable, Callable, Generator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import ParamSpec, TypeVar
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class StageTiming:
+    """The time a stage started, relative to the start of the request, and how long it took."""
+
+    name: str
+    start_seconds: float
+    duration_seconds: float
+
+
+class StageTimer:
+    """Records the timing of each stage of a request."""
+
+    def __init__(self, *, clock: Callable[[], float] = time.perf_counter):
+        """Initialize a timer whose request starts now, reading times from `clock`."""
+        self.clock = clock
+        self.started_at = clock()
+        self.stages: list[StageTiming] = []
+
+    @contextmanager
+    def measure(self, name: str) -> Generator[None]:
+        """Record how long the body of the `with` statement takes, even if it raises."""
+        start = self.clock()
+        try:
+            yield
+        finally:
+            # list.append is atomic, so stages running in other threads can record safely
+            self.stages.append(
+                StageTiming(
+                    name=name,
+                    start_seconds=start - self.started_at,
+                    duration_seconds=self.clock() - start,
+                )
+            )
+
+    def call(
+        self, name: str, func: Callable[P, T], /, *args: P.args, **kwargs: P.kwargs
+    ) -> T:
+        """Call a function as a stage, such as one submitted to an executor."""
+        with self.measure(name):
+            return func(*args, **kwargs)
+
+    async def call_async(self, name: str, awaitable: Awaitable[T], /) -> T:
+        """Await a coroutine as a stage, such as one run as a task."""
+        with self.measure(name):
+            return await awaitable
+
+    def format_summary(self) -> str:
+        """
+        Format the stages in the order they started, followed by the total time.
+
+        Returns:
+            str: The summary, such as "translate 12ms (at 0ms), history 530ms (at 1ms),
+                total 540ms".
+        """
+        parts = [
+            f"{stage.name} {stage.duration_seconds * 1000:.0f}ms"
+            f" (at {stage.start_seconds * 1000:.0f}ms)"
+            for stage in sorted(self.stages, key=lambda s: s.start_seconds)
+        ]
+        parts.append(f"total {(self.clock() - self.started_at) * 1000:.0f}ms")
+        return ", ".join(parts)
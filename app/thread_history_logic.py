@@ -0,0 +1,225 @@
+"""
+This module contains logic for caching the replies of Slack threads between posts.
+"""
+
+from bisect import bisect_left
+from collections import OrderedDict
+from dataclasses import dataclass
+
+# The fields of Slack files read when building the history, including the ID that keys the
+# file cache, and the size and creation time that tell a replaced file apart
+FILE_KEYS = ("id", "mimetype", "url_private", "name", "size", "created")
+
+
+@dataclass(frozen=True, slots=True)
+class ThreadReply:
+    """The fields of a Slack reply that are used to build the conversation history."""
+
+    ts: str
+    text: str
+    user: str | None = None
+    username: str | None = None
+    bot_id: str | None = None
+    files: tuple[dict, ...] | None = None
+    edited_ts: str | None = None
+
+
+def parse_ts(ts: str) -> tuple[int, int]:
+    """
+    Parse a Slack timestamp into a sortable key.
+
+    Args:
+        ts (str): The Slack timestamp, such as "1700000000.000100".
+
+    Returns:
+        tuple[int, int]: The seconds and the fractional part.
+    """
+    seconds, _, fraction = ts.partition(".")
+    return int(seconds), int(fraction or 0)
+
+
+def build_thread_reply(message: dict) -> ThreadReply:
+    """
+    Build a compact record from a Slack message.
+
+    Args:
+        message (dict): The Slack message from an API response or an event.
+
+    Returns:
+        ThreadReply: The record keeping only the fields used for the conversation history.
+    """
+    files = message.get("files")
+    return ThreadReply(
+        ts=message["ts"],
+        text=message.get("text", ""),
+        user=message.get("user"),
+        username=message.get("username"),
+        bot_id=message.get("bot_id"),
+        files=None
+        if files is None
+        else tuple({k: file[k] for k in FILE_KEYS if k in file} for file in files),
+        edited_ts=(message.get("edited") or {}).get("ts"),
+    )
+
+
+def convert_thread_reply_to_dict(reply: ThreadReply) -> dict:
+    """
+    Convert a record back into a Slack message dictionary.
+
+    Args:
+        reply (ThreadReply): The record to convert.
+
+    Returns:
+        dict: The Slack message with the cached fields that are set.
+    """
+    message = {"ts": reply.ts, "text": reply.text, "bot_id": reply.bot_id}
+    if reply.user is not None:
+        message["user"] = reply.user
+    if reply.username is not None:
+        message["username"] = reply.username
+    if reply.files is not None:
+        message["files"] = [dict(file) for file in reply.files]
+    if reply.edited_ts is not None:
+        message["edited"] = {"ts": reply.edited_ts}
+    return message
+
+
+def upsert_thread_reply(replies: list[ThreadReply], reply: ThreadReply) -> None:
+    """
+    Insert a record in timestamp order, replacing the record with the same timestamp.
+
+    Args:
+        replies (list[ThreadReply]): The records of a thread, sorted by timestamp.
+        reply (ThreadReply): The record to insert.
+
+    Returns:
+        None
+    """
+    key = parse_ts(reply.ts)
+    index = bisect_left(replies, key, key=lambda r: parse_ts(r.ts))
+    if index < len(replies) and replies[index].ts == reply.ts:
+        replies[index] = reply
+    else:
+        replies.insert(index, reply)
+
+
+def has_thread_reply(replies: list[ThreadReply], ts: str) -> bool:
+    """
+    Check if a record with the given timestamp exists.
+
+    Args:
+        replies (list[ThreadReply]): The records of a thread, sorted by timestamp.
+        ts (str): The timestamp to look for.
+
+    Returns:
+        bool: True if the record exists, False otherwise.
+    """
+    index = bisect_left(replies, parse_ts(ts), key=lambda r: parse_ts(r.ts))
+    return index < len(replies) and replies[index].ts == ts
+
+
+def remove_thread_reply(replies: list[ThreadReply], ts: str) -> None:
+    """
+    Remove the record with the given timestamp if it exists.
+
+    Args:
+        replies (list[ThreadReply]): The records of a thread, sorted by timestamp.
+        ts (str): The timestamp of the record to remove.
+
+    Returns:
+        None
+    """
+    index = bisect_left(replies, parse_ts(ts), key=lambda r: parse_ts(r.ts))
+    if index < len(replies) and replies[index].ts == ts:
+        del replies[index]
+
+
+def find_thread_event_change(
+    payload: dict,
+) -> tuple[str | None, dict | None, str | None]:
+    """
+    Find how a Slack message event changes its thread.
+
+    Args:
+        payload (dict): The payload of the message event.
+
+    Returns:
+        tuple[Optional[str], Optional[dict], Optional[str]]: The thread timestamp, the message
+            to insert or replace, and the timestamp of the message to remove.
+    """
+    subtype = payload.get("subtype")
+    if subtype == "message_changed":
+        message = payload.get("message") or {}
+        return message.get("thread_ts"), message, None
+    if subtype == "message_deleted":
+        previous_message = payload.get("previous_message") or {}
+        return previous_message.get("thread_ts"), None, payload.get("deleted_ts")
+    return payload.get("thread_ts"), payload, None
+
+
+class ThreadHistoryCache:
+    """LRU cache of thread replies keyed by channel and thread timestamp."""
+
+    def __init__(self, *, max_threads: int):
+        """Initialize an empty cache holding up to `max_threads` threads."""
+        self.max_threads = max_threads
+        self._threads: OrderedDict[tuple[str, str], list[ThreadReply]] = OrderedDict()
+
+    def __len__(self) -> int:
+        """Return the number of cached threads."""
+        return len(self._threads)
+
+    def get(self, channel: str, thread_ts: str) -> list[ThreadReply] | None:
+        """Return a copy of the cached records of a thread, marking it as recently used."""
+        replies = self._threads.get((channel, thread_ts))
+        if replies is None:
+            return None
+        self._threads.move_to_end((channel, thread_ts))
+        return list(replies)
+
+    def put(self, channel: str, thread_ts: str, replies: list[ThreadReply]) -> None:
+        """Cache the records of a thread, evicting the least recently used threads."""
+        if self.max_threads <= 0:
+            return
+        self._threads[(channel, thread_ts)] = sorted(
+            replies, key=lambda r: parse_ts(r.ts)
+        )
+        self._threads.move_to_end((channel, thread_ts))
+        while len(self._threads) > self.max_threads:
+            self._threads.popitem(last=False)
+
+    def merge(
+        self, channel: str, thread_ts: str, replies: list[ThreadReply]
+    ) -> list[ThreadReply] | None:
+        """Insert or replace records of a cached thread and return a copy of its records."""
+        cached = self._threads.get((channel, thread_ts))
+        if cached is None:
+            return None
+        for reply in replies:
+            upsert_thread_reply(cached, reply)
+        return list(cached)
+
+    def apply_event(self, channel: str, payload: dict) -> bool:
+        """
+        Apply a message event to its thread if the thread is cached.
+
+        Args:
+            channel (str): The ID of the channel the event belongs to.
+            payload (dict): The payload of the message event.
+
+        Returns:
+            bool: True if a cached thread was changed, False otherwise.
+        """
+        thread_ts, message, deleted_ts = find_thread_event_change(payload)
+        if thread_ts is None:
+            return False
+        cached = self._threads.get((channel, thread_ts))
+        if cached is None:
+            return False
+        if message is not None and "ts" in message:
+            upsert_thread_reply(cached, build_thread_reply(message))
+            return True
+        if deleted_ts is not None:
+            remove_thread_reply(cached, deleted_ts)
+            return True
+        return False
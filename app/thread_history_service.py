@@ -0,0 +1,83 @@
+"""
+Service functions for the thread history cache shared by all incoming posts.
+"""
+
+import threading
+
+from app.env import THREAD_HISTORY_CACHE_SIZE
+from app.thread_history_logic import (
+    ThreadHistoryCache,
+    ThreadReply,
+    build_thread_reply,
+)
+
+thread_history_cache = ThreadHistoryCache(max_threads=THREAD_HISTORY_CACHE_SIZE)
+_thread_history_cache_lock = threading.Lock()
+
+
+def record_thread_message_event(channel_id: str, payload: dict) -> None:
+    """
+    Apply a message event to the cached history of its thread, if the thread is cached.
+
+    Args:
+        channel_id (str): The ID of the channel the event belongs to.
+        payload (dict): The payload of the message event.
+
+    Returns:
+        None
+    """
+    with _thread_history_cache_lock:
+        thread_history_cache.apply_event(channel_id, payload)
+
+
+def get_cached_thread_replies(
+    channel_id: str, thread_ts: str
+) -> list[ThreadReply] | None:
+    """
+    Get the cached records of a thread.
+
+    Args:
+        channel_id (str): The ID of the channel containing the thread.
+        thread_ts (str): The timestamp of the parent post.
+
+    Returns:
+        Optional[list[ThreadReply]]: The records sorted by timestamp, or None if not cached.
+    """
+    with _thread_history_cache_lock:
+        return thread_history_cache.get(channel_id, thread_ts)
+
+
+def store_thread_replies(channel_id: str, thread_ts: str, messages: list[dict]) -> None:
+    """
+    Cache the full history of a thread fetched from Slack.
+
+    Args:
+        channel_id (str): The ID of the channel containing the thread.
+        thread_ts (str): The timestamp of the parent post.
+        messages (list[dict]): All messages in the thread.
+
+    Returns:
+        None
+    """
+    replies = [build_thread_reply(message) for message in messages]
+    with _thread_history_cache_lock:
+        thread_history_cache.put(channel_id, thread_ts, replies)
+
+
+def merge_thread_replies(
+    channel_id: str, thread_ts: str, messages: list[dict]
+) -> list[ThreadReply] | None:
+    """
+    Add messages fetched after a gap to the cached history of a thread.
+
+    Args:
+        channel_id (str): The ID of the channel containing the thread.
+        thread_ts (str): The timestamp of the parent post.
+        messages (list[dict]): The messages newer than the cached ones.
+
+    Returns:
+        Optional[list[ThreadReply]]: The merged records, or None if the thread was evicted.
+    """
+    replies = [build_thread_reply(message) for message in messages]
+    with _thread_history_cache_lock:
+        return thread_history_cache.merge(channel_id, thread_ts, replies)
@@ -2,6 +2,7 @@
 This module provides service functions for tools.
 """
 
+import asyncio
 import json
 import logging
 from importlib import import_module
@@ -12,16 +13,19 @@ from litellm.types.utils import ChatCompletionMessageToolCall, Message
 from app.env import TOOLS_MODULE_NAME
 from app.mcp.config_service import get_no_auth_servers
 from app.mcp.no_auth_tools_service import (
+    async_process_no_auth_mcp_tool_call,
     get_no_auth_mcp_tools,
     process_no_auth_mcp_tool_call,
 )
 from app.mcp.oauth_tools_logic import parse_mcp_tool_name
 from app.mcp.oauth_tools_service import (
+    async_process_oauth_mcp_tool_call,
     expire_old_oauth_sessions,
     get_flattened_user_oauth_mcp_tools,
     process_oauth_mcp_tool_call,
 )
 from app.message_logic import build_tool_message
+from app.redaction_service import maybe_redact_tool_arguments, maybe_redact_tool_result
 from app.tools_logic import is_mcp_tool_name, load_classic_tools
 
 classic_tools: list[dict] | None = None
@@ -128,17 +132,18 @@ def process_tool_call(
         logging.warning("Skipped tool call with empty name: %s", tool_call)
         return
 
+    arguments = maybe_redact_tool_arguments(json.loads(tool_call.function.arguments))
     if not is_mcp_tool_name(tool_name) and TOOLS_MODULE_NAME is not None:
         tools_module = import_module(TOOLS_MODULE_NAME)
         tool_response = process_classic_tool_call(
             tools_module=tools_module,
             tool_name=tool_name,
-            arguments=json.loads(tool_call.function.arguments),
+            arguments=arguments,
         )
         tool_message = build_tool_message(
             tool_call_id=tool_call.id,
             name=tool_name,
-            content=tool_response,
+            content=maybe_redact_tool_result(tool_response),
         )
         messages.append(tool_message)
         return
@@ -149,14 +154,14 @@ def process_tool_call(
         tool_response = process_oauth_mcp_tool_call(
             tool_call_id=tool_call.id,
             tool_name=spec_name,
-            arguments=json.loads(tool_call.function.arguments),
+            arguments=arguments,
             user_id=user_id,
             server_index=server_index,
         )
         tool_message = build_tool_message(
             tool_call_id=tool_call.id,
             name=tool_name,
-            content=tool_response,
+            content=maybe_redact_tool_result(tool_response),
         )
         messages.append(tool_message)
         return
@@ -165,16 +170,116 @@ def process_tool_call(
         server_url=no_auth_server_urls[server_index],
         tool_call_id=tool_call.id,
         tool_name=spec_name,
-        arguments=json.loads(tool_call.function.arguments),
+        arguments=arguments,
     )
     tool_message = build_tool_message(
         tool_call_id=tool_call.id,
         name=tool_name,
-        content=tool_response,
+        content=maybe_redact_tool_result(tool_response),
     )
     messages.append(tool_message)
 
 
+async def async_process_tool_calls(
+    *,
+    response_message: Message,
+    assistant_message: dict,
+    messages: list[dict],
+    user_id: str | None = None,
+) -> None:
+    """
+    Processes the tool calls in the response message concurrently on the event loop.
+
+    The tool messages are appended in the same order as the tool calls.
+
+    Args:
+        response_message (Message): The response message containing tool calls.
+        assistant_message (dict): The assistant message to update.
+        messages (list[dict]): The list of messages to include in the reply.
+        user_id (Optional[str]): User ID for authenticated tool access.
+
+    Returns:
+        None
+    """
+    if response_message.tool_calls is None:
+        return
+
+    assistant_message["tool_calls"] = response_message.model_dump()["tool_calls"]
+
+    no_auth_servers = get_no_auth_servers()
+    no_auth_server_urls = [server["url"] for server in no_auth_servers]
+
+    tool_messages = await asyncio.gather(
+        *(
+            async_process_tool_call(
+                tool_call=tool_call,
+                no_auth_server_urls=no_auth_server_urls,
+                user_id=user_id,
+            )
+            for tool_call in response_message.tool_calls
+        )
+    )
+    messages.extend(
+        tool_message for tool_message in tool_messages if tool_message is not None
+    )
+
+
+async def async_process_tool_call(
+    *,
+    tool_call: ChatCompletionMessageToolCall,
+    no_auth_server_urls: list[str],
+    user_id: str | None = None,
+) -> dict | None:
+    """
+    Processes a single tool call without blocking the event loop.
+
+    Classic tools are run in a worker thread, MCP tools are called natively.
+
+    Args:
+        tool_call (ChatCompletionMessageToolCall): The tool call to process.
+        no_auth_server_urls (list[str]): The list of no-auth MCP server URLs.
+        user_id (Optional[str]): User ID for authenticated tool access.
+
+    Returns:
+        Optional[dict]: The tool message, or None if the tool call was skipped.
+    """
+    tool_name = tool_call.function.name
+    if not tool_name:
+        logging.warning("Skipped tool call with empty name: %s", tool_call)
+        return None
+
+    arguments = maybe_redact_tool_arguments(json.loads(tool_call.function.arguments))
+    if not is_mcp_tool_name(tool_name) and TOOLS_MODULE_NAME is not None:
+        tools_module = import_module(TOOLS_MODULE_NAME)
+        tool_response = await asyncio.to_thread(
+            process_classic_tool_call,
+            tools_module=tools_module,
+            tool_name=tool_name,
+            arguments=arguments,
+        )
+    else:
+        spec_name, auth_type, server_index = parse_mcp_tool_name(tool_name)
+        if auth_type != "none" and user_id:
+            tool_response = await async_process_oauth_mcp_tool_call(
+                tool_name=spec_name,
+                arguments=arguments,
+                user_id=user_id,
+                server_index=server_index,
+            )
+        else:
+            tool_response = await async_process_no_auth_mcp_tool_call(
+                server_url=no_auth_server_urls[server_index],
+                tool_name=spec_name,
+                arguments=arguments,
+            )
+
+    return build_tool_message(
+        tool_call_id=tool_call.id,
+        name=tool_name,
+        content=maybe_redact_tool_result(tool_response),
+    )
+
+
 def process_classic_tool_call(
     *,
     tools_module: ModuleType,
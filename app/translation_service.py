@@ -4,6 +4,9 @@ Provides functionality to translate text based on the user's locale.
 
 from litellm.types.utils import ModelResponse
 
+from app.async_litellm_service import (
+    call_litellm_completion as async_call_litellm_completion,
+)
 from app.litellm_service import call_litellm_completion
 from app.translation_logic import (
     build_translation_messages,
@@ -71,3 +74,44 @@ def translate(locale: str | None, text: str) -> str:
         translated=translated,
     )
     return translated
+
+
+async def async_translate(locale: str | None, text: str) -> str:
+    """
+    Translate the given text without blocking the event loop.
+
+    Args:
+        - locale (Optional[str]): The locale string (e.g., "en-US").
+        - text (str): The text to be translated.
+
+    Returns:
+        - str: The translated text.
+    """
+    lang = get_lang_from_locale(locale, LOCALE_TO_LANG)
+    if lang is None or lang == "English":
+        return text
+
+    cached_result = get_cached_translation(
+        cache=_translation_result_cache,
+        lang=lang,
+        original=text,
+    )
+    if cached_result is not None:
+        return cached_result
+
+    response = await async_call_litellm_completion(
+        messages=build_translation_messages(lang, text),
+        temperature=1,
+        user="system",
+    )
+    if not isinstance(response, ModelResponse):
+        raise TypeError("Expected ModelResponse when streaming is disabled")
+
+    translated = response["choices"][0]["message"].get("content")
+    set_cached_translation(
+        cache=_translation_result_cache,
+        lang=lang,
+        original=text,
+        translated=translated,
+    )
+    return translated
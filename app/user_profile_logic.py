@@ -0,0 +1,72 @@
+"""
+This module contains logic for caching the Slack profile fields the app uses, such as the
+locale and the timezone of a user.
+"""
+
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True, slots=True)
+class UserProfile:
+    """The fields of a Slack user that the app uses."""
+
+    locale: str | None = None
+    tz: str | None = None
+
+
+def build_user_profile(user: dict) -> UserProfile:
+    """
+    Build a profile from a user object of users.info or users.list.
+
+    Args:
+        user (dict): The Slack user object.
+
+    Returns:
+        UserProfile: The profile keeping only the used fields.
+    """
+    return UserProfile(locale=user.get("locale"), tz=user.get("tz"))
+
+
+class UserProfileCache:
+    """LRU cache of user profiles whose entries expire after a fixed time."""
+
+    def __init__(
+        self,
+        *,
+        max_users: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize an empty cache of up to `max_users` profiles kept for `ttl_seconds`."""
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._profiles: OrderedDict[str, tuple[UserProfile, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        """Return the number of cached profiles, including expired ones not yet evicted."""
+        return len(self._profiles)
+
+    def get(self, user_id: str) -> UserProfile | None:
+        """Return the cached profile, or None if it is missing or expired."""
+        entry = self._profiles.get(user_id)
+        if entry is None:
+            return None
+        profile, expires_at = entry
+        if expires_at <= self.clock():
+            del self._profiles[user_id]
+            return None
+        self._profiles.move_to_end(user_id)
+        return profile
+
+    def put(self, user_id: str, profile: UserProfile) -> None:
+        """Cache a profile, evicting the least recently used profiles."""
+        if self.max_users <= 0:
+            return
+        self._profiles[user_id] = (profile, self.clock() + self.ttl_seconds)
+        self._profiles.move_to_end(user_id)
+        while len(self._profiles) > self.max_users:
+            self._profiles.popitem(last=False)
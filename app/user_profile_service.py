@@ -0,0 +1,132 @@
+"""
+Service functions for the user profile cache shared by all events and Home tab renders.
+"""
+
+import logging
+import threading
+
+from slack_sdk.web import WebClient
+from slack_sdk.web.async_client import AsyncWebClient
+
+from app.env import USER_PROFILE_CACHE_SIZE, USER_PROFILE_TTL_SECONDS
+from app.user_profile_logic import UserProfile, UserProfileCache, build_user_profile
+
+USERS_LIST_PAGE_SIZE = 200
+
+user_profile_cache = UserProfileCache(
+    max_users=USER_PROFILE_CACHE_SIZE,
+    ttl_seconds=USER_PROFILE_TTL_SECONDS,
+)
+_user_profile_cache_lock = threading.Lock()
+
+
+def get_cached_user_profile(user_id: str) -> UserProfile | None:
+    """
+    Get the cached profile of a user.
+
+    Args:
+        user_id (str): The ID of the user.
+
+    Returns:
+        Optional[UserProfile]: The profile, or None if not cached or expired.
+    """
+    with _user_profile_cache_lock:
+        return user_profile_cache.get(user_id)
+
+
+def store_user_profile(user: dict) -> UserProfile:
+    """
+    Cache the profile of a user object from users.info or users.list.
+
+    Args:
+        user (dict): The Slack user object.
+
+    Returns:
+        UserProfile: The cached profile.
+    """
+    profile = build_user_profile(user)
+    if user_id := user.get("id"):
+        with _user_profile_cache_lock:
+            user_profile_cache.put(user_id, profile)
+    return profile
+
+
+def get_user_profile(client: WebClient, user_id: str) -> UserProfile:
+    """
+    Get the profile of a user, calling users.info only if it is not cached.
+
+    Args:
+        client (WebClient): The Slack WebClient instance.
+        user_id (str): The ID of the user.
+
+    Returns:
+        UserProfile: The profile of the user.
+    """
+    if (profile := get_cached_user_profile(user_id)) is not None:
+        return profile
+    user_info = client.users_info(user=user_id, include_locale=True)
+    return store_user_profile({"id": user_id, **user_info.get("user", {})})
+
+
+async def async_get_user_profile(client: AsyncWebClient, user_id: str) -> UserProfile:
+    """
+    Get the profile of a user, calling users.info only if it is not cached.
+
+    Args:
+        client (AsyncWebClient): The Slack AsyncWebClient instance.
+        user_id (str): The ID of the user.
+
+    Returns:
+        UserProfile: The profile of the user.
+    """
+    if (profile := get_cached_user_profile(user_id)) is not None:
+        return profile
+    user_info = await client.users_info(user=user_id, include_locale=True)
+    return store_user_profile({"id": user_id, **user_info.get("user", {})})
+
+
+def warm_up_user_profiles(client: WebClient) -> int:
+    """
+    Cache the profiles of all users in the workspace with users.list.
+
+    Args:
+        client (WebClient): The Slack WebClient instance.
+
+    Returns:
+        int: The number of cached profiles.
+    """
+    count = 0
+    cursor = None
+    while True:
+        response = client.users_list(
+            limit=USERS_LIST_PAGE_SIZE, include_locale=True, cursor=cursor
+        )
+        for user in response.get("members", []):
+            if not user.get("deleted"):
+                store_user_profile(user)
+                count += 1
+        cursor = (response.get("response_metadata") or {}).get("next_cursor")
+        if not cursor:
+            return count
+
+
+def start_user_profile_warm_up(client: WebClient) -> None:
+    """
+    Start a background thread that caches the profiles of all users in the workspace.
+
+    Args:
+        client (WebClient): The Slack WebClient instance.
+
+    Returns:
+        None
+    """
+
+    def warm_up():
+        """Cache all profiles, logging instead of failing the app on errors."""
+        try:
+            count = warm_up_user_profiles(client)
+            logging.info(f"User profiles warmed up: {count} users")
+        except Exception as e:
+            logging.warning(f"Failed to warm up user profiles: {e}")
+
+    threading.Thread(target=warm_up, daemon=True, name="user-profile-warm-up").start()
@@ -2,9 +2,11 @@
 This module is the entry point for Collmbo, the Slack chatbot.
 
 It initializes the Slack Bolt app, sets up signal handlers for graceful shutdown,
-and starts the Socket Mode handler.
+and starts the Socket Mode handler. When SLACK_ASYNC_MODE_ENABLED is set, an AsyncApp
+serves all conversations on a single asyncio event loop instead.
 """
 
+import asyncio
 import logging
 import os
 import re
@@ -15,19 +17,38 @@ from types import FrameType
 
 from slack_bolt import Ack, App
 from slack_bolt.adapter.socket_mode import SocketModeHandler
+from slack_bolt.adapter.socket_mode.async_handler import AsyncSocketModeHandler
+from slack_bolt.app.async_app import AsyncApp
+from slack_bolt.context.ack.async_ack import AsyncAck
 
+from app import async_bolt_listeners
 from app.bolt_listeners import (
+    enqueue_new_post,
     handle_app_home_opened,
     handle_cancel_mcp_oauth_action,
     handle_disable_mcp_oauth_action,
     handle_enable_mcp_oauth_action,
-    respond_to_new_post,
 )
-from app.bolt_logic import append_rate_limit_retry_handler
-from app.bolt_middlewares import before_authorize, set_locale
-from app.env import SLACK_APP_LOG_LEVEL, USE_SLACK_LOCALE
+from app.bolt_logic import (
+    append_async_rate_limit_retry_handler,
+    append_rate_limit_retry_handler,
+)
+from app.bolt_middlewares import (
+    async_before_authorize,
+    async_enable_slack_locale,
+    before_authorize,
+    enable_slack_locale,
+)
+from app.env import (
+    SLACK_APP_LOG_LEVEL,
+    SLACK_ASYNC_MODE_ENABLED,
+    USE_SLACK_LOCALE,
+    USER_PROFILE_WARM_UP_ENABLED,
+)
+from app.flush_service import record_channel_rate_limited
 from app.mcp.agentcore_service import shutdown_all_oauth_pollers
 from app.mcp.no_auth_tools_service import start_no_auth_mcp_tools_refresh_loop
+from app.user_profile_service import start_user_profile_warm_up
 
 
 def main() -> None:
@@ -47,16 +68,56 @@ def main() -> None:
     # https://github.com/BerriAI/litellm/issues/17631
     warnings.filterwarnings("ignore", message="Pydantic serializer warnings")
 
+    if SLACK_ASYNC_MODE_ENABLED:
+        asyncio.run(async_main())
+        return
+
     app = create_bolt_app(os.environ["SLACK_BOT_TOKEN"], USE_SLACK_LOCALE)
-    append_rate_limit_retry_handler(app.client.retry_handlers, 2)
+    append_rate_limit_retry_handler(
+        app.client.retry_handlers, 2, on_rate_limited=record_channel_rate_limited
+    )
 
     start_no_auth_mcp_tools_refresh_loop()
+    if USER_PROFILE_WARM_UP_ENABLED:
+        start_user_profile_warm_up(app.client)
 
     slack_handler = SocketModeHandler(app, os.environ["SLACK_APP_TOKEN"])
     register_signal_handlers(slack_handler)
     slack_handler.start()
 
 
+async def async_main() -> None:
+    """
+    Serve Collmbo with an AsyncApp on the running event loop until SIGTERM or SIGINT.
+
+    Returns:
+        None
+    """
+    app = create_async_bolt_app(os.environ["SLACK_BOT_TOKEN"], USE_SLACK_LOCALE)
+    append_async_rate_limit_retry_handler(
+        app.client.retry_handlers, 2, on_rate_limited=record_channel_rate_limited
+    )
+
+    start_no_auth_mcp_tools_refresh_loop()
+    if USER_PROFILE_WARM_UP_ENABLED:
+        start_user_profile_warm_up(async_bolt_listeners.build_sync_client(app.client))
+
+    slack_handler = AsyncSocketModeHandler(app, os.environ["SLACK_APP_TOKEN"])
+    shutdown_requested = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, shutdown_requested.set)
+
+    await slack_handler.connect_async()
+    await shutdown_requested.wait()
+    logging.info("Received a shutdown signal, shutting down...")
+    shutdown_all_oauth_pollers()
+    try:
+        await slack_handler.close_async()
+    except Exception:
+        logging.debug("Failed to close slack handler")
+
+
 def create_bolt_app(slack_bot_token: str, use_slack_locale: bool) -> App:
     """
     Create and configure a Slack Bolt app instance.
@@ -73,7 +134,7 @@ def create_bolt_app(slack_bot_token: str, use_slack_locale: bool) -> App:
         before_authorize=before_authorize,
         process_before_response=True,
     )
-    app.event("message")(ack=just_ack, lazy=[respond_to_new_post])
+    app.event("message")(enqueue_new_post)
     app.event("app_home_opened")(ack=just_ack, lazy=[handle_app_home_opened])
 
     app.action(re.compile(r"enable_mcp_oauth_\d+"))(
@@ -87,7 +148,43 @@ def create_bolt_app(slack_bot_token: str, use_slack_locale: bool) -> App:
     )
 
     if use_slack_locale:
-        app.middleware(set_locale)
+        app.middleware(enable_slack_locale)
+    return app
+
+
+def create_async_bolt_app(slack_bot_token: str, use_slack_locale: bool) -> AsyncApp:
+    """
+    Create and configure a Slack Bolt AsyncApp instance.
+
+    Args:
+        slack_bot_token (str): The Slack bot token for authentication.
+        use_slack_locale (bool): Whether to use Slack's locale preference.
+
+    Returns:
+        AsyncApp: The configured Slack Bolt AsyncApp instance.
+    """
+    app = AsyncApp(
+        token=slack_bot_token,
+        before_authorize=async_before_authorize,
+        process_before_response=True,
+    )
+    app.event("message")(async_bolt_listeners.enqueue_new_post)
+    app.event("app_home_opened")(
+        ack=async_just_ack, lazy=[async_bolt_listeners.handle_app_home_opened]
+    )
+
+    app.action(re.compile(r"enable_mcp_oauth_\d+"))(
+        ack=async_just_ack, lazy=[async_bolt_listeners.handle_enable_mcp_oauth_action]
+    )
+    app.action(re.compile(r"disable_mcp_oauth_\d+"))(
+        ack=async_just_ack, lazy=[async_bolt_listeners.handle_disable_mcp_oauth_action]
+    )
+    app.action(re.compile(r"cancel_mcp_oauth_\d+"))(
+        ack=async_just_ack, lazy=[async_bolt_listeners.handle_cancel_mcp_oauth_action]
+    )
+
+    if use_slack_locale:
+        app.middleware(async_enable_slack_locale)
     return app
 
 
@@ -106,6 +203,19 @@ def just_ack(ack: Ack) -> None:
     ack()
 
 
+async def async_just_ack(ack: AsyncAck) -> None:
+    """
+    A simple acknowledgment function for the AsyncApp that does nothing.
+
+    Args:
+        ack (AsyncAck): The acknowledgment function provided by Slack Bolt.
+
+    Returns:
+        None
+    """
+    await ack()
+
+
 def register_signal_handlers(slack_handler: SocketModeHandler) -> None:
     """
     Register signal handlers for graceful shutdown.
@@ -1,18 +1,32 @@
 import pytest
 from slack_bolt import BoltContext
 from slack_bolt.authorization import AuthorizeResult
+from slack_sdk.http_retry.builtin_async_handlers import (
+    AsyncRateLimitErrorRetryHandler,
+)
 from slack_sdk.http_retry.builtin_handlers import RateLimitErrorRetryHandler
+from slack_sdk.http_retry.request import HttpRequest
 
 from app.bolt_logic import (
+    QUEUE_FULL_ERROR_MESSAGE,
+    SLACK_LOCALE_ENABLED_KEY,
+    NotifyingAsyncRateLimitErrorRetryHandler,
+    NotifyingRateLimitErrorRetryHandler,
+    append_async_rate_limit_retry_handler,
     append_rate_limit_retry_handler,
+    build_queue_full_reply,
     determine_thread_ts_to_reply,
+    extract_channel_from_request,
+    extract_retry_after,
     extract_user_id_from_context,
     has_read_files_scope,
     is_post_from_bot,
     is_post_in_dm,
     is_post_mentioned,
+    is_slack_locale_enabled,
     should_skip_event,
 )
+from app.post_queue_logic import KeyedTaskQueue, PostSchedule, QueuedTask
 
 
 def test_append_rate_limit_retry_handler():
@@ -28,6 +42,78 @@ def test_append_rate_limit_retry_handler():
     assert handlers[0].max_retry_count == expected_handlers[0].max_retry_count
 
 
+def test_append_rate_limit_retry_handler_with_callback():
+    handlers = []
+
+    append_rate_limit_retry_handler(handlers, 2, on_rate_limited=lambda c, r: None)
+
+    assert len(handlers) == 1
+    assert isinstance(handlers[0], NotifyingRateLimitErrorRetryHandler)
+    assert handlers[0].max_retry_count == 2
+
+
+def test_append_async_rate_limit_retry_handler():
+    handlers = []
+
+    append_async_rate_limit_retry_handler(handlers, 3)
+
+    assert len(handlers) == 1
+    assert isinstance(handlers[0], AsyncRateLimitErrorRetryHandler)
+    assert handlers[0].max_retry_count == 3
+
+
+def test_append_async_rate_limit_retry_handler_with_callback():
+    handlers = []
+
+    append_async_rate_limit_retry_handler(
+        handlers, 2, on_rate_limited=lambda c, r: None
+    )
+
+    assert len(handlers) == 1
+    assert isinstance(handlers[0], NotifyingAsyncRateLimitErrorRetryHandler)
+    assert handlers[0].max_retry_count == 2
+
+
+@pytest.mark.parametrize(
+    "body_params, data, expected",
+    [
+        ({"channel": "C111"}, None, "C111"),
+        (None, b'{"channel": "C222", "ts": "1.2"}', "C222"),
+        (None, b"channel=C333&ts=1.2", "C333"),
+        (None, b"ts=1.2", None),
+        (None, b"[]", None),
+        (None, None, None),
+    ],
+)
+def test_extract_channel_from_request(body_params, data, expected):
+    request = HttpRequest(
+        method="POST",
+        url="https://slack.com/api/chat.update",
+        headers={},
+        body_params=body_params,
+        data=data,
+    )
+
+    result = extract_channel_from_request(request)
+
+    assert result == expected
+
+
+@pytest.mark.parametrize(
+    "headers, expected",
+    [
+        ({"Retry-After": ["30"]}, 30.0),
+        ({"retry-after": "5"}, 5.0),
+        ({"Retry-After": ["soon"]}, 1.0),
+        ({}, 1.0),
+    ],
+)
+def test_extract_retry_after(headers, expected):
+    result = extract_retry_after(headers)
+
+    assert result == expected
+
+
 @pytest.mark.parametrize(
     "body, payload, expected",
     [
@@ -125,6 +211,15 @@ def test_is_post_in_dm(payload, expected):
     assert result == expected
 
 
+def test_is_slack_locale_enabled():
+    context = BoltContext()
+    assert is_slack_locale_enabled(context) is False
+
+    context[SLACK_LOCALE_ENABLED_KEY] = True
+
+    assert is_slack_locale_enabled(context) is True
+
+
 @pytest.mark.parametrize(
     "bot_user_id, post, expected",
     [
@@ -163,6 +258,30 @@ def test_determine_thread_ts_to_reply(payload, expected):
     assert result == expected
 
 
+@pytest.mark.parametrize(
+    "payload, expected_thread_ts",
+    [
+        ({"ts": "2.0", "thread_ts": "1.0", "channel_type": "channel"}, "1.0"),
+        ({"ts": "2.0", "channel_type": "channel"}, "2.0"),
+        ({"ts": "2.0", "channel_type": "im"}, None),
+    ],
+)
+def test_post_dropped_by_a_full_queue_is_answered(payload, expected_thread_ts):
+    queue = KeyedTaskQueue(max_size=1)
+    queue.push(QueuedTask(schedule=PostSchedule(key="C1:0.5"), run=lambda: None))
+
+    dropped = not queue.push(
+        QueuedTask(schedule=PostSchedule(key="C1:2.0"), run=lambda: None)
+    )
+
+    assert dropped
+    assert build_queue_full_reply("C1", payload) == {
+        "channel": "C1",
+        "thread_ts": expected_thread_ts,
+        "text": QUEUE_FULL_ERROR_MESSAGE,
+    }
+
+
 @pytest.mark.parametrize(
     "bot_scopes, expected",
     [
@@ -0,0 +1,69 @@
+import httpcore
+
+from app.connection_stats_logic import (
+    ConnectionReuseStats,
+    HostConnectionStats,
+    find_trace_event_host,
+)
+
+
+def build_request(url: str) -> httpcore.Request:
+    return httpcore.Request("GET", url)
+
+
+def test_find_trace_event_host():
+    request = build_request("https://files.slack.com/a.png")
+
+    assert (
+        find_trace_event_host("connection.connect_tcp.started", {"host": "a.com"})
+        == "a.com"
+    )
+    assert (
+        find_trace_event_host(
+            "connection.start_tls.started", {"server_hostname": "a.com"}
+        )
+        == "a.com"
+    )
+    assert (
+        find_trace_event_host(
+            "http11.send_request_headers.started", {"request": request}
+        )
+        == "files.slack.com"
+    )
+    assert find_trace_event_host("connection.connect_tcp.complete", {}) is None
+
+
+def test_connection_reuse_stats_counts_reused_requests_per_host():
+    stats = ConnectionReuseStats()
+    slack = {"request": build_request("https://files.slack.com/a.png")}
+    cdn = {"request": build_request("https://cdn.example.com/a.png")}
+    stats.record("connection.connect_tcp.started", {"host": "files.slack.com"})
+    stats.record("connection.start_tls.started", {"server_hostname": "files.slack.com"})
+    for _ in range(3):
+        stats.record("http11.send_request_headers.started", slack)
+    stats.record("connection.connect_tcp.started", {"host": "cdn.example.com"})
+    stats.record("http2.send_request_headers.started", cdn)
+    stats.record("http11.receive_response_headers.started", slack)
+
+    assert stats.snapshot() == {
+        "files.slack.com": HostConnectionStats(
+            requests=3, connections=1, tls_handshakes=1
+        ),
+        "cdn.example.com": HostConnectionStats(
+            requests=1, http2_requests=1, connections=1
+        ),
+    }
+    assert stats.snapshot()["files.slack.com"].reused_requests == 2
+    assert stats.total() == HostConnectionStats(
+        requests=4, http2_requests=1, connections=2, tls_handshakes=1
+    )
+
+
+def test_connection_reuse_stats_snapshot_is_a_copy():
+    stats = ConnectionReuseStats()
+    stats.record("connection.connect_tcp.started", {"host": "a.com"})
+    snapshot = stats.snapshot()
+
+    stats.record("connection.connect_tcp.started", {"host": "a.com"})
+
+    assert snapshot["a.com"].connections == 1
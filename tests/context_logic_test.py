@@ -0,0 +1,115 @@
+from app.context_logic import (
+    ATTACHMENTS_OMITTED_TEXT,
+    FILE_ITEM_TOKENS,
+    IMAGE_ITEM_TOKENS,
+    count_message_tokens,
+    fit_messages_to_token_budget,
+    merge_consecutive_assistant_messages,
+)
+from app.history_logic import MESSAGE_OVERHEAD_TOKENS
+
+
+def count_words(text: str) -> int:
+    return len(text.split())
+
+
+def system(text: str = "system") -> dict:
+    return {"role": "system", "content": [{"type": "text", "text": text}]}
+
+
+def user(text: str, *attachments: dict) -> dict:
+    return {"role": "user", "content": [*attachments, {"type": "text", "text": text}]}
+
+
+def assistant(text: str) -> dict:
+    return {"role": "assistant", "content": text}
+
+
+IMAGE = {"type": "image_url", "image_url": {"url": "data:image/png;base64,AAAA"}}
+PDF = {"type": "file", "file": {"filename": "a.pdf", "file_data": "data:..."}}
+
+
+def test_count_message_tokens_estimates_attachments():
+    message = user("one two", IMAGE, PDF)
+
+    result = count_message_tokens(message, count_words)
+
+    assert result == MESSAGE_OVERHEAD_TOKENS + 2 + IMAGE_ITEM_TOKENS + FILE_ITEM_TOKENS
+    assert count_message_tokens(assistant("a b c"), count_words) == (
+        MESSAGE_OVERHEAD_TOKENS + 3
+    )
+
+
+def test_merge_consecutive_assistant_messages_joins_split_replies():
+    messages = [
+        system(),
+        user("<@U1>: question"),
+        assistant("<@B1>: first part"),
+        assistant("<@B1>: second part"),
+        user("<@U1>: thanks"),
+        assistant("<@B1>: welcome"),
+    ]
+
+    result = merge_consecutive_assistant_messages(messages, speaker_prefix="<@B1>: ")
+
+    assert result == [
+        system(),
+        user("<@U1>: question"),
+        assistant("<@B1>: first part\nsecond part"),
+        user("<@U1>: thanks"),
+        assistant("<@B1>: welcome"),
+    ]
+
+
+def test_fit_messages_to_token_budget_keeps_messages_that_fit():
+    messages = [system(), user("old", IMAGE), assistant("answer"), user("new")]
+
+    result = fit_messages_to_token_budget(
+        messages=messages, count_text_tokens=count_words, max_tokens=10000
+    )
+
+    assert result == messages
+
+
+def test_fit_messages_to_token_budget_drops_oldest_attachments_first():
+    messages = [system(), user("old", IMAGE), assistant("answer"), user("new", PDF)]
+
+    result = fit_messages_to_token_budget(
+        messages=messages,
+        count_text_tokens=count_words,
+        max_tokens=FILE_ITEM_TOKENS + 100,
+    )
+
+    assert result[1]["content"] == [
+        {"type": "text", "text": "old"},
+        {"type": "text", "text": ATTACHMENTS_OMITTED_TEXT},
+    ]
+    assert result[2:] == messages[2:]
+    assert messages[1]["content"][0] == IMAGE
+
+
+def test_fit_messages_to_token_budget_drops_oldest_turns_and_starts_with_user():
+    messages = [
+        system(),
+        user("a " * 50),
+        assistant("b " * 50),
+        user("c"),
+        assistant("d"),
+        user("e"),
+    ]
+
+    result = fit_messages_to_token_budget(
+        messages=messages, count_text_tokens=count_words, max_tokens=60
+    )
+
+    assert result == [system(), user("c"), assistant("d"), user("e")]
+
+
+def test_fit_messages_to_token_budget_always_keeps_last_message():
+    messages = [system(), assistant("x"), user("y " * 100)]
+
+    result = fit_messages_to_token_budget(
+        messages=messages, count_text_tokens=count_words, max_tokens=10
+    )
+
+    assert result == [system(), user("y " * 100)]
@@ -0,0 +1,101 @@
+import pytest
+
+from app.engaged_thread_logic import (
+    EngagedThreadIndex,
+    find_edited_post_ts,
+    is_top_level_post,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.mark.parametrize(
+    "payload, expected",
+    [
+        ({"ts": "1.0", "text": "Hi"}, True),
+        ({"ts": "1.0", "thread_ts": "1.0", "text": "Hi"}, True),
+        ({"ts": "2.0", "thread_ts": "1.0", "text": "Reply"}, False),
+        ({"subtype": "message_changed", "message": {"ts": "1.0"}}, False),
+        ({"subtype": "message_deleted", "deleted_ts": "1.0"}, False),
+    ],
+)
+def test_is_top_level_post(payload, expected):
+    assert is_top_level_post(payload) == expected
+
+
+@pytest.mark.parametrize(
+    "payload, expected",
+    [
+        ({"subtype": "message_changed", "message": {"ts": "1.0"}}, "1.0"),
+        ({"subtype": "message_deleted", "deleted_ts": "2.0"}, "2.0"),
+        ({"ts": "3.0", "text": "Hi"}, None),
+    ],
+)
+def test_find_edited_post_ts(payload, expected):
+    assert find_edited_post_ts(payload) == expected
+
+
+def test_engaged_thread_index_learns_from_top_level_posts():
+    index = EngagedThreadIndex(max_threads=10, ttl_seconds=60)
+
+    assert index.apply_event("C1", {"ts": "1.0", "text": "<@B1> help"}, "B1")
+    assert index.apply_event("C1", {"ts": "2.0", "text": "lunch?"}, "B1")
+    assert not index.apply_event(
+        "C1", {"ts": "3.0", "thread_ts": "2.0", "text": "<@B1>"}, "B1"
+    )
+
+    assert index.get("C1", "1.0") is True
+    assert index.get("C1", "2.0") is False
+    assert index.get("C1", "9.0") is None
+
+
+def test_engaged_thread_index_forgets_edited_parent_posts():
+    index = EngagedThreadIndex(max_threads=10, ttl_seconds=60)
+    index.put("C1", "1.0", False)
+
+    index.apply_event(
+        "C1",
+        {"subtype": "message_changed", "message": {"ts": "1.0", "text": "<@B1>"}},
+        None,
+    )
+
+    assert index.get("C1", "1.0") is None
+
+
+def test_engaged_thread_index_expires_entries():
+    clock = FakeClock()
+    index = EngagedThreadIndex(max_threads=10, ttl_seconds=60, clock=clock)
+    index.put("C1", "1.0", True)
+
+    clock.now = 59.0
+    assert index.get("C1", "1.0") is True
+    clock.now = 60.0
+    assert index.get("C1", "1.0") is None
+    assert len(index) == 0
+
+
+def test_engaged_thread_index_evicts_least_recently_used_thread():
+    index = EngagedThreadIndex(max_threads=2, ttl_seconds=60)
+    index.put("C1", "1.0", True)
+    index.put("C1", "2.0", False)
+    index.get("C1", "1.0")
+
+    index.put("C1", "3.0", False)
+
+    assert len(index) == 2
+    assert index.get("C1", "2.0") is None
+    assert index.get("C1", "1.0") is True
+
+
+def test_engaged_thread_index_is_disabled_with_zero_size():
+    index = EngagedThreadIndex(max_threads=0, ttl_seconds=60)
+
+    index.put("C1", "1.0", True)
+
+    assert index.get("C1", "1.0") is None
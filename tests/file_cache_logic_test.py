@@ -0,0 +1,285 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.file_cache_logic import (
+    DiskFileCache,
+    FileCacheStats,
+    MemoryFileCache,
+    hash_content,
+)
+from app.slack_image_service import find_image_files
+from app.thread_history_logic import build_thread_reply, convert_thread_reply_to_dict
+
+PNG_BYTES = b"\x89PNG\r\n\x1a\n" + b"\x00" * 24
+PDF_BYTES = b"%PDF-1.7\n" + b"\x00" * 11
+
+
+def test_hash_content_is_sha256_hex_digest():
+    assert hash_content(b"abc") == (
+        "ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad"
+    )
+
+
+@pytest.mark.parametrize(
+    "stats, expected",
+    [
+        (FileCacheStats(), 0.0),
+        (FileCacheStats(memory_hits=2, disk_hits=1, misses=1), 0.75),
+        (FileCacheStats(misses=3), 0.0),
+    ],
+)
+def test_file_cache_stats_hit_rate(stats, expected):
+    assert stats.hit_rate == expected
+
+
+def test_memory_file_cache_links_file_ids_to_contents():
+    cache = MemoryFileCache(max_bytes=100)
+    cache.put("h1", "data:a")
+    cache.link("F1", "h1")
+    cache.link("F2", "h1")
+
+    assert cache.find_content_hash("F1") == "h1"
+    assert cache.find_content_hash("F2") == "h1"
+    assert cache.find_content_hash("F3") is None
+    assert cache.get("h1") == "data:a"
+    assert len(cache) == 1
+
+
+def test_memory_file_cache_evicts_least_recently_used_contents():
+    cache = MemoryFileCache(max_bytes=10)
+    assert cache.put("h1", "aaaa") == 0
+    assert cache.put("h2", "bbbb") == 0
+    cache.get("h1")
+
+    assert cache.put("h3", "cccc") == 1
+    assert cache.get("h1") == "aaaa"
+    assert cache.get("h2") is None
+    assert cache.get("h3") == "cccc"
+    assert cache.nbytes == 8
+
+
+def test_memory_file_cache_skips_content_larger_than_limit():
+    cache = MemoryFileCache(max_bytes=3)
+
+    assert cache.put("h1", "aaaa") == 0
+    assert cache.get("h1") is None
+    assert cache.nbytes == 0
+
+
+def test_memory_file_cache_forgets_oldest_file_ids():
+    cache = MemoryFileCache(max_bytes=100, max_file_ids=2)
+    cache.link("F1", "h1")
+    cache.link("F2", "h2")
+    cache.link("F1", "h1")
+    cache.link("F3", "h3")
+
+    assert cache.find_content_hash("F1") == "h1"
+    assert cache.find_content_hash("F2") is None
+    assert cache.find_content_hash("F3") == "h3"
+
+
+def store(
+    cache: DiskFileCache, file_id: str, mime_type: str, data: bytes
+) -> int | None:
+    content_hash = hash_content(data)
+    if not cache.write(
+        file_id=file_id, content_hash=content_hash, mime_type=mime_type, data=data
+    ):
+        return 0
+    return cache.add(
+        file_id=file_id, content_hash=content_hash, mime_type=mime_type, size=len(data)
+    )
+
+
+def test_disk_file_cache_stores_and_reloads_contents(tmp_path):
+    cache = DiskFileCache(directory=tmp_path, max_bytes=1000)
+    content_hash = hash_content(PNG_BYTES)
+    store(cache, "F1", "image/png", PNG_BYTES)
+    store(cache, "F2", "image/png", PNG_BYTES)
+
+    assert cache.find("F1") == (content_hash, "image/png")
+    assert cache.read(content_hash) == PNG_BYTES
+    assert len(cache) == 1
+    assert cache.nbytes == len(PNG_BYTES)
+
+    reloaded = DiskFileCache(directory=tmp_path, max_bytes=1000)
+
+    assert reloaded.find("F2") == (content_hash, "image/png")
+    assert reloaded.read(content_hash) == PNG_BYTES
+    assert reloaded.find("F3") is None
+    assert reloaded.nbytes == len(PNG_BYTES)
+
+
+def test_disk_file_cache_writes_without_changing_the_index(tmp_path):
+    cache = DiskFileCache(directory=tmp_path, max_bytes=1000)
+    content_hash = hash_content(PNG_BYTES)
+
+    assert cache.write(
+        file_id="F1", content_hash=content_hash, mime_type="image/png", data=PNG_BYTES
+    )
+    assert cache.find("F1") is None
+    assert cache.read(content_hash) == PNG_BYTES
+
+    assert (
+        cache.add(
+            file_id="F1",
+            content_hash=content_hash,
+            mime_type="image/png",
+            size=len(PNG_BYTES),
+        )
+        == 0
+    )
+    assert cache.find("F1") == (content_hash, "image/png")
+
+
+def test_disk_file_cache_evicts_least_recently_used_contents(tmp_path):
+    cache = DiskFileCache(directory=tmp_path, max_bytes=60)
+    png_hash = hash_content(PNG_BYTES)
+    pdf_hash = hash_content(PDF_BYTES)
+    other_bytes = b"%PDF-1.4\n" + b"\x01" * 11
+    store(cache, "F1", "image/png", PNG_BYTES)
+    store(cache, "F2", "application/pdf", PDF_BYTES)
+    cache.mark_used(png_hash)
+
+    evictions = store(cache, "F3", "application/pdf", other_bytes)
+
+    assert evictions == 1
+    assert cache.find("F1") is not None
+    assert cache.find("F2") is None
+    assert cache.find("F3") is not None
+    assert cache.read(pdf_hash) is None
+    assert not (tmp_path / "files" / "F2").exists()
+
+
+def test_disk_file_cache_reads_corrupted_contents_as_missing(tmp_path):
+    cache = DiskFileCache(directory=tmp_path, max_bytes=1000)
+    content_hash = hash_content(PDF_BYTES)
+    store(cache, "F1", "application/pdf", PDF_BYTES)
+    (tmp_path / "content" / content_hash).write_bytes(b"corrupted")
+
+    assert cache.read(content_hash) is None
+
+    cache.forget(content_hash)
+
+    assert cache.find("F1") is None
+    assert len(cache) == 0
+    assert cache.nbytes == 0
+    assert not (tmp_path / "files" / "F1").exists()
+
+
+def test_disk_file_cache_does_not_index_content_evicted_after_a_skipped_write(tmp_path):
+    cache = DiskFileCache(directory=tmp_path, max_bytes=40)
+    png_hash = hash_content(PNG_BYTES)
+    store(cache, "F1", "image/png", PNG_BYTES)
+
+    # The content is already there, so the write of another file with it is skipped
+    assert cache.write(
+        file_id="F2", content_hash=png_hash, mime_type="image/png", data=PNG_BYTES
+    )
+    # Before that file is added, another download evicts the content
+    store(cache, "F3", "application/pdf", PDF_BYTES)
+
+    assert (
+        cache.add(
+            file_id="F2",
+            content_hash=png_hash,
+            mime_type="image/png",
+            size=len(PNG_BYTES),
+        )
+        is None
+    )
+    assert cache.find("F2") is None
+    assert cache.nbytes == len(PDF_BYTES)
+
+
+def test_disk_file_cache_indexes_only_existing_contents_under_concurrent_use(tmp_path):
+    cache = DiskFileCache(directory=tmp_path, max_bytes=100)
+    lock = threading.Lock()
+    contents = [b"%PDF-1.7\n" + bytes([i]) * 31 for i in range(4)]
+
+    def cache_and_read(i: int) -> None:
+        data = contents[i % len(contents)]
+        content_hash = hash_content(data)
+        file_id = f"F{i % 8}"
+        if cache.write(
+            file_id=file_id,
+            content_hash=content_hash,
+            mime_type="application/pdf",
+            data=data,
+        ):
+            with lock:
+                cache.add(
+                    file_id=file_id,
+                    content_hash=content_hash,
+                    mime_type="application/pdf",
+                    size=len(data),
+                )
+        with lock:
+            entry = cache.find(file_id)
+        if entry is not None and cache.read(entry[0]) is None:
+            with lock:
+                cache.forget(entry[0])
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(cache_and_read, range(400)))
+
+    for file_id in (f"F{i}" for i in range(8)):
+        if (entry := cache.find(file_id)) is not None:
+            assert cache.read(entry[0]) is not None
+    assert cache.nbytes <= cache.max_bytes
+
+
+def test_disk_file_cache_removes_incomplete_contents_at_startup(tmp_path):
+    (tmp_path / "content").mkdir()
+    (tmp_path / "content" / "abc.tmp").write_bytes(b"partial")
+
+    cache = DiskFileCache(directory=tmp_path, max_bytes=1000)
+
+    assert len(cache) == 0
+    assert not (tmp_path / "content" / "abc.tmp").exists()
+
+
+@pytest.mark.parametrize("file_id", ["../F1", "F/1", ""])
+def test_disk_file_cache_skips_invalid_file_ids(tmp_path, file_id):
+    cache = DiskFileCache(directory=tmp_path, max_bytes=1000)
+
+    written = cache.write(
+        file_id=file_id,
+        content_hash=hash_content(PNG_BYTES),
+        mime_type="image/png",
+        data=PNG_BYTES,
+    )
+
+    assert not written
+    assert not any((tmp_path / "content").iterdir())
+
+
+def test_files_of_cached_thread_replies_hit_the_file_cache(tmp_path):
+    message = {
+        "ts": "1.000001",
+        "text": "See this",
+        "user": "U1",
+        "files": [
+            {
+                "id": "F1",
+                "mimetype": "image/png",
+                "url_private": "https://files.slack.com/a.png",
+                "name": "a.png",
+            }
+        ],
+    }
+    content_hash = hash_content(PNG_BYTES)
+    memory_cache = MemoryFileCache(max_bytes=100)
+    memory_cache.put(content_hash, "data:image/png;base64,AA==")
+    memory_cache.link("F1", content_hash)
+    disk_cache = DiskFileCache(directory=tmp_path, max_bytes=1000)
+    store(disk_cache, "F1", "image/png", PNG_BYTES)
+
+    cached = convert_thread_reply_to_dict(build_thread_reply(message))
+    [(_, _, file_id)] = find_image_files(cached["files"])
+
+    assert file_id == "F1"
+    assert memory_cache.find_content_hash(file_id) == content_hash
+    assert disk_cache.find(file_id) == (content_hash, "image/png")
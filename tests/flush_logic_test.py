@@ -0,0 +1,158 @@
+from collections import OrderedDict
+
+import pytest
+
+from app.flush_logic import (
+    FlushScheduler,
+    apply_rate_limit_backoff,
+    build_token_bucket,
+    calculate_flush_interval,
+    get_token_bucket,
+    is_at_text_boundary,
+    try_consume_token,
+)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("Hello.", True),
+        ("Hello! ", True),
+        ("Is it?", True),
+        ("こんにちは。", True),
+        ("First paragraph\n", True),
+        ("Hello", False),
+        ("3.14", False),
+        ("", False),
+    ],
+)
+def test_is_at_text_boundary(text, expected):
+    result = is_at_text_boundary(text)
+
+    assert result == expected
+
+
+@pytest.mark.parametrize(
+    "chars_per_second, expected",
+    [
+        (0.0, 2.0),
+        (5.0, 2.0),
+        (20.0, 1.0),
+        (400.0, 0.5),
+    ],
+)
+def test_calculate_flush_interval(chars_per_second, expected):
+    result = calculate_flush_interval(
+        chars_per_second=chars_per_second,
+        buffer_size=20,
+        min_interval=0.5,
+        max_interval=2.0,
+    )
+
+    assert result == expected
+
+
+def build_scheduler() -> FlushScheduler:
+    return FlushScheduler(
+        start_time=0.0,
+        buffer_size=20,
+        min_interval=0.5,
+        max_interval=2.0,
+    )
+
+
+def test_flush_scheduler_flushes_first_visible_text_immediately():
+    scheduler = build_scheduler()
+
+    scheduler.add_text("\n")
+    assert scheduler.should_flush(0.1) is False
+
+    scheduler.add_text("Hi")
+    assert scheduler.should_flush(0.1) is True
+
+
+def test_flush_scheduler_respects_min_interval():
+    scheduler = build_scheduler()
+    scheduler.add_text("Hello.")
+    scheduler.mark_flushed(1.0)
+
+    scheduler.add_text(" World.")
+
+    assert scheduler.should_flush(1.2) is False
+    assert scheduler.should_flush(1.6) is True
+
+
+def test_flush_scheduler_flushes_at_boundary_before_rate_interval():
+    scheduler = build_scheduler()
+    scheduler.add_text("Hi")
+    scheduler.mark_flushed(1.0)
+
+    scheduler.add_text(" there")
+    assert scheduler.should_flush(1.6) is False
+
+    scheduler.add_text(".\n")
+    assert scheduler.should_flush(1.6) is True
+
+
+def test_flush_scheduler_flushes_after_rate_interval():
+    scheduler = build_scheduler()
+    scheduler.add_text("Hi")
+    scheduler.mark_flushed(1.0)
+
+    scheduler.add_text(" there")
+
+    assert scheduler.should_flush(2.9) is False
+    assert scheduler.should_flush(3.0) is True
+
+
+def test_flush_scheduler_mark_flushed_clears_pending_text():
+    scheduler = build_scheduler()
+    scheduler.add_text("Hello.")
+    scheduler.mark_flushed(1.0)
+
+    assert scheduler.should_flush(10.0) is False
+
+
+def test_try_consume_token():
+    bucket = build_token_bucket(2.0, 0.0)
+
+    assert try_consume_token(bucket=bucket, now=0.0, rate=1.0, capacity=2.0)
+    assert try_consume_token(bucket=bucket, now=0.0, rate=1.0, capacity=2.0)
+    assert not try_consume_token(bucket=bucket, now=0.5, rate=1.0, capacity=2.0)
+    assert try_consume_token(bucket=bucket, now=1.0, rate=1.0, capacity=2.0)
+
+
+def test_try_consume_token_caps_refill_at_capacity():
+    bucket = build_token_bucket(2.0, 0.0)
+
+    try_consume_token(bucket=bucket, now=100.0, rate=1.0, capacity=2.0)
+
+    assert bucket["tokens"] == 1.0
+
+
+def test_apply_rate_limit_backoff():
+    bucket = build_token_bucket(3.0, 0.0)
+
+    apply_rate_limit_backoff(bucket=bucket, now=10.0, retry_after=5.0)
+
+    assert bucket["tokens"] == 0.0
+    assert bucket["blocked_until"] == 15.0
+    assert bucket["rate_factor"] == 0.5
+    assert not try_consume_token(bucket=bucket, now=14.0, rate=1.0, capacity=3.0)
+    assert not try_consume_token(bucket=bucket, now=16.0, rate=1.0, capacity=3.0)
+    assert try_consume_token(bucket=bucket, now=17.0, rate=1.0, capacity=3.0)
+    assert bucket["rate_factor"] == pytest.approx(0.6)
+
+
+def test_get_token_bucket_evicts_least_recently_used_buckets():
+    buckets: OrderedDict[str, dict] = OrderedDict()
+    first = get_token_bucket(buckets, "C1", capacity=2.0, now=0.0, max_buckets=2)
+    get_token_bucket(buckets, "C2", capacity=2.0, now=0.0, max_buckets=2)
+
+    assert (
+        get_token_bucket(buckets, "C1", capacity=2.0, now=1.0, max_buckets=2) is first
+    )
+
+    get_token_bucket(buckets, "C3", capacity=2.0, now=2.0, max_buckets=2)
+
+    assert list(buckets) == ["C1", "C3"]
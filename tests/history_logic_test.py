@@ -0,0 +1,126 @@
+import pytest
+
+from app.context_logic import fit_messages_to_token_budget
+from app.history_logic import (
+    TokenBudget,
+    TokenCounter,
+    calculate_history_token_budget,
+    select_newest_replies_within_budget,
+    trim_replies_to_token_budget,
+)
+
+
+def count_words(text: str) -> int:
+    return len(text.split())
+
+
+@pytest.mark.parametrize(
+    "configured_tokens, max_input_tokens, expected",
+    [
+        (5000, 128000, 5000),
+        (0, 128000, 96000),
+        (0, None, 0),
+        (0, 0, 0),
+    ],
+)
+def test_calculate_history_token_budget(configured_tokens, max_input_tokens, expected):
+    result = calculate_history_token_budget(
+        configured_tokens=configured_tokens,
+        max_input_tokens=max_input_tokens,
+    )
+
+    assert result == expected
+
+
+def test_token_budget_always_adds_the_newest_message():
+    budget = TokenBudget(max_tokens=10)
+
+    assert budget.try_add(100) is True
+    assert budget.try_add(1) is False
+    assert budget.is_filled is True
+    assert budget.message_count == 1
+
+
+def test_token_budget_without_limit_adds_everything():
+    budget = TokenBudget(max_tokens=0)
+
+    assert all(budget.try_add(1000) for _ in range(10))
+    assert budget.is_filled is False
+
+
+def test_select_newest_replies_within_budget_spans_pages():
+    budget = TokenBudget(max_tokens=20)
+    first_page = [{"text": "one two three"}, {"text": "four five"}]
+    second_page = [{"text": "six seven eight"}, {"text": "nine"}]
+
+    first = select_newest_replies_within_budget(
+        replies_newest_first=first_page, count_tokens=count_words, budget=budget
+    )
+    second = select_newest_replies_within_budget(
+        replies_newest_first=second_page, count_tokens=count_words, budget=budget
+    )
+
+    assert first == first_page
+    assert second == second_page[:1]
+    assert budget.is_filled is True
+
+
+def test_trim_replies_to_token_budget_keeps_newest_in_order():
+    replies = [{"text": "old " * 10}, {"text": "middle"}, {"text": "new"}]
+
+    result = trim_replies_to_token_budget(
+        replies=replies, count_tokens=count_words, max_tokens=12
+    )
+
+    assert result == [{"text": "middle"}, {"text": "new"}]
+
+
+def test_trim_replies_to_token_budget_without_limit_returns_all():
+    replies = [{"text": "a"}, {"text": "b"}]
+
+    result = trim_replies_to_token_budget(
+        replies=replies, count_tokens=count_words, max_tokens=0
+    )
+
+    assert result == replies
+
+
+def test_trim_replies_to_token_budget_counts_converted_texts():
+    replies = [{"user": "U1", "text": "a b"}, {"user": "U2", "text": "c"}]
+
+    result = trim_replies_to_token_budget(
+        replies=replies,
+        count_tokens=count_words,
+        max_tokens=12,
+        convert_text=lambda reply: f"<@{reply['user']}>: {reply['text']}",
+    )
+
+    assert result == replies[1:]
+
+
+def test_token_counter_counts_each_message_once_per_turn():
+    counted: list[str] = []
+
+    def count_and_record(text: str) -> int:
+        counted.append(text)
+        return count_words(text)
+
+    def convert_text(reply: dict) -> str:
+        return f"<@{reply['user']}>: {reply['text']}"
+
+    count_tokens = TokenCounter(count_and_record)
+    replies = trim_replies_to_token_budget(
+        replies=[{"user": "U1", "text": "hello there"}, {"user": "U2", "text": "hi"}],
+        count_tokens=count_tokens,
+        max_tokens=1000,
+        convert_text=convert_text,
+    )
+    messages = [{"role": "system", "content": "Be brief"}] + [
+        {"role": "user", "content": [{"type": "text", "text": convert_text(reply)}]}
+        for reply in replies
+    ]
+    fit_messages_to_token_budget(
+        messages=messages, count_text_tokens=count_tokens, max_tokens=1000
+    )
+
+    assert sorted(counted) == ["<@U1>: hello there", "<@U2>: hi", "Be brief"]
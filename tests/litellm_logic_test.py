@@ -1,7 +1,23 @@
 import pytest
-from litellm.types.utils import Choices, Delta, Message, ModelResponse, StreamingChoices
+from litellm.types.utils import (
+    Choices,
+    Delta,
+    Message,
+    ModelResponse,
+    StreamingChoices,
+    Usage,
+)
 
-from app.litellm_logic import extract_delta_content, is_final_chunk
+from app.litellm_logic import (
+    StreamAccumulator,
+    StreamStallDetector,
+    build_agent_step,
+    extract_delta_content,
+    extract_total_tokens,
+    find_agent_stop_reason,
+    format_agent_step,
+    is_final_chunk,
+)
 
 
 @pytest.mark.parametrize(
@@ -76,3 +92,217 @@ def test_is_final_chunk(chunk, expected):
     result = is_final_chunk(chunk)
 
     assert result == expected
+
+
+def build_stream_chunk(**kwargs) -> ModelResponse:
+    finish_reason = kwargs.pop("finish_reason", None)
+    usage = kwargs.pop("usage", None)
+    return ModelResponse(
+        choices=[StreamingChoices(delta=Delta(**kwargs), finish_reason=finish_reason)],
+        stream=True,
+        **({"usage": usage} if usage is not None else {}),
+    )
+
+
+def test_stream_accumulator_text():
+    accumulator = StreamAccumulator()
+
+    deltas = [
+        accumulator.add_chunk(build_stream_chunk(content="Hello")),
+        accumulator.add_chunk(build_stream_chunk(content=", world")),
+        accumulator.add_chunk(
+            build_stream_chunk(
+                content="!",
+                finish_reason="stop",
+                usage=Usage(prompt_tokens=3, completion_tokens=4, total_tokens=7),
+            )
+        ),
+    ]
+    message = accumulator.build_message()
+
+    assert deltas == ["Hello", ", world", "!"]
+    assert accumulator.content == "Hello, world!"
+    assert accumulator.finish_reason == "stop"
+    assert accumulator.usage is not None
+    assert accumulator.usage.total_tokens == 7
+    assert message.content == "Hello, world!"
+    assert message.tool_calls is None
+
+
+def test_stream_accumulator_is_complete_after_usage_following_final_text():
+    accumulator = StreamAccumulator()
+
+    accumulator.add_chunk(build_stream_chunk(content="Hello", finish_reason="stop"))
+    assert accumulator.finish_reason == "stop"
+    assert not accumulator.is_complete
+
+    accumulator.add_chunk(
+        build_stream_chunk(
+            usage=Usage(prompt_tokens=3, completion_tokens=4, total_tokens=7)
+        )
+    )
+
+    assert accumulator.is_complete
+    assert accumulator.content == "Hello"
+    assert extract_total_tokens(accumulator.usage) == 7
+
+
+def test_stream_accumulator_content_between_chunks():
+    accumulator = StreamAccumulator()
+
+    accumulator.add_chunk(build_stream_chunk(content="Hello"))
+    assert accumulator.content == "Hello"
+    accumulator.add_chunk(build_stream_chunk(content=" again"))
+
+    assert accumulator.content == "Hello again"
+
+
+def test_stream_accumulator_tool_calls():
+    accumulator = StreamAccumulator()
+    chunks = [
+        build_stream_chunk(
+            tool_calls=[
+                {
+                    "index": 0,
+                    "id": "call_1",
+                    "type": "function",
+                    "function": {"name": "get_weather", "arguments": '{"city"'},
+                    "provider_specific_fields": {"thought_signature": "sig"},
+                }
+            ]
+        ),
+        build_stream_chunk(
+            tool_calls=[{"index": 0, "function": {"arguments": ': "Tokyo"}'}}]
+        ),
+        build_stream_chunk(
+            tool_calls=[
+                {
+                    "index": 1,
+                    "id": "call_2",
+                    "type": "function",
+                    "function": {"name": "get_time", "arguments": ""},
+                }
+            ]
+        ),
+        build_stream_chunk(
+            tool_calls=[{"index": 2, "function": {"arguments": "{}"}}],
+            finish_reason="tool_calls",
+        ),
+    ]
+
+    for chunk in chunks:
+        assert accumulator.add_chunk(chunk) is None
+    message = accumulator.build_message()
+
+    assert accumulator.finish_reason == "tool_calls"
+    assert message.content is None
+    assert message.model_dump()["tool_calls"] == [
+        {
+            "id": "call_1",
+            "type": "function",
+            "function": {"name": "get_weather", "arguments": '{"city": "Tokyo"}'},
+            "provider_specific_fields": {"thought_signature": "sig"},
+        },
+        {
+            "id": "call_2",
+            "type": "function",
+            "function": {"name": "get_time", "arguments": "{}"},
+        },
+    ]
+
+
+def test_stream_accumulator_ignores_chunks_without_choices():
+    accumulator = StreamAccumulator()
+
+    result = accumulator.add_chunk(ModelResponse(choices=[], stream=True))
+
+    assert result is None
+    assert accumulator.build_message().content is None
+
+
+@pytest.mark.parametrize(
+    "usage, expected",
+    [
+        (Usage(prompt_tokens=3, completion_tokens=4, total_tokens=7), 7),
+        ({"prompt_tokens": 10, "completion_tokens": 5}, 15),
+        ({"total_tokens": 12}, 12),
+        (None, 0),
+    ],
+)
+def test_extract_total_tokens(usage, expected):
+    result = extract_total_tokens(usage)
+
+    assert result == expected
+
+
+def test_format_agent_step():
+    agent_step = build_agent_step(
+        step=2,
+        llm_seconds=1.234,
+        tool_seconds=0.5,
+        total_tokens=321,
+        tool_call_count=3,
+    )
+
+    result = format_agent_step(agent_step)
+
+    assert result == "step=2 llm=1.23s tools=0.50s tokens=321 tool_calls=3"
+
+
+@pytest.mark.parametrize(
+    "step, total_tokens, max_total_tokens, expected",
+    [
+        (1, 100, 0, None),
+        (1, 100, 1000, None),
+        (
+            1,
+            1000,
+            1000,
+            "Stopped after using 1000 tokens (budget: 1000) without a final answer",
+        ),
+        (5, 100, 0, "Stopped at the step limit (5) without a final answer"),
+    ],
+)
+def test_find_agent_stop_reason(step, total_tokens, max_total_tokens, expected):
+    result = find_agent_stop_reason(
+        step=step,
+        max_steps=5,
+        total_tokens=total_tokens,
+        max_total_tokens=max_total_tokens,
+    )
+
+    assert result == expected
+
+
+def build_stall_detector() -> StreamStallDetector:
+    return StreamStallDetector(
+        start_time=100.0,
+        first_chunk_timeout=10.0,
+        chunk_gap_timeout=3.0,
+        total_timeout=30.0,
+    )
+
+
+def test_stream_stall_detector_waits_for_first_chunk():
+    detector = build_stall_detector()
+
+    assert detector.next_deadline() == 110.0
+    assert detector.find_stall(109.0) is None
+    assert detector.find_stall(110.0) == "The response did not start within 10s"
+
+
+def test_stream_stall_detector_detects_chunk_gap():
+    detector = build_stall_detector()
+    detector.record_chunk(105.0)
+
+    assert detector.next_deadline() == 108.0
+    assert detector.find_stall(107.5) is None
+    assert detector.find_stall(108.0) == "The response stalled for 3s"
+
+
+def test_stream_stall_detector_enforces_total_timeout():
+    detector = build_stall_detector()
+    detector.record_chunk(129.0)
+
+    assert detector.next_deadline() == 130.0
+    assert detector.find_stall(130.0) == "The response did not complete within 30s"
@@ -10,14 +10,17 @@ from app.message_logic import (
     build_system_message,
     build_tool_message,
     build_user_message,
+    convert_continued_markdown_to_mrkdwn,
     convert_markdown_to_mrkdwn,
     filter_replies_after_last_marker,
+    find_stable_prefix_end,
     format_assistant_reply_for_slack,
     is_last_marker_reply,
-    maybe_redact_string,
     maybe_set_cache_points,
     maybe_slack_to_markdown,
     remove_bot_mention,
+    render_assistant_reply_for_slack,
+    render_stable_prefix,
     unescape_slack_formatting,
 )
 
@@ -334,47 +337,6 @@ def test_remove_bot_mention(text, bot_user_id, expected):
     assert remove_bot_mention(text, bot_user_id) == expected
 
 
-@pytest.mark.parametrize(
-    "input_string, patterns, redaction_enabled, expected_output",
-    [
-        (
-            "My email is test@example.com and my phone is 123-456-7890",
-            [("test@example\\.com", "[EMAIL]"), ("123-456-7890", "[PHONE]")],
-            True,
-            "My email is [EMAIL] and my phone is [PHONE]",
-        ),
-        (
-            "No sensitive data here",
-            [("test@example\\.com", "[EMAIL]")],
-            True,
-            "No sensitive data here",
-        ),
-        (
-            "My email is test@example.com and my phone is 123-456-7890",
-            [("test@example\\.com", "[EMAIL]"), ("123-456-7890", "[PHONE]")],
-            False,
-            "My email is test@example.com and my phone is 123-456-7890",
-        ),
-        (
-            "No sensitive data here",
-            [("test@example\\.com", "[EMAIL]")],
-            False,
-            "No sensitive data here",
-        ),
-    ],
-)
-def test_maybe_redact_string(
-    input_string, patterns, redaction_enabled, expected_output
-):
-    result = maybe_redact_string(
-        input_string=input_string,
-        patterns=patterns,
-        redaction_enabled=redaction_enabled,
-    )
-
-    assert result == expected_output
-
-
 @pytest.mark.parametrize(
     "content, expected",
     [
@@ -826,3 +788,134 @@ def test_convert_markdown_to_mrkdwn(content, expected):
     result = convert_markdown_to_mrkdwn(content)
 
     assert result == expected
+
+
+@pytest.mark.parametrize(
+    "content, expected",
+    [
+        ("\n\nHello", "\n\nHello"),
+        ("<@U123>: Hello", "<@U123>: Hello"),
+        ("```python\nprint(1)\n```", "```\nprint(1)\n```"),
+    ],
+)
+def test_format_assistant_reply_for_slack_continuation(content, expected):
+    result = format_assistant_reply_for_slack(content, is_continuation=True)
+
+    assert result == expected
+
+
+@pytest.mark.parametrize(
+    "content, is_continuation, expected",
+    [
+        ("`stray **bold**", False, "`stray **bold**"),
+        ("`stray **bold**", True, "`stray *bold*"),
+        ("`code`中文", True, "`code` 中文"),
+    ],
+)
+def test_convert_continued_markdown_to_mrkdwn(content, is_continuation, expected):
+    result = convert_continued_markdown_to_mrkdwn(content, is_continuation)
+
+    assert result == expected
+
+
+@pytest.mark.parametrize(
+    "content, expected",
+    [
+        ("No paragraph break yet", 0),
+        ("First\n\nSecond", 7),
+        ("First\n\nSecond\n\nThird", 15),
+        ("First\n\n", 0),
+        ("First\n\n\nSecond", 8),
+        ("First\n\n```\ncode\n\nmore", 7),
+        ("```\ncode\n```\n\nAfter", 14),
+    ],
+)
+def test_find_stable_prefix_end(content, expected):
+    result = find_stable_prefix_end(content)
+
+    assert result == expected
+
+
+@pytest.mark.parametrize(
+    "content, slack_formatting_enabled, is_continuation, expected",
+    [
+        ("**Bold**\n\n", True, False, "*Bold*\n\n"),
+        ("**Bold**\n\n", False, False, "**Bold**\n\n"),
+        ("\n\n", True, False, None),
+        ("\n\n", True, True, "\n\n"),
+        ("```python\n\n", True, False, None),
+        ("A stray ` backtick\n\n", True, False, None),
+        ("A stray ` backtick\n\n", False, False, "A stray ` backtick\n\n"),
+        ("`code`\n\n", True, True, "`code`\n\n"),
+    ],
+)
+def test_render_stable_prefix(
+    content, slack_formatting_enabled, is_continuation, expected
+):
+    result = render_stable_prefix(
+        content=content,
+        slack_formatting_enabled=slack_formatting_enabled,
+        is_continuation=is_continuation,
+    )
+
+    assert result == expected
+
+
+RENDER_CONFORMANCE_CORPUS = [
+    "\n\n<@U123>: Hello **world**.\n\nSecond *paragraph* with `code`.\n\nThird.",
+    "Intro\n\n```python\ndef f():\n\n    return 1\n```\n\nAfter **the** block.\n\nEnd",
+    "```c\n\nbash\n```\n\nText\n\n```\n\npython\nx\n```\n\nDone",
+    "中文**粗體**中文\n\n`程式`中文\n\n~~刪除~~\n\n***both***",
+    "A stray ` backtick\n\n**bold**\n\n`x`\n\n__bold__ and _italic_",
+    "<@U1>\n\n:\n\nName\n\n```js\nconsole.log(1)\n```\n\n- item\n\n1. item",
+    "Paragraph\n\n``````python\nb\n\nhello\n\n~~strike~~",
+]
+
+
+@pytest.mark.parametrize("content", RENDER_CONFORMANCE_CORPUS)
+@pytest.mark.parametrize("slack_formatting_enabled", [True, False])
+def test_render_assistant_reply_for_slack_matches_full_render(
+    content, slack_formatting_enabled
+):
+    cache: dict[str, str] = {}
+    for end in range(1, len(content) + 1):
+        partial = content[:end]
+        expected = format_assistant_reply_for_slack(partial)
+        if slack_formatting_enabled:
+            expected = convert_markdown_to_mrkdwn(expected)
+
+        result = render_assistant_reply_for_slack(
+            content=partial,
+            slack_formatting_enabled=slack_formatting_enabled,
+            cache=cache,
+        )
+
+        assert result == expected
+
+
+def test_render_assistant_reply_for_slack_caches_stable_prefix():
+    cache: dict[str, str] = {}
+
+    render_assistant_reply_for_slack(
+        content="**One**\n\n**Two**\n\n```\nopen",
+        slack_formatting_enabled=True,
+        cache=cache,
+    )
+
+    assert cache == {
+        "source": "**One**\n\n**Two**\n\n",
+        "rendered": "*One*\n\n*Two*\n\n",
+    }
+
+
+def test_render_assistant_reply_for_slack_resets_cache_for_new_content():
+    cache = {"source": "Old\n\n", "rendered": "Old\n\n"}
+
+    result = render_assistant_reply_for_slack(
+        content="**New**",
+        slack_formatting_enabled=True,
+        cache=cache,
+    )
+
+    assert result == "*New*"
+    assert cache == {}
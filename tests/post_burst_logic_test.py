@@ -0,0 +1,107 @@
+import pytest
+
+from app.post_burst_logic import (
+    BURST_RETENTION_SECONDS,
+    BurstCoalescer,
+    find_burst_key,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.mark.parametrize(
+    "payload, expected",
+    [
+        ({"ts": "2.0", "thread_ts": "1.0"}, ("C1", "1.0")),
+        ({"ts": "2.0", "channel_type": "im"}, ("C1", None)),
+        ({"ts": "3.0", "thread_ts": "2.0", "channel_type": "im"}, ("C1", "2.0")),
+        ({"ts": "1.0", "channel_type": "channel"}, None),
+    ],
+)
+def test_find_burst_key(payload, expected):
+    assert find_burst_key("C1", payload) == expected
+
+
+def test_burst_coalescer_replies_to_latest_post_after_window():
+    clock = FakeClock()
+    coalescer = BurstCoalescer(window_seconds=2, max_bursts=10, clock=clock)
+    coalescer.add("K", "1.0")
+    clock.now = 1.0
+    coalescer.add("K", "2.0")
+
+    assert coalescer.seconds_until_quiet("K") == 2.0
+    assert not coalescer.is_latest("K", "1.0")
+    assert coalescer.is_latest("K", "2.0")
+
+    clock.now = 3.0
+    assert coalescer.seconds_until_quiet("K") == 0.0
+
+
+def test_burst_coalescer_keeps_loading_reply_within_burst():
+    clock = FakeClock()
+    coalescer = BurstCoalescer(window_seconds=2, max_bursts=10, clock=clock)
+    coalescer.add("K", "1.0")
+    coalescer.set_loading_reply("K", {"ts": "1.5"})
+
+    clock.now = 1.0
+    coalescer.add("K", "2.0")
+    assert coalescer.get_loading_reply("K") == {"ts": "1.5"}
+
+    clock.now = 3.0
+    coalescer.add("K", "4.0")
+    assert coalescer.get_loading_reply("K") is None
+    assert coalescer.is_latest("K", "4.0")
+
+
+def test_burst_coalescer_discard_restores_earlier_latest_post():
+    coalescer = BurstCoalescer(window_seconds=2, max_bursts=10, clock=FakeClock())
+    coalescer.add("K", "1.0")
+    coalescer.add("K", "2.0")
+    coalescer.add("K", "3.0")
+
+    coalescer.discard("K", "2.0")
+    coalescer.discard("K", "3.0")
+
+    assert coalescer.is_latest("K", "1.0")
+
+    coalescer.discard("K", "1.0")
+
+    assert len(coalescer) == 0
+
+
+def test_burst_coalescer_treats_unknown_posts_as_latest():
+    coalescer = BurstCoalescer(window_seconds=2, max_bursts=10)
+
+    assert coalescer.is_latest("K", "1.0")
+    assert coalescer.seconds_until_quiet("K") == 0.0
+    assert coalescer.get_loading_reply("K") is None
+
+
+def test_burst_coalescer_forgets_old_bursts():
+    clock = FakeClock()
+    coalescer = BurstCoalescer(window_seconds=2, max_bursts=10, clock=clock)
+    coalescer.add("A", "1.0")
+
+    clock.now = 2 + BURST_RETENTION_SECONDS
+    coalescer.add("B", "2.0")
+
+    assert len(coalescer) == 1
+    assert coalescer.is_latest("A", "0.5")
+
+
+def test_burst_coalescer_evicts_oldest_bursts_over_capacity():
+    coalescer = BurstCoalescer(window_seconds=2, max_bursts=2)
+    coalescer.add("A", "1.0")
+    coalescer.add("B", "2.0")
+    coalescer.add("A", "3.0")
+    coalescer.add("C", "4.0")
+
+    assert len(coalescer) == 2
+    assert coalescer.is_latest("B", "0.5")
+    assert not coalescer.is_latest("A", "1.0")
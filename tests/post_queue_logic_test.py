@@ -0,0 +1,258 @@
+import pytest
+
+from app.post_queue_logic import (
+    DEFAULT_PRIORITY_CLASS_WEIGHTS,
+    KeyedTaskQueue,
+    LatencyStats,
+    PostSchedule,
+    QueuedTask,
+    RecentKeys,
+    build_post_queue_key,
+    build_post_schedule,
+    classify_post,
+    find_event_dedupe_key,
+    find_retry_num,
+    parse_priority_class_weights,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def build_task(
+    key: str, name: str, *, flows: tuple = (), weight: float = 1.0
+) -> QueuedTask:
+    return QueuedTask(
+        schedule=PostSchedule(key=key, flows=flows, weight=weight), run=lambda: name
+    )
+
+
+def run_all(queue: KeyedTaskQueue) -> list:
+    names = []
+    while (task := queue.pop_ready()) is not None:
+        names.append(task.run())
+        queue.complete(task.key)
+    return names
+
+
+@pytest.mark.parametrize(
+    "payload, expected",
+    [
+        ({"ts": "1.0"}, ("C1", "1.0")),
+        ({"ts": "2.0", "thread_ts": "1.0"}, ("C1", "1.0")),
+        ({"ts": "2.0", "channel_type": "im"}, ("C1", None)),
+        ({"ts": "3.0", "thread_ts": "2.0", "channel_type": "im"}, ("C1", "2.0")),
+    ],
+)
+def test_build_post_queue_key_groups_threads(payload, expected):
+    assert build_post_queue_key("C1", payload) == expected
+
+
+@pytest.mark.parametrize(
+    "payload, expected",
+    [
+        ({"ts": "1.0", "text": "<@B1> hi", "files": [{}]}, "attachments"),
+        ({"ts": "1.0", "text": "hi", "channel_type": "im"}, "dm"),
+        ({"ts": "1.0", "text": "<@B1> hi", "channel_type": "channel"}, "mention"),
+        ({"ts": "2.0", "thread_ts": "1.0", "text": "and?"}, "thread"),
+    ],
+)
+def test_classify_post(payload, expected):
+    assert classify_post(payload, "B1") == expected
+
+
+def test_build_post_schedule_charges_user_and_channel():
+    schedule = build_post_schedule(
+        channel_id="C1",
+        user_id="U1",
+        payload={"ts": "1.0", "text": "<@B1> hi"},
+        bot_user_id="B1",
+        class_weights={"mention": 2.0},
+    )
+
+    assert schedule == PostSchedule(
+        key=("C1", "1.0"),
+        flows=(("user", "U1"), ("channel", "C1")),
+        priority_class="mention",
+        weight=2.0,
+    )
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("dm:4,mention:2", {"dm": 4.0, "mention": 2.0}),
+        (" dm : 4 , thread:0.5 ", {"dm": 4.0, "thread": 0.5}),
+        ("dm:x,mention:-1,:3,thread", {}),
+        ("", {}),
+    ],
+)
+def test_parse_priority_class_weights(text, expected):
+    assert parse_priority_class_weights(text) == expected
+
+
+def test_latency_stats_summarizes_waits():
+    stats = LatencyStats(max_samples=20)
+    for seconds in range(1, 21):
+        stats.add(float(seconds))
+
+    summary = stats.summarize()
+
+    assert summary.count == 20
+    assert summary.mean_seconds == 10.5
+    assert summary.p95_seconds == 19.0
+    assert summary.max_seconds == 20.0
+
+
+def test_latency_stats_keeps_maximum_beyond_recent_samples():
+    stats = LatencyStats(max_samples=2)
+    stats.add(9.0)
+    stats.add(1.0)
+    stats.add(1.0)
+
+    summary = stats.summarize()
+
+    assert summary.count == 3
+    assert summary.mean_seconds == 1.0
+    assert summary.max_seconds == 9.0
+
+
+def test_latency_stats_is_empty_without_waits():
+    assert LatencyStats().summarize().count == 0
+
+
+@pytest.mark.parametrize(
+    "body, expected",
+    [
+        ({"event_id": "Ev1", "event": {"channel": "C1", "ts": "1.0"}}, "Ev1"),
+        ({"event": {"channel": "C1", "ts": "1.0"}}, "C1:1.0"),
+        ({"event": {}}, None),
+    ],
+)
+def test_find_event_dedupe_key(body, expected):
+    assert find_event_dedupe_key(body) == expected
+
+
+@pytest.mark.parametrize(
+    "headers, expected",
+    [
+        ({"x-slack-retry-num": ["2"]}, 2),
+        ({"x-slack-retry-num": ["x"]}, 0),
+        ({}, 0),
+        (None, 0),
+    ],
+)
+def test_find_retry_num(headers, expected):
+    assert find_retry_num(headers) == expected
+
+
+def test_recent_keys_rejects_keys_seen_within_ttl():
+    clock = FakeClock()
+    keys = RecentKeys(max_keys=10, ttl_seconds=60, clock=clock)
+
+    assert keys.add("Ev1") is True
+    assert keys.add("Ev1") is False
+    clock.now = 60.0
+    assert keys.add("Ev1") is True
+
+
+def test_recent_keys_forgets_oldest_keys_over_capacity():
+    keys = RecentKeys(max_keys=2, ttl_seconds=60)
+    keys.add("Ev1")
+    keys.add("Ev2")
+    keys.add("Ev3")
+
+    assert len(keys) == 2
+    assert keys.add("Ev1") is True
+
+
+def test_keyed_task_queue_runs_one_task_per_key_in_order():
+    queue = KeyedTaskQueue(max_size=10)
+    queue.push(build_task("A", "a1"))
+    queue.push(build_task("A", "a2"))
+    queue.push(build_task("B", "b1"))
+
+    first = queue.pop_ready()
+    second = queue.pop_ready()
+
+    assert first is not None and first.run() == "a1"
+    assert second is not None and second.run() == "b1"
+    assert queue.pop_ready() is None
+    assert len(queue) == 1
+    assert queue.running_count == 2
+
+    queue.complete("A")
+    third = queue.pop_ready()
+
+    assert third is not None and third.run() == "a2"
+    assert len(queue) == 0
+
+
+def test_keyed_task_queue_rejects_tasks_when_full():
+    queue = KeyedTaskQueue(max_size=1)
+
+    assert queue.push(build_task("A", "a1")) is True
+    assert queue.is_full
+    assert queue.push(build_task("B", "b1")) is False
+
+    queue.pop_ready()
+
+    assert queue.push(build_task("B", "b1")) is True
+
+
+def test_keyed_task_queue_shares_workers_between_flows():
+    queue = KeyedTaskQueue(max_size=10)
+    for i in range(3):
+        queue.push(build_task(f"busy{i}", f"busy{i}", flows=("U1",)))
+    queue.push(build_task("quiet", "quiet", flows=("U2",)))
+
+    assert run_all(queue) == ["busy0", "quiet", "busy1", "busy2"]
+
+
+def test_keyed_task_queue_prefers_heavier_weights():
+    queue = KeyedTaskQueue(max_size=10)
+    for i in range(3):
+        queue.push(build_task(f"t{i}", f"thread{i}", flows=("U1",)))
+        queue.push(build_task(f"d{i}", f"dm{i}", flows=("U2",), weight=4.0))
+
+    assert run_all(queue) == ["dm0", "dm1", "dm2", "thread0", "thread1", "thread2"]
+
+
+def test_keyed_task_queue_runs_classes_in_priority_order_across_users():
+    class_weights = parse_priority_class_weights(DEFAULT_PRIORITY_CLASS_WEIGHTS)
+    posts = [
+        ("C1", "UA", {"ts": "1.0", "text": "<@B1> hi", "files": [{"id": "F1"}]}),
+        ("C2", "UB", {"ts": "2.0", "text": "<@B1> hi"}),
+        ("D1", "UC", {"ts": "3.0", "text": "hi", "channel_type": "im"}),
+    ]
+    queue = KeyedTaskQueue(max_size=10)
+    for channel_id, user_id, payload in posts:
+        schedule = build_post_schedule(
+            channel_id=channel_id,
+            user_id=user_id,
+            payload=payload,
+            bot_user_id="B1",
+            class_weights=class_weights,
+        )
+        queue.push(
+            QueuedTask(schedule=schedule, run=lambda s=schedule: s.priority_class)
+        )
+
+    assert run_all(queue) == ["dm", "mention", "attachments"]
+
+
+def test_keyed_task_queue_does_not_credit_idle_flows():
+    queue = KeyedTaskQueue(max_size=10)
+    for i in range(3):
+        queue.push(build_task(f"busy{i}", f"busy{i}", flows=("U1",)))
+    assert run_all(queue) == ["busy0", "busy1", "busy2"]
+
+    queue.push(build_task("busy3", "busy3", flows=("U1",)))
+    queue.push(build_task("idle", "idle", flows=("U2",)))
+
+    assert run_all(queue) == ["busy3", "idle"]
@@ -0,0 +1,109 @@
+import pytest
+
+from app.redaction_logic import (
+    TIMED_OUT_REPLACEMENT,
+    RedactionEngine,
+    RedactionResult,
+    RedactionStats,
+    redact_json_strings,
+)
+
+PATTERNS = [
+    (r"\b[A-Za-z0-9.*%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b", "[EMAIL]"),
+    (r"\b\d{4}[- ]?\d{4}[- ]?\d{4}[- ]?\d{4}\b", "[CREDIT CARD]"),
+    (r"\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}\b", "[PHONE]"),
+    (r"\b\d{3}[- ]?\d{2}[- ]?\d{4}\b", "[SSN]"),
+    (r"(?!)", "[REDACTED]"),
+]
+
+
+class StepClock:
+    def __init__(self, step: float):
+        self.now = 0.0
+        self.step = step
+
+    def __call__(self) -> float:
+        self.now += self.step
+        return self.now
+
+
+@pytest.mark.parametrize(
+    "text, expected_text, expected_matches",
+    [
+        (
+            "Mail a@example.com or b@example.org, card 1234-5678-9012-3456",
+            "Mail [EMAIL] or [EMAIL], card [CREDIT CARD]",
+            {"[EMAIL]": 2, "[CREDIT CARD]": 1},
+        ),
+        (
+            "Call (555) 123-4567, SSN 123-45-6789",
+            "Call [PHONE], SSN [SSN]",
+            {"[PHONE]": 1, "[SSN]": 1},
+        ),
+        ("No sensitive data here", "No sensitive data here", {}),
+    ],
+)
+def test_redaction_engine_redacts_in_order(text, expected_text, expected_matches):
+    engine = RedactionEngine(PATTERNS, timeout_seconds=1.0)
+
+    result = engine.redact(text)
+
+    assert result.text == expected_text
+    assert result.matches == expected_matches
+    assert not result.timed_out
+
+
+def test_redaction_engine_skips_never_matching_pattern():
+    engine = RedactionEngine(PATTERNS, timeout_seconds=0)
+
+    assert len(engine.rules) == 4
+
+
+def test_redaction_engine_redacts_whole_text_after_time_limit():
+    engine = RedactionEngine(PATTERNS, timeout_seconds=2.5, clock=StepClock(1.0))
+
+    result = engine.redact("a@example.com 123-45-6789")
+
+    assert result == RedactionResult(
+        text=TIMED_OUT_REPLACEMENT,
+        matches={"[EMAIL]": 1},
+        seconds=4.0,
+        timed_out=True,
+    )
+
+
+def test_redaction_engine_stops_catastrophic_backtracking():
+    engine = RedactionEngine([(r"(x+x+)+y", "[REDACTED]")], timeout_seconds=0.05)
+
+    result = engine.redact("x" * 5000)
+
+    assert result.timed_out
+    assert result.text == TIMED_OUT_REPLACEMENT
+
+
+def test_redaction_stats_adds_results():
+    stats = RedactionStats()
+    stats.add(RedactionResult(text="", matches={"[EMAIL]": 2}, seconds=0.5))
+    stats.add(
+        RedactionResult(
+            text="", matches={"[EMAIL]": 1, "[SSN]": 1}, seconds=1.0, timed_out=True
+        )
+    )
+
+    assert stats == RedactionStats(
+        texts=2,
+        matches={"[EMAIL]": 3, "[SSN]": 1},
+        seconds=1.5,
+        max_seconds=1.0,
+        timeouts=1,
+    )
+
+
+def test_redact_json_strings_keeps_keys_and_other_values():
+    arguments = {"to": ["a@example.com", 1], "subject": "hi", "a@example.com": None}
+
+    assert redact_json_strings(arguments, str.upper) == {
+        "to": ["A@EXAMPLE.COM", 1],
+        "subject": "HI",
+        "a@example.com": None,
+    }
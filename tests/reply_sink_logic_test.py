@@ -0,0 +1,65 @@
+import asyncio
+from itertools import count
+
+from app.reply_sink_logic import (
+    AsyncRecordingReplySink,
+    NoopReplySink,
+    RecordingReplySink,
+    ReplySinkEvent,
+)
+
+
+def test_noop_reply_sink_always_allows_updates():
+    sink = NoopReplySink()
+
+    sink.add_delta("Hello")
+    sink.submit("Hello")
+    sink.finish("Hello")
+
+    assert sink.try_acquire_update() is True
+
+
+def test_recording_reply_sink_timestamps_events():
+    sink = RecordingReplySink(clock=count().__next__)
+
+    sink.add_delta("Hello")
+    sink.submit("Hello")
+    sink.add_delta(" world")
+    sink.close_message()
+    sink.finish("Hello world")
+    sink.start_next_message()
+    sink.show_loading()
+
+    assert sink.events == [
+        ReplySinkEvent(time=0, kind="delta", text="Hello"),
+        ReplySinkEvent(time=1, kind="flush", text="Hello"),
+        ReplySinkEvent(time=2, kind="delta", text=" world"),
+        ReplySinkEvent(time=3, kind="close"),
+        ReplySinkEvent(time=4, kind="finish", text="Hello world"),
+        ReplySinkEvent(time=5, kind="next_message"),
+        ReplySinkEvent(time=6, kind="loading"),
+    ]
+
+
+def test_recording_reply_sink_collects_finished_messages():
+    sink = RecordingReplySink()
+
+    sink.finish("First")
+    sink.start_next_message()
+    sink.finish("Second")
+
+    assert sink.messages == ["First", "Second"]
+
+
+def test_async_recording_reply_sink_records_awaited_events():
+    sink = AsyncRecordingReplySink(clock=count().__next__)
+
+    async def run():
+        sink.add_delta("Hi")
+        await sink.close_message()
+        await sink.finish("Hi")
+
+    asyncio.run(run())
+
+    assert [event.kind for event in sink.events] == ["delta", "close", "finish"]
+    assert sink.messages == ["Hi"]
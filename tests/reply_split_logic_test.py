@@ -0,0 +1,87 @@
+import pytest
+
+from app.reply_split_logic import ReplySplitter, toggles_code_fence
+
+
+@pytest.mark.parametrize(
+    "line, expected",
+    [
+        ("```", True),
+        ("```python", True),
+        ("  ```", True),
+        ("```inline```", False),
+        ("text ```", False),
+        ("plain text", False),
+    ],
+)
+def test_toggles_code_fence(line, expected):
+    result = toggles_code_fence(line)
+
+    assert result == expected
+
+
+def test_reply_splitter_tracks_utf8_length_across_chunks():
+    splitter = ReplySplitter(max_bytes=10)
+
+    for chunk in ["こん", "にち", "\nは"]:
+        splitter.add_text(chunk)
+
+    assert splitter.text == "こんにち\nは"
+    assert splitter.byte_length == len("こんにち\nは".encode())
+    assert splitter.is_over_limit() is True
+
+
+def test_reply_splitter_splits_at_paragraph_boundary():
+    splitter = ReplySplitter(max_bytes=30)
+    for chunk in ["First paragraph.\n", "\nSecond ", "paragraph keeps going"]:
+        splitter.add_text(chunk)
+
+    head = splitter.split()
+
+    assert head == "First paragraph.\n\n"
+    assert splitter.text == "Second paragraph keeps going"
+    assert splitter.byte_length == len(b"Second paragraph keeps going")
+
+
+def test_reply_splitter_splits_before_list_item():
+    splitter = ReplySplitter(max_bytes=24)
+    splitter.add_text("Items:\n- first item\n- second item")
+
+    head = splitter.split()
+
+    assert head == "Items:\n- first item\n"
+    assert splitter.text == "- second item"
+
+
+def test_reply_splitter_prefers_closed_code_fence_over_later_lines():
+    splitter = ReplySplitter(max_bytes=30)
+    splitter.add_text("```\nprint(1)\n```\nafter the code\nmore text")
+
+    head = splitter.split()
+
+    assert head == "```\nprint(1)\n```\n"
+    assert splitter.text == "after the code\nmore text"
+
+
+def test_reply_splitter_closes_and_reopens_code_fence():
+    splitter = ReplySplitter(max_bytes=30)
+    splitter.add_text("```python\nx = 1\ny = 2\nz = 3\nw = 4\n")
+
+    head = splitter.split()
+
+    assert head == "```python\nx = 1\ny = 2\nz = 3\n```"
+    assert splitter.text == "```python\nw = 4\n"
+
+    splitter.add_text("```\nDone")
+    assert splitter.split() == "```python\nw = 4\n```\n"
+    assert splitter.text == "Done"
+
+
+def test_reply_splitter_hard_cuts_without_line_breaks():
+    splitter = ReplySplitter(max_bytes=7)
+    splitter.add_text("ああああ")
+
+    head = splitter.split()
+
+    assert head == "ああ"
+    assert splitter.text == "ああ"
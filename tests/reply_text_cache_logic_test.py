@@ -0,0 +1,44 @@
+from app.reply_text_cache_logic import ReplyTextCache, build_reply_text_cache_key
+
+
+def build_key(reply: dict, channel_id: str | None = "C1", config_key: int = 1):
+    return build_reply_text_cache_key(
+        channel_id=channel_id, reply=reply, bot_user_id="B1", config_key=config_key
+    )
+
+
+def test_build_reply_text_cache_key_changes_with_edits_and_settings():
+    reply = {"ts": "1.0", "text": "Hello"}
+    edited_reply = {"ts": "1.0", "text": "Hello!", "edited": {"ts": "2.0"}}
+
+    assert build_key(reply) == build_key(dict(reply))
+    assert build_key(reply) != build_key(edited_reply)
+    assert build_key(reply) != build_key({"ts": "1.0", "text": "Updated"})
+    assert build_key(reply) != build_key(reply, config_key=2)
+    assert build_key(reply, channel_id=None) is None
+    assert build_key({"text": "No timestamp"}) is None
+
+
+def test_reply_text_cache_evicts_least_recently_used_text():
+    cache = ReplyTextCache(max_entries=2)
+    first, second, third = (build_key({"ts": f"{i}.0"}) for i in range(3))
+    assert first is not None and second is not None and third is not None
+    cache.put(first, "<@U1>: first")
+    cache.put(second, "<@U1>: second")
+    cache.get(first)
+
+    cache.put(third, "<@U1>: third")
+
+    assert len(cache) == 2
+    assert cache.get(second) is None
+    assert cache.get(first) == "<@U1>: first"
+
+
+def test_reply_text_cache_is_disabled_with_zero_size():
+    cache = ReplyTextCache(max_entries=0)
+    key = build_key({"ts": "1.0"})
+    assert key is not None
+
+    cache.put(key, "<@U1>: text")
+
+    assert cache.get(key) is None
@@ -0,0 +1,226 @@
+from itertools import product
+
+import pytest
+
+from app.slack_blocks_logic import (
+    append_loading_character,
+    find_stable_elements_end,
+    parse_inline_markdown,
+    render_reply_blocks,
+    render_rich_text_block,
+    render_rich_text_elements,
+    render_table,
+)
+
+STREAMED_REPLY = """# Plan
+
+Here is **bold *and italic*** text.
+
+1. First
+   - nested `code`
+2. Second
+
+> quoted ~~old~~
+
+| Name | 値 |
+|------|----|
+| a | 日本 |
+
+```python
+print("a\\n\\nb")
+```
+
+Done."""
+
+
+def text(value: str, **style) -> dict:
+    element: dict = {"type": "text", "text": value}
+    if style:
+        element["style"] = style
+    return element
+
+
+def section(*elements: dict) -> dict:
+    return {"type": "rich_text_section", "elements": list(elements)}
+
+
+def test_parse_inline_markdown_nests_emphasis():
+    assert parse_inline_markdown("**a *b* c** ~~d~~ ***e***") == [
+        text("a ", bold=True),
+        text("b", bold=True, italic=True),
+        text(" c", bold=True),
+        text(" "),
+        text("d", strike=True),
+        text(" "),
+        text("e", bold=True, italic=True),
+    ]
+
+
+def test_parse_inline_markdown_keeps_code_and_links_literal():
+    assert parse_inline_markdown(
+        "`**x**` [docs](https://example.com/a_b_) <@U123> :smile: snake_case_name"
+    ) == [
+        text("**x**", code=True),
+        text(" "),
+        {"type": "link", "url": "https://example.com/a_b_", "text": "docs"},
+        text(" "),
+        {"type": "user", "user_id": "U123"},
+        text(" "),
+        {"type": "emoji", "name": "smile"},
+        text(" snake_case_name"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "content",
+    ["2 * 3 * 4", "at 12:30:45", "a ** b ** c"],
+)
+def test_parse_inline_markdown_leaves_plain_text(content):
+    assert parse_inline_markdown(content) == [text(content)]
+
+
+def test_render_rich_text_elements_builds_lists():
+    assert render_rich_text_elements("- a\n  - b\n- c\n3. d\n4. e") == [
+        {
+            "type": "rich_text_list",
+            "style": "bullet",
+            "indent": 0,
+            "elements": [section(text("a"))],
+        },
+        {
+            "type": "rich_text_list",
+            "style": "bullet",
+            "indent": 1,
+            "elements": [section(text("b"))],
+        },
+        {
+            "type": "rich_text_list",
+            "style": "bullet",
+            "indent": 0,
+            "elements": [section(text("c"))],
+        },
+        {
+            "type": "rich_text_list",
+            "style": "ordered",
+            "indent": 0,
+            "offset": 2,
+            "elements": [section(text("d")), section(text("e"))],
+        },
+    ]
+
+
+def test_render_rich_text_elements_builds_paragraphs_quotes_and_code():
+    assert render_rich_text_elements(
+        "## Title\n\nOne\ntwo\n\n> *q*\n```go\nfunc main() {}\n```\nopen\n```\nx"
+    ) == [
+        section(text("Title", bold=True), text("\n")),
+        section(text("One\ntwo"), text("\n")),
+        {"type": "rich_text_quote", "elements": [text("q", italic=True)]},
+        {"type": "rich_text_preformatted", "elements": [text("func main() {}")]},
+        section(text("open")),
+        {"type": "rich_text_preformatted", "elements": [text("x")]},
+    ]
+
+
+def test_render_table_aligns_wide_characters():
+    assert render_table(["| Name | 値 |", "|---|---|", "| **a** | 日本 |"]) == (
+        "Name | 値\n-----+-----\na    | 日本"
+    )
+
+
+def test_render_rich_text_block_matches_whole_render_while_streaming():
+    cache: dict = {}
+    for end in range(1, len(STREAMED_REPLY) + 1):
+        content = STREAMED_REPLY[:end]
+        assert render_rich_text_block(content, cache) == render_rich_text_block(content)
+    assert cache["blocks_source"].endswith("```\n\n")
+
+
+@pytest.mark.parametrize(
+    "content, expected",
+    [
+        ("One\n\nTwo", 5),
+        ("One\n\n  Two", 0),
+        ("```\nA\n\nB", 0),
+        ("```\nA\n\nB\n```\n\nC", 14),
+        ('```\nFENCE = "```"\n\nx = 1\n```\n\nDone', 30),
+    ],
+)
+def test_find_stable_elements_end(content, expected):
+    assert find_stable_elements_end(content) == expected
+
+
+def test_render_rich_text_block_keeps_inline_fences_in_code():
+    content = (
+        "Use this:\n\n```markdown\nWrap code in ``` fences.\n\nLike so.\n```\n\nDone."
+    )
+
+    assert render_rich_text_block(content) == {
+        "type": "rich_text",
+        "elements": render_rich_text_elements(content),
+    }
+
+
+def test_render_rich_text_block_matches_elements_for_all_small_contents():
+    pieces = [
+        "Text",
+        "```",
+        " ``` x",
+        "- item",
+        "> quote",
+        "| a |\n|---|",
+        "\n",
+        "\n\n",
+    ]
+    for parts in product(pieces, repeat=4):
+        content = "".join(parts)
+        cache: dict = {}
+        for end in range(1, len(content) + 1, 4):
+            prefix = content[:end]
+            block = render_rich_text_block(prefix, cache)
+            assert (block["elements"] if block else []) == render_rich_text_elements(
+                prefix
+            ), prefix
+
+
+def test_render_rich_text_block_resets_cache_for_edited_content():
+    cache: dict = {}
+    render_rich_text_block("One\n\nTwo", cache)
+
+    assert render_rich_text_block("Three", cache) == {
+        "type": "rich_text",
+        "elements": [section(text("Three"))],
+    }
+
+
+@pytest.mark.parametrize(
+    "reply_format, content, expected",
+    [
+        ("text", "*a*", None),
+        ("markdown", "*a*", [{"type": "markdown", "text": "*a*"}]),
+        ("markdown", "\n", []),
+        (
+            "rich_text",
+            "*a*",
+            [{"type": "rich_text", "elements": [section(text("a", italic=True))]}],
+        ),
+        ("rich_text", "```\n", []),
+    ],
+)
+def test_render_reply_blocks(reply_format, content, expected):
+    assert render_reply_blocks(content=content, reply_format=reply_format) == expected
+
+
+def test_append_loading_character_copies_blocks():
+    blocks = render_reply_blocks(content="a\n\n- b", reply_format="rich_text")
+    assert blocks is not None
+
+    loading = append_loading_character(blocks, " ... :writing_hand:")
+
+    assert loading[0]["elements"][-1] == section(
+        text(" ... "), {"type": "emoji", "name": "writing_hand"}
+    )
+    assert len(blocks[0]["elements"]) == 2
+    assert append_loading_character(
+        [{"type": "markdown", "text": "a"}, {"type": "markdown", "text": "b"}], "…"
+    ) == [{"type": "markdown", "text": "a"}, {"type": "markdown", "text": "b…"}]
@@ -0,0 +1,143 @@
+import pytest
+
+from app.slack_format_logic import (
+    has_stray_backtick,
+    is_wide_char,
+    markdown_to_mrkdwn,
+    mrkdwn_to_markdown,
+    split_code_spans,
+    strip_code_block_tags,
+    strip_reply_start,
+    strip_streamed_reply_start,
+)
+
+# Outputs of the per-pass regex implementation the engine replaced
+MARKDOWN_TO_MRKDWN_CORPUS = [
+    (
+        "Here is **bold**, *italic*, ***both*** and ~~gone~~.",
+        "Here is *bold*, _italic_, _*both*_ and ~gone~.",
+    ),
+    ("**a *b* c**", "*a _b_ c*"),
+    (
+        "__bold__ and `**code**` and\n```\nx = '*a*'\n```\n",
+        "*bold* and `**code**` and\n```\nx = '*a*'\n```\n",
+    ),
+    (
+        "日本語の**太字**と*斜体*、`コード`です。",
+        "日本語の *太字* と _斜体_ 、 `コード` です。",
+    ),
+    ("한국어 ~~취소~~ 테스트", "한국어 ~취소~ 테스트"),
+    ("Unclosed `tick *a*", "Unclosed `tick _a_"),
+    ("snake_case_name and 2 * 3 * 4", "snake_case_name and 2 * 3 * 4"),
+    (
+        "- item **one**\n- item _two_\n> quote ~~x~~",
+        "- item *one*\n- item _two_\n> quote ~x~",
+    ),
+    ("中文`code`中文", "中文 `code` 中文"),
+    ("全角　**スペース**　です", "全角　*スペース*　です"),
+    ("Café *résumé* naïve", "Café _résumé_ naïve"),
+    ("`a``b`", "`a``b`"),
+    ("*a\n`b`\nc*", "*a\n`b`\nc*"),
+    ("*a* \ue000 `b` *c*", "_a_ \ue000 `b` _c_"),
+    (
+        "Use **bold** and `value_0`.\n```python\nprint(item * 2)\n```\n"
+        "日本語の**太字**と`コード`です。",
+        "Use *bold* and `value_0`.\n```python\nprint(item * 2)\n```\n"
+        "日本語の *太字* と `コード` です。",
+    ),
+]
+MRKDWN_TO_MARKDOWN_CORPUS = [
+    ("*bold* _italic_ ~strike~ `*code*`", "**bold** *italic* ~~strike~~ `*code*`"),
+    ("*a _b_ c*", "**a *b* c**"),
+    ("snake_case_name", "snake*case*name"),
+    ("```\n*not bold*\n```", "```\n*not bold*\n```"),
+    ("*a* \ue000 `b` _c_", "**a** \ue000 `b` *c*"),
+    ("use **bold** and ~~old~~ `value_0`", "use ***bold*** and ~~~old~~~ `value_0`"),
+]
+CODE_BLOCK_TAG_CORPUS = [
+    ("```ruby\nputs 1\n```", "```\nputs 1\n```"),
+    (
+        "```Python\nprint(1)\n```\n```js\nx\n```",
+        "```\nprint(1)\n```\n```js\nx\n```",
+    ),
+    ("```\nsh\nls -la\n```", "```\nls -la\n```"),
+    ("```rust\ngo\nfn main() {}\n```", "```\nfn main() {}\n```"),
+    ("```go\nrust\n```", "```\nrust\n```"),
+    ("````c\nint x;\n````", "````\nint x;\n````"),
+]
+
+
+@pytest.mark.parametrize("content, expected", MARKDOWN_TO_MRKDWN_CORPUS)
+def test_markdown_to_mrkdwn_matches_corpus(content, expected):
+    assert markdown_to_mrkdwn(content) == expected
+
+
+@pytest.mark.parametrize("content, expected", MRKDWN_TO_MARKDOWN_CORPUS)
+def test_mrkdwn_to_markdown_matches_corpus(content, expected):
+    assert mrkdwn_to_markdown(content) == expected
+
+
+@pytest.mark.parametrize("content, expected", CODE_BLOCK_TAG_CORPUS)
+def test_strip_code_block_tags_matches_corpus(content, expected):
+    assert strip_code_block_tags(content) == expected
+
+
+@pytest.mark.parametrize(
+    "content, expected",
+    [
+        ("\n\n<@U123ABC>: Hi", "Hi"),
+        ("<@U123ABC> : \nHi", "\nHi"),
+        ("Hi <@U123ABC>: there", "Hi <@U123ABC>: there"),
+    ],
+)
+def test_strip_reply_start(content, expected):
+    assert strip_reply_start(content) == expected
+
+
+@pytest.mark.parametrize(
+    "content, is_final, expected",
+    [
+        ("\n\nHello", False, "Hello"),
+        ("<@U123ABC>: Hello", False, "Hello"),
+        ("\n", False, None),
+        ("<@U12", False, None),
+        ("<@U123ABC>", False, None),
+        ("<@U123ABC>:", False, None),
+        ("<@U123ABC>: ", False, None),
+        ("<@U123ABC>: ", True, ""),
+        ("<https://example.com|link>", False, "<https://example.com|link>"),
+        ("<!here>", False, "<!here>"),
+    ],
+)
+def test_strip_streamed_reply_start(content, is_final, expected):
+    assert strip_streamed_reply_start(content, is_final=is_final) == expected
+
+
+def test_split_code_spans_alternates_text_and_code():
+    assert split_code_spans("a `b` c\n```\nd\n```") == [
+        "a ",
+        "`b`",
+        " c\n",
+        "```\nd\n```",
+        "",
+    ]
+
+
+@pytest.mark.parametrize(
+    "content, expected",
+    [
+        ("a `b` c", False),
+        ("a `b", True),
+        ("```\nopen", True),
+    ],
+)
+def test_has_stray_backtick(content, expected):
+    assert has_stray_backtick(content) == expected
+
+
+@pytest.mark.parametrize(
+    "char, expected",
+    [("漢", True), ("ア", True), ("！", True), ("　", False), ("a", False)],
+)
+def test_is_wide_char(char, expected):
+    assert is_wide_char(char) == expected
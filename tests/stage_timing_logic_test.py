@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from app.stage_timing_logic import StageTimer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_stage_timer_summarizes_overlapping_stages_in_start_order():
+    clock = FakeClock()
+    timer = StageTimer(clock=clock)
+
+    def fetch() -> str:
+        clock.now = 0.002
+        with timer.measure("translate"):
+            clock.now = 0.014
+        clock.now = 0.5
+        return "history"
+
+    clock.now = 0.001
+    assert timer.call("history", fetch) == "history"
+    clock.now = 0.6
+
+    assert [stage.name for stage in timer.stages] == ["translate", "history"]
+    assert timer.format_summary() == (
+        "history 499ms (at 1ms), translate 12ms (at 2ms), total 600ms"
+    )
+
+
+def test_stage_timer_records_failed_stages():
+    clock = FakeClock()
+    timer = StageTimer(clock=clock)
+
+    with pytest.raises(RuntimeError), timer.measure("reply"):
+        clock.now = 0.25
+        raise RuntimeError("failed")
+
+    assert timer.stages[0].name == "reply"
+    assert timer.stages[0].duration_seconds == 0.25
+
+
+def test_stage_timer_times_awaitables():
+    clock = FakeClock()
+    timer = StageTimer(clock=clock)
+
+    async def build() -> list[dict]:
+        clock.now = 0.1
+        return []
+
+    result = asyncio.run(timer.call_async("history", build()))
+
+    assert result == []
+    assert timer.stages[0].duration_seconds == 0.1
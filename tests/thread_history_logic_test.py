@@ -0,0 +1,194 @@
+import pytest
+
+from app.slack_image_service import find_image_files
+from app.slack_pdf_service import find_pdf_files
+from app.thread_history_logic import (
+    ThreadHistoryCache,
+    ThreadReply,
+    build_thread_reply,
+    convert_thread_reply_to_dict,
+    find_thread_event_change,
+    has_thread_reply,
+    parse_ts,
+)
+
+
+def test_parse_ts_orders_fractions_numerically():
+    assert parse_ts("1700000000.000100") < parse_ts("1700000000.000200")
+    assert parse_ts("999999999.999999") < parse_ts("1000000000.000000")
+
+
+def test_build_thread_reply_keeps_only_used_fields():
+    message = {
+        "ts": "1.000001",
+        "text": "Hello",
+        "user": "U1",
+        "blocks": [{"type": "rich_text"}],
+        "files": [
+            {
+                "mimetype": "image/png",
+                "url_private": "https://files.slack.com/a.png",
+                "name": "a.png",
+                "thumb_64": "https://files.slack.com/a_64.png",
+            }
+        ],
+    }
+
+    reply = build_thread_reply(message)
+
+    assert convert_thread_reply_to_dict(reply) == {
+        "ts": "1.000001",
+        "text": "Hello",
+        "bot_id": None,
+        "user": "U1",
+        "files": [
+            {
+                "mimetype": "image/png",
+                "url_private": "https://files.slack.com/a.png",
+                "name": "a.png",
+            }
+        ],
+    }
+
+
+def test_cached_files_are_found_as_in_the_slack_message():
+    message = {
+        "ts": "1.000001",
+        "text": "See these",
+        "user": "U1",
+        "files": [
+            {
+                "id": "F1",
+                "mimetype": "image/png",
+                "url_private": "https://files.slack.com/a.png",
+                "name": "a.png",
+                "size": 1024,
+                "created": 1700000000,
+                "thumb_64": "https://files.slack.com/a_64.png",
+            },
+            {
+                "id": "F2",
+                "mimetype": "application/pdf",
+                "url_private": "https://files.slack.com/b.pdf",
+                "name": "b.pdf",
+                "size": 2048,
+                "created": 1700000001,
+            },
+        ],
+    }
+
+    cached = convert_thread_reply_to_dict(build_thread_reply(message))
+
+    assert find_image_files(cached["files"]) == find_image_files(message["files"])
+    assert find_pdf_files(cached["files"]) == find_pdf_files(message["files"])
+    assert find_image_files(cached["files"])[0][2] == "F1"
+    assert find_pdf_files(cached["files"])[0][2] == "F2"
+
+
+@pytest.mark.parametrize(
+    "payload, expected",
+    [
+        (
+            {"ts": "2.0", "thread_ts": "1.0", "text": "Hi"},
+            ("1.0", {"ts": "2.0", "thread_ts": "1.0", "text": "Hi"}, None),
+        ),
+        (
+            {
+                "subtype": "message_changed",
+                "message": {"ts": "2.0", "thread_ts": "1.0", "text": "Edited"},
+            },
+            ("1.0", {"ts": "2.0", "thread_ts": "1.0", "text": "Edited"}, None),
+        ),
+        (
+            {
+                "subtype": "message_deleted",
+                "deleted_ts": "2.0",
+                "previous_message": {"ts": "2.0", "thread_ts": "1.0"},
+            },
+            ("1.0", None, "2.0"),
+        ),
+        (
+            {"ts": "3.0", "text": "Not in a thread"},
+            (None, {"ts": "3.0", "text": "Not in a thread"}, None),
+        ),
+    ],
+)
+def test_find_thread_event_change(payload, expected):
+    result = find_thread_event_change(payload)
+
+    assert result == expected
+
+
+def test_thread_history_cache_applies_events_to_cached_threads():
+    cache = ThreadHistoryCache(max_threads=10)
+    cache.put("C1", "1.0", [ThreadReply(ts="1.0", text="Parent")])
+
+    assert cache.apply_event("C1", {"ts": "3.0", "thread_ts": "1.0", "text": "B"})
+    assert cache.apply_event("C1", {"ts": "2.0", "thread_ts": "1.0", "text": "A"})
+    assert cache.apply_event(
+        "C1",
+        {
+            "subtype": "message_changed",
+            "message": {"ts": "3.0", "thread_ts": "1.0", "text": "B2"},
+        },
+    )
+    assert cache.apply_event(
+        "C1",
+        {
+            "subtype": "message_deleted",
+            "deleted_ts": "2.0",
+            "previous_message": {"thread_ts": "1.0"},
+        },
+    )
+    assert not cache.apply_event("C1", {"ts": "5.0", "thread_ts": "4.0", "text": "X"})
+
+    replies = cache.get("C1", "1.0")
+    assert replies is not None
+    assert [(r.ts, r.text) for r in replies] == [("1.0", "Parent"), ("3.0", "B2")]
+    assert cache.get("C1", "4.0") is None
+
+
+def test_thread_history_cache_merges_replies_after_a_gap():
+    cache = ThreadHistoryCache(max_threads=10)
+    cache.put("C1", "1.0", [ThreadReply(ts="1.0", text="Parent")])
+
+    merged = cache.merge(
+        "C1",
+        "1.0",
+        [ThreadReply(ts="1.0", text="Parent"), ThreadReply(ts="2.0", text="Missed")],
+    )
+
+    assert merged is not None
+    assert [r.ts for r in merged] == ["1.0", "2.0"]
+    assert has_thread_reply(merged, "2.0")
+    assert not has_thread_reply(merged, "3.0")
+    assert cache.merge("C1", "9.0", []) is None
+
+
+def test_build_thread_reply_keeps_edit_time():
+    message = {"ts": "1.0", "text": "Edited", "edited": {"user": "U1", "ts": "2.0"}}
+
+    result = convert_thread_reply_to_dict(build_thread_reply(message))
+
+    assert result["edited"] == {"ts": "2.0"}
+
+
+def test_thread_history_cache_evicts_least_recently_used_thread():
+    cache = ThreadHistoryCache(max_threads=2)
+    cache.put("C1", "1.0", [])
+    cache.put("C1", "2.0", [])
+    cache.get("C1", "1.0")
+
+    cache.put("C1", "3.0", [])
+
+    assert len(cache) == 2
+    assert cache.get("C1", "2.0") is None
+    assert cache.get("C1", "1.0") == []
+
+
+def test_thread_history_cache_is_disabled_with_zero_size():
+    cache = ThreadHistoryCache(max_threads=0)
+
+    cache.put("C1", "1.0", [ThreadReply(ts="1.0", text="Parent")])
+
+    assert cache.get("C1", "1.0") is None
@@ -0,0 +1,49 @@
+from app.user_profile_logic import UserProfile, UserProfileCache, build_user_profile
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_build_user_profile_keeps_locale_and_timezone():
+    user = {"id": "U1", "locale": "ja-JP", "tz": "Asia/Tokyo", "real_name": "Taro"}
+
+    assert build_user_profile(user) == UserProfile(locale="ja-JP", tz="Asia/Tokyo")
+    assert build_user_profile({"id": "U2"}) == UserProfile()
+
+
+def test_user_profile_cache_expires_entries():
+    clock = FakeClock()
+    cache = UserProfileCache(max_users=10, ttl_seconds=60, clock=clock)
+    cache.put("U1", UserProfile(locale="en-US"))
+
+    clock.now = 59.0
+    assert cache.get("U1") == UserProfile(locale="en-US")
+    clock.now = 60.0
+    assert cache.get("U1") is None
+    assert len(cache) == 0
+
+
+def test_user_profile_cache_evicts_least_recently_used_user():
+    cache = UserProfileCache(max_users=2, ttl_seconds=60)
+    cache.put("U1", UserProfile(locale="en-US"))
+    cache.put("U2", UserProfile(locale="ja-JP"))
+    cache.get("U1")
+
+    cache.put("U3", UserProfile(locale="fr-FR"))
+
+    assert len(cache) == 2
+    assert cache.get("U2") is None
+    assert cache.get("U1") == UserProfile(locale="en-US")
+
+
+def test_user_profile_cache_is_disabled_with_zero_size():
+    cache = UserProfileCache(max_users=0, ttl_seconds=60)
+
+    cache.put("U1", UserProfile(locale="en-US"))
+
+    assert cache.get("U1") is None